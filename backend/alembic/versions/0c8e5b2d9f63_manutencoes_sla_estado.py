@@ -0,0 +1,102 @@
+"""manutencoes: precomputed SLA state for the SLA scheduler
+
+Revision ID: 0c8e5b2d9f63
+Revises: f1a4c7e2b985
+Create Date: 2026-10-19 21:30:00.000000
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c8e5b2d9f63'
+down_revision = 'f1a4c7e2b985'
+branch_labels = None
+depends_on = None
+
+PROXIMO_EVENTO = sa.text('sla_proximo_evento_em IS NOT NULL')
+ENCERRADOS = ('resolvido', 'fechado', 'cancelado', 'finalizada', 'cancelada')
+ALERTA = 0.8
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('manutencoes') as batch_op:
+        batch_op.add_column(sa.Column('sla_vence_em', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('sla_proximo_evento_em', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('sla_pausado_em', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('sla_alerta_em', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('sla_violado_em', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_manutencoes_sla_proximo_evento_em', 'manutencoes', ['sla_proximo_evento_em'], unique=False,
+                    postgresql_where=PROXIMO_EVENTO, sqlite_where=PROXIMO_EVENTO)
+    op.create_index('ix_manutencoes_sla_vence_em', 'manutencoes', ['sla_vence_em'], unique=False)
+
+    # Estado inicial das ordens em aberto; violações já ocorridas são marcadas
+    # pelo agendador na primeira execução (próximo evento no passado). Ordens
+    # encerradas recebem o prazo efetivo e, se resolvidas depois dele, a
+    # violação no instante do prazo (o agendador não as processa)
+    manutencoes = sa.table(
+        'manutencoes',
+        sa.column('id', sa.Integer), sa.column('status', sa.String), sa.column('sla_horas', sa.Integer),
+        sa.column('data_vencimento_sla', sa.DateTime), sa.column('sla_pausado', sa.Integer),
+        sa.column('tempo_pausado_minutos', sa.Integer), sa.column('data_resolucao', sa.DateTime),
+        sa.column('sla_vence_em', sa.DateTime), sa.column('sla_proximo_evento_em', sa.DateTime),
+        sa.column('sla_pausado_em', sa.DateTime), sa.column('sla_violado_em', sa.DateTime),
+    )
+    bind = op.get_bind()
+    agora = datetime.now()
+    linhas = bind.execute(
+        sa.select(
+            manutencoes.c.id, manutencoes.c.status, manutencoes.c.sla_horas, manutencoes.c.data_vencimento_sla,
+            manutencoes.c.sla_pausado, manutencoes.c.tempo_pausado_minutos, manutencoes.c.data_resolucao,
+        ).where(manutencoes.c.data_vencimento_sla.isnot(None))
+    ).all()
+    valores = []
+    for linha in linhas:
+        vence_em = _local(linha.data_vencimento_sla) + timedelta(minutes=linha.tempo_pausado_minutos or 0)
+        if linha.status in ENCERRADOS:
+            resolucao = _local(linha.data_resolucao)
+            valores.append({
+                'b_id': linha.id, 'sla_vence_em': vence_em, 'sla_proximo_evento_em': None, 'sla_pausado_em': None,
+                'sla_violado_em': vence_em if resolucao is not None and resolucao > vence_em else None,
+            })
+            continue
+        proximo = None
+        if not linha.sla_pausado:
+            proximo = vence_em - timedelta(hours=(linha.sla_horas or 0) * (1 - ALERTA))
+        valores.append({
+            'b_id': linha.id, 'sla_vence_em': vence_em, 'sla_proximo_evento_em': proximo,
+            'sla_pausado_em': agora if linha.sla_pausado else None, 'sla_violado_em': None,
+        })
+    if valores:
+        bind.execute(
+            manutencoes.update()
+            .where(manutencoes.c.id == sa.bindparam('b_id'))
+            .values(
+                sla_vence_em=sa.bindparam('sla_vence_em'),
+                sla_proximo_evento_em=sa.bindparam('sla_proximo_evento_em'),
+                sla_pausado_em=sa.bindparam('sla_pausado_em'),
+                sla_violado_em=sa.bindparam('sla_violado_em'),
+            ),
+            valores,
+        )
+
+
+def _local(valor):
+    """Hora local sem fuso (timestamptz volta com fuso no PostgreSQL)"""
+    if valor is not None and valor.tzinfo is not None:
+        return valor.astimezone().replace(tzinfo=None)
+    return valor
+
+
+def downgrade() -> None:
+    op.drop_index('ix_manutencoes_sla_vence_em', table_name='manutencoes')
+    op.drop_index('ix_manutencoes_sla_proximo_evento_em', table_name='manutencoes')
+    with op.batch_alter_table('manutencoes') as batch_op:
+        batch_op.drop_column('sla_violado_em')
+        batch_op.drop_column('sla_alerta_em')
+        batch_op.drop_column('sla_pausado_em')
+        batch_op.drop_column('sla_proximo_evento_em')
+        batch_op.drop_column('sla_vence_em')
@@ -0,0 +1,35 @@
+"""asset audit chain checkpoints
+
+Revision ID: 5e2b8f0c7a14
+Revises: d4a7c1e93b62
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2b8f0c7a14'
+down_revision = 'd4a7c1e93b62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('asset_audit_checkpoints',
+    sa.Column('asset_id', sa.Integer(), nullable=False),
+    sa.Column('last_audit_id', sa.Integer(), nullable=False),
+    sa.Column('last_hash', sa.String(length=64), nullable=True),
+    sa.Column('verified_count', sa.Integer(), nullable=False),
+    sa.Column('broken_audit_id', sa.Integer(), nullable=True),
+    sa.Column('broken_reason', sa.String(length=50), nullable=True),
+    sa.Column('verified_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('asset_id')
+    )
+    op.create_index('ix_asset_audits_asset_id_id', 'asset_audits', ['asset_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_asset_audits_asset_id_id', table_name='asset_audits')
+    op.drop_table('asset_audit_checkpoints')
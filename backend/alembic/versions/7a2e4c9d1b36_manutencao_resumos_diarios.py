@@ -0,0 +1,45 @@
+"""manutencao_resumos_diarios: daily maintenance rollup
+
+Revision ID: 7a2e4c9d1b36
+Revises: 0c8e5b2d9f63
+Create Date: 2026-10-19 23:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a2e4c9d1b36'
+down_revision = '0c8e5b2d9f63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'manutencao_resumos_diarios',
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('categoria', sa.String(length=50), nullable=False),
+        sa.Column('tipo', sa.String(length=20), nullable=False),
+        sa.Column('abertas', sa.Integer(), nullable=False),
+        sa.Column('resolvidas', sa.Integer(), nullable=False),
+        sa.Column('minutos_reparo_total', sa.Float(), nullable=False),
+        sa.Column('reparo_p50_minutos', sa.Float(), nullable=True),
+        sa.Column('reparo_p90_minutos', sa.Float(), nullable=True),
+        sa.Column('sla_avaliadas', sa.Integer(), nullable=False),
+        sa.Column('sla_cumpridas', sa.Integer(), nullable=False),
+        sa.Column('custo_total', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('calculado_em', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('dia', 'categoria', 'tipo'),
+    )
+    op.create_index('ix_manutencoes_data_abertura', 'manutencoes', ['data_abertura'])
+    op.create_index('ix_manutencoes_data_resolucao', 'manutencoes', ['data_resolucao'])
+    op.create_index('ix_manutencoes_atualizado_em', 'manutencoes', ['atualizado_em'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_manutencoes_atualizado_em', table_name='manutencoes')
+    op.drop_index('ix_manutencoes_data_resolucao', table_name='manutencoes')
+    op.drop_index('ix_manutencoes_data_abertura', table_name='manutencoes')
+    op.drop_table('manutencao_resumos_diarios')
@@ -0,0 +1,28 @@
+"""auditoria_itens: estado_esperado, verificado_por nullable
+
+Revision ID: 8b41d6e2c931
+Revises: 3f9c2a7d5b10
+Create Date: 2026-10-19 17:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41d6e2c931'
+down_revision = '3f9c2a7d5b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('auditoria_itens') as batch_op:
+        batch_op.add_column(sa.Column('estado_esperado', sa.String(length=30), nullable=True))
+        batch_op.alter_column('verificado_por', existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('auditoria_itens') as batch_op:
+        batch_op.alter_column('verificado_por', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_column('estado_esperado')
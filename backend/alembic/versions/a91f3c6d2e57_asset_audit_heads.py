@@ -0,0 +1,50 @@
+"""asset audit chain heads and chain sequence
+
+Revision ID: a91f3c6d2e57
+Revises: 5e2b8f0c7a14
+Create Date: 2026-10-19 19:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a91f3c6d2e57'
+down_revision = '5e2b8f0c7a14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('asset_audit_heads',
+    sa.Column('asset_id', sa.Integer(), nullable=False),
+    sa.Column('last_hash', sa.String(length=64), nullable=True),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('asset_id')
+    )
+    with op.batch_alter_table('asset_audits') as batch_op:
+        batch_op.add_column(sa.Column('chain_seq', sa.Integer(), nullable=True))
+    op.create_index('uq_asset_audits_asset_id_chain_seq', 'asset_audits', ['asset_id', 'chain_seq'], unique=True)
+
+    # Heads of existing chains: last record (by id) of each asset
+    op.execute(
+        """
+        INSERT INTO asset_audit_heads (asset_id, last_hash, seq)
+        SELECT a.asset_id, a.record_hash, c.total
+        FROM asset_audits a
+        JOIN (
+            SELECT asset_id, MAX(id) AS last_id, COUNT(*) AS total
+            FROM asset_audits
+            GROUP BY asset_id
+        ) c ON a.id = c.last_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_asset_audits_asset_id_chain_seq', table_name='asset_audits')
+    with op.batch_alter_table('asset_audits') as batch_op:
+        batch_op.drop_column('chain_seq')
+    op.drop_table('asset_audit_heads')
@@ -0,0 +1,141 @@
+"""custodia_intervalos: precomputed custody intervals per asset
+
+Revision ID: b3d8e1f47a20
+Revises: e6c0d9b4f218
+Create Date: 2026-10-19 20:30:00.000000
+
+"""
+from datetime import datetime
+from itertools import groupby
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d8e1f47a20'
+down_revision = 'e6c0d9b4f218'
+branch_labels = None
+depends_on = None
+
+EXECUTADAS = ('executada', 'concluida')
+LOTE = 1000
+
+
+def upgrade() -> None:
+    op.create_table('custodia_intervalos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('ativo_id', sa.Integer(), nullable=False),
+    sa.Column('local_id', sa.Integer(), nullable=True),
+    sa.Column('responsavel_id', sa.Integer(), nullable=True),
+    sa.Column('movimentacao_id', sa.Integer(), nullable=True),
+    sa.Column('inicio', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('fim', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['ativo_id'], ['ativos.id'], ),
+    sa.ForeignKeyConstraint(['local_id'], ['locais.id'], ),
+    sa.ForeignKeyConstraint(['movimentacao_id'], ['movimentacoes.id'], ),
+    sa.ForeignKeyConstraint(['responsavel_id'], ['responsaveis.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_custodia_intervalos_ativo_inicio', 'custodia_intervalos', ['ativo_id', 'inicio'], unique=False)
+    op.create_index('ix_custodia_intervalos_local_inicio_fim', 'custodia_intervalos', ['local_id', 'inicio', 'fim'], unique=False)
+    op.create_index('ix_custodia_intervalos_responsavel_inicio_fim', 'custodia_intervalos', ['responsavel_id', 'inicio', 'fim'], unique=False)
+    op.create_index(
+        'uq_custodia_intervalos_ativo_aberto', 'custodia_intervalos', ['ativo_id'], unique=True,
+        postgresql_where=sa.text('fim IS NULL'), sqlite_where=sa.text('fim IS NULL'),
+    )
+
+    _reconstruir_intervalos(op.get_bind())
+
+
+def _reconstruir_intervalos(bind) -> None:
+    """
+    Histórico de custódia a partir das movimentações executadas, em ordem de
+    conclusão: a custódia inicial (origem da primeira movimentação) desde o
+    cadastro, um intervalo por movimentação até a conclusão da seguinte e o
+    último aberto, salvo após uma baixa. Ativos nunca movimentados recebem a
+    custódia atual, aberta desde o cadastro.
+    """
+    ativos = sa.table(
+        'ativos',
+        sa.column('id', sa.Integer), sa.column('local_id', sa.Integer), sa.column('responsavel_id', sa.Integer),
+        sa.column('status', sa.String), sa.column('criado_em', sa.DateTime), sa.column('atualizado_em', sa.DateTime),
+    )
+    movimentacoes = sa.table(
+        'movimentacoes',
+        sa.column('id', sa.Integer), sa.column('ativo_id', sa.Integer), sa.column('tipo', sa.String),
+        sa.column('status', sa.String), sa.column('de_local_id', sa.Integer), sa.column('para_local_id', sa.Integer),
+        sa.column('de_responsavel_id', sa.Integer), sa.column('para_responsavel_id', sa.Integer),
+        sa.column('data_conclusao', sa.DateTime),
+    )
+    intervalos = sa.table(
+        'custodia_intervalos',
+        sa.column('ativo_id', sa.Integer), sa.column('local_id', sa.Integer), sa.column('responsavel_id', sa.Integer),
+        sa.column('movimentacao_id', sa.Integer), sa.column('inicio', sa.DateTime), sa.column('fim', sa.DateTime),
+    )
+
+    agora = datetime.now()
+    cadastro = {linha.id: linha for linha in bind.execute(sa.select(ativos)).all()}
+    executadas = bind.execute(
+        sa.select(movimentacoes)
+        .where(movimentacoes.c.status.in_(EXECUTADAS), movimentacoes.c.data_conclusao.isnot(None))
+        .order_by(movimentacoes.c.ativo_id, movimentacoes.c.data_conclusao, movimentacoes.c.id)
+    ).all()
+
+    lote = []
+
+    def adicionar(**intervalo):
+        lote.append(intervalo)
+        if len(lote) >= LOTE:
+            bind.execute(intervalos.insert(), lote)
+            lote.clear()
+
+    movimentados = set()
+    for ativo_id, historico in groupby(executadas, key=lambda linha: linha.ativo_id):
+        ativo = cadastro.get(ativo_id)
+        if ativo is None:
+            continue
+        movimentados.add(ativo_id)
+        historico = list(historico)
+
+        primeira = historico[0]
+        local_id, responsavel_id = primeira.de_local_id, primeira.de_responsavel_id
+        if ativo.criado_em is not None and ativo.criado_em < primeira.data_conclusao:
+            adicionar(
+                ativo_id=ativo_id, local_id=local_id, responsavel_id=responsavel_id,
+                movimentacao_id=None, inicio=ativo.criado_em, fim=primeira.data_conclusao,
+            )
+
+        for movimentacao, seguinte in zip(historico, historico[1:] + [None]):
+            local_id = movimentacao.para_local_id or local_id
+            responsavel_id = movimentacao.para_responsavel_id or responsavel_id
+            if movimentacao.tipo == 'baixa':
+                continue
+            if seguinte is not None:
+                fim = seguinte.data_conclusao
+            elif ativo.status == 'baixado':
+                # Baixado sem movimentação de baixa: custódia encerrada na última alteração
+                fim = max(ativo.atualizado_em or agora, movimentacao.data_conclusao)
+            else:
+                fim = None
+            adicionar(
+                ativo_id=ativo_id, local_id=local_id, responsavel_id=responsavel_id,
+                movimentacao_id=movimentacao.id, inicio=movimentacao.data_conclusao, fim=fim,
+            )
+
+    for ativo in cadastro.values():
+        if ativo.id not in movimentados and ativo.status != 'baixado':
+            adicionar(
+                ativo_id=ativo.id, local_id=ativo.local_id, responsavel_id=ativo.responsavel_id,
+                movimentacao_id=None, inicio=ativo.criado_em or agora, fim=None,
+            )
+    if lote:
+        bind.execute(intervalos.insert(), lote)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_custodia_intervalos_ativo_aberto', table_name='custodia_intervalos')
+    op.drop_index('ix_custodia_intervalos_responsavel_inicio_fim', table_name='custodia_intervalos')
+    op.drop_index('ix_custodia_intervalos_local_inicio_fim', table_name='custodia_intervalos')
+    op.drop_index('ix_custodia_intervalos_ativo_inicio', table_name='custodia_intervalos')
+    op.drop_table('custodia_intervalos')
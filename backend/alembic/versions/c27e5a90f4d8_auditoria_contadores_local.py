@@ -0,0 +1,43 @@
+"""auditoria_contadores_local and auditoria_itens (auditoria_id, resultado) index
+
+Revision ID: c27e5a90f4d8
+Revises: 8b41d6e2c931
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c27e5a90f4d8'
+down_revision = '8b41d6e2c931'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('auditoria_contadores_local',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('auditoria_id', sa.Integer(), nullable=False),
+    sa.Column('local_id', sa.Integer(), nullable=False),
+    sa.Column('esperados', sa.Integer(), nullable=False),
+    sa.Column('verificados', sa.Integer(), nullable=False),
+    sa.Column('conformes', sa.Integer(), nullable=False),
+    sa.Column('divergentes', sa.Integer(), nullable=False),
+    sa.Column('nao_encontrados', sa.Integer(), nullable=False),
+    sa.Column('extras', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['auditoria_id'], ['auditorias.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('auditoria_id', 'local_id', name='uq_auditoria_contador_local')
+    )
+    op.create_index(op.f('ix_auditoria_contadores_local_id'), 'auditoria_contadores_local', ['id'], unique=False)
+    op.create_index(op.f('ix_auditoria_contadores_local_auditoria_id'), 'auditoria_contadores_local', ['auditoria_id'], unique=False)
+    op.create_index('ix_auditoria_itens_auditoria_resultado', 'auditoria_itens', ['auditoria_id', 'resultado'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_auditoria_itens_auditoria_resultado', table_name='auditoria_itens')
+    op.drop_index(op.f('ix_auditoria_contadores_local_auditoria_id'), table_name='auditoria_contadores_local')
+    op.drop_index(op.f('ix_auditoria_contadores_local_id'), table_name='auditoria_contadores_local')
+    op.drop_table('auditoria_contadores_local')
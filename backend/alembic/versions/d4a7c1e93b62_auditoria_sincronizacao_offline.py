@@ -0,0 +1,47 @@
+"""auditoria: versões de itens e recibos de leituras (sincronização offline)
+
+Revision ID: d4a7c1e93b62
+Revises: c27e5a90f4d8
+Create Date: 2026-10-19 18:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7c1e93b62'
+down_revision = 'c27e5a90f4d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('auditoria_item_versoes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('auditoria_id', sa.Integer(), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['auditoria_id'], ['auditorias.id'], ),
+    sa.ForeignKeyConstraint(['item_id'], ['auditoria_itens.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_auditoria_item_versoes_auditoria_id_id', 'auditoria_item_versoes', ['auditoria_id', 'id'], unique=False)
+    op.create_table('auditoria_leituras_recebidas',
+    sa.Column('auditoria_id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.String(length=64), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=True),
+    sa.Column('dispositivo_id', sa.String(length=100), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('resultado', sa.String(length=30), nullable=True),
+    sa.Column('erro', sa.Text(), nullable=True),
+    sa.Column('recebido_em', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['auditoria_id'], ['auditorias.id'], ),
+    sa.PrimaryKeyConstraint('auditoria_id', 'client_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('auditoria_leituras_recebidas')
+    op.drop_index('ix_auditoria_item_versoes_auditoria_id_id', table_name='auditoria_item_versoes')
+    op.drop_table('auditoria_item_versoes')
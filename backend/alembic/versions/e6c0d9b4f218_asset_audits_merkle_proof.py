@@ -0,0 +1,26 @@
+"""asset_audits: merkle_proof for batch-signed records
+
+Revision ID: e6c0d9b4f218
+Revises: a91f3c6d2e57
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6c0d9b4f218'
+down_revision = 'a91f3c6d2e57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('asset_audits') as batch_op:
+        batch_op.add_column(sa.Column('merkle_proof', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('asset_audits') as batch_op:
+        batch_op.drop_column('merkle_proof')
@@ -0,0 +1,51 @@
+"""movimentacoes: approval routing columns and pending-queue partial indexes
+
+Revision ID: f1a4c7e2b985
+Revises: b3d8e1f47a20
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a4c7e2b985'
+down_revision = 'b3d8e1f47a20'
+branch_labels = None
+depends_on = None
+
+PENDENTE = sa.text("status = 'pendente_aprovacao'")
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('movimentacoes') as batch_op:
+        batch_op.add_column(sa.Column('setor_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('centro_custo_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_movimentacoes_setor_id', 'setores', ['setor_id'], ['id'])
+        batch_op.create_foreign_key('fk_movimentacoes_centro_custo_id', 'centros_custo', ['centro_custo_id'], ['id'])
+
+    # Roteamento das movimentações já existentes pelo setor/centro de custo atual do ativo
+    op.execute(
+        "UPDATE movimentacoes SET "
+        "setor_id = (SELECT ativos.setor_id FROM ativos WHERE ativos.id = movimentacoes.ativo_id), "
+        "centro_custo_id = (SELECT ativos.centro_custo_id FROM ativos WHERE ativos.id = movimentacoes.ativo_id)"
+    )
+
+    op.create_index('ix_movimentacoes_pendentes', 'movimentacoes', ['id'], unique=False,
+                    postgresql_where=PENDENTE, sqlite_where=PENDENTE)
+    op.create_index('ix_movimentacoes_pendentes_setor', 'movimentacoes', ['setor_id', 'id'], unique=False,
+                    postgresql_where=PENDENTE, sqlite_where=PENDENTE)
+    op.create_index('ix_movimentacoes_pendentes_centro_custo', 'movimentacoes', ['centro_custo_id', 'id'], unique=False,
+                    postgresql_where=PENDENTE, sqlite_where=PENDENTE)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_movimentacoes_pendentes_centro_custo', table_name='movimentacoes')
+    op.drop_index('ix_movimentacoes_pendentes_setor', table_name='movimentacoes')
+    op.drop_index('ix_movimentacoes_pendentes', table_name='movimentacoes')
+    with op.batch_alter_table('movimentacoes') as batch_op:
+        batch_op.drop_constraint('fk_movimentacoes_centro_custo_id', type_='foreignkey')
+        batch_op.drop_constraint('fk_movimentacoes_setor_id', type_='foreignkey')
+        batch_op.drop_column('centro_custo_id')
+        batch_op.drop_column('setor_id')
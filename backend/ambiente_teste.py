@@ -0,0 +1,134 @@
+"""
+Ambiente isolado dos scripts de teste (test_*.py)
+
+Importar antes de qualquer módulo ``app``: aponta a aplicação para um banco
+SQLite temporário (o levitiis_dev.db não é tocado), cria as tabelas e
+oferece helpers para cadastros, tokens e contagem de queries.
+
+    cd backend && python -m pytest -q test_movimentacoes.py
+    cd backend && python test_movimentacoes.py
+"""
+
+import itertools
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+_diretorio = tempfile.mkdtemp(prefix="levitiis_teste_")
+_banco = os.path.join(_diretorio, "teste.db")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_banco}",
+    "DATABASE_URL_SYNC": f"sqlite:///{_banco}",
+    "ASYNC_DATABASE_URL": f"sqlite+aiosqlite:///{_banco}",
+    "DEBUG": "false",
+    "UPLOAD_PATH": os.path.join(_diretorio, "uploads"),
+    "REDIS_URL": "",
+    "RATE_LIMIT_RULES": "",
+    "RATE_LIMIT_DEFAULT": "1000000/60",
+})
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import app.models  # noqa: E402,F401
+from app.core.database import Base, SessionLocal, async_engine, sync_engine  # noqa: E402
+from app.core.security import create_access_token, get_password_hash  # noqa: E402
+from app.models import (  # noqa: E402
+    Ativo, CentroCusto, Local, Responsavel, Setor, User, UserRole
+)
+
+Base.metadata.create_all(sync_engine)
+
+DIRETORIO = _diretorio
+_sequencia = itertools.count(1)
+
+
+def cliente() -> TestClient:
+    """Cliente HTTP da aplicação completa (sem lifespan: job runner e monitoramento parados)"""
+    import main
+    return TestClient(main.app, base_url="http://localhost")
+
+
+def criar(db, modelo, **campos):
+    """Inserir uma linha e devolvê-la já com o ID"""
+    objeto = modelo(**campos)
+    db.add(objeto)
+    db.commit()
+    db.refresh(objeto)
+    return objeto
+
+
+def criar_usuario(db, role: UserRole = UserRole.ADMIN) -> User:
+    n = next(_sequencia)
+    return criar(
+        db, User, username=f"usuario{n}", email=f"usuario{n}@teste.com", full_name=f"Usuário {n}",
+        hashed_password=get_password_hash("senha123"), role=role,
+    )
+
+
+def cabecalhos(usuario: User) -> dict:
+    """Authorization de um usuário (token de acesso com o role no payload)"""
+    role = usuario.role.value if hasattr(usuario.role, "value") else usuario.role
+    token = create_access_token({"sub": str(usuario.id), "email": usuario.email, "role": role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def criar_setor(db, gestor: User = None, centro_custo: CentroCusto = None) -> Setor:
+    n = next(_sequencia)
+    return criar(
+        db, Setor, nome=f"Setor {n}", codigo=f"S{n}",
+        gestor_id=gestor.id if gestor else None,
+        centro_custo_id=centro_custo.id if centro_custo else None,
+    )
+
+
+def criar_centro_custo(db) -> CentroCusto:
+    n = next(_sequencia)
+    return criar(db, CentroCusto, codigo=f"CC{n}", nome=f"Centro {n}")
+
+
+def criar_local(db) -> Local:
+    n = next(_sequencia)
+    return criar(db, Local, codigo=f"L{n}", unidade="Matriz")
+
+
+def criar_responsavel(db, setor: Setor) -> Responsavel:
+    n = next(_sequencia)
+    return criar(db, Responsavel, nome=f"Responsável {n}", email=f"resp{n}@teste.com", setor_id=setor.id)
+
+
+def criar_ativo(db, **campos) -> Ativo:
+    n = next(_sequencia)
+    campos.setdefault("descricao", f"Ativo {n}")
+    return criar(db, Ativo, codigo=f"AT{n:06d}", **campos)
+
+
+@contextmanager
+def contar_queries():
+    """Lista das instruções SQL executadas (engines síncrono e assíncrono) no bloco"""
+    instrucoes = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        instrucoes.append(statement)
+
+    engines = (sync_engine, async_engine.sync_engine)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        yield instrucoes
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", registrar)
+
+
+def sessao():
+    return SessionLocal()
+
+
+def executar(*testes):
+    """Rodar os testes de um script sem pytest"""
+    for teste in testes:
+        teste()
+        print(f"✓ {teste.__name__}")
@@ -7,8 +7,6 @@ from fastapi import APIRouter, HTTPException, status, Depends, Query, Background
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 import structlog
-import psutil
-import platform
 import socket
 import uuid
 import json
@@ -18,6 +16,7 @@ from app.core.database import get_sync_session
 from app.core.security import get_current_user_from_token
 from app.models.machine import Machine, MachineStatus, MachineType, OperatingSystem
 from app.core.redis_config import redis_manager
+from app.core.system_metrics import system_sampler
 
 logger = structlog.get_logger()
 
@@ -25,155 +24,32 @@ router = APIRouter(prefix="/machines", tags=["Machine Monitoring"])
 
 
 class WindowsSystemCollector:
-    """Collector for Windows system metrics"""
+    """Collector for Windows system metrics (latest sample of the system metrics sampler)"""
     
     @staticmethod
     def get_cpu_metrics() -> Dict[str, Any]:
         """Collect CPU metrics"""
-        try:
-            cpu_percent = psutil.cpu_percent(interval=1)
-            cpu_count = psutil.cpu_count()
-            cpu_count_logical = psutil.cpu_count(logical=True)
-            cpu_freq = psutil.cpu_freq()
-            
-            return {
-                "usage_percent": round(cpu_percent, 2),
-                "cores_physical": cpu_count,
-                "cores_logical": cpu_count_logical,
-                "frequency_mhz": round(cpu_freq.current, 2) if cpu_freq else None,
-                "frequency_max_mhz": round(cpu_freq.max, 2) if cpu_freq else None,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        except Exception as e:
-            logger.error(f"Error collecting CPU metrics: {e}")
-            return {"error": str(e)}
+        return dict(system_sampler.snapshot["cpu"])
     
     @staticmethod
     def get_memory_metrics() -> Dict[str, Any]:
         """Collect memory metrics"""
-        try:
-            memory = psutil.virtual_memory()
-            swap = psutil.swap_memory()
-            
-            return {
-                "total_gb": round(memory.total / (1024**3), 2),
-                "available_gb": round(memory.available / (1024**3), 2),
-                "used_gb": round(memory.used / (1024**3), 2),
-                "usage_percent": round(memory.percent, 2),
-                "swap_total_gb": round(swap.total / (1024**3), 2),
-                "swap_used_gb": round(swap.used / (1024**3), 2),
-                "swap_usage_percent": round(swap.percent, 2),
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        except Exception as e:
-            logger.error(f"Error collecting memory metrics: {e}")
-            return {"error": str(e)}
+        return dict(system_sampler.snapshot["memory"])
     
     @staticmethod
     def get_disk_metrics() -> Dict[str, Any]:
         """Collect disk metrics"""
-        try:
-            disk_usage = psutil.disk_usage('/')
-            disk_io = psutil.disk_io_counters()
-            
-            # Get all disk partitions
-            partitions = []
-            for partition in psutil.disk_partitions():
-                try:
-                    partition_usage = psutil.disk_usage(partition.mountpoint)
-                    partitions.append({
-                        "device": partition.device,
-                        "mountpoint": partition.mountpoint,
-                        "fstype": partition.fstype,
-                        "total_gb": round(partition_usage.total / (1024**3), 2),
-                        "used_gb": round(partition_usage.used / (1024**3), 2),
-                        "free_gb": round(partition_usage.free / (1024**3), 2),
-                        "usage_percent": round((partition_usage.used / partition_usage.total) * 100, 2)
-                    })
-                except PermissionError:
-                    continue
-            
-            return {
-                "total_gb": round(disk_usage.total / (1024**3), 2),
-                "used_gb": round(disk_usage.used / (1024**3), 2),
-                "free_gb": round(disk_usage.free / (1024**3), 2),
-                "usage_percent": round((disk_usage.used / disk_usage.total) * 100, 2),
-                "read_bytes": disk_io.read_bytes if disk_io else 0,
-                "write_bytes": disk_io.write_bytes if disk_io else 0,
-                "partitions": partitions,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        except Exception as e:
-            logger.error(f"Error collecting disk metrics: {e}")
-            return {"error": str(e)}
+        return dict(system_sampler.snapshot["disk"])
     
     @staticmethod
     def get_network_metrics() -> Dict[str, Any]:
         """Collect network metrics"""
-        try:
-            net_io = psutil.net_io_counters()
-            net_connections = len(psutil.net_connections())
-            
-            # Get network interfaces
-            interfaces = []
-            for interface, addrs in psutil.net_if_addrs().items():
-                interface_stats = psutil.net_if_stats().get(interface)
-                interface_info = {
-                    "name": interface,
-                    "is_up": interface_stats.isup if interface_stats else False,
-                    "speed_mbps": interface_stats.speed if interface_stats else 0,
-                    "addresses": []
-                }
-                
-                for addr in addrs:
-                    interface_info["addresses"].append({
-                        "family": str(addr.family),
-                        "address": addr.address,
-                        "netmask": addr.netmask,
-                        "broadcast": addr.broadcast
-                    })
-                
-                interfaces.append(interface_info)
-            
-            return {
-                "bytes_sent": net_io.bytes_sent,
-                "bytes_recv": net_io.bytes_recv,
-                "packets_sent": net_io.packets_sent,
-                "packets_recv": net_io.packets_recv,
-                "errors_in": net_io.errin,
-                "errors_out": net_io.errout,
-                "drops_in": net_io.dropin,
-                "drops_out": net_io.dropout,
-                "connections_count": net_connections,
-                "interfaces": interfaces,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        except Exception as e:
-            logger.error(f"Error collecting network metrics: {e}")
-            return {"error": str(e)}
+        return dict(system_sampler.snapshot["network"])
     
     @staticmethod
     def get_system_info() -> Dict[str, Any]:
         """Collect system information"""
-        try:
-            boot_time = datetime.fromtimestamp(psutil.boot_time())
-            uptime = datetime.now() - boot_time
-            
-            return {
-                "hostname": socket.gethostname(),
-                "platform": platform.platform(),
-                "system": platform.system(),
-                "release": platform.release(),
-                "version": platform.version(),
-                "machine": platform.machine(),
-                "processor": platform.processor(),
-                "boot_time": boot_time.isoformat(),
-                "uptime_seconds": int(uptime.total_seconds()),
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        except Exception as e:
-            logger.error(f"Error collecting system info: {e}")
-            return {"error": str(e)}
+        return dict(system_sampler.snapshot["system"])
 
 
 @router.get("/metrics/current")
@@ -197,7 +73,7 @@ async def get_current_machine_metrics(
         }
         
         # Store metrics in Redis for real-time access
-        await redis_manager.set(
+        redis_manager.set(
             f"machine_metrics:current",
             json.dumps(metrics),
             expire=300  # 5 minutes
@@ -489,7 +365,7 @@ async def update_machine_metrics(
             "updated_at": datetime.utcnow().isoformat()
         }
         
-        await redis_manager.set(
+        redis_manager.set(
             f"machine_metrics:{machine_id}",
             json.dumps(metrics_data),
             expire=300  # 5 minutes
@@ -2,15 +2,22 @@
 Monitoring and metrics endpoints
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from fastapi.responses import PlainTextResponse, Response
+from fastapi.security import HTTPAuthorizationCredentials
 from typing import Optional
+import hmac
 import structlog
 
+from app.core.config import settings
 from app.core.monitoring import (
     metrics_collector, get_metrics_summary, start_monitoring, stop_monitoring
 )
+from app.core.profiling import profiler
+from app.core.query_stats import query_tracker
+from app.core.prometheus import OPENMETRICS_CONTENT_TYPE, PROMETHEUS_CONTENT_TYPE, render_metrics
 from app.core.redis_config import redis_health_check, redis_manager
-from app.core.security import get_current_user_from_token
+from app.core.security import get_current_user_from_token, security
 
 logger = structlog.get_logger()
 
@@ -91,6 +98,133 @@ async def get_metrics(
         )
 
 
+@router.get("/prometheus")
+async def get_prometheus_metrics(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    Metrics in Prometheus text format (OpenMetrics when the scraper asks for it)
+    
+    Authenticated with ``METRICS_BEARER_TOKEN`` (scrape config) or an admin/monitor JWT.
+    """
+    token = settings.METRICS_BEARER_TOKEN
+    if not (token and hmac.compare_digest(credentials.credentials.encode(), token.encode())):
+        current_user = get_current_user_from_token(credentials)
+        if current_user.get("role", "") not in ["admin", "monitor"]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Monitoring access required"
+            )
+    
+    openmetrics = "application/openmetrics-text" in request.headers.get("accept", "")
+    try:
+        content = await render_metrics(openmetrics)
+    except Exception as e:
+        logger.error(f"Prometheus metrics error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to render metrics"
+        )
+    
+    return Response(
+        content=content,
+        headers={"Content-Type": OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE}
+    )
+
+
+@router.get("/queries")
+async def get_query_statistics(
+    sort: str = Query("total_time", pattern="^(total_time|mean_time|p99_time|count|rows)$"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_user_from_token)
+):
+    """
+    Statistics per query fingerprint and the latest slow queries
+    
+    ``routes[].per_request`` is the number of executions per request of the
+    route: values well above 1 point at N+1 patterns.
+    """
+    if current_user.get("role", "") not in ["admin", "monitor"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Monitoring access required"
+        )
+    
+    return query_tracker.summary(sort, limit)
+
+
+@router.delete("/queries")
+async def reset_query_statistics(
+    current_user: dict = Depends(get_current_user_from_token)
+):
+    """
+    Discard the query statistics (admin only)
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    query_tracker.reset()
+    logger.info(f"Query statistics reset by admin user {current_user.get('email')}")
+    return {"message": "Query statistics reset"}
+
+
+@router.get("/profiles")
+async def get_profiles(
+    route: Optional[str] = Query(None, description='Route template, e.g. "GET /api/v1/ativos/{ativo_id}"'),
+    format: str = Query("summary", pattern="^(summary|collapsed|flamegraph)$"),
+    limit: Optional[int] = Query(None, ge=1, description="Most frequent stacks only (collapsed)"),
+    current_user: dict = Depends(get_current_user_from_token)
+):
+    """
+    Profiles of sampled requests, per route template (admin only)
+    
+    ``summary``: requests, samples and DB/Redis/serialisation/middleware spans;
+    ``collapsed``: folded stacks for flamegraph.pl / speedscope;
+    ``flamegraph``: the same stacks as a d3-flame-graph JSON tree.
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    if route is not None and route not in profiler.routes:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No profiles for this route"
+        )
+    
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed(route, limit))
+    if format == "flamegraph":
+        return profiler.flame_graph(route)
+    summary = profiler.summary()
+    if route is not None:
+        summary["routes"] = {route: summary["routes"][route]}
+    return summary
+
+
+@router.delete("/profiles")
+async def reset_profiles(
+    current_user: dict = Depends(get_current_user_from_token)
+):
+    """
+    Discard the collected profiles (admin only)
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    profiler.reset()
+    logger.info(f"Profiles reset by admin user {current_user.get('email')}")
+    return {"message": "Profiles reset"}
+
+
 @router.get("/metrics/requests")
 async def get_request_metrics(
     minutes: Optional[int] = Query(60, description="Time window in minutes"),
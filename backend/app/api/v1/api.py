@@ -6,7 +6,7 @@ from fastapi import APIRouter
 
 from app.api.v1.endpoints import (
     auth, machines, tickets, alerts, assets, users, dashboard, websocket,
-    ativos, movimentacoes, auditorias, manutencao
+    ativos, movimentacoes, auditorias, manutencao, jobs, audit_trail
 )
 from app.api import auth_advanced, monitoring, machine_monitoring
 
@@ -24,9 +24,11 @@ api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboar
 api_router.include_router(websocket.router, tags=["websocket"])
 api_router.include_router(monitoring.router, tags=["monitoring"])
 api_router.include_router(machine_monitoring.router, tags=["machine-monitoring"])
+api_router.include_router(audit_trail.router, prefix="/audit-trail", tags=["audit-trail"])
 
 # Sistema de Inventário - Novas rotas
 api_router.include_router(ativos.router, prefix="/ativos", tags=["ativos"])
 api_router.include_router(movimentacoes.router, prefix="/movimentacoes", tags=["movimentacoes"])
 api_router.include_router(auditorias.router, prefix="/auditorias", tags=["auditorias"])
-api_router.include_router(manutencao.router, prefix="/manutencao", tags=["manutencao"])
\ No newline at end of file
+api_router.include_router(manutencao.router, prefix="/manutencao", tags=["manutencao"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
@@ -3,21 +3,50 @@ Ativos API endpoints for Levitiis inventory system
 Asset management CRUD operations and business logic
 """
 
-from typing import List, Optional, Any
+import base64
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import List, Optional, Any, Dict, IO, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi.responses import FileResponse, JSONResponse, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, SessionLocal
 from app.core.auth import get_current_user
 from app.models import User, Ativo, Local, Responsavel, Setor, CentroCusto, Fornecedor
 from app.schemas.ativos import (
     AtivoCreate, AtivoUpdate, AtivoResponse, AtivoList, 
     AtivoFilter, AtivoImport, EtiquetaQR
 )
+from app.core.batch_loader import IN_CHUNK_SIZE
+from app.core.csv_import import IMPORT_BACKGROUND_THRESHOLD, iter_csv_chunks
+from app.core.jobs import job_runner, JobContext
+from app.core.labels import (
+    LABEL_BATCH_DIR, build_label_pdf, build_label_zip, expire_label_batches, label_reference,
+    qr_payload, render_labels
+)
+from app.core.streaming_export import (
+    EXPORT_FORMAT_REGEX, get_encoder, iter_export, iter_query_batches, export_response
+)
 
 router = APIRouter()
 
+# Lotes de etiquetas maiores que isto são gerados como job
+ETIQUETAS_LIMITE_SINCRONO = 200
+ETIQUETAS_MAX_POR_LOTE = 5000
+
+# Colunas exportadas em /ativos/exportar
+COLUNAS_EXPORTACAO = [
+    "id", "codigo", "patrimonio", "descricao", "categoria", "subcategoria",
+    "marca", "modelo", "ns_serie", "estado", "status", "valor_aquisicao",
+    "data_compra", "nota_fiscal", "vida_util_meses", "centro_custo_id", "setor_id",
+    "local_id", "responsavel_id", "fornecedor_id", "garantia_ate", "criado_em"
+]
+
 
 @router.post("/", response_model=AtivoResponse)
 def criar_ativo(
@@ -72,62 +101,25 @@ def listar_ativos(
 ):
     """Listar ativos com filtros avançados"""
     
-    query_obj = db.query(Ativo)
-    
-    # Filtro de busca textual
-    if query:
-        search_filter = or_(
-            Ativo.codigo.ilike(f"%{query}%"),
-            Ativo.patrimonio.ilike(f"%{query}%"),
-            Ativo.descricao.ilike(f"%{query}%"),
-            Ativo.numero_serie.ilike(f"%{query}%"),
-            Ativo.marca.ilike(f"%{query}%"),
-            Ativo.modelo.ilike(f"%{query}%")
-        )
-        query_obj = query_obj.filter(search_filter)
-    
-    # Filtros específicos
-    if categoria:
-        query_obj = query_obj.filter(Ativo.categoria == categoria)
-    if subcategoria:
-        query_obj = query_obj.filter(Ativo.subcategoria == subcategoria)
-    if setor_id:
-        query_obj = query_obj.filter(Ativo.setor_id == setor_id)
-    if local_id:
-        query_obj = query_obj.filter(Ativo.local_id == local_id)
-    if responsavel_id:
-        query_obj = query_obj.filter(Ativo.responsavel_id == responsavel_id)
-    if status:
-        query_obj = query_obj.filter(Ativo.status == status)
-    if estado:
-        query_obj = query_obj.filter(Ativo.estado == estado)
-    if centro_custo_id:
-        query_obj = query_obj.filter(Ativo.centro_custo_id == centro_custo_id)
-    if fornecedor_id:
-        query_obj = query_obj.filter(Ativo.fornecedor_id == fornecedor_id)
-    
-    # Filtros de valor
-    if valor_min is not None:
-        query_obj = query_obj.filter(Ativo.valor_aquisicao >= valor_min)
-    if valor_max is not None:
-        query_obj = query_obj.filter(Ativo.valor_aquisicao <= valor_max)
-    
-    # Filtros de data
-    if data_compra_inicio:
-        query_obj = query_obj.filter(Ativo.data_compra >= data_compra_inicio)
-    if data_compra_fim:
-        query_obj = query_obj.filter(Ativo.data_compra <= data_compra_fim)
-    
-    # Filtro de auditoria
-    if sem_auditoria_dias:
-        from datetime import datetime, timedelta
-        data_limite = datetime.now() - timedelta(days=sem_auditoria_dias)
-        query_obj = query_obj.filter(
-            or_(
-                Ativo.ultima_auditoria.is_(None),
-                Ativo.ultima_auditoria < data_limite
-            )
-        )
+    # Parâmetros repassados sem conversão (mesma semântica dos filtros originais)
+    filtros = AtivoFilter.model_construct(
+        query=query,
+        categoria=categoria,
+        subcategoria=subcategoria,
+        setor_id=setor_id,
+        local_id=local_id,
+        responsavel_id=responsavel_id,
+        status=status,
+        estado=estado,
+        centro_custo_id=centro_custo_id,
+        fornecedor_id=fornecedor_id,
+        valor_min=valor_min,
+        valor_max=valor_max,
+        data_compra_inicio=data_compra_inicio,
+        data_compra_fim=data_compra_fim,
+        sem_auditoria_dias=sem_auditoria_dias
+    )
+    query_obj = _aplicar_filtros_ativos(db.query(Ativo), filtros)
     
     # Contar total
     total = query_obj.count()
@@ -143,6 +135,98 @@ def listar_ativos(
     }
 
 
+@router.get("/exportar")
+def exportar_ativos(
+    formato: str = Query("csv", regex=EXPORT_FORMAT_REGEX),
+    compactar: bool = Query(False, description="Compactar a resposta com gzip"),
+    filtros: AtivoFilter = Depends(),
+    current_user: User = Depends(get_current_user)
+):
+    """Exportar ativos (CSV, NDJSON ou XLSX) em streaming, com os mesmos filtros da listagem"""
+    
+    colunas = [getattr(Ativo, nome) for nome in COLUNAS_EXPORTACAO]
+    
+    def montar_consulta(db: Session):
+        return _aplicar_filtros_ativos(db.query(*colunas), filtros).order_by(Ativo.id).statement
+    
+    encoder = get_encoder(formato, COLUNAS_EXPORTACAO, sheet_name="ativos")
+    conteudo = iter_export(encoder, iter_query_batches(montar_consulta), compress=compactar)
+    return export_response(conteudo, formato, "ativos", compress=compactar)
+
+
+@router.get("/etiquetas")
+def gerar_etiquetas_lote(
+    ids: Optional[List[int]] = Query(None, description="IDs dos ativos (ignora os filtros)"),
+    formato: str = Query("pdf", regex="^(pdf|zip)$"),
+    colunas: int = Query(3, ge=1, le=6),
+    linhas: int = Query(7, ge=1, le=12),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(ETIQUETAS_MAX_POR_LOTE, ge=1, le=ETIQUETAS_MAX_POR_LOTE),
+    filtros: AtivoFilter = Depends(),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Gerar etiquetas QR em lote (PDF para impressão ou ZIP de PNGs)"""
+    query = db.query(Ativo.id)
+    if ids:
+        query = query.filter(Ativo.id.in_(ids[:ETIQUETAS_MAX_POR_LOTE]))
+    else:
+        query = _aplicar_filtros_ativos(query, filtros)
+    ativos_ids = [row.id for row in query.order_by(Ativo.codigo).offset(skip).limit(limit)]
+    if not ativos_ids:
+        raise HTTPException(status_code=404, detail="Nenhum ativo encontrado")
+    
+    if len(ativos_ids) > ETIQUETAS_LIMITE_SINCRONO:
+        job_id = job_runner.submit(
+            "ativos.gerar_etiquetas",
+            {"ids": ativos_ids, "formato": formato, "colunas": colunas, "linhas": linhas},
+            created_by=current_user.id,
+        )
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": job_id,
+                "status": "pending",
+                "status_url": f"/api/v1/jobs/{job_id}",
+                "download_url": f"/api/v1/ativos/etiquetas/lotes/{job_id}",
+            },
+        )
+    
+    conteudo = _gerar_lote_etiquetas(db, ativos_ids, formato, colunas, linhas)
+    return Response(
+        content=conteudo,
+        media_type=_ETIQUETAS_MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="etiquetas.{formato}"'},
+    )
+
+
+@router.get("/etiquetas/lotes/{job_id}")
+def baixar_lote_etiquetas(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Baixar lote de etiquetas gerado em segundo plano"""
+    job = job_runner.get(job_id)
+    if (
+        not job
+        or job.kind != "ativos.gerar_etiquetas"
+        or (current_user.role != "admin" and job.created_by != current_user.id)
+    ):
+        raise HTTPException(status_code=404, detail="Lote não encontrado")
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Lote ainda não disponível (status: {job.status})")
+    
+    formato = job.result["formato"]
+    caminho = LABEL_BATCH_DIR / f"{job_id}.{formato}"
+    if not caminho.exists():
+        raise HTTPException(status_code=410, detail="Lote expirado; gere as etiquetas novamente")
+    return FileResponse(
+        caminho,
+        media_type=_ETIQUETAS_MEDIA_TYPES[formato],
+        filename=f"etiquetas.{formato}",
+    )
+
+
 @router.get("/{ativo_id}", response_model=AtivoResponse)
 def obter_ativo(
     ativo_id: int,
@@ -231,37 +315,18 @@ def gerar_etiqueta_qr(
     if not ativo:
         raise HTTPException(status_code=404, detail="Ativo não encontrado")
     
-    # Gerar código QR
-    import qrcode
-    import io
-    import base64
+    # Gerar código QR (imagem em cache; o ativo guarda apenas a referência)
+    qr_data = qr_payload(ativo.id, ativo.codigo, ativo.patrimonio)
+    _, digest, caminho = render_labels([qr_data])[0]
+    img_str = base64.b64encode(caminho.read_bytes()).decode()
     
-    qr_data = {
-        "id": ativo.id,
-        "codigo": ativo.codigo,
-        "patrimonio": ativo.patrimonio,
-        "tipo": "ativo_levitiis"
-    }
-    
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(str(qr_data))
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Converter para base64
-    buffer = io.BytesIO()
-    img.save(buffer, format='PNG')
-    img_str = base64.b64encode(buffer.getvalue()).decode()
-    
-    # Atualizar ativo com código QR
-    ativo.codigo_qr = f"data:image/png;base64,{img_str}"
-    ativo.etiqueta_gerada = True
+    ativo.qr_code = label_reference(digest)
+    ativo.etiqueta_impressa = 1
     db.commit()
     
     return {
         "ativo_id": ativo.id,
-        "codigo_qr": ativo.codigo_qr,
+        "codigo_qr": f"data:image/png;base64,{img_str}",
         "qr_data": qr_data
     }
 
@@ -269,74 +334,36 @@ def gerar_etiqueta_qr(
 @router.post("/importar")
 def importar_ativos_csv(
     file: UploadFile = File(...),
+    em_segundo_plano: bool = Query(False, description="Processar a importação em segundo plano"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Importar ativos via CSV"""
+    """Importar ativos via CSV (processado em lotes)"""
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Arquivo deve ser CSV")
     
-    import csv
-    import io
-    
-    # Ler arquivo CSV
-    content = file.file.read()
-    csv_data = io.StringIO(content.decode('utf-8'))
-    reader = csv.DictReader(csv_data)
-    
-    resultados = {
-        "sucessos": 0,
-        "erros": 0,
-        "detalhes": []
-    }
-    
-    for row_num, row in enumerate(reader, start=2):
-        try:
-            # Validar campos obrigatórios
-            if not row.get('codigo'):
-                raise ValueError("Código é obrigatório")
-            
-            # Verificar duplicatas
-            if db.query(Ativo).filter(Ativo.codigo == row['codigo']).first():
-                raise ValueError(f"Código {row['codigo']} já existe")
-            
-            # Criar ativo
-            ativo_data = {
-                'codigo': row['codigo'],
-                'patrimonio': row.get('patrimonio'),
-                'categoria': row.get('categoria'),
-                'subcategoria': row.get('subcategoria'),
-                'descricao': row.get('descricao'),
-                'marca': row.get('marca'),
-                'modelo': row.get('modelo'),
-                'numero_serie': row.get('numero_serie'),
-                'valor_aquisicao': float(row['valor_aquisicao']) if row.get('valor_aquisicao') else None,
-                'data_compra': row.get('data_compra'),
-                'criado_por': current_user.id
-            }
-            
-            ativo = Ativo(**{k: v for k, v in ativo_data.items() if v is not None})
-            db.add(ativo)
-            db.commit()
-            
-            resultados["sucessos"] += 1
-            resultados["detalhes"].append({
-                "linha": row_num,
-                "codigo": row['codigo'],
-                "status": "sucesso"
-            })
-            
-        except Exception as e:
-            resultados["erros"] += 1
-            resultados["detalhes"].append({
-                "linha": row_num,
-                "codigo": row.get('codigo', 'N/A'),
-                "status": "erro",
-                "erro": str(e)
-            })
-            db.rollback()
+    tamanho = getattr(file, "size", None) or 0
+    if em_segundo_plano or tamanho > IMPORT_BACKGROUND_THRESHOLD:
+        # O upload é fechado ao fim da requisição: copiar para arquivo temporário
+        temporario = tempfile.NamedTemporaryFile(prefix="importacao_", suffix=".csv", delete=False)
+        with temporario:
+            shutil.copyfileobj(file.file, temporario)
+        
+        job_id = job_runner.submit(
+            "ativos.importar_csv",
+            {"caminho": temporario.name, "usuario_id": current_user.id},
+            created_by=current_user.id,
+        )
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": job_id,
+                "status": "pending",
+                "status_url": f"/api/v1/jobs/{job_id}",
+            },
+        )
     
-    return resultados
+    return _importar_ativos(db, file.file, current_user.id)
 
 
 @router.get("/relatorios/patrimonio")
@@ -368,8 +395,14 @@ def relatorio_patrimonio(
     if formato == "json":
         return [dict(r._mapping) for r in resultados]
     
-    # TODO: Implementar exportação CSV/XLSX
-    return {"message": "Exportação CSV/XLSX será implementada"}
+    # Exportação CSV/XLSX (resultado agregado, já pequeno: um lote único)
+    colunas = list(resultados[0]._mapping.keys()) if resultados else [
+        "centro_custo_id", "centro_custo_nome", "quantidade_ativos",
+        "valor_total", "depreciacao_total", "valor_contabil_total"
+    ]
+    encoder = get_encoder(formato, colunas, sheet_name="patrimonio")
+    conteudo = iter_export(encoder, [[tuple(r) for r in resultados]])
+    return export_response(conteudo, formato, "relatorio_patrimonio")
 
 
 @router.get("/dashboard/metricas")
@@ -429,4 +462,343 @@ def metricas_dashboard(
             "por_categoria": [{"categoria": r.categoria, "quantidade": r.quantidade} for r in ativos_por_categoria],
             "por_setor": [{"setor": r.nome, "quantidade": r.quantidade} for r in ativos_por_setor]
         }
-    }
\ No newline at end of file
+    }
+
+
+def _aplicar_filtros_ativos(query_obj, filtros: AtivoFilter):
+    """Aplicar filtros da listagem de ativos (compartilhado com a exportação)"""
+    
+    # Filtro de busca textual
+    if filtros.query:
+        search_filter = or_(
+            Ativo.codigo.ilike(f"%{filtros.query}%"),
+            Ativo.patrimonio.ilike(f"%{filtros.query}%"),
+            Ativo.descricao.ilike(f"%{filtros.query}%"),
+            Ativo.ns_serie.ilike(f"%{filtros.query}%"),
+            Ativo.marca.ilike(f"%{filtros.query}%"),
+            Ativo.modelo.ilike(f"%{filtros.query}%")
+        )
+        query_obj = query_obj.filter(search_filter)
+    
+    # Filtros específicos
+    if filtros.categoria:
+        query_obj = query_obj.filter(Ativo.categoria == filtros.categoria)
+    if filtros.subcategoria:
+        query_obj = query_obj.filter(Ativo.subcategoria == filtros.subcategoria)
+    if filtros.setor_id:
+        query_obj = query_obj.filter(Ativo.setor_id == filtros.setor_id)
+    if filtros.local_id:
+        query_obj = query_obj.filter(Ativo.local_id == filtros.local_id)
+    if filtros.responsavel_id:
+        query_obj = query_obj.filter(Ativo.responsavel_id == filtros.responsavel_id)
+    if filtros.status:
+        query_obj = query_obj.filter(Ativo.status == filtros.status)
+    if filtros.estado:
+        query_obj = query_obj.filter(Ativo.estado == filtros.estado)
+    if filtros.centro_custo_id:
+        query_obj = query_obj.filter(Ativo.centro_custo_id == filtros.centro_custo_id)
+    if filtros.fornecedor_id:
+        query_obj = query_obj.filter(Ativo.fornecedor_id == filtros.fornecedor_id)
+    
+    # Filtros de valor
+    if filtros.valor_min is not None:
+        query_obj = query_obj.filter(Ativo.valor_aquisicao >= filtros.valor_min)
+    if filtros.valor_max is not None:
+        query_obj = query_obj.filter(Ativo.valor_aquisicao <= filtros.valor_max)
+    
+    # Filtros de data
+    if filtros.data_compra_inicio:
+        query_obj = query_obj.filter(Ativo.data_compra >= filtros.data_compra_inicio)
+    if filtros.data_compra_fim:
+        query_obj = query_obj.filter(Ativo.data_compra <= filtros.data_compra_fim)
+    
+    # Filtro de auditoria
+    if filtros.sem_auditoria_dias:
+        from datetime import datetime, timedelta
+        data_limite = datetime.now() - timedelta(days=filtros.sem_auditoria_dias)
+        query_obj = query_obj.filter(
+            or_(
+                Ativo.ultima_auditoria.is_(None),
+                Ativo.ultima_auditoria < data_limite
+            )
+        )
+    
+    return query_obj
+
+
+def _importar_ativos(
+    db: Session,
+    arquivo: IO[bytes],
+    usuario_id: int,
+    ctx: Optional[JobContext] = None,
+    tamanho: int = 0,
+) -> Dict[str, Any]:
+    """
+    Pipeline de importação: leitura incremental, validação e inserção por lote.
+
+    Em job, cada lote é gravado junto com um checkpoint (última linha e
+    contadores) na mesma transação; um job reiniciado retoma após a última
+    linha gravada em vez de reinserir os lotes anteriores.
+    """
+    resultados = {
+        "sucessos": 0,
+        "erros": 0,
+        "detalhes": []
+    }
+    # Chaves únicas já vistas no próprio arquivo
+    vistos = {"codigo": set(), "patrimonio": set(), "ns_serie": set()}
+    retomar_apos = 0
+    if ctx is not None and ctx.checkpoint:
+        # Duplicatas de linhas anteriores à retomada são relatadas como "já existe"
+        retomar_apos = ctx.checkpoint["linha"]
+        resultados["sucessos"] = ctx.checkpoint["sucessos"]
+        resultados["erros"] = ctx.checkpoint["erros"]
+        resultados["detalhes"] = list(ctx.checkpoint["erros_detalhes"])
+        resultados["retomado_apos_linha"] = retomar_apos
+    
+    for lote in iter_csv_chunks(arquivo):
+        if retomar_apos:
+            lote = [(row_num, row) for row_num, row in lote if row_num > retomar_apos]
+            if not lote:
+                continue
+        validos = _validar_lote_importacao(db, lote, vistos, resultados)
+        for row_num, dados in validos:
+            dados["criado_por"] = usuario_id
+        _inserir_lote_importacao(db, validos, resultados)
+        
+        ultima_linha = lote[-1][0]
+        if ctx is not None:
+            ctx.save_checkpoint({
+                "linha": ultima_linha,
+                "sucessos": resultados["sucessos"],
+                "erros": resultados["erros"],
+                "erros_detalhes": [d for d in resultados["detalhes"] if d["status"] == "erro"],
+            }, db)
+        db.commit()
+        
+        if ctx is not None:
+            # Lotes já gravados são mantidos se o job for cancelado
+            ctx.check_cancelled()
+            progresso = arquivo.tell() / tamanho * 100 if tamanho else 0
+            ctx.set_progress(min(progresso, 99.0), f"{ultima_linha - 1} linhas processadas")
+    
+    return resultados
+
+
+def _remover_arquivo_importacao(caminho: str, **_) -> None:
+    """Apagar o CSV temporário quando o job termina (não quando volta para a fila)"""
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+
+@job_runner.register("ativos.importar_csv", on_final=_remover_arquivo_importacao)
+def _job_importar_ativos(ctx: JobContext, caminho: str, usuario_id: int) -> Dict[str, Any]:
+    """Job: importar um CSV salvo em arquivo temporário"""
+    db = SessionLocal()
+    try:
+        with open(caminho, "rb") as arquivo:
+            return _importar_ativos(db, arquivo, usuario_id, ctx, os.path.getsize(caminho))
+    finally:
+        db.close()
+
+
+def _registrar_erro_importacao(resultados: Dict[str, Any], row_num: int, codigo: Any, erro: str):
+    resultados["erros"] += 1
+    resultados["detalhes"].append({
+        "linha": row_num,
+        "codigo": codigo or 'N/A',
+        "status": "erro",
+        "erro": erro
+    })
+
+
+def _converter_linha_importacao(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Validar e converter uma linha do CSV para colunas de Ativo"""
+    def texto(campo: str) -> Optional[str]:
+        valor = row.get(campo)
+        if valor is None:
+            return None
+        valor = valor.strip()
+        return valor or None
+    
+    codigo = texto('codigo')
+    if not codigo:
+        raise ValueError("Código é obrigatório")
+    if not texto('descricao'):
+        raise ValueError("Descrição é obrigatória")
+    if not texto('categoria'):
+        raise ValueError("Categoria é obrigatória")
+    
+    valor = texto('valor_aquisicao')
+    vida_util = texto('vida_util_meses')
+    data_compra = texto('data_compra')
+    if data_compra:
+        for formato_data in ("%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%dT%H:%M:%S"):
+            try:
+                data_compra = datetime.strptime(data_compra, formato_data)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"Data de compra inválida: {data_compra}")
+    
+    ativo_data = {
+        'codigo': codigo,
+        'patrimonio': texto('patrimonio'),
+        'categoria': texto('categoria'),
+        'subcategoria': texto('subcategoria'),
+        'descricao': texto('descricao'),
+        'marca': texto('marca'),
+        'modelo': texto('modelo'),
+        'ns_serie': texto('ns_serie') or texto('numero_serie'),
+        'estado': texto('estado'),
+        'nota_fiscal': texto('nota_fiscal'),
+        'observacoes': texto('observacoes'),
+        'valor_aquisicao': float(valor.replace(',', '.')) if valor else None,
+        'vida_util_meses': int(vida_util) if vida_util else None,
+        'data_compra': data_compra,
+    }
+    return {k: v for k, v in ativo_data.items() if v is not None}
+
+
+def _validar_lote_importacao(
+    db: Session,
+    lote: List[Tuple[int, Dict[str, Any]]],
+    vistos: Dict[str, set],
+    resultados: Dict[str, Any],
+) -> List[Tuple[int, Dict[str, Any]]]:
+    """Validar um lote e remover duplicatas (no arquivo e no banco, uma consulta por lote)"""
+    convertidos = []
+    for row_num, row in lote:
+        try:
+            convertidos.append((row_num, _converter_linha_importacao(row)))
+        except ValueError as e:
+            _registrar_erro_importacao(resultados, row_num, (row.get('codigo') or '').strip(), str(e))
+    
+    if not convertidos:
+        return []
+    
+    # Chaves únicas já existentes no banco para este lote
+    chaves = {campo: {d[campo] for _, d in convertidos if d.get(campo)} for campo in vistos}
+    condicoes = [getattr(Ativo, campo).in_(valores) for campo, valores in chaves.items() if valores]
+    existentes = {campo: set() for campo in vistos}
+    for codigo, patrimonio, ns_serie in db.query(Ativo.codigo, Ativo.patrimonio, Ativo.ns_serie).filter(or_(*condicoes)):
+        existentes["codigo"].add(codigo)
+        existentes["patrimonio"].add(patrimonio)
+        existentes["ns_serie"].add(ns_serie)
+    
+    validos = []
+    rotulos = {"codigo": "Código", "patrimonio": "Patrimônio", "ns_serie": "Número de série"}
+    for row_num, dados in convertidos:
+        erro = None
+        for campo, rotulo in rotulos.items():
+            valor = dados.get(campo)
+            if not valor:
+                continue
+            if valor in existentes[campo]:
+                erro = f"{rotulo} {valor} já existe"
+                break
+            if valor in vistos[campo]:
+                erro = f"{rotulo} {valor} duplicado no arquivo"
+                break
+        if erro:
+            _registrar_erro_importacao(resultados, row_num, dados['codigo'], erro)
+            continue
+        for campo in rotulos:
+            if dados.get(campo):
+                vistos[campo].add(dados[campo])
+        validos.append((row_num, dados))
+    
+    return validos
+
+
+def _inserir_lote_importacao(
+    db: Session,
+    validos: List[Tuple[int, Dict[str, Any]]],
+    resultados: Dict[str, Any],
+):
+    """
+    Inserir um lote com bulk insert; em caso de falha, linha a linha em
+    savepoints. O commit fica com o chamador.
+    """
+    if not validos:
+        return
+    
+    try:
+        with db.begin_nested():
+            db.bulk_insert_mappings(Ativo, [dados for _, dados in validos])
+        inseridos = validos
+    except Exception:
+        db.rollback()
+        # Isolar as linhas problemáticas para manter o relatório por linha
+        inseridos = []
+        for row_num, dados in validos:
+            try:
+                with db.begin_nested():
+                    db.bulk_insert_mappings(Ativo, [dados])
+                inseridos.append((row_num, dados))
+            except Exception as e:
+                _registrar_erro_importacao(resultados, row_num, dados['codigo'], str(e))
+    
+    for row_num, dados in inseridos:
+        resultados["sucessos"] += 1
+        resultados["detalhes"].append({
+            "linha": row_num,
+            "codigo": dados['codigo'],
+            "status": "sucesso"
+        })
+
+
+_ETIQUETAS_MEDIA_TYPES = {"pdf": "application/pdf", "zip": "application/zip"}
+
+
+def _gerar_lote_etiquetas(db: Session, ids: List[int], formato: str, colunas: int, linhas: int) -> bytes:
+    """Renderizar (ou reaproveitar do cache) as etiquetas e montar o PDF/ZIP"""
+    registros = []
+    for inicio in range(0, len(ids), IN_CHUNK_SIZE):
+        registros.extend(
+            db.query(Ativo.id, Ativo.codigo, Ativo.patrimonio, Ativo.qr_code)
+            .filter(Ativo.id.in_(ids[inicio:inicio + IN_CHUNK_SIZE]))
+            .all()
+        )
+    registros.sort(key=lambda r: r.codigo)
+    
+    etiquetas = render_labels([qr_payload(r.id, r.codigo, r.patrimonio) for r in registros])
+    
+    # Guardar apenas a referência da imagem no ativo
+    atualizacoes = []
+    for registro, (_, digest, _) in zip(registros, etiquetas):
+        referencia = label_reference(digest)
+        if registro.qr_code != referencia:
+            atualizacoes.append({"id": registro.id, "qr_code": referencia})
+    if atualizacoes:
+        db.bulk_update_mappings(Ativo, atualizacoes)
+        db.commit()
+    
+    if formato == "zip":
+        return build_label_zip(etiquetas)
+    return build_label_pdf(etiquetas, columns=colunas, rows=linhas)
+
+
+@job_runner.register("ativos.gerar_etiquetas")
+def _job_gerar_etiquetas(ctx: JobContext, ids: List[int], formato: str, colunas: int, linhas: int) -> Dict[str, Any]:
+    """Job: gerar lote de etiquetas e gravar o arquivo para download"""
+    db = SessionLocal()
+    try:
+        conteudo = _gerar_lote_etiquetas(db, ids, formato, colunas, linhas)
+    finally:
+        db.close()
+    
+    LABEL_BATCH_DIR.mkdir(parents=True, exist_ok=True)
+    (LABEL_BATCH_DIR / f"{ctx.job_id}.{formato}").write_bytes(conteudo)
+    return {"total": len(ids), "formato": formato}
+
+
+@job_runner.register("ativos.expirar_lotes_etiquetas")
+def _job_expirar_lotes_etiquetas(ctx: JobContext) -> Dict[str, Any]:
+    """Job: apagar lotes de etiquetas com mais de LABEL_BATCH_TTL_HOURS"""
+    return {"removidos": expire_label_batches(settings.LABEL_BATCH_TTL_HOURS * 3600)}
+
+
+if settings.LABEL_BATCH_TTL_HOURS > 0:
+    job_runner.every("ativos.expirar_lotes_etiquetas", 3600)
@@ -0,0 +1,84 @@
+"""
+Audit trail endpoints
+Hash-chain verification of asset audit records
+"""
+
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from app.core.audit_verification import verify_audit_chains
+from app.core.auth import get_current_user
+from app.core.database import get_db
+from app.core.jobs import job_runner, JobContext
+from app.core.security import require_roles
+from app.models import User
+from app.models.movement import AssetAuditCheckpoint
+
+router = APIRouter()
+
+
+@router.post("/verify", dependencies=[Depends(require_roles(["admin", "auditor"]))])
+def verify_chains(
+    asset_ids: Optional[List[int]] = Query(None, description="Restrict verification to these assets"),
+    full: bool = Query(False, description="Ignore checkpoints and re-verify every chain"),
+    current_user: User = Depends(get_current_user)
+):
+    """Verify audit chains in the background (incremental from the last checkpoints)"""
+    job_id = job_runner.submit(
+        "audit_trail.verify",
+        {"asset_ids": asset_ids, "full": full},
+        created_by=current_user.id,
+    )
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job_id,
+            "status": "pending",
+            "status_url": f"/api/v1/jobs/{job_id}",
+        },
+    )
+
+
+@router.get("/assets/{asset_id}/verify", dependencies=[Depends(require_roles(["admin", "auditor"]))])
+def verify_asset_chain(
+    asset_id: int,
+    full: bool = Query(False, description="Ignore the checkpoint and re-verify the whole chain"),
+    current_user: User = Depends(get_current_user)
+):
+    """Verify one asset's audit chain inline and report the first broken link"""
+    return verify_audit_chains(asset_ids=[asset_id], full=full, workers=1)
+
+
+@router.get("/assets/{asset_id}/checkpoint", dependencies=[Depends(require_roles(["admin", "auditor"]))])
+def get_asset_checkpoint(
+    asset_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Last verified record of an asset's audit chain"""
+    checkpoint = db.query(AssetAuditCheckpoint).filter(AssetAuditCheckpoint.asset_id == asset_id).first()
+    if not checkpoint:
+        return {"asset_id": asset_id, "verified": False}
+    return {
+        "asset_id": asset_id,
+        "verified": checkpoint.broken_audit_id is None,
+        "last_audit_id": checkpoint.last_audit_id,
+        "last_hash": checkpoint.last_hash,
+        "verified_count": checkpoint.verified_count,
+        "broken_audit_id": checkpoint.broken_audit_id,
+        "broken_reason": checkpoint.broken_reason,
+        "verified_at": checkpoint.verified_at,
+    }
+
+
+@job_runner.register("audit_trail.verify")
+def _job_verify_chains(ctx: JobContext, asset_ids: Optional[List[int]] = None, full: bool = False) -> Dict[str, Any]:
+    """Job: verify audit chains on the process pool"""
+    def progress(verified: int):
+        ctx.check_cancelled()
+        # Total is unknown while streaming: report the count only
+        ctx.set_progress(0, f"{verified} records verified")
+
+    return verify_audit_chains(asset_ids=asset_ids, full=full, progress=progress)
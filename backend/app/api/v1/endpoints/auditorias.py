@@ -4,23 +4,30 @@ Physical inventory audit and reconciliation management
 """
 
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, UploadFile, File
+from sqlalchemy.orm import Session, aliased, joinedload
+from sqlalchemy import and_, or_, func, exists, insert, literal, select
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
+import gzip
+import json
 
-from app.core.database import get_db
+from app.core.batch_loader import IN_CHUNK_SIZE
+from app.core.database import get_db, SessionLocal
+from app.core.jobs import job_runner, JobContext
 from app.core.auth import get_current_user
-from app.core.security import require_roles, compute_audit_record_hash, compute_audit_signature
+from app.core.security import require_roles
+from app.core.audit_chain import append_audit_records
+from app.middleware.validation import skip_sanitization
 from app.models import (
-    User, Ativo, Auditoria, AuditoriaItem, Local, Setor, 
-    TipoAuditoria, StatusAuditoria, ResultadoItem
+    User, Ativo, Auditoria, AuditoriaItem, AuditoriaContadorLocal, AuditoriaItemVersao,
+    AuditoriaLeituraRecebida, Local, Setor, Responsavel,
+    TipoAuditoria, StatusAuditoria, ResultadoItem, StatusAtivo
 )
-from app.models.movement import AssetAudit
 from app.schemas.auditorias import (
     AuditoriaCreate, AuditoriaUpdate, AuditoriaResponse, AuditoriaList,
     AuditoriaItemCreate, AuditoriaItemResponse, AuditoriaItemList,
-    ListaContagem, ColetaLeitura, RelatorioReconciliacao
+    ListaContagem, ColetaLeitura, SincronizacaoColetas, RelatorioReconciliacao
 )
 
 router = APIRouter()
@@ -29,6 +36,8 @@ router = APIRouter()
 @router.post("/", response_model=AuditoriaResponse, dependencies=[Depends(require_roles(["admin", "gestor", "auditor"]))])
 def criar_auditoria(
     auditoria: AuditoriaCreate,
+    response: Response,
+    em_segundo_plano: bool = Query(False, description="Gerar itens da auditoria em segundo plano"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -63,7 +72,13 @@ def criar_auditoria(
     db.refresh(db_auditoria)
     
     # Gerar itens de auditoria baseado no escopo
-    _gerar_itens_auditoria(db_auditoria, db)
+    if em_segundo_plano:
+        job_id = job_runner.submit(
+            "auditorias.gerar_itens", {"auditoria_id": db_auditoria.id}, created_by=current_user.id
+        )
+        response.headers["X-Job-Id"] = job_id
+    else:
+        _gerar_itens_auditoria(db_auditoria, db)
     
     return db_auditoria
 
@@ -171,8 +186,11 @@ def gerar_lista_contagem(
             detail="Lista de contagem só pode ser gerada para auditorias planejadas ou em andamento"
         )
     
-    # Buscar itens de auditoria
-    query = db.query(AuditoriaItem).filter(AuditoriaItem.auditoria_id == auditoria_id)
+    # Buscar itens de auditoria (ativo, local e responsável carregados na mesma consulta)
+    query = db.query(AuditoriaItem).options(
+        joinedload(AuditoriaItem.ativo).joinedload(Ativo.local),
+        joinedload(AuditoriaItem.ativo).joinedload(Ativo.responsavel)
+    ).filter(AuditoriaItem.auditoria_id == auditoria_id)
     
     if setor_id:
         query = query.join(Ativo).filter(Ativo.setor_id == setor_id)
@@ -241,112 +259,113 @@ def registrar_coleta(
             detail="Coletas só podem ser registradas em auditorias em andamento"
         )
     
-    resultados = {
-        "sucessos": 0,
-        "erros": 0,
-        "detalhes": []
+    return _registrar_coletas_lote(db, auditoria, coletas, current_user.id)
+
+
+@router.get("/{auditoria_id}/sync/snapshot", dependencies=[Depends(require_roles(["admin", "gestor", "auditor"]))])
+def obter_snapshot_sincronizacao(
+    auditoria_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Lista de contagem completa para dispositivos offline (JSON compactado com gzip).
+    
+    A versão retornada (também no ETag) é usada em ``/sync/delta`` para baixar
+    apenas os itens alterados depois do snapshot.
+    """
+    auditoria = _obter_auditoria_sincronizavel(auditoria_id, db)
+    
+    # Versão lida antes dos itens: alterações concorrentes voltam no próximo delta
+    versao = _versao_atual_sincronizacao(db, auditoria.id)
+    etag = f'"{auditoria.id}-{versao}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    linhas = [
+        _formatar_linha_sincronizacao(row)
+        for row in _consultar_itens_sincronizacao(db, auditoria.id).order_by(AuditoriaItem.id)
+    ]
+    conteudo = json.dumps({
+        "auditoria_id": auditoria.id,
+        "versao": versao,
+        "colunas": _COLUNAS_SINCRONIZACAO,
+        "itens": linhas,
+    }, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    
+    return Response(
+        content=gzip.compress(conteudo, compresslevel=6),
+        media_type="application/json",
+        headers={"Content-Encoding": "gzip", "ETag": etag, "X-Sync-Version": str(versao)}
+    )
+
+
+@router.get("/{auditoria_id}/sync/delta", dependencies=[Depends(require_roles(["admin", "gestor", "auditor"]))])
+def obter_delta_sincronizacao(
+    auditoria_id: int,
+    desde: int = Query(0, ge=0, description="Última versão aplicada no dispositivo"),
+    limit: int = Query(1000, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Itens alterados depois da versão ``desde`` (ordem de versão, paginado pelo cursor)"""
+    auditoria = _obter_auditoria_sincronizavel(auditoria_id, db)
+    
+    versoes = db.query(
+        AuditoriaItemVersao.item_id,
+        func.max(AuditoriaItemVersao.id).label("versao")
+    ).filter(
+        AuditoriaItemVersao.auditoria_id == auditoria.id,
+        AuditoriaItemVersao.id > desde
+    ).group_by(AuditoriaItemVersao.item_id).subquery()
+    
+    rows = _consultar_itens_sincronizacao(db, auditoria.id, versoes.c.versao).join(
+        versoes, versoes.c.item_id == AuditoriaItem.id
+    ).order_by(versoes.c.versao).limit(limit + 1).all()
+    
+    mais = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "auditoria_id": auditoria.id,
+        "desde": desde,
+        "versao": rows[-1].versao if rows else desde,
+        "mais": mais,
+        "colunas": _COLUNAS_SINCRONIZACAO,
+        "itens": [_formatar_linha_sincronizacao(row) for row in rows],
     }
+
+
+@router.post("/{auditoria_id}/sync/coletas", response_model=Dict[str, Any], dependencies=[Depends(require_roles(["admin", "gestor", "auditor"]))])
+@skip_sanitization
+def sincronizar_coletas(
+    auditoria_id: int,
+    lote: SincronizacaoColetas,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Receber um lote de leituras de um dispositivo offline.
     
-    for coleta in coletas:
-        try:
-            # Buscar item de auditoria
-            item = db.query(AuditoriaItem).filter(
-                and_(
-                    AuditoriaItem.auditoria_id == auditoria_id,
-                    AuditoriaItem.id == coleta.item_id
-                )
-            ).first()
-            
-            if not item:
-                # Verificar se é um ativo extra (não cadastrado na auditoria)
-                ativo = db.query(Ativo).filter(Ativo.codigo == coleta.codigo_lido).first()
-                if ativo:
-                    # Criar item extra
-                    item = AuditoriaItem(
-                        auditoria_id=auditoria_id,
-                        ativo_id=ativo.id,
-                        resultado=ResultadoItem.EXTRA
-                    )
-                    db.add(item)
-                    db.flush()
-                else:
-                    raise ValueError(f"Código {coleta.codigo_lido} não encontrado")
-            
-            # Atualizar item com dados da coleta
-            item.codigo_lido = coleta.codigo_lido
-            item.local_encontrado_id = coleta.local_encontrado_id
-            item.estado_encontrado = coleta.estado_encontrado
-            item.observacoes_coleta = coleta.observacoes
-            item.foto_evidencia_url = coleta.foto_url
-            item.coletado_por = current_user.id
-            item.data_coleta = datetime.now()
-            
-            # Determinar resultado da verificação
-            ativo = item.ativo
-            resultado = _determinar_resultado_verificacao(item, ativo, coleta)
-            item.resultado = resultado
-            
-            # Registrar divergências se houver
-            if resultado in [ResultadoItem.DIVERGENTE, ResultadoItem.NAO_ENCONTRADO]:
-                divergencias = _identificar_divergencias(item, ativo, coleta)
-                item.divergencias = ",".join(divergencias)
-            
-            # Assinar trilha de auditoria da coleta
-            audit_payload = {
-                "asset_id": ativo.id,
-                "auditoria_id": auditoria_id,
-                "auditoria_status": auditoria.status,
-                "action": "AUDIT_READ",
-                "table_name": "auditoria_itens",
-                "record_id": item.id,
-                "collector_user_id": current_user.id,
-                "codigo_lido": coleta.codigo_lido,
-                "local_encontrado_id": coleta.local_encontrado_id,
-                "estado_encontrado": coleta.estado_encontrado,
-                "resultado": resultado,
-                "divergencias": item.divergencias.split(",") if item.divergencias else []
-            }
-            prev_audit = db.query(AssetAudit).filter(AssetAudit.asset_id == ativo.id).order_by(AssetAudit.created_at.desc()).first()
-            prev_hash = prev_audit.record_hash if prev_audit and prev_audit.record_hash else None
-            record_hash = compute_audit_record_hash(audit_payload)
-            signature = compute_audit_signature(record_hash)
-            db.add(AssetAudit(
-                asset_id=ativo.id,
-                action="AUDIT_READ",
-                table_name="auditoria_itens",
-                record_id=item.id,
-                field_name=None,
-                old_value=None,
-                new_value=None,
-                reason="audit_collection",
-                ip_address=None,
-                user_agent=None,
-                custom_metadata=audit_payload,
-                prev_hash=prev_hash,
-                record_hash=record_hash,
-                signature=signature,
-                created_by=current_user.id
-            ))
-            
-            db.commit()
-            resultados["sucessos"] += 1
-            resultados["detalhes"].append({
-                "item_id": item.id,
-                "codigo": coleta.codigo_lido,
-                "resultado": resultado,
-                "status": "sucesso"
-            })
-            
-        except Exception as e:
-            resultados["erros"] += 1
-            resultados["detalhes"].append({
-                "item_id": coleta.item_id,
-                "codigo": coleta.codigo_lido,
-                "erro": str(e),
-                "status": "erro"
-            })
-            db.rollback()
+    Cada leitura deve trazer ``client_id``; leituras já recebidas são
+    reportadas como ``duplicada`` sem reprocessamento, então o dispositivo
+    pode reenviar o lote inteiro após uma falha de conexão.
+    """
+    auditoria = db.query(Auditoria).filter(Auditoria.id == auditoria_id).first()
+    if not auditoria:
+        raise HTTPException(status_code=404, detail="Auditoria não encontrada")
+    
+    if auditoria.status != StatusAuditoria.EM_ANDAMENTO:
+        raise HTTPException(
+            status_code=400, 
+            detail="Coletas só podem ser registradas em auditorias em andamento"
+        )
+    
+    if any(not coleta.client_id for coleta in lote.coletas):
+        raise HTTPException(status_code=422, detail="Todas as leituras devem informar client_id")
     
+    resultados = _registrar_coletas_lote(db, auditoria, lote.coletas, current_user.id, lote.dispositivo_id)
+    resultados["versao"] = _versao_atual_sincronizacao(db, auditoria.id)
     return resultados
 
 
@@ -386,8 +405,14 @@ def iniciar_reconciliacao(
     auditoria.status = StatusAuditoria.RECONCILIACAO
     auditoria.data_reconciliacao = datetime.now()
     
-    # Gerar resumo de resultados
+    # Gerar resumo de resultados (totais consolidados na auditoria a partir dos contadores por local)
     resumo = _gerar_resumo_auditoria(auditoria_id, db)
+    totais = _totais_contadores(db, auditoria_id)
+    auditoria.total_itens_verificados = totais["verificados"]
+    auditoria.total_conformes = totais["conformes"]
+    auditoria.total_divergentes = totais["divergentes"]
+    auditoria.total_nao_encontrados = totais["nao_encontrados"]
+    auditoria.total_extras = totais["extras"]
     auditoria.total_itens = resumo["total_itens"]
     auditoria.itens_conformes = resumo["conformes"]
     auditoria.itens_divergentes = resumo["divergentes"]
@@ -402,61 +427,80 @@ def iniciar_reconciliacao(
     }
 
 
-@router.get("/{auditoria_id}/relatorio-reconciliacao", response_model=RelatorioReconciliacao, dependencies=[Depends(require_roles(["admin", "gestor", "auditor"]))])
-def gerar_relatorio_reconciliacao(
+@router.get("/{auditoria_id}/progresso", dependencies=[Depends(require_roles(["admin", "gestor", "auditor"]))])
+def obter_progresso_auditoria(
     auditoria_id: int,
+    incluir_locais: bool = Query(True, description="Incluir contadores por local"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Gerar relatório de reconciliação"""
+    """Progresso da auditoria a partir dos contadores incrementais (sem varrer os itens)"""
     
     auditoria = db.query(Auditoria).filter(Auditoria.id == auditoria_id).first()
     if not auditoria:
         raise HTTPException(status_code=404, detail="Auditoria não encontrada")
     
-    if auditoria.status not in [StatusAuditoria.RECONCILIACAO, StatusAuditoria.FINALIZADA]:
-        raise HTTPException(
-            status_code=400, 
-            detail="Relatório só pode ser gerado em auditorias em reconciliação ou finalizadas"
-        )
+    totais = _totais_contadores(db, auditoria_id)
+    esperados = auditoria.total_itens_esperados or 0
+    verificados = totais["verificados"]
+    extras = totais["extras"]
+    verificados_esperados = verificados - extras
     
-    # Buscar todos os itens da auditoria
-    itens = db.query(AuditoriaItem).filter(AuditoriaItem.auditoria_id == auditoria_id).all()
+    progresso = {
+        "auditoria_id": auditoria.id,
+        "status": auditoria.status,
+        "esperados": esperados,
+        "verificados": verificados,
+        "pendentes": max(esperados - verificados_esperados, 0),
+        "percentual_concluido": round(verificados_esperados / esperados * 100, 2) if esperados else 0.0,
+        "resultados": {
+            "conformes": totais["conformes"],
+            "divergentes": totais["divergentes"],
+            "nao_encontrados": totais["nao_encontrados"],
+            "extras": extras,
+        },
+    }
+    
+    if incluir_locais:
+        contadores = db.query(AuditoriaContadorLocal).filter(
+            AuditoriaContadorLocal.auditoria_id == auditoria_id
+        ).order_by(AuditoriaContadorLocal.local_id).all()
+        progresso["locais"] = [
+            {
+                "local_id": contador.local_id or None,
+                "esperados": contador.esperados,
+                "verificados": contador.verificados,
+                "conformes": contador.conformes,
+                "divergentes": contador.divergentes,
+                "nao_encontrados": contador.nao_encontrados,
+                "extras": contador.extras,
+            }
+            for contador in contadores
+        ]
+    
+    return progresso
+
+
+@router.get("/{auditoria_id}/relatorio-reconciliacao", response_model=RelatorioReconciliacao, dependencies=[Depends(require_roles(["admin", "gestor", "auditor"]))])
+def gerar_relatorio_reconciliacao(
+    auditoria_id: int,
+    limite_por_grupo: int = Query(50, ge=0, le=1000, description="Itens retornados por grupo; use /relatorio-reconciliacao/{grupo} para paginar"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Gerar relatório de reconciliação (resumo + primeira página de cada grupo)"""
+    
+    auditoria = _obter_auditoria_reconciliavel(auditoria_id, db)
+    resumo = _gerar_resumo_auditoria(auditoria_id, db)
     
-    # Agrupar por resultado
     itens_por_resultado = {
-        "conformes": [],
-        "divergentes": [],
-        "nao_encontrados": [],
-        "extras": []
+        grupo: [
+            _formatar_item_reconciliacao(row)
+            for row in _consultar_itens_reconciliacao(db, auditoria_id, grupo).limit(limite_por_grupo)
+        ] if limite_por_grupo else []
+        for grupo in ("conformes", "divergentes", "nao_encontrados", "extras")
     }
     
-    for item in itens:
-        ativo = item.ativo
-        item_data = {
-            "item_id": item.id,
-            "ativo_id": ativo.id,
-            "codigo": ativo.codigo,
-            "patrimonio": ativo.patrimonio,
-            "descricao": ativo.descricao,
-            "local_esperado": ativo.local.nome if ativo.local else None,
-            "local_encontrado": item.local_encontrado.nome if item.local_encontrado else None,
-            "responsavel": ativo.responsavel.nome if ativo.responsavel else None,
-            "divergencias": item.divergencias.split(",") if item.divergencias else [],
-            "observacoes": item.observacoes_coleta,
-            "coletado_por": item.coletor.name if item.coletor else None,
-            "data_coleta": item.data_coleta.isoformat() if item.data_coleta else None
-        }
-        
-        if item.resultado == ResultadoItem.CONFORME:
-            itens_por_resultado["conformes"].append(item_data)
-        elif item.resultado == ResultadoItem.DIVERGENTE:
-            itens_por_resultado["divergentes"].append(item_data)
-        elif item.resultado == ResultadoItem.NAO_ENCONTRADO:
-            itens_por_resultado["nao_encontrados"].append(item_data)
-        elif item.resultado == ResultadoItem.EXTRA:
-            itens_por_resultado["extras"].append(item_data)
-    
     return {
         "auditoria_id": auditoria_id,
         "tipo": auditoria.tipo,
@@ -464,19 +508,53 @@ def gerar_relatorio_reconciliacao(
         "data_inicio": auditoria.data_inicio.isoformat() if auditoria.data_inicio else None,
         "data_reconciliacao": auditoria.data_reconciliacao.isoformat() if auditoria.data_reconciliacao else None,
         "resumo": {
-            "total_itens": auditoria.total_itens or 0,
-            "conformes": auditoria.itens_conformes or 0,
-            "divergentes": auditoria.itens_divergentes or 0,
-            "nao_encontrados": auditoria.itens_nao_encontrados or 0,
-            "extras": auditoria.itens_extras or 0,
+            **resumo,
             "percentual_conformidade": round(
-                (auditoria.itens_conformes or 0) / max(auditoria.total_itens or 1, 1) * 100, 2
+                resumo["conformes"] / max(resumo["total_itens"], 1) * 100, 2
             )
         },
         "itens": itens_por_resultado
     }
 
 
+@router.get("/{auditoria_id}/relatorio-reconciliacao/{grupo}", dependencies=[Depends(require_roles(["admin", "gestor", "auditor"]))])
+def listar_itens_reconciliacao(
+    auditoria_id: int,
+    grupo: str,
+    local_id: Optional[int] = Query(None, description="Local esperado (ou encontrado, para extras)"),
+    divergencia: Optional[str] = Query(None, regex="^(local|estado|etiqueta)$"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Listar itens de um grupo da reconciliação, paginado e filtrável"""
+    
+    if grupo not in _GRUPOS_RECONCILIACAO:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Grupo inválido. Use: {', '.join(_GRUPOS_RECONCILIACAO)}"
+        )
+    _obter_auditoria_reconciliavel(auditoria_id, db)
+    
+    query = _consultar_itens_reconciliacao(db, auditoria_id, grupo)
+    if local_id is not None:
+        query = query.filter(
+            or_(AuditoriaItem.local_esperado_id == local_id, AuditoriaItem.local_encontrado_id == local_id)
+        )
+    if divergencia:
+        query = query.filter(AuditoriaItem.divergencias.like(f"%{divergencia}%"))
+    
+    total = query.order_by(None).count()
+    return {
+        "grupo": grupo,
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "itens": [_formatar_item_reconciliacao(row) for row in query.offset(skip).limit(limit)]
+    }
+
+
 @router.put("/{auditoria_id}/finalizar", dependencies=[Depends(require_roles(["admin", "gestor", "auditor"]))])
 def finalizar_auditoria(
     auditoria_id: int,
@@ -503,7 +581,9 @@ def finalizar_auditoria(
     auditoria.observacoes_finais = observacoes_finais
     
     # Atualizar data de última auditoria nos ativos
-    itens_conformes = db.query(AuditoriaItem).filter(
+    itens_conformes = db.query(AuditoriaItem).options(
+        joinedload(AuditoriaItem.ativo)
+    ).filter(
         and_(
             AuditoriaItem.auditoria_id == auditoria_id,
             AuditoriaItem.resultado == ResultadoItem.CONFORME
@@ -518,48 +598,83 @@ def finalizar_auditoria(
     return {"message": "Auditoria finalizada com sucesso"}
 
 
-def _gerar_itens_auditoria(auditoria: Auditoria, db: Session):
-    """Gerar itens de auditoria baseado no escopo"""
-    
-    query = db.query(Ativo).filter(Ativo.ativo == True)
+def _gerar_itens_auditoria(auditoria: Auditoria, db: Session) -> int:
+    """
+    Gerar itens de auditoria baseado no escopo.
+    
+    Os itens são criados com um único INSERT ... SELECT a partir de ``ativos``
+    (local, responsável e estado copiados no banco), sem carregar os ativos
+    em memória; os contadores da auditoria são gravados na mesma transação.
+    """
+    
+    consulta = select(
+        literal(auditoria.id).label("auditoria_id"),
+        Ativo.id.label("ativo_id"),
+        Ativo.local_id.label("local_esperado_id"),
+        Ativo.responsavel_id.label("responsavel_esperado_id"),
+        Ativo.estado.label("estado_esperado"),
+    ).where(Ativo.status != StatusAtivo.BAIXADO)
     
     # Filtrar por escopo
     if auditoria.escopo_setores:
         setores_ids = [int(x) for x in auditoria.escopo_setores.split(",")]
-        query = query.filter(Ativo.setor_id.in_(setores_ids))
+        consulta = consulta.where(Ativo.setor_id.in_(setores_ids))
     
     if auditoria.escopo_locais:
         locais_ids = [int(x) for x in auditoria.escopo_locais.split(",")]
-        query = query.filter(Ativo.local_id.in_(locais_ids))
+        consulta = consulta.where(Ativo.local_id.in_(locais_ids))
     
     # Aplicar filtros específicos por tipo de auditoria
     if auditoria.tipo == TipoAuditoria.AMOSTRAGEM:
         # Para amostragem, priorizar ativos de alto valor
-        query = query.order_by(Ativo.valor_aquisicao.desc()).limit(auditoria.tamanho_amostra or 100)
+        consulta = consulta.order_by(Ativo.valor_aquisicao.desc()).limit(auditoria.tamanho_amostra or 100)
     elif auditoria.tipo == TipoAuditoria.CICLICA:
-        # Para cíclica, focar em ativos sem auditoria recente
-        data_limite = datetime.now() - timedelta(days=180)  # 6 meses
-        query = query.filter(
-            or_(
-                Ativo.ultima_auditoria.is_(None),
-                Ativo.ultima_auditoria < data_limite
+        # Para cíclica, focar em ativos sem coleta nos últimos 6 meses
+        data_limite = datetime.now() - timedelta(days=180)
+        coleta_recente = aliased(AuditoriaItem)
+        consulta = consulta.where(
+            ~exists().where(
+                coleta_recente.ativo_id == Ativo.id,
+                coleta_recente.data_coleta >= data_limite,
             )
         )
     
-    ativos = query.all()
-    
-    # Criar itens de auditoria
-    for ativo in ativos:
-        item = AuditoriaItem(
-            auditoria_id=auditoria.id,
-            ativo_id=ativo.id,
-            local_esperado_id=ativo.local_id,
-            responsavel_esperado_id=ativo.responsavel_id,
-            estado_esperado=ativo.estado
-        )
-        db.add(item)
-    
+    colunas = list(consulta.selected_columns.keys())
+    resultado = db.execute(insert(AuditoriaItem).from_select(colunas, consulta.subquery().select()))
+    total = resultado.rowcount
+    
+    # Contadores de progresso por local, na mesma transação
+    chave_local = func.coalesce(AuditoriaItem.local_esperado_id, 0)
+    db.execute(insert(AuditoriaContadorLocal).from_select(
+        ["auditoria_id", "local_id", "esperados"],
+        select(AuditoriaItem.auditoria_id, chave_local, func.count(AuditoriaItem.id))
+        .where(AuditoriaItem.auditoria_id == auditoria.id)
+        .group_by(AuditoriaItem.auditoria_id, chave_local)
+    ))
+    
+    auditoria.total_itens_esperados = total
+    auditoria.total_itens = total
+    auditoria.total_itens_verificados = 0
+    auditoria.total_conformes = 0
+    auditoria.total_divergentes = 0
+    auditoria.total_nao_encontrados = 0
+    auditoria.total_extras = 0
     db.commit()
+    return total
+
+
+@job_runner.register("auditorias.gerar_itens", max_attempts=3)
+def _job_gerar_itens_auditoria(ctx: JobContext, auditoria_id: int) -> Dict[str, Any]:
+    """Job: gerar itens de auditoria fora da requisição"""
+    db = SessionLocal()
+    try:
+        auditoria = db.query(Auditoria).filter(Auditoria.id == auditoria_id).first()
+        if not auditoria:
+            raise ValueError(f"Auditoria {auditoria_id} não encontrada")
+        total = _gerar_itens_auditoria(auditoria, db)
+        return {"auditoria_id": auditoria_id, "itens": total}
+    finally:
+        db.close()
 
 
 def _determinar_resultado_verificacao(item: AuditoriaItem, ativo: Ativo, coleta: ColetaLeitura) -> str:
@@ -598,20 +713,459 @@ def _identificar_divergencias(item: AuditoriaItem, ativo: Ativo, coleta: ColetaL
 
 
 def _gerar_resumo_auditoria(auditoria_id: int, db: Session) -> Dict[str, int]:
-    """Gerar resumo de resultados da auditoria"""
+    """Gerar resumo de resultados da auditoria a partir dos contadores incrementais"""
     
-    resumo = db.query(
-        func.count(AuditoriaItem.id).label('total'),
-        func.sum(func.case([(AuditoriaItem.resultado == ResultadoItem.CONFORME, 1)], else_=0)).label('conformes'),
-        func.sum(func.case([(AuditoriaItem.resultado == ResultadoItem.DIVERGENTE, 1)], else_=0)).label('divergentes'),
-        func.sum(func.case([(AuditoriaItem.resultado == ResultadoItem.NAO_ENCONTRADO, 1)], else_=0)).label('nao_encontrados'),
-        func.sum(func.case([(AuditoriaItem.resultado == ResultadoItem.EXTRA, 1)], else_=0)).label('extras')
-    ).filter(AuditoriaItem.auditoria_id == auditoria_id).first()
+    auditoria = db.query(Auditoria).filter(Auditoria.id == auditoria_id).first()
+    totais = _totais_contadores(db, auditoria_id)
+    extras = totais["extras"]
+    verificados_esperados = totais["verificados"] - extras
     
     return {
-        "total_itens": resumo.total or 0,
-        "conformes": resumo.conformes or 0,
-        "divergentes": resumo.divergentes or 0,
-        "nao_encontrados": resumo.nao_encontrados or 0,
-        "extras": resumo.extras or 0
-    }
\ No newline at end of file
+        "total_itens": (auditoria.total_itens_esperados or 0) + extras,
+        "conformes": totais["conformes"],
+        "divergentes": totais["divergentes"],
+        "nao_encontrados": totais["nao_encontrados"],
+        "extras": extras,
+        "pendentes": max((auditoria.total_itens_esperados or 0) - verificados_esperados, 0)
+    }
+
+
+# Grupo do relatório de reconciliação -> resultado do item (None = não coletado)
+_GRUPOS_RECONCILIACAO = {
+    "conformes": ResultadoItem.CONFORME,
+    "divergentes": ResultadoItem.DIVERGENTE,
+    "nao_encontrados": ResultadoItem.NAO_ENCONTRADO,
+    "extras": ResultadoItem.EXTRA,
+    "pendentes": None,
+}
+
+# Resultado do item -> contador incremental
+_CONTADORES_POR_RESULTADO = {
+    ResultadoItem.CONFORME: "conformes",
+    ResultadoItem.DIVERGENTE: "divergentes",
+    ResultadoItem.NAO_ENCONTRADO: "nao_encontrados",
+    ResultadoItem.EXTRA: "extras",
+}
+
+
+def _obter_auditoria_reconciliavel(auditoria_id: int, db: Session) -> Auditoria:
+    auditoria = db.query(Auditoria).filter(Auditoria.id == auditoria_id).first()
+    if not auditoria:
+        raise HTTPException(status_code=404, detail="Auditoria não encontrada")
+    
+    if auditoria.status not in [StatusAuditoria.RECONCILIACAO, StatusAuditoria.FINALIZADA]:
+        raise HTTPException(
+            status_code=400, 
+            detail="Relatório só pode ser gerado em auditorias em reconciliação ou finalizadas"
+        )
+    return auditoria
+
+
+def _consultar_itens_reconciliacao(db: Session, auditoria_id: int, grupo: str):
+    """Consulta (somente colunas) dos itens de um grupo da reconciliação"""
+    local_esperado = aliased(Local)
+    local_encontrado = aliased(Local)
+    query = db.query(
+        AuditoriaItem.id.label("item_id"),
+        Ativo.id.label("ativo_id"),
+        Ativo.codigo,
+        Ativo.patrimonio,
+        Ativo.descricao,
+        local_esperado.codigo.label("local_esperado"),
+        local_encontrado.codigo.label("local_encontrado"),
+        Responsavel.nome.label("responsavel"),
+        AuditoriaItem.divergencias,
+        AuditoriaItem.observacoes_coleta,
+        User.full_name.label("coletado_por"),
+        AuditoriaItem.data_coleta,
+    ).outerjoin(
+        Ativo, AuditoriaItem.ativo_id == Ativo.id
+    ).outerjoin(
+        local_esperado, AuditoriaItem.local_esperado_id == local_esperado.id
+    ).outerjoin(
+        local_encontrado, AuditoriaItem.local_encontrado_id == local_encontrado.id
+    ).outerjoin(
+        Responsavel, AuditoriaItem.responsavel_esperado_id == Responsavel.id
+    ).outerjoin(
+        User, AuditoriaItem.coletado_por == User.id
+    ).filter(AuditoriaItem.auditoria_id == auditoria_id)
+    
+    resultado = _GRUPOS_RECONCILIACAO[grupo]
+    if resultado is None:
+        query = query.filter(AuditoriaItem.data_coleta.is_(None))
+    else:
+        query = query.filter(
+            AuditoriaItem.data_coleta.isnot(None),
+            AuditoriaItem.resultado == resultado
+        )
+    return query.order_by(AuditoriaItem.id)
+
+
+def _formatar_item_reconciliacao(row) -> Dict[str, Any]:
+    return {
+        "item_id": row.item_id,
+        "ativo_id": row.ativo_id,
+        "codigo": row.codigo,
+        "patrimonio": row.patrimonio,
+        "descricao": row.descricao,
+        "local_esperado": row.local_esperado,
+        "local_encontrado": row.local_encontrado,
+        "responsavel": row.responsavel,
+        "divergencias": row.divergencias.split(",") if row.divergencias else [],
+        "observacoes": row.observacoes_coleta,
+        "coletado_por": row.coletado_por,
+        "data_coleta": row.data_coleta.isoformat() if row.data_coleta else None
+    }
+
+
+def _chave_local_contador(item: AuditoriaItem) -> int:
+    """Local usado nos contadores: esperado, ou encontrado para extras (0 = sem local)"""
+    return item.local_esperado_id or item.local_encontrado_id or 0
+
+
+def _acumular_contadores(deltas: Dict[int, Counter], anterior: tuple, item: AuditoriaItem):
+    """Acumular a variação de contadores causada por uma leitura"""
+    verificado_antes, resultado_antes, chave_antes = anterior
+    if verificado_antes:
+        deltas[chave_antes]["verificados"] -= 1
+        campo = _CONTADORES_POR_RESULTADO.get(resultado_antes)
+        if campo:
+            deltas[chave_antes][campo] -= 1
+    
+    chave = _chave_local_contador(item)
+    deltas[chave]["verificados"] += 1
+    deltas[chave][_CONTADORES_POR_RESULTADO[item.resultado]] += 1
+
+
+_CAMPOS_CONTADORES = ["verificados", "conformes", "divergentes", "nao_encontrados", "extras"]
+
+
+def _totais_contadores(db: Session, auditoria_id: int) -> Dict[str, int]:
+    """Totais da auditoria somando os contadores por local"""
+    row = db.query(*[
+        func.coalesce(func.sum(getattr(AuditoriaContadorLocal, campo)), 0) for campo in _CAMPOS_CONTADORES
+    ]).filter(AuditoriaContadorLocal.auditoria_id == auditoria_id).one()
+    return dict(zip(_CAMPOS_CONTADORES, (int(valor) for valor in row)))
+
+
+def _aplicar_contadores(db: Session, auditoria_id: int, deltas: Dict[int, Counter]):
+    """
+    Aplicar variações aos contadores por local (incrementos atômicos no banco).
+    
+    A linha da auditoria não é atualizada durante a coleta: dispositivos em
+    locais diferentes incrementam linhas diferentes e não se serializam; os
+    totais são a soma dos contadores por local.
+    """
+    campos = _CAMPOS_CONTADORES
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    stmt = upsert(AuditoriaContadorLocal)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["auditoria_id", "local_id"],
+        set_={campo: getattr(AuditoriaContadorLocal, campo) + getattr(stmt.excluded, campo) for campo in campos}
+    )
+    db.execute(stmt, [
+        {"auditoria_id": auditoria_id, "local_id": chave, "esperados": 0, **{campo: contador[campo] for campo in campos}}
+        for chave, contador in deltas.items()
+    ])
+
+
+def _registrar_coletas_lote(
+    db: Session,
+    auditoria: Auditoria,
+    coletas: List[ColetaLeitura],
+    usuario_id: int,
+    dispositivo_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Registrar um lote de leituras em uma única transação.
+    
+    Itens e ativos são buscados com consultas ``IN`` para o lote inteiro;
+    resultados são calculados em memória e gravados com inserts/updates em
+    lote, e a trilha é encadeada por ``append_audit_records``. Leituras
+    inválidas são reportadas individualmente sem interromper as demais.
+    
+    Leituras com ``client_id`` já recebido são reportadas como ``duplicada``;
+    cada leitura gravada gera um recibo e uma nova versão do item para a
+    sincronização offline.
+    """
+    resultados = {
+        "sucessos": 0,
+        "erros": 0,
+        "duplicadas": 0,
+        "detalhes": []
+    }
+    
+    def registrar_erro(coleta: ColetaLeitura, erro: str):
+        resultados["erros"] += 1
+        detalhe = {
+            "item_id": coleta.item_id,
+            "codigo": coleta.codigo_lido,
+            "erro": erro,
+            "status": "erro"
+        }
+        if coleta.client_id:
+            detalhe["client_id"] = coleta.client_id
+        resultados["detalhes"].append(detalhe)
+    
+    # 0. Leituras já recebidas (reenvio após falha de conexão)
+    recibos = _buscar_recibos_leituras(db, auditoria.id, {c.client_id for c in coletas if c.client_id})
+    novas = []
+    for coleta in coletas:
+        recibo = recibos.get(coleta.client_id) if coleta.client_id else None
+        if recibo is None:
+            if coleta.client_id:
+                recibos[coleta.client_id] = {"item_id": coleta.item_id, "resultado": None}
+            novas.append(coleta)
+            continue
+        resultados["duplicadas"] += 1
+        resultados["detalhes"].append({
+            "item_id": recibo["item_id"],
+            "codigo": coleta.codigo_lido,
+            "resultado": recibo["resultado"],
+            "client_id": coleta.client_id,
+            "status": "duplicada"
+        })
+    coletas = novas
+    
+    # 1. Itens referenciados
+    itens_ids = list({c.item_id for c in coletas if c.item_id})
+    itens: Dict[int, AuditoriaItem] = {}
+    for inicio in range(0, len(itens_ids), IN_CHUNK_SIZE):
+        for item in db.query(AuditoriaItem).filter(
+            AuditoriaItem.auditoria_id == auditoria.id,
+            AuditoriaItem.id.in_(itens_ids[inicio:inicio + IN_CHUNK_SIZE])
+        ):
+            itens[item.id] = item
+    
+    # 2. Ativos dos itens e ativos lidos fora da lista (extras), por id ou código
+    ativos_ids = list({item.ativo_id for item in itens.values() if item.ativo_id})
+    codigos_extras = list({
+        c.codigo_lido for c in coletas if c.item_id not in itens and c.codigo_lido
+    })
+    ativos_por_id: Dict[int, Ativo] = {}
+    for inicio in range(0, max(len(ativos_ids), len(codigos_extras)), IN_CHUNK_SIZE):
+        ids_lote = ativos_ids[inicio:inicio + IN_CHUNK_SIZE]
+        codigos_lote = codigos_extras[inicio:inicio + IN_CHUNK_SIZE]
+        for ativo in db.query(Ativo).filter(or_(Ativo.id.in_(ids_lote), Ativo.codigo.in_(codigos_lote))):
+            ativos_por_id[ativo.id] = ativo
+    ativos_por_codigo = {ativo.codigo: ativo for ativo in ativos_por_id.values()}
+    
+    # 3. Resolver item/ativo de cada leitura; extras são criados com um único flush
+    extras: Dict[int, AuditoriaItem] = {}
+    resolvidas = []
+    for coleta in coletas:
+        item = itens.get(coleta.item_id)
+        if item is not None:
+            ativo = ativos_por_id.get(item.ativo_id)
+        else:
+            # Verificar se é um ativo extra (não cadastrado na auditoria)
+            ativo = ativos_por_codigo.get(coleta.codigo_lido) if coleta.codigo_lido else None
+            if ativo is None:
+                registrar_erro(coleta, f"Código {coleta.codigo_lido} não encontrado")
+                continue
+            item = extras.get(ativo.id)
+            if item is None:
+                item = AuditoriaItem(
+                    auditoria_id=auditoria.id,
+                    ativo_id=ativo.id,
+                    resultado=ResultadoItem.EXTRA
+                )
+                extras[ativo.id] = item
+        if ativo is None:
+            registrar_erro(coleta, "Item sem ativo associado")
+            continue
+        resolvidas.append((coleta, item, ativo))
+    
+    if extras:
+        db.add_all(extras.values())
+        db.flush()
+    
+    # 4. Calcular resultados e registros de trilha em memória
+    agora = datetime.now()
+    registros_trilha = []
+    registros_recibos = []
+    sucessos = []
+    deltas: Dict[int, Counter] = defaultdict(Counter)
+    for coleta, item, ativo in resolvidas:
+        anterior = (item.data_coleta is not None, item.resultado, _chave_local_contador(item))
+        
+        item.codigo_lido = coleta.codigo_lido
+        item.local_encontrado_id = coleta.local_encontrado_id
+        item.estado_encontrado = coleta.estado_encontrado
+        item.observacoes_coleta = coleta.observacoes
+        item.foto_evidencia_url = coleta.foto_url
+        item.coletado_por = usuario_id
+        item.verificado_por = usuario_id
+        item.data_coleta = agora
+        
+        # Determinar resultado da verificação (extras permanecem como extras)
+        if item.ativo_id in extras and extras[item.ativo_id] is item:
+            resultado = ResultadoItem.EXTRA
+        else:
+            resultado = _determinar_resultado_verificacao(item, ativo, coleta)
+        item.resultado = resultado
+        
+        # Registrar divergências se houver
+        if resultado in [ResultadoItem.DIVERGENTE, ResultadoItem.NAO_ENCONTRADO]:
+            item.divergencias = ",".join(_identificar_divergencias(item, ativo, coleta))
+        else:
+            item.divergencias = None
+        
+        _acumular_contadores(deltas, anterior, item)
+        
+        # Trilha de auditoria da coleta (encadeada e assinada ao gravar)
+        audit_payload = {
+            "asset_id": ativo.id,
+            "auditoria_id": auditoria.id,
+            "auditoria_status": auditoria.status,
+            "action": "AUDIT_READ",
+            "table_name": "auditoria_itens",
+            "record_id": item.id,
+            "collector_user_id": usuario_id,
+            "codigo_lido": coleta.codigo_lido,
+            "local_encontrado_id": coleta.local_encontrado_id,
+            "estado_encontrado": coleta.estado_encontrado,
+            "resultado": resultado,
+            "divergencias": item.divergencias.split(",") if item.divergencias else []
+        }
+        registros_trilha.append({
+            "asset_id": ativo.id,
+            "action": "AUDIT_READ",
+            "table_name": "auditoria_itens",
+            "record_id": item.id,
+            "reason": "audit_collection",
+            "custom_metadata": audit_payload,
+            "created_by": usuario_id,
+        })
+        detalhe = {
+            "item_id": item.id,
+            "codigo": coleta.codigo_lido,
+            "resultado": resultado,
+            "status": "sucesso"
+        }
+        if coleta.client_id:
+            detalhe["client_id"] = coleta.client_id
+            registros_recibos.append({
+                "client_id": coleta.client_id,
+                "auditoria_id": auditoria.id,
+                "item_id": item.id,
+                "dispositivo_id": dispositivo_id,
+                "status": "sucesso",
+                "resultado": resultado,
+            })
+        sucessos.append(detalhe)
+    
+    # 5. Gravar tudo em uma transação
+    try:
+        db.flush()
+        append_audit_records(db, registros_trilha)
+        if sucessos:
+            db.execute(insert(AuditoriaItemVersao), [
+                {"auditoria_id": auditoria.id, "item_id": item_id}
+                for item_id in dict.fromkeys(detalhe["item_id"] for detalhe in sucessos)
+            ])
+        if registros_recibos:
+            db.execute(insert(AuditoriaLeituraRecebida), registros_recibos)
+        if deltas:
+            _aplicar_contadores(db, auditoria.id, deltas)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        for detalhe in sucessos:
+            resultados["erros"] += 1
+            erro = {
+                "item_id": detalhe["item_id"],
+                "codigo": detalhe["codigo"],
+                "erro": str(e),
+                "status": "erro"
+            }
+            if "client_id" in detalhe:
+                erro["client_id"] = detalhe["client_id"]
+            resultados["detalhes"].append(erro)
+        return resultados
+    
+    resultados["sucessos"] += len(sucessos)
+    resultados["detalhes"].extend(sucessos)
+    return resultados
+
+
+def _buscar_recibos_leituras(db: Session, auditoria_id: int, client_ids) -> Dict[str, Dict[str, Any]]:
+    """Recibos já gravados nesta auditoria para os client_ids do lote"""
+    client_ids = list(client_ids)
+    recibos: Dict[str, Dict[str, Any]] = {}
+    for inicio in range(0, len(client_ids), IN_CHUNK_SIZE):
+        for client_id, item_id, resultado in db.query(
+            AuditoriaLeituraRecebida.client_id,
+            AuditoriaLeituraRecebida.item_id,
+            AuditoriaLeituraRecebida.resultado
+        ).filter(
+            AuditoriaLeituraRecebida.auditoria_id == auditoria_id,
+            AuditoriaLeituraRecebida.client_id.in_(client_ids[inicio:inicio + IN_CHUNK_SIZE])
+        ):
+            recibos[client_id] = {"item_id": item_id, "resultado": resultado}
+    return recibos
+
+
+# Colunas das linhas de sincronização (linhas são listas, na mesma ordem)
+_COLUNAS_SINCRONIZACAO = [
+    "item_id", "ativo_id", "codigo", "patrimonio", "descricao",
+    "local_esperado_id", "local_esperado", "resultado", "data_coleta", "versao",
+]
+
+
+def _obter_auditoria_sincronizavel(auditoria_id: int, db: Session) -> Auditoria:
+    auditoria = db.query(Auditoria).filter(Auditoria.id == auditoria_id).first()
+    if not auditoria:
+        raise HTTPException(status_code=404, detail="Auditoria não encontrada")
+    
+    if auditoria.status not in [StatusAuditoria.PLANEJADA, StatusAuditoria.EM_ANDAMENTO]:
+        raise HTTPException(
+            status_code=400, 
+            detail="Sincronização disponível apenas para auditorias planejadas ou em andamento"
+        )
+    return auditoria
+
+
+def _versao_atual_sincronizacao(db: Session, auditoria_id: int) -> int:
+    versao = db.query(func.max(AuditoriaItemVersao.id)).filter(
+        AuditoriaItemVersao.auditoria_id == auditoria_id
+    ).scalar()
+    return versao or 0
+
+
+def _consultar_itens_sincronizacao(db: Session, auditoria_id: int, versao=None):
+    """Consulta (somente colunas) dos itens enviados aos dispositivos"""
+    return db.query(
+        AuditoriaItem.id.label("item_id"),
+        Ativo.id.label("ativo_id"),
+        Ativo.codigo,
+        Ativo.patrimonio,
+        Ativo.descricao,
+        AuditoriaItem.local_esperado_id,
+        Local.codigo.label("local_esperado"),
+        AuditoriaItem.resultado,
+        AuditoriaItem.data_coleta,
+        (versao if versao is not None else literal(None)).label("versao"),
+    ).outerjoin(
+        Ativo, AuditoriaItem.ativo_id == Ativo.id
+    ).outerjoin(
+        Local, AuditoriaItem.local_esperado_id == Local.id
+    ).filter(AuditoriaItem.auditoria_id == auditoria_id)
+
+
+def _formatar_linha_sincronizacao(row) -> List[Any]:
+    return [
+        row.item_id,
+        row.ativo_id,
+        row.codigo,
+        row.patrimonio,
+        row.descricao,
+        row.local_esperado_id,
+        row.local_esperado,
+        row.resultado if row.data_coleta else None,
+        row.data_coleta.isoformat() if row.data_coleta else None,
+        row.versao,
+    ]
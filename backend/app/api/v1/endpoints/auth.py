@@ -20,7 +20,9 @@ from app.core.security import (
     verify_token,
     revoke_refresh_token
 )
+from app.core.config import settings
 from app.core.exceptions import AuthenticationException, ValidationException
+from app.middleware.rate_limiting import parse_rate_limit, rate_limit
 from app.crud.user import authenticate_user, get_user_by_username_or_email, create_user
 
 logger = structlog.get_logger()
@@ -69,6 +71,7 @@ class PasswordChangeRequest(BaseModel):
 
 
 @router.post("/login", response_model=TokenResponse)
+@rate_limit(*parse_rate_limit(settings.RATE_LIMIT_LOGIN))
 async def login(
     request: Request,
     db: AsyncSession = Depends(get_async_session)
@@ -155,6 +158,7 @@ async def login(
 
 
 @router.post("/register", response_model=dict)
+@rate_limit(*parse_rate_limit(settings.RATE_LIMIT_LOGIN))
 async def register(
     user_data: UserRegister,
     db: AsyncSession = Depends(get_async_session)
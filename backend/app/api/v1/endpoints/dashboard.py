@@ -7,6 +7,7 @@ import random
 import time
 
 from app.core.database import get_async_session
+from app.core.monitoring import metrics_collector
 from app.core.security import get_current_user_id, security
 
 router = APIRouter()
@@ -94,6 +95,10 @@ def get_cached_dashboard_base_stats(cache_key: str):
         }
     }
 
+# Acertos/falhas dos caches expostos nas métricas (/monitoring/prometheus)
+metrics_collector.register_cache("dashboard_static", lambda: get_cached_static_data.cache_info()[:2])
+metrics_collector.register_cache("dashboard_stats", lambda: get_cached_dashboard_base_stats.cache_info()[:2])
+
 def get_cache_key_for_stats():
     """Gera chave de cache que muda a cada 5 minutos"""
     current_time = int(time.time())
@@ -0,0 +1,87 @@
+"""
+Background job endpoints
+Status, progress and cancellation of long-running operations
+"""
+
+from datetime import datetime
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.auth import get_current_user
+from app.core.jobs import job_runner
+from app.models import User, BackgroundJob
+
+router = APIRouter()
+
+
+class JobResponse(BaseModel):
+    """Background job status"""
+    id: str
+    kind: str
+    status: str
+    progress: float
+    message: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    created_by: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+@router.get("/", response_model=List[JobResponse])
+def listar_jobs(
+    status: Optional[str] = Query(None),
+    kind: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Listar jobs do usuário (administradores veem todos)"""
+    query = db.query(BackgroundJob)
+    if current_user.role != "admin":
+        query = query.filter(BackgroundJob.created_by == current_user.id)
+    if status:
+        query = query.filter(BackgroundJob.status == status)
+    if kind:
+        query = query.filter(BackgroundJob.kind == kind)
+    return query.order_by(BackgroundJob.created_at.desc()).limit(limit).all()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def obter_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Obter status e progresso de um job"""
+    return _obter_job_autorizado(job_id, db, current_user)
+
+
+@router.post("/{job_id}/cancelar", response_model=JobResponse)
+def cancelar_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Solicitar cancelamento de um job"""
+    _obter_job_autorizado(job_id, db, current_user)
+    if not job_runner.cancel(job_id):
+        raise HTTPException(status_code=400, detail="Job já finalizado")
+    db.expire_all()
+    return _obter_job_autorizado(job_id, db, current_user)
+
+
+def _obter_job_autorizado(job_id: str, db: Session, current_user: User) -> BackgroundJob:
+    job = db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+    if not job or (current_user.role != "admin" and job.created_by != current_user.id):
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
@@ -2,7 +2,7 @@
 Machine endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
@@ -12,16 +12,20 @@ import structlog
 from app.core.database import get_async_session
 from app.core.security import get_current_user_id, security
 from app.core.exceptions import NotFoundException, ValidationException
+from app.core.monitoring import metrics_collector
 
-from sqlalchemy import select
+from sqlalchemy import false, select
 from datetime import datetime, timezone
 import uuid
 from app.models.machine import Machine
 from app.models.location import Location
 from app.core.security import require_roles_or_api_key, require_roles
 from app.models.asset import Asset
-from app.models.movement import AssetAudit
-from app.core.security import compute_audit_record_hash, compute_audit_signature
+from app.core.audit_chain import aappend_audit_records
+from app.core.batch_loader import BatchLoader, get_batch_loader
+from app.core.streaming_export import (
+    EXPORT_FORMAT_REGEX, aiter_export, aiter_query_batches, export_response, get_encoder
+)
 
 logger = structlog.get_logger()
 
@@ -183,18 +187,13 @@ async def register_machine(
                 "machine_uuid": machine.machine_id,
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
-            record_hash = compute_audit_record_hash(audit_payload)
-            signature = compute_audit_signature(record_hash)
-            audit = AssetAudit(
-                asset_id=linked_asset.id,
-                action="link_machine_asset",
-                table_name="machines",
-                record_id=str(machine.id),
-                prev_hash=None,
-                record_hash=record_hash,
-                signature=signature,
-            )
-            db.add(audit)
+            await aappend_audit_records(db, [{
+                "asset_id": linked_asset.id,
+                "action": "link_machine_asset",
+                "table_name": "machines",
+                "record_id": machine.id,
+                "custom_metadata": audit_payload,
+            }])
             await db.commit()
         
         logger.info(
@@ -269,6 +268,7 @@ async def update_machine_status(
         machine.agent_last_seen = datetime.now(timezone.utc)
         
         await db.commit()
+        metrics_collector.increment("machine_heartbeats")
         
         # Check for alerts based on metrics
         alerts_triggered = []
@@ -355,37 +355,30 @@ async def list_machines(
     machine_type: Optional[str] = None,
     location_code: Optional[str] = None,
     db: AsyncSession = Depends(get_async_session),
+    loader: BatchLoader = Depends(get_batch_loader),
     current_user: str = Depends(get_current_user)
 ):
     """
     List all registered machines with optional filtering
     """
     try:
-        query = select(Machine)
-        if status_filter:
-            query = query.where(Machine.status == status_filter)
-        if hostname:
-            query = query.where(Machine.hostname.ilike(f"%{hostname}%"))
-        if machine_type:
-            query = query.where(Machine.machine_type == machine_type)
-        if location_code:
-            loc_res = await db.execute(select(Location.id).where(Location.code == location_code))
-            location_id = loc_res.scalar_one_or_none()
-            if location_id is None:
-                return []
-            query = query.where(Machine.location_id == location_id)
+        query = await _apply_machine_filters(
+            db, select(Machine), status_filter, hostname, machine_type, location_code
+        )
+        if query is None:
+            return []
         query = query.order_by(Machine.created_at.desc()).offset(skip).limit(limit)
 
         result = await db.execute(query)
         machines = result.scalars().all()
 
+        # Resolver location_code de todas as máquinas com uma única consulta
+        loader.queue(Location.id, Location.code, (m.location_id for m in machines))
+        await loader.resolve(db)
+
         responses: List[MachineResponse] = []
         for m in machines:
-            # Resolver location_code
-            location_code = None
-            if m.location_id:
-                loc_res = await db.execute(select(Location.code).where(Location.id == m.location_id))
-                location_code = loc_res.scalar_one_or_none()
+            location_code = loader.get(Location.id, Location.code, m.location_id)
             # Resolver asset_tag de custom_metadata
             asset_tag = None
             try:
@@ -416,4 +409,71 @@ async def list_machines(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve machines"
-        )
\ No newline at end of file
+        )
+
+
+# Columns streamed by GET /machines/export (location_code is joined from Location)
+EXPORT_COLUMNS = [
+    "id", "hostname", "machine_id", "name", "machine_type", "status",
+    "operating_system", "os_version", "ip_address", "mac_address", "domain",
+    "location_code", "agent_version", "agent_last_seen", "is_compliant",
+    "is_managed", "created_at", "updated_at",
+]
+
+
+@router.get("/export", dependencies=[Depends(require_roles(["admin", "gestor", "auditor", "agent", "system"]))])
+async def export_machines(
+    format: str = Query("csv", regex=EXPORT_FORMAT_REGEX),
+    compress: bool = Query(False, description="Gzip the response body"),
+    status_filter: Optional[str] = None,
+    hostname: Optional[str] = None,
+    machine_type: Optional[str] = None,
+    location_code: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_session),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Stream all machines matching the filters as CSV, NDJSON or XLSX
+    """
+    columns = [
+        Location.code.label("location_code") if name == "location_code" else getattr(Machine, name)
+        for name in EXPORT_COLUMNS
+    ]
+    query = await _apply_machine_filters(
+        db,
+        select(*columns).outerjoin(Location, Machine.location_id == Location.id),
+        status_filter, hostname, machine_type, location_code,
+    )
+    if query is None:
+        # Unknown location: export only the header
+        query = select(*columns).where(false())
+
+    encoder = get_encoder(format, EXPORT_COLUMNS, sheet_name="machines")
+    content = aiter_export(
+        encoder, aiter_query_batches(query.order_by(Machine.id)), compress=compress
+    )
+    return export_response(content, format, "machines", compress=compress)
+
+
+async def _apply_machine_filters(
+    db: AsyncSession,
+    query,
+    status_filter: Optional[str],
+    hostname: Optional[str],
+    machine_type: Optional[str],
+    location_code: Optional[str],
+):
+    """Apply list/export filters; returns None when the location code does not exist"""
+    if status_filter:
+        query = query.where(Machine.status == status_filter)
+    if hostname:
+        query = query.where(Machine.hostname.ilike(f"%{hostname}%"))
+    if machine_type:
+        query = query.where(Machine.machine_type == machine_type)
+    if location_code:
+        loc_res = await db.execute(select(Location.id).where(Location.code == location_code))
+        location_id = loc_res.scalar_one_or_none()
+        if location_id is None:
+            return None
+        query = query.where(Machine.location_id == location_id)
+    return query
@@ -4,14 +4,21 @@ Handles CRUD operations, SLA tracking, evaluations and reports
 """
 
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc, asc
+from sqlalchemy import and_, or_, case, func, desc, asc, select
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, SessionLocal
 from app.core.auth import get_current_user
+from app.core.jobs import job_runner, JobContext
+from app.core.maintenance_analytics import mtbf, refresh_daily_summaries, repair_minutes, sla_met, summary_series
+from app.core.sla_scheduler import (
+    SLA_CLOSED_STATUSES, local_naive, refresh_sla_state, sla_breached_clause, sla_scheduler
+)
 from app.models import Manutencao, Ativo, User, Fornecedor
 from app.schemas.manutencao import (
     ManutencaoCreate, ManutencaoUpdate, ManutencaoResponse, ManutencaoList,
@@ -63,10 +70,12 @@ async def criar_manutencao(
         criado_por=current_user.id,
         criado_em=datetime.now()
     )
+    refresh_sla_state(db_manutencao)
     
     db.add(db_manutencao)
     db.commit()
     db.refresh(db_manutencao)
+    sla_scheduler.schedule(db_manutencao.id, db_manutencao.sla_proximo_evento_em)
     
     # Enviar notificação (implementar webhook/email)
     # await enviar_notificacao_nova_manutencao(db_manutencao)
@@ -116,23 +125,12 @@ async def listar_manutencoes(
     if filtros.data_fim:
         query = query.filter(Manutencao.criado_em <= filtros.data_fim)
     
+    # Violação de SLA marcada pelo agendador (prazo efetivo se o agendador estiver desligado)
     if filtros.sla_vencido is not None:
         if filtros.sla_vencido:
-            query = query.filter(
-                and_(
-                    Manutencao.data_vencimento_sla.isnot(None),
-                    Manutencao.data_vencimento_sla < datetime.now(),
-                    Manutencao.status.in_(["aberta", "em_andamento"])
-                )
-            )
+            query = query.filter(sla_breached_clause())
         else:
-            query = query.filter(
-                or_(
-                    Manutencao.data_vencimento_sla.is_(None),
-                    Manutencao.data_vencimento_sla >= datetime.now(),
-                    Manutencao.status.in_(["finalizada", "cancelada"])
-                )
-            )
+            query = query.filter(~sla_breached_clause())
     
     if filtros.texto:
         texto_busca = f"%{filtros.texto}%"
@@ -189,6 +187,9 @@ async def atualizar_manutencao(
     
     # Atualizar campos
     update_data = manutencao_update.dict(exclude_unset=True)
+    if update_data.get("sla_pausado") is not None:
+        manutencao.sla_pausado = 1 if update_data.pop("sla_pausado") else 0
+    update_data.pop("sla_pausado", None)
     for field, value in update_data.items():
         setattr(manutencao, field, value)
     
@@ -203,8 +204,12 @@ async def atualizar_manutencao(
     if manutencao_update.status == "em_andamento" and manutencao.data_inicio_real is None:
         manutencao.data_inicio_real = datetime.now()
     
+    # Pausa/retomada, mudança de status ou de prazo: recalcular o próximo evento de SLA
+    refresh_sla_state(manutencao)
+    
     db.commit()
     db.refresh(manutencao)
+    sla_scheduler.schedule(manutencao.id, manutencao.sla_proximo_evento_em)
     
     return manutencao
 
@@ -230,8 +235,10 @@ async def cancelar_manutencao(
     manutencao.finalizado_por = current_user.id
     manutencao.data_fim_real = datetime.now()
     manutencao.atualizado_em = datetime.now()
+    refresh_sla_state(manutencao)
     
     db.commit()
+    sla_scheduler.schedule(manutencao.id, None)
     
     return {"message": "Manutenção cancelada com sucesso"}
 
@@ -310,52 +317,35 @@ async def obter_metricas_dashboard(
         Manutencao.status == "em_andamento"
     ).count()
     
-    # Manutenções vencidas
-    total_vencidas = db.query(Manutencao).filter(
-        and_(
-            Manutencao.data_vencimento_sla < datetime.now(),
-            Manutencao.status.in_(["aberta", "em_andamento"])
-        )
-    ).count()
+    # Manutenções vencidas (violação marcada pelo agendador de SLA)
+    total_vencidas = db.query(Manutencao).filter(sla_breached_clause()).count()
     
-    # Manutenções finalizadas no mês
+    # Manutenções resolvidas no mês
     inicio_mes = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    total_finalizadas_mes = db.query(Manutencao).filter(
-        and_(
-            Manutencao.status == "finalizada",
-            Manutencao.data_fim_real >= inicio_mes
-        )
-    ).count()
-    
-    # Tempo médio de resolução
-    manutencoes_finalizadas = db.query(Manutencao).filter(
-        and_(
-            Manutencao.status == "finalizada",
-            Manutencao.data_inicio_real.isnot(None),
-            Manutencao.data_fim_real.isnot(None)
-        )
-    ).all()
-    
-    if manutencoes_finalizadas:
-        tempos_resolucao = [
-            (m.data_fim_real - m.data_inicio_real).total_seconds() / 3600
-            for m in manutencoes_finalizadas
-        ]
-        tempo_medio_resolucao_horas = sum(tempos_resolucao) / len(tempos_resolucao)
-    else:
-        tempo_medio_resolucao_horas = 0
-    
-    # Percentual de SLA cumprido
-    manutencoes_com_sla = db.query(Manutencao).filter(
-        and_(
-            Manutencao.status == "finalizada",
-            Manutencao.sla_horas.isnot(None)
-        )
-    ).all()
-    
-    if manutencoes_com_sla:
-        sla_cumprido = sum(1 for m in manutencoes_com_sla if not m.sla_vencido)
-        percentual_sla_cumprido = (sla_cumprido / len(manutencoes_com_sla)) * 100
+    resolvidas = and_(
+        Manutencao.data_resolucao.isnot(None),
+        Manutencao.status.notin_(["cancelado", "cancelada"])
+    )
+    total_finalizadas_mes = db.query(func.count(Manutencao.id)).filter(
+        resolvidas,
+        Manutencao.data_resolucao >= inicio_mes
+    ).scalar()
+    
+    # Tempo médio de resolução (abertura -> resolução), calculado no banco
+    minutos_medios = db.query(func.avg(repair_minutes(db))).filter(resolvidas).scalar()
+    tempo_medio_resolucao_horas = float(minutos_medios) / 60 if minutos_medios is not None else 0
+    
+    # Percentual de SLA cumprido (mesma regra dos resumos diários: resolvida até o prazo)
+    total_com_sla, sla_cumprido = db.query(
+        func.count(Manutencao.id),
+        func.sum(case((sla_met, 1), else_=0))
+    ).filter(
+        resolvidas,
+        Manutencao.sla_horas.isnot(None)
+    ).one()
+    
+    if total_com_sla:
+        percentual_sla_cumprido = (sla_cumprido / total_com_sla) * 100
     else:
         percentual_sla_cumprido = 100
     
@@ -384,39 +374,107 @@ async def obter_metricas_dashboard(
     )
 
 
+@router.get("/metricas/analitico")
+async def obter_metricas_analiticas(
+    data_inicio: Optional[date] = Query(None, description="Padrão: 30 dias antes de data_fim"),
+    data_fim: Optional[date] = Query(None, description="Padrão: hoje"),
+    categoria: Optional[str] = Query(None, description="Categoria do ativo"),
+    tipo: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """MTTR, conformidade de SLA e custos por dia, a partir dos resumos diários"""
+    
+    data_fim = data_fim or date.today()
+    data_inicio = data_inicio or data_fim - timedelta(days=30)
+    if data_inicio > data_fim:
+        raise HTTPException(status_code=400, detail="data_inicio deve ser anterior a data_fim")
+    
+    return summary_series(db, data_inicio, data_fim, categoria, tipo)
+
+
+@router.get("/metricas/mtbf")
+async def obter_mtbf(
+    agrupar: str = Query("ativo", regex="^(ativo|categoria)$"),
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Tempo médio entre falhas (manutenções corretivas) por ativo ou categoria"""
+    
+    return mtbf(db, agrupar, data_inicio, data_fim, skip, limit)
+
+
+@router.post("/metricas/resumos/atualizar", status_code=202)
+async def atualizar_resumos_manutencao(
+    completo: bool = Query(False, description="Recalcular todos os dias"),
+    current_user: User = Depends(get_current_user)
+):
+    """Agendar a atualização dos resumos diários de manutenção"""
+    
+    if current_user.role not in ("admin", "manager"):
+        raise HTTPException(status_code=403, detail="Permissão insuficiente")
+    
+    job_id = await job_runner.asubmit(
+        "manutencao.atualizar_resumos", {"completo": completo}, created_by=current_user.id
+    )
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job_id,
+            "status": "pending",
+            "status_url": f"/api/v1/jobs/{job_id}"
+        }
+    )
+
+
 @router.get("/alertas/sla", response_model=List[AlertaSLA])
 async def obter_alertas_sla(
     horas_antecedencia: int = Query(24, description="Horas de antecedência para alerta"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Obter alertas de SLA próximo ao vencimento"""
+    """Obter alertas de SLA próximo ao vencimento (prazo efetivo pré-calculado)"""
     
-    limite_alerta = datetime.now() + timedelta(hours=horas_antecedencia)
+    agora = datetime.now()
+    limite_alerta = agora + timedelta(hours=horas_antecedencia)
     
-    manutencoes = db.query(Manutencao).join(Ativo).filter(
-        and_(
-            Manutencao.status.in_(["aberta", "em_andamento"]),
-            Manutencao.data_vencimento_sla.isnot(None),
-            Manutencao.data_vencimento_sla <= limite_alerta
+    linhas = db.execute(
+        select(
+            Manutencao.id, Manutencao.numero_chamado, Manutencao.titulo, Manutencao.sla_horas,
+            Manutencao.sla_vence_em, Manutencao.status,
+            Ativo.codigo.label("ativo_codigo"), User.full_name.label("tecnico"),
         )
-    ).all()
+        .join(Ativo, Ativo.id == Manutencao.ativo_id)
+        .outerjoin(User, User.id == Manutencao.atribuido_para)
+        .where(
+            Manutencao.status.notin_(SLA_CLOSED_STATUSES),
+            or_(Manutencao.sla_pausado.is_(None), Manutencao.sla_pausado == 0),
+            Manutencao.sla_vence_em.isnot(None),
+            Manutencao.sla_vence_em <= limite_alerta
+        )
+        .order_by(Manutencao.sla_vence_em)
+    )
     
     alertas = []
-    for m in manutencoes:
-        horas_restantes = (m.data_vencimento_sla - datetime.now()).total_seconds() / 3600
-        percentual_utilizado = ((m.sla_horas * 3600 - (m.data_vencimento_sla - datetime.now()).total_seconds()) / (m.sla_horas * 3600)) * 100
+    for m in linhas:
+        segundos_restantes = (local_naive(m.sla_vence_em) - agora).total_seconds()
+        sla_segundos = (m.sla_horas or 0) * 3600
+        percentual_utilizado = ((sla_segundos - segundos_restantes) / sla_segundos) * 100 if sla_segundos else 100
         
         alertas.append(AlertaSLA(
             manutencao_id=m.id,
-            numero_ticket=m.numero_ticket,
-            ativo_codigo=m.ativo.codigo,
+            numero_ticket=m.numero_chamado,
+            ativo_codigo=m.ativo_codigo,
             titulo=m.titulo,
-            sla_horas=m.sla_horas,
-            horas_restantes=max(0, horas_restantes),
+            sla_horas=m.sla_horas or 0,
+            horas_restantes=max(0, segundos_restantes / 3600),
             percentual_utilizado=min(100, max(0, percentual_utilizado)),
             status=m.status,
-            atribuido_para=m.atribuido_para_user.nome if m.atribuido_para else None
+            atribuido_para=m.tecnico
         ))
     
     return alertas
@@ -444,4 +502,20 @@ def calcular_sla(categoria: str, tipo: str, prioridade: str) -> int:
     sla_base = sla_matrix.get(prioridade.lower(), sla_matrix["media"])
     sla_tipo = sla_base.get(tipo.lower(), sla_base["corretiva"])
     
-    return int(sla_tipo * multiplicador_prioridade.get(prioridade.lower(), 1.0))
\ No newline at end of file
+    return int(sla_tipo * multiplicador_prioridade.get(prioridade.lower(), 1.0))
+
+
+@job_runner.register("manutencao.atualizar_resumos")
+def _job_atualizar_resumos(ctx: JobContext, completo: bool = False) -> Dict[str, Any]:
+    """Job: recalcular os resumos diários dos dias alterados"""
+    db = SessionLocal()
+    try:
+        resultado = refresh_daily_summaries(db, full=completo)
+        db.commit()
+        return resultado
+    finally:
+        db.close()
+
+
+if settings.MAINTENANCE_SUMMARY_REFRESH_SECONDS > 0:
+    job_runner.every("manutencao.atualizar_resumos", settings.MAINTENANCE_SUMMARY_REFRESH_SECONDS)
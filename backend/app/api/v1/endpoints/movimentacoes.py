@@ -3,21 +3,44 @@ Movimentacoes API endpoints for Levitiis inventory system
 Asset movement and custody chain management
 """
 
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, or_, case, false, func, insert, null, select, union_all, update
 
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.core.auth import get_current_user
-from app.models import User, Ativo, Movimentacao, Local, Responsavel
+from app.core.batch_loader import IN_CHUNK_SIZE
+from app.core.jobs import job_runner, JobContext
+from app.core.websocket import connection_manager
+from app.middleware.validation import skip_sanitization
+from app.core.streaming_export import (
+    EXPORT_FORMAT_REGEX, export_response, get_encoder, iter_export, iter_query_batches
+)
+from app.models import User, Ativo, Movimentacao, CustodiaIntervalo, Local, Responsavel, Setor
 from app.schemas.movimentacoes import (
     MovimentacaoCreate, MovimentacaoUpdate, MovimentacaoResponse, 
-    MovimentacaoList, TermoResponsabilidade
+    MovimentacaoList, MovimentacaoLote, AprovacaoLote, TermoResponsabilidade
 )
 
 router = APIRouter()
 
+# Movimentações de ativos com valor acima disto (transferência/alocação) exigem aprovação
+VALOR_LIMITE_APROVACAO = 5000.0
+
+# Lotes de movimentações maiores que isto são processados como job
+MOVIMENTACOES_LOTE_LIMITE_SINCRONO = 500
+
+# Colunas exportadas em /movimentacoes/exportar
+COLUNAS_EXPORTACAO = [
+    "id", "ativo_id", "tipo", "motivo", "de_local_id", "para_local_id",
+    "de_responsavel_id", "para_responsavel_id", "status", "data_solicitacao",
+    "data_aprovacao", "data_conclusao", "solicitado_por", "aprovado_por",
+    "executado_por", "observacoes",
+]
+
 
 @router.post("/", response_model=MovimentacaoResponse)
 def criar_movimentacao(
@@ -62,32 +85,69 @@ def criar_movimentacao(
             raise HTTPException(status_code=404, detail="Responsável de destino não encontrado")
     
     # Verificar regras de negócio para aprovação
-    valor_limite_aprovacao = 5000.0  # Configurável
-    requer_aprovacao = (
-        ativo.valor_aquisicao and 
-        ativo.valor_aquisicao > valor_limite_aprovacao and
-        movimentacao.tipo in ["transferencia", "alocacao"]
-    )
+    requer_aprovacao = _requer_aprovacao(ativo.valor_aquisicao, movimentacao.tipo)
     
     # Criar movimentação
     db_movimentacao = Movimentacao(
-        **movimentacao.dict(),
+        ativo_id=ativo.id,
+        tipo=movimentacao.tipo,
+        motivo=movimentacao.motivo,
+        observacoes=movimentacao.observacoes,
+        de_local_id=movimentacao.local_origem_id or ativo.local_id,
+        para_local_id=movimentacao.local_destino_id,
+        de_responsavel_id=movimentacao.responsavel_origem_id or ativo.responsavel_id,
+        para_responsavel_id=movimentacao.responsavel_destino_id,
         solicitado_por=current_user.id,
+        setor_id=ativo.setor_id,
+        centro_custo_id=ativo.centro_custo_id,
         status="pendente_aprovacao" if requer_aprovacao else "aprovada",
-        requer_aprovacao=requer_aprovacao
+        valor_limite_aprovacao=int(VALOR_LIMITE_APROVACAO),
     )
     
     db.add(db_movimentacao)
     db.commit()
     db.refresh(db_movimentacao)
     
+    if requer_aprovacao:
+        _notificar_aprovadores(db, [(db_movimentacao.id, ativo.setor_id, ativo.centro_custo_id)])
+    
     # Se não requer aprovação, executar movimentação automaticamente
     if not requer_aprovacao:
-        _executar_movimentacao(db_movimentacao, ativo, db)
+        _executar_movimentacao(db_movimentacao, ativo, db, current_user.id)
+        db.commit()
+        db.refresh(db_movimentacao)
     
     return db_movimentacao
 
 
+@router.post("/lote")
+@skip_sanitization
+def criar_movimentacoes_lote(
+    lote: MovimentacaoLote,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Criar movimentações em lote (realocações e alocações em massa)"""
+    itens = [item.dict(exclude={"data_prevista"}) for item in lote.movimentacoes]
+    
+    if len(itens) > MOVIMENTACOES_LOTE_LIMITE_SINCRONO:
+        job_id = job_runner.submit(
+            "movimentacoes.criar_lote",
+            {"itens": itens, "usuario_id": current_user.id},
+            created_by=current_user.id,
+        )
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": job_id,
+                "status": "pending",
+                "status_url": f"/api/v1/jobs/{job_id}",
+            },
+        )
+    
+    return _criar_movimentacoes_lote(db, itens, current_user.id)
+
+
 @router.get("/", response_model=MovimentacaoList)
 def listar_movimentacoes(
     skip: int = Query(0, ge=0),
@@ -106,29 +166,14 @@ def listar_movimentacoes(
 ):
     """Listar movimentações com filtros"""
     
-    query = db.query(Movimentacao)
-    
-    # Aplicar filtros
-    if ativo_id:
-        query = query.filter(Movimentacao.ativo_id == ativo_id)
-    if tipo:
-        query = query.filter(Movimentacao.tipo == tipo)
-    if status:
-        query = query.filter(Movimentacao.status == status)
-    if local_origem_id:
-        query = query.filter(Movimentacao.local_origem_id == local_origem_id)
-    if local_destino_id:
-        query = query.filter(Movimentacao.local_destino_id == local_destino_id)
-    if responsavel_origem_id:
-        query = query.filter(Movimentacao.responsavel_origem_id == responsavel_origem_id)
-    if responsavel_destino_id:
-        query = query.filter(Movimentacao.responsavel_destino_id == responsavel_destino_id)
-    
-    # Filtros de data
-    if data_inicio:
-        query = query.filter(Movimentacao.data_solicitacao >= data_inicio)
-    if data_fim:
-        query = query.filter(Movimentacao.data_solicitacao <= data_fim)
+    query = _aplicar_filtros_movimentacoes(
+        db.query(Movimentacao),
+        ativo_id=ativo_id, tipo=tipo, status=status,
+        local_origem_id=local_origem_id, local_destino_id=local_destino_id,
+        responsavel_origem_id=responsavel_origem_id,
+        responsavel_destino_id=responsavel_destino_id,
+        data_inicio=data_inicio, data_fim=data_fim,
+    )
     
     # Contar total
     total = query.count()
@@ -144,6 +189,41 @@ def listar_movimentacoes(
     }
 
 
+@router.get("/exportar")
+def exportar_movimentacoes(
+    formato: str = Query("csv", regex=EXPORT_FORMAT_REGEX),
+    compactar: bool = Query(False, description="Compactar a resposta com gzip"),
+    ativo_id: Optional[int] = Query(None),
+    tipo: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    local_origem_id: Optional[int] = Query(None),
+    local_destino_id: Optional[int] = Query(None),
+    responsavel_origem_id: Optional[int] = Query(None),
+    responsavel_destino_id: Optional[int] = Query(None),
+    data_inicio: Optional[str] = Query(None),
+    data_fim: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user)
+):
+    """Exportar movimentações em streaming (CSV, NDJSON ou XLSX)"""
+    
+    colunas = [getattr(Movimentacao, nome) for nome in COLUNAS_EXPORTACAO]
+    
+    def montar_consulta(db: Session):
+        query = _aplicar_filtros_movimentacoes(
+            db.query(*colunas),
+            ativo_id=ativo_id, tipo=tipo, status=status,
+            local_origem_id=local_origem_id, local_destino_id=local_destino_id,
+            responsavel_origem_id=responsavel_origem_id,
+            responsavel_destino_id=responsavel_destino_id,
+            data_inicio=data_inicio, data_fim=data_fim,
+        )
+        return query.order_by(Movimentacao.id).statement
+    
+    encoder = get_encoder(formato, COLUNAS_EXPORTACAO, sheet_name="movimentacoes")
+    conteudo = iter_export(encoder, iter_query_batches(montar_consulta), compress=compactar)
+    return export_response(conteudo, formato, "movimentacoes", compress=compactar)
+
+
 @router.get("/{movimentacao_id}", response_model=MovimentacaoResponse)
 def obter_movimentacao(
     movimentacao_id: int,
@@ -176,18 +256,21 @@ def aprovar_movimentacao(
             detail=f"Movimentação não pode ser aprovada. Status atual: {movimentacao.status}"
         )
     
-    # Verificar permissões (gestor de setor ou admin)
-    # TODO: Implementar verificação de permissões baseada em RBAC
+    # Admin ou gestor do setor/centro de custo da movimentação (mesma regra do aprovar-lote)
+    if current_user.role != "admin":
+        setores, centros = _escopo_aprovador(db, current_user.id)
+        if movimentacao.setor_id not in setores and movimentacao.centro_custo_id not in centros:
+            raise HTTPException(status_code=403, detail="Movimentação fora da fila de aprovação do usuário")
     
-    # Aprovar movimentação
-    movimentacao.status = "aprovada"
-    movimentacao.aprovado_por = current_user.id
-    movimentacao.data_aprovacao = func.now()
-    movimentacao.observacoes_aprovacao = observacoes_aprovacao
+    if observacoes_aprovacao:
+        movimentacao.observacoes = _anexar_observacao(movimentacao.observacoes, "Aprovação", observacoes_aprovacao)
     
-    # Executar movimentação
+    # Aprovar e executar movimentação
     ativo = db.query(Ativo).filter(Ativo.id == movimentacao.ativo_id).first()
-    _executar_movimentacao(movimentacao, ativo, db)
+    _executar_movimentacao(
+        movimentacao, ativo, db, current_user.id,
+        aprovado_por=current_user.id, data_aprovacao=datetime.now(),
+    )
     
     db.commit()
     
@@ -217,7 +300,7 @@ def rejeitar_movimentacao(
     movimentacao.status = "rejeitada"
     movimentacao.aprovado_por = current_user.id
     movimentacao.data_aprovacao = func.now()
-    movimentacao.observacoes_aprovacao = motivo_rejeicao
+    movimentacao.observacoes = _anexar_observacao(movimentacao.observacoes, "Rejeição", motivo_rejeicao)
     
     db.commit()
     
@@ -247,14 +330,14 @@ def gerar_termo_responsabilidade(
     responsavel_origem = None
     responsavel_destino = None
     
-    if movimentacao.responsavel_origem_id:
+    if movimentacao.de_responsavel_id:
         responsavel_origem = db.query(Responsavel).filter(
-            Responsavel.id == movimentacao.responsavel_origem_id
+            Responsavel.id == movimentacao.de_responsavel_id
         ).first()
     
-    if movimentacao.responsavel_destino_id:
+    if movimentacao.para_responsavel_id:
         responsavel_destino = db.query(Responsavel).filter(
-            Responsavel.id == movimentacao.responsavel_destino_id
+            Responsavel.id == movimentacao.para_responsavel_id
         ).first()
     
     # Gerar termo de responsabilidade
@@ -267,7 +350,7 @@ def gerar_termo_responsabilidade(
             "valor": float(ativo.valor_aquisicao) if ativo.valor_aquisicao else None
         },
         "tipo_movimentacao": movimentacao.tipo,
-        "data_movimentacao": movimentacao.data_execucao.isoformat() if movimentacao.data_execucao else None,
+        "data_movimentacao": movimentacao.data_conclusao.isoformat() if movimentacao.data_conclusao else None,
         "responsavel_origem": {
             "nome": responsavel_origem.nome if responsavel_origem else None,
             "email": responsavel_origem.email if responsavel_origem else None,
@@ -293,96 +376,244 @@ def gerar_termo_responsabilidade(
 @router.get("/{movimentacao_id}/historico")
 def obter_historico_ativo(
     movimentacao_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Obter histórico completo de movimentações do ativo"""
+    """Obter histórico de movimentações do ativo (paginado)"""
     
-    movimentacao = db.query(Movimentacao).filter(Movimentacao.id == movimentacao_id).first()
-    if not movimentacao:
+    ativo_id = db.query(Movimentacao.ativo_id).filter(Movimentacao.id == movimentacao_id).scalar()
+    if ativo_id is None:
         raise HTTPException(status_code=404, detail="Movimentação não encontrada")
     
-    # Buscar todas as movimentações do ativo
-    historico = db.query(Movimentacao).filter(
-        Movimentacao.ativo_id == movimentacao.ativo_id
-    ).order_by(Movimentacao.data_solicitacao.desc()).all()
+    total = db.query(func.count(Movimentacao.id)).filter(Movimentacao.ativo_id == ativo_id).scalar()
+    linhas = db.execute(
+        _consulta_cadeia_custodia(ativo_id)
+        .order_by(Movimentacao.data_solicitacao.desc(), Movimentacao.id.desc())
+        .offset(skip).limit(limit)
+    )
     
     return {
-        "ativo_id": movimentacao.ativo_id,
-        "total_movimentacoes": len(historico),
-        "movimentacoes": historico
+        "ativo_id": ativo_id,
+        "total_movimentacoes": total,
+        "skip": skip,
+        "limit": limit,
+        "movimentacoes": [dict(linha._mapping) for linha in linhas]
     }
 
 
-def _executar_movimentacao(movimentacao: Movimentacao, ativo: Ativo, db: Session):
-    """Executar movimentação aprovada"""
-    
-    # Atualizar localização e responsável do ativo
-    if movimentacao.local_destino_id:
-        ativo.local_id = movimentacao.local_destino_id
-    
-    if movimentacao.responsavel_destino_id:
-        ativo.responsavel_id = movimentacao.responsavel_destino_id
-    
-    # Atualizar status do ativo baseado no tipo de movimentação
-    if movimentacao.tipo == "alocacao":
-        ativo.status = "alocado"
-    elif movimentacao.tipo == "devolucao":
-        ativo.status = "ativo"
-    elif movimentacao.tipo == "manutencao":
-        ativo.status = "em_manutencao"
-    elif movimentacao.tipo == "baixa":
-        ativo.status = "baixado"
-        ativo.ativo = False
-    
-    # Atualizar movimentação
-    movimentacao.status = "executada"
-    movimentacao.data_execucao = func.now()
+def _executar_movimentacao(
+    movimentacao: Movimentacao,
+    ativo: Ativo,
+    db: Session,
+    usuario_id: int,
+    **valores,
+):
+    """Executar uma movimentação (mesmo caminho das execuções em lote)"""
+    _executar_movimentacoes(db, [{
+        "movimentacao_id": movimentacao.id,
+        "ativo_id": ativo.id,
+        "tipo": movimentacao.tipo,
+        "para_local_id": movimentacao.para_local_id,
+        "para_responsavel_id": movimentacao.para_responsavel_id,
+        "local_id": ativo.local_id,
+        "responsavel_id": ativo.responsavel_id,
+        "criado_em": ativo.criado_em,
+    }], usuario_id, datetime.now(), **valores)
+
+
+def _anexar_observacao(observacoes: Optional[str], rotulo: str, texto: str) -> str:
+    """Acrescentar às observações da movimentação a nota de aprovação/rejeição"""
+    nota = f"{rotulo}: {texto}"
+    return f"{observacoes}\n{nota}" if observacoes else nota
+
+
+def _registrar_intervalos_custodia(db: Session, transicoes: List[Dict[str, Any]], agora: datetime):
+    """
+    Fechar os intervalos de custódia abertos dos ativos e abrir os das novas
+    custódias (no máximo IN_CHUNK_SIZE transições, um ativo por transição)
+    """
+    ativos_ids = [transicao["ativo_id"] for transicao in transicoes]
+    abertos = set(db.scalars(
+        select(CustodiaIntervalo.ativo_id)
+        .where(CustodiaIntervalo.ativo_id.in_(ativos_ids), CustodiaIntervalo.fim.is_(None))
+    ))
+    if abertos:
+        db.execute(
+            update(CustodiaIntervalo)
+            .where(CustodiaIntervalo.ativo_id.in_(abertos), CustodiaIntervalo.fim.is_(None))
+            .values(fim=agora)
+            .execution_options(synchronize_session=False)
+        )
     
-    # Atualizar timestamp de última movimentação do ativo
-    ativo.ultima_movimentacao = func.now()
+    intervalos = []
+    for transicao in transicoes:
+        if transicao["ativo_id"] not in abertos:
+            # Primeira movimentação de ativo cadastrado após a criação da tabela:
+            # registrar a custódia inicial, desde o cadastro
+            intervalos.append({
+                "ativo_id": transicao["ativo_id"], "local_id": transicao["local_anterior"],
+                "responsavel_id": transicao["responsavel_anterior"], "movimentacao_id": None,
+                "inicio": transicao["criado_em"] or agora, "fim": agora,
+            })
+        if not transicao["baixado"]:
+            intervalos.append({
+                "ativo_id": transicao["ativo_id"], "local_id": transicao["local_id"],
+                "responsavel_id": transicao["responsavel_id"], "movimentacao_id": transicao["movimentacao_id"],
+                "inicio": agora, "fim": None,
+            })
+    if intervalos:
+        # render_nulls: linhas com NULLs diferentes no mesmo INSERT em lote
+        db.execute(insert(CustodiaIntervalo).execution_options(render_nulls=True), intervalos)
 
 
 def _gerar_hash_termo(movimentacao: Movimentacao, ativo: Ativo) -> str:
     """Gerar hash de integridade para o termo de responsabilidade"""
     import hashlib
     
-    dados = f"{movimentacao.id}{ativo.codigo}{movimentacao.tipo}{movimentacao.data_execucao}"
+    dados = f"{movimentacao.id}{ativo.codigo}{movimentacao.tipo}{movimentacao.data_conclusao}"
     return hashlib.sha256(dados.encode()).hexdigest()
 
 
 @router.get("/pendentes/aprovacao")
 def listar_movimentacoes_pendentes(
+    cursor: Optional[int] = Query(None, description="ID da última movimentação da página anterior"),
+    limit: int = Query(100, ge=1, le=500),
+    minha_fila: bool = Query(False, description="Apenas movimentações roteadas ao usuário"),
+    setor_id: Optional[int] = Query(None),
+    centro_custo_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Listar movimentações pendentes de aprovação"""
+    """Fila de movimentações pendentes de aprovação (mais antigas primeiro, paginação por cursor)"""
+    
+    pendentes = select(Movimentacao.id).where(Movimentacao.status == "pendente_aprovacao")
+    if minha_fila:
+        setores, centros = _escopo_aprovador(db, current_user.id)
+        pendentes = pendentes.where(_filtro_fila_aprovador(setores, centros))
+    if setor_id:
+        pendentes = pendentes.where(Movimentacao.setor_id == setor_id)
+    if centro_custo_id:
+        pendentes = pendentes.where(Movimentacao.centro_custo_id == centro_custo_id)
     
-    movimentacoes = db.query(Movimentacao).filter(
-        Movimentacao.status == "pendente_aprovacao"
-    ).order_by(Movimentacao.data_solicitacao.asc()).all()
+    total = db.scalar(select(func.count()).select_from(pendentes.subquery()))
+    if cursor:
+        pendentes = pendentes.where(Movimentacao.id > cursor)
+    pagina = pendentes.order_by(Movimentacao.id).limit(limit).subquery()
+    
+    linhas = db.execute(
+        select(
+            Movimentacao.id, Movimentacao.ativo_id, Ativo.codigo.label("ativo_codigo"),
+            Ativo.valor_aquisicao, Movimentacao.tipo, Movimentacao.motivo,
+            Movimentacao.de_local_id, Movimentacao.para_local_id,
+            Movimentacao.de_responsavel_id, Movimentacao.para_responsavel_id,
+            Movimentacao.setor_id, Movimentacao.centro_custo_id,
+            Movimentacao.solicitado_por, Movimentacao.data_solicitacao,
+        )
+        .join(pagina, pagina.c.id == Movimentacao.id)
+        .join(Ativo, Ativo.id == Movimentacao.ativo_id)
+        .order_by(Movimentacao.id)
+    ).all()
     
     return {
-        "total": len(movimentacoes),
-        "movimentacoes": movimentacoes
+        "total": total,
+        "limit": limit,
+        "proximo_cursor": linhas[-1].id if len(linhas) == limit else None,
+        "movimentacoes": [
+            {**linha._mapping, "valor_aquisicao": float(linha.valor_aquisicao) if linha.valor_aquisicao else None}
+            for linha in linhas
+        ]
+    }
+
+
+@router.put("/aprovar-lote")
+def aprovar_movimentacoes_lote(
+    lote: AprovacaoLote,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Aprovar e executar um lote de movimentações pendentes em uma única transação"""
+    
+    ids = list(dict.fromkeys(lote.movimentacao_ids))
+    movimentacoes = {}
+    for inicio in range(0, len(ids), IN_CHUNK_SIZE):
+        for linha in db.execute(
+            select(
+                Movimentacao.id.label("movimentacao_id"), Movimentacao.ativo_id, Movimentacao.tipo,
+                Movimentacao.status, Movimentacao.setor_id, Movimentacao.centro_custo_id,
+                Movimentacao.para_local_id, Movimentacao.para_responsavel_id,
+                Ativo.status.label("ativo_status"), Ativo.local_id, Ativo.responsavel_id, Ativo.criado_em,
+            )
+            .join(Ativo, Ativo.id == Movimentacao.ativo_id)
+            .where(Movimentacao.id.in_(ids[inicio:inicio + IN_CHUNK_SIZE]))
+            .order_by(Movimentacao.id)
+            .with_for_update(of=Movimentacao)
+        ):
+            movimentacoes[linha.movimentacao_id] = linha
+    
+    if current_user.role != "admin":
+        setores, centros = _escopo_aprovador(db, current_user.id)
+    
+    detalhes, execucoes, ativos = [], [], set()
+    for movimentacao_id in ids:
+        linha = movimentacoes.get(movimentacao_id)
+        detalhe = {"movimentacao_id": movimentacao_id}
+        detalhes.append(detalhe)
+        if linha is None:
+            erro = "Movimentação não encontrada"
+        elif linha.status != "pendente_aprovacao":
+            erro = f"Movimentação não pode ser aprovada. Status atual: {linha.status}"
+        elif current_user.role != "admin" and linha.setor_id not in setores and linha.centro_custo_id not in centros:
+            erro = "Movimentação fora da fila de aprovação do usuário"
+        elif linha.ativo_status in ["baixado", "em_manutencao"]:
+            erro = f"Ativo não pode ser movimentado. Status atual: {linha.ativo_status}"
+        elif linha.ativo_id in ativos:
+            erro = "Outra movimentação do mesmo ativo no lote"
+        else:
+            erro = None
+        if erro:
+            detalhe.update(status="erro", erro=erro)
+            continue
+        ativos.add(linha.ativo_id)
+        detalhe["status"] = "executada"
+        execucoes.append(dict(linha._mapping))
+    
+    agora = datetime.now()
+    for inicio in range(0, len(execucoes), IN_CHUNK_SIZE):
+        _executar_movimentacoes(
+            db, execucoes[inicio:inicio + IN_CHUNK_SIZE], current_user.id, agora,
+            aprovado_por=current_user.id, data_aprovacao=agora,
+        )
+    db.commit()
+    
+    return {
+        "aprovadas": len(execucoes),
+        "erros": len(detalhes) - len(execucoes),
+        "detalhes": detalhes
     }
 
 
 @router.get("/relatorios/cadeia-custodia/{ativo_id}")
 def relatorio_cadeia_custodia(
     ativo_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Relatório de cadeia de custódia de um ativo"""
+    """Relatório de cadeia de custódia de um ativo (paginado)"""
     
     ativo = db.query(Ativo).filter(Ativo.id == ativo_id).first()
     if not ativo:
         raise HTTPException(status_code=404, detail="Ativo não encontrado")
     
-    movimentacoes = db.query(Movimentacao).filter(
-        Movimentacao.ativo_id == ativo_id
-    ).order_by(Movimentacao.data_solicitacao.asc()).all()
+    total = db.query(func.count(Movimentacao.id)).filter(Movimentacao.ativo_id == ativo_id).scalar()
+    linhas = db.execute(
+        _consulta_cadeia_custodia(ativo_id)
+        .order_by(Movimentacao.data_solicitacao.asc(), Movimentacao.id.asc())
+        .offset(skip).limit(limit)
+    )
     
     return {
         "ativo": {
@@ -391,18 +622,474 @@ def relatorio_cadeia_custodia(
             "patrimonio": ativo.patrimonio,
             "descricao": ativo.descricao
         },
+        "total": total,
+        "skip": skip,
+        "limit": limit,
         "cadeia_custodia": [
             {
-                "data": mov.data_execucao or mov.data_solicitacao,
-                "tipo": mov.tipo,
-                "status": mov.status,
-                "local_origem": mov.local_origem.nome if mov.local_origem else None,
-                "local_destino": mov.local_destino.nome if mov.local_destino else None,
-                "responsavel_origem": mov.responsavel_origem.nome if mov.responsavel_origem else None,
-                "responsavel_destino": mov.responsavel_destino.nome if mov.responsavel_destino else None,
-                "solicitado_por": mov.solicitante.name if mov.solicitante else None,
-                "observacoes": mov.observacoes
+                "data": linha.data_conclusao or linha.data_solicitacao,
+                "tipo": linha.tipo,
+                "status": linha.status,
+                "local_origem": linha.local_origem,
+                "local_destino": linha.local_destino,
+                "responsavel_origem": linha.responsavel_origem,
+                "responsavel_destino": linha.responsavel_destino,
+                "solicitado_por": linha.solicitado_por,
+                "observacoes": linha.observacoes
             }
-            for mov in movimentacoes
+            for linha in linhas
         ]
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/custodia/em")
+def consultar_custodia_em(
+    data: datetime = Query(..., description="Instante consultado"),
+    ativo_id: Optional[int] = Query(None),
+    local_id: Optional[int] = Query(None),
+    responsavel_id: Optional[int] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Custódia vigente em uma data: onde/com quem estavam os ativos"""
+    return _paginar_custodia(db, data, data, ativo_id, local_id, responsavel_id, skip, limit)
+
+
+@router.get("/custodia/periodo")
+def consultar_custodia_periodo(
+    inicio: datetime = Query(...),
+    fim: datetime = Query(...),
+    ativo_id: Optional[int] = Query(None),
+    local_id: Optional[int] = Query(None),
+    responsavel_id: Optional[int] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Intervalos de custódia que se sobrepõem ao período [inicio, fim]"""
+    if fim < inicio:
+        raise HTTPException(status_code=400, detail="Data final anterior à data inicial")
+    return _paginar_custodia(db, inicio, fim, ativo_id, local_id, responsavel_id, skip, limit)
+
+
+def _aplicar_filtros_movimentacoes(
+    query_obj,
+    ativo_id: Optional[int] = None,
+    tipo: Optional[str] = None,
+    status: Optional[str] = None,
+    local_origem_id: Optional[int] = None,
+    local_destino_id: Optional[int] = None,
+    responsavel_origem_id: Optional[int] = None,
+    responsavel_destino_id: Optional[int] = None,
+    data_inicio: Optional[str] = None,
+    data_fim: Optional[str] = None,
+):
+    """Aplicar filtros comuns à listagem e à exportação de movimentações"""
+    if ativo_id:
+        query_obj = query_obj.filter(Movimentacao.ativo_id == ativo_id)
+    if tipo:
+        query_obj = query_obj.filter(Movimentacao.tipo == tipo)
+    if status:
+        query_obj = query_obj.filter(Movimentacao.status == status)
+    if local_origem_id:
+        query_obj = query_obj.filter(Movimentacao.de_local_id == local_origem_id)
+    if local_destino_id:
+        query_obj = query_obj.filter(Movimentacao.para_local_id == local_destino_id)
+    if responsavel_origem_id:
+        query_obj = query_obj.filter(Movimentacao.de_responsavel_id == responsavel_origem_id)
+    if responsavel_destino_id:
+        query_obj = query_obj.filter(Movimentacao.para_responsavel_id == responsavel_destino_id)
+    
+    # Filtros de data
+    if data_inicio:
+        query_obj = query_obj.filter(Movimentacao.data_solicitacao >= data_inicio)
+    if data_fim:
+        query_obj = query_obj.filter(Movimentacao.data_solicitacao <= data_fim)
+    
+    return query_obj
+
+
+def _consulta_cadeia_custodia(ativo_id: int):
+    """Movimentações do ativo com nomes de locais, responsáveis e solicitante já resolvidos"""
+    local_origem, local_destino = aliased(Local), aliased(Local)
+    responsavel_origem, responsavel_destino = aliased(Responsavel), aliased(Responsavel)
+    return (
+        select(
+            Movimentacao.id, Movimentacao.tipo, Movimentacao.motivo, Movimentacao.status,
+            Movimentacao.data_solicitacao, Movimentacao.data_aprovacao, Movimentacao.data_conclusao,
+            Movimentacao.de_local_id, local_origem.codigo.label("local_origem"),
+            Movimentacao.para_local_id, local_destino.codigo.label("local_destino"),
+            Movimentacao.de_responsavel_id, responsavel_origem.nome.label("responsavel_origem"),
+            Movimentacao.para_responsavel_id, responsavel_destino.nome.label("responsavel_destino"),
+            User.full_name.label("solicitado_por"), Movimentacao.observacoes,
+        )
+        .outerjoin(local_origem, local_origem.id == Movimentacao.de_local_id)
+        .outerjoin(local_destino, local_destino.id == Movimentacao.para_local_id)
+        .outerjoin(responsavel_origem, responsavel_origem.id == Movimentacao.de_responsavel_id)
+        .outerjoin(responsavel_destino, responsavel_destino.id == Movimentacao.para_responsavel_id)
+        .outerjoin(User, User.id == Movimentacao.solicitado_por)
+        .where(Movimentacao.ativo_id == ativo_id)
+    )
+
+
+def _paginar_custodia(
+    db: Session,
+    inicio: datetime,
+    fim: datetime,
+    ativo_id: Optional[int],
+    local_id: Optional[int],
+    responsavel_id: Optional[int],
+    skip: int,
+    limit: int,
+) -> Dict[str, Any]:
+    """
+    Intervalos de custódia que se sobrepõem a [inicio, fim] (um instante se
+    inicio == fim). Ativos ainda sem intervalos (nunca movimentados desde o
+    cadastro) entram com a custódia atual, vigente desde o cadastro.
+    """
+    intervalos = (
+        select(
+            CustodiaIntervalo.ativo_id, CustodiaIntervalo.local_id, CustodiaIntervalo.responsavel_id,
+            CustodiaIntervalo.movimentacao_id, CustodiaIntervalo.inicio, CustodiaIntervalo.fim,
+        )
+        .where(
+            CustodiaIntervalo.inicio <= fim,
+            or_(CustodiaIntervalo.fim.is_(None), CustodiaIntervalo.fim > inicio),
+        )
+    )
+    sem_intervalos = (
+        select(
+            Ativo.id, Ativo.local_id, Ativo.responsavel_id,
+            null(), Ativo.criado_em, null(),
+        )
+        .where(
+            Ativo.criado_em <= fim,
+            Ativo.status != "baixado",
+            ~select(CustodiaIntervalo.id).where(CustodiaIntervalo.ativo_id == Ativo.id).exists(),
+        )
+    )
+    if ativo_id:
+        intervalos = intervalos.where(CustodiaIntervalo.ativo_id == ativo_id)
+        sem_intervalos = sem_intervalos.where(Ativo.id == ativo_id)
+    if local_id:
+        intervalos = intervalos.where(CustodiaIntervalo.local_id == local_id)
+        sem_intervalos = sem_intervalos.where(Ativo.local_id == local_id)
+    if responsavel_id:
+        intervalos = intervalos.where(CustodiaIntervalo.responsavel_id == responsavel_id)
+        sem_intervalos = sem_intervalos.where(Ativo.responsavel_id == responsavel_id)
+    
+    custodia = union_all(intervalos, sem_intervalos).subquery()
+    total = db.scalar(select(func.count()).select_from(custodia))
+    linhas = db.execute(
+        select(
+            custodia.c.ativo_id, Ativo.codigo.label("ativo_codigo"),
+            custodia.c.local_id, Local.codigo.label("local_codigo"),
+            custodia.c.responsavel_id, Responsavel.nome.label("responsavel_nome"),
+            custodia.c.movimentacao_id, custodia.c.inicio, custodia.c.fim,
+        )
+        .join(Ativo, Ativo.id == custodia.c.ativo_id)
+        .outerjoin(Local, Local.id == custodia.c.local_id)
+        .outerjoin(Responsavel, Responsavel.id == custodia.c.responsavel_id)
+        .order_by(custodia.c.inicio, custodia.c.ativo_id)
+        .offset(skip).limit(limit)
+    )
+    
+    return {
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "intervalos": [dict(linha._mapping) for linha in linhas]
+    }
+
+
+def _requer_aprovacao(valor_aquisicao, tipo: str) -> bool:
+    """Regra de aprovação: transferência/alocação de ativo acima do valor limite"""
+    return bool(
+        valor_aquisicao
+        and valor_aquisicao > VALOR_LIMITE_APROVACAO
+        and tipo in ("transferencia", "alocacao")
+    )
+
+
+# Status do ativo após a execução, por tipo de movimentação
+_STATUS_ATIVO_POR_TIPO = {
+    "alocacao": "alocado",
+    "devolucao": "ativo",
+    "manutencao": "em_manutencao",
+    "baixa": "baixado",
+}
+
+
+def _criar_movimentacoes_lote(
+    db: Session,
+    itens: List[Dict[str, Any]],
+    usuario_id: int,
+    ctx: Optional[JobContext] = None,
+) -> Dict[str, Any]:
+    """Validar, inserir e executar movimentações em lote (um commit por bloco)"""
+    resultados = {
+        "executadas": 0,
+        "pendentes": 0,
+        "erros": 0,
+        "detalhes": []
+    }
+    # Ativos já movimentados no próprio lote
+    vistos = set()
+    
+    for inicio in range(0, len(itens), IN_CHUNK_SIZE):
+        _processar_bloco_movimentacoes(db, itens[inicio:inicio + IN_CHUNK_SIZE], inicio, vistos, usuario_id, resultados)
+        
+        if ctx is not None:
+            # Blocos já gravados são mantidos se o job for cancelado
+            ctx.check_cancelled()
+            processados = min(inicio + IN_CHUNK_SIZE, len(itens))
+            ctx.set_progress(min(processados / len(itens) * 100, 99.0), f"{processados} movimentações processadas")
+    
+    return resultados
+
+
+@job_runner.register("movimentacoes.criar_lote")
+def _job_criar_movimentacoes_lote(ctx: JobContext, itens: List[Dict[str, Any]], usuario_id: int) -> Dict[str, Any]:
+    """Job: criar um lote grande de movimentações"""
+    db = SessionLocal()
+    try:
+        return _criar_movimentacoes_lote(db, itens, usuario_id, ctx)
+    finally:
+        db.close()
+
+
+def _processar_bloco_movimentacoes(
+    db: Session,
+    bloco: List[Dict[str, Any]],
+    deslocamento: int,
+    vistos: set,
+    usuario_id: int,
+    resultados: Dict[str, Any],
+):
+    """Um bloco do lote: uma consulta IN por entidade, um INSERT e um UPDATE de ativos"""
+    ativos = {
+        ativo.id: ativo
+        for ativo in db.query(
+            Ativo.id, Ativo.status, Ativo.valor_aquisicao, Ativo.local_id,
+            Ativo.responsavel_id, Ativo.setor_id, Ativo.centro_custo_id, Ativo.criado_em,
+        ).filter(Ativo.id.in_({item["ativo_id"] for item in bloco}))
+    }
+    locais = _ids_existentes(db, Local, {
+        item[campo] for item in bloco for campo in ("local_origem_id", "local_destino_id") if item[campo]
+    })
+    responsaveis = _ids_existentes(db, Responsavel, {
+        item[campo] for item in bloco for campo in ("responsavel_origem_id", "responsavel_destino_id") if item[campo]
+    })
+    
+    agora = datetime.now()
+    detalhes, linhas = [], []
+    for indice, item in enumerate(bloco, start=deslocamento):
+        ativo = ativos.get(item["ativo_id"])
+        erro = _validar_item_lote(item, ativo, locais, responsaveis, vistos)
+        detalhe = {"indice": indice, "ativo_id": item["ativo_id"]}
+        detalhes.append(detalhe)
+        if erro:
+            detalhe.update(status="erro", erro=erro)
+            continue
+        vistos.add(ativo.id)
+        
+        executar = not _requer_aprovacao(ativo.valor_aquisicao, item["tipo"])
+        detalhe["status"] = "executada" if executar else "pendente_aprovacao"
+        linhas.append((detalhe, ativo, {
+            "ativo_id": ativo.id,
+            "tipo": item["tipo"],
+            "motivo": item["motivo"],
+            "observacoes": item["observacoes"],
+            "de_local_id": item["local_origem_id"] or ativo.local_id,
+            "para_local_id": item["local_destino_id"],
+            "de_responsavel_id": item["responsavel_origem_id"] or ativo.responsavel_id,
+            "para_responsavel_id": item["responsavel_destino_id"],
+            "setor_id": ativo.setor_id,
+            "centro_custo_id": ativo.centro_custo_id,
+            "status": "aprovada" if executar else "pendente_aprovacao",
+            "solicitado_por": usuario_id,
+            "valor_limite_aprovacao": int(VALOR_LIMITE_APROVACAO),
+        }))
+    
+    if linhas:
+        # Cada ativo aparece uma única vez no lote: associar os IDs pelo ativo
+        # (sem exigir a ordem do RETURNING, que forçaria um INSERT por linha)
+        ids = dict(db.execute(
+            insert(Movimentacao)
+            .returning(Movimentacao.ativo_id, Movimentacao.id)
+            .execution_options(render_nulls=True),
+            [valores for _, _, valores in linhas],
+        ).all())
+        
+        execucoes, pendentes = [], []
+        for detalhe, ativo, valores in linhas:
+            movimentacao_id = detalhe["movimentacao_id"] = ids[ativo.id]
+            if detalhe["status"] == "executada":
+                execucoes.append({
+                    "movimentacao_id": movimentacao_id,
+                    "ativo_id": ativo.id,
+                    "tipo": valores["tipo"],
+                    "para_local_id": valores["para_local_id"],
+                    "para_responsavel_id": valores["para_responsavel_id"],
+                    "local_id": ativo.local_id,
+                    "responsavel_id": ativo.responsavel_id,
+                    "criado_em": ativo.criado_em,
+                })
+            else:
+                pendentes.append((movimentacao_id, ativo.setor_id, ativo.centro_custo_id))
+        
+        _executar_movimentacoes(db, execucoes, usuario_id, agora)
+    
+    db.commit()
+    if linhas:
+        _notificar_aprovadores(db, pendentes)
+    
+    for detalhe in detalhes:
+        if detalhe["status"] == "executada":
+            resultados["executadas"] += 1
+        elif detalhe["status"] == "pendente_aprovacao":
+            resultados["pendentes"] += 1
+        else:
+            resultados["erros"] += 1
+    resultados["detalhes"].extend(detalhes)
+
+
+def _executar_movimentacoes(
+    db: Session,
+    execucoes: List[Dict[str, Any]],
+    usuario_id: int,
+    agora: datetime,
+    **valores,
+):
+    """
+    Marcar as movimentações como executadas e aplicá-las aos ativos (no máximo
+    IN_CHUNK_SIZE, um ativo por movimentação) com um UPDATE em cada tabela;
+    ``valores`` são colunas extras da movimentação (ex.: dados da aprovação)
+    """
+    if not execucoes:
+        return
+    db.execute(
+        update(Movimentacao)
+        .where(Movimentacao.id.in_([execucao["movimentacao_id"] for execucao in execucoes]))
+        .values(status="executada", executado_por=usuario_id, data_conclusao=agora, **valores)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(Ativo)
+        .where(
+            Ativo.id == Movimentacao.ativo_id,
+            Movimentacao.id.in_([execucao["movimentacao_id"] for execucao in execucoes]),
+        )
+        .values(
+            local_id=func.coalesce(Movimentacao.para_local_id, Ativo.local_id),
+            responsavel_id=func.coalesce(Movimentacao.para_responsavel_id, Ativo.responsavel_id),
+            status=case(
+                *[(Movimentacao.tipo == tipo, status) for tipo, status in _STATUS_ATIVO_POR_TIPO.items()],
+                else_=Ativo.status,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    _registrar_intervalos_custodia(db, [
+        {
+            "ativo_id": execucao["ativo_id"],
+            "movimentacao_id": execucao["movimentacao_id"],
+            "criado_em": execucao["criado_em"],
+            "local_anterior": execucao["local_id"],
+            "responsavel_anterior": execucao["responsavel_id"],
+            "local_id": execucao["para_local_id"] or execucao["local_id"],
+            "responsavel_id": execucao["para_responsavel_id"] or execucao["responsavel_id"],
+            "baixado": execucao["tipo"] == "baixa",
+        }
+        for execucao in execucoes
+    ], agora)
+
+
+def _ids_existentes(db: Session, modelo, ids: set) -> set:
+    """IDs existentes de uma entidade (consultas IN em blocos)"""
+    ids = list(ids)
+    existentes = set()
+    for inicio in range(0, len(ids), IN_CHUNK_SIZE):
+        existentes.update(db.scalars(select(modelo.id).where(modelo.id.in_(ids[inicio:inicio + IN_CHUNK_SIZE]))))
+    return existentes
+
+
+def _validar_item_lote(
+    item: Dict[str, Any],
+    ativo,
+    locais: set,
+    responsaveis: set,
+    vistos: set,
+) -> Optional[str]:
+    """Mensagem de erro de um item do lote (None se válido)"""
+    if ativo is None:
+        return "Ativo não encontrado"
+    if ativo.id in vistos:
+        return "Ativo repetido no lote"
+    if ativo.status in ["baixado", "em_manutencao"]:
+        return f"Ativo não pode ser movimentado. Status atual: {ativo.status}"
+    if item["local_origem_id"] and item["local_origem_id"] not in locais:
+        return "Local de origem não encontrado"
+    if item["local_destino_id"] and item["local_destino_id"] not in locais:
+        return "Local de destino não encontrado"
+    if item["responsavel_origem_id"] and item["responsavel_origem_id"] not in responsaveis:
+        return "Responsável de origem não encontrado"
+    if item["responsavel_destino_id"] and item["responsavel_destino_id"] not in responsaveis:
+        return "Responsável de destino não encontrado"
+    return None
+
+
+def _escopo_aprovador(db: Session, usuario_id: int) -> Tuple[set, set]:
+    """Setores geridos pelo usuário e os centros de custo desses setores"""
+    setores, centros = set(), set()
+    for setor_id, centro_custo_id in db.execute(
+        select(Setor.id, Setor.centro_custo_id).where(Setor.gestor_id == usuario_id)
+    ):
+        setores.add(setor_id)
+        if centro_custo_id:
+            centros.add(centro_custo_id)
+    return setores, centros
+
+
+def _filtro_fila_aprovador(setores: set, centros: set):
+    """Movimentações roteadas a um aprovador (usa os índices parciais por setor/centro de custo)"""
+    if not setores and not centros:
+        return false()
+    return or_(Movimentacao.setor_id.in_(setores), Movimentacao.centro_custo_id.in_(centros))
+
+
+def _notificar_aprovadores(db: Session, pendentes: List[Tuple[int, Optional[int], Optional[int]]]):
+    """Avisar via WebSocket os gestores de setor/centro de custo sobre novas pendências"""
+    if not pendentes or not connection_manager.user_connections:
+        return
+    setores = {setor_id for _, setor_id, _ in pendentes if setor_id}
+    centros = {centro_custo_id for _, _, centro_custo_id in pendentes if centro_custo_id}
+    if not setores and not centros:
+        return
+    
+    gestores_setor, gestores_centro = {}, {}
+    for setor_id, centro_custo_id, gestor_id in db.execute(
+        select(Setor.id, Setor.centro_custo_id, Setor.gestor_id)
+        .where(Setor.gestor_id.isnot(None), or_(Setor.id.in_(setores), Setor.centro_custo_id.in_(centros)))
+    ):
+        gestores_setor.setdefault(setor_id, set()).add(gestor_id)
+        if centro_custo_id:
+            gestores_centro.setdefault(centro_custo_id, set()).add(gestor_id)
+    
+    por_aprovador = {}
+    for movimentacao_id, setor_id, centro_custo_id in pendentes:
+        for gestor_id in gestores_setor.get(setor_id, set()) | gestores_centro.get(centro_custo_id, set()):
+            por_aprovador.setdefault(str(gestor_id), []).append(movimentacao_id)
+    
+    timestamp = datetime.utcnow().isoformat()
+    connection_manager.send_to_users_threadsafe({
+        gestor_id: {
+            "type": "aprovacao_pendente",
+            "data": {"movimentacoes": ids, "total": len(ids)},
+            "timestamp": timestamp,
+        }
+        for gestor_id, ids in por_aprovador.items()
+    })
@@ -15,6 +15,7 @@ from app.core.exceptions import NotFoundException, ValidationException
 from sqlalchemy import select
 from app.core.security import require_roles_or_api_key
 from app.core.security import require_roles, get_current_user_payload
+from app.core.batch_loader import BatchLoader, get_batch_loader
 
 logger = structlog.get_logger()
 
@@ -165,21 +166,7 @@ async def create_ticket(
         await db.refresh(ticket)
         
         if ticket.asset_id is not None:
-            from app.models.movement import AssetAudit
-            from app.core.security import compute_audit_record_hash, compute_audit_signature
-            
-            prev_hash = None
-            try:
-                from sqlalchemy import select
-                result = await db.execute(
-                    select(AssetAudit.record_hash)
-                    .where(AssetAudit.asset_id == ticket.asset_id)
-                    .order_by(AssetAudit.id.desc())
-                    .limit(1)
-                )
-                prev_hash = result.scalar_one_or_none()
-            except Exception:
-                prev_hash = None
+            from app.core.audit_chain import aappend_audit_records
             
             audit_payload = {
                 "action": "CREATE",
@@ -193,28 +180,14 @@ async def create_ticket(
                 "created_at": datetime.utcnow().isoformat()
             }
             
-            record_hash = compute_audit_record_hash(audit_payload)
-            signature = compute_audit_signature(record_hash, prev_hash)
-            
-            audit = AssetAudit(
-                asset_id=ticket.asset_id,
-                action="CREATE",
-                table_name="tickets",
-                record_id=ticket.id,
-                field_name=None,
-                old_value=None,
-                new_value=None,
-                reason=None,
-                ip_address=None,
-                user_agent=None,
-                custom_metadata={"ticket_number": ticket.ticket_number, "priority": ticket.priority, "category": ticket.category},
-                prev_hash=prev_hash,
-                record_hash=record_hash,
-                signature=signature,
-                signature_algorithm="HMAC-SHA256",
-                created_by=creator_id
-            )
-            db.add(audit)
+            await aappend_audit_records(db, [{
+                "asset_id": ticket.asset_id,
+                "action": "CREATE",
+                "table_name": "tickets",
+                "record_id": ticket.id,
+                "custom_metadata": audit_payload,
+                "created_by": creator_id
+            }])
         
         # Auto-assign placeholder logic
         assigned_to = ticket.assigned_to
@@ -453,6 +426,7 @@ async def list_tickets(
     category: Optional[str] = None,
     assigned_to: Optional[int] = None,
     db: AsyncSession = Depends(get_async_session),
+    loader: BatchLoader = Depends(get_batch_loader),
     principal: dict = Depends(get_current_user_payload)
 ):
     """
@@ -482,17 +456,15 @@ async def list_tickets(
         result = await db.execute(query)
         tickets = result.scalars().all()
 
+        # Resolver nomes e códigos de local em lote (uma consulta por relação)
+        loader.queue(User.id, User.full_name, (t.assigned_to for t in tickets))
+        loader.queue(Location.id, Location.code, (t.location_id for t in tickets))
+        await loader.resolve(db)
+
         responses = []
         for t in tickets:
-            assigned_to_name = None
-            if t.assigned_to:
-                user_result = await db.execute(select(User.full_name).where(User.id == t.assigned_to))
-                assigned_to_name = user_result.scalar_one_or_none()
-
-            location_code = None
-            if t.location_id:
-                loc_result = await db.execute(select(Location.code).where(Location.id == t.location_id))
-                location_code = loc_result.scalar_one_or_none()
+            assigned_to_name = loader.get(User.id, User.full_name, t.assigned_to)
+            location_code = loader.get(Location.id, Location.code, t.location_id)
 
             responses.append({
                 "id": t.id,
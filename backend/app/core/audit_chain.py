@@ -0,0 +1,233 @@
+"""
+Append path for per-asset audit chains
+
+Every ``asset_audits`` record links to the previous record of the same asset.
+The last hash and sequence number of each chain live in ``asset_audit_heads``;
+writers lock the head rows of the assets they touch (``SELECT ... FOR UPDATE``,
+in asset order to avoid deadlocks), so appends to the same asset are strictly
+ordered while appends to different assets proceed in parallel, and no history
+is read on the hot path.
+
+Usage::
+
+    append_audit_records(db, [{
+        "asset_id": 12,
+        "action": "MOVE",
+        "table_name": "movements",
+        "record_id": 34,
+        "created_by": user_id,
+        "custom_metadata": {...},  # signed payload
+    }])
+    db.commit()
+
+``custom_metadata`` is the signed payload: ``action`` and ``asset_id`` are added
+to it when missing, so every record can be re-hashed by the verifier. The
+caller owns the transaction; head locks are released on commit/rollback.
+
+Batch signing: with ``AUDIT_MERKLE_SIGNING`` enabled, appends of at least
+``AUDIT_MERKLE_MIN_BATCH`` records build a Merkle tree over the links
+``(prev_hash, record_hash)`` of the batch and sign only its root. Each record
+stores the root signature and its inclusion proof (``merkle_proof``), so it
+remains verifiable on its own.
+"""
+
+import base64
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.batch_loader import IN_CHUNK_SIZE
+from app.core.config import settings
+from app.core.security import compute_audit_record_hash, compute_audit_signature
+from app.models.movement import AssetAudit, AssetAuditHead
+
+SIGNATURE_ALGORITHM = "HMAC-SHA256"
+MERKLE_SIGNATURE_ALGORITHM = "MERKLE-HMAC-SHA256"
+
+# Domain separation between leaves and inner nodes
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+
+def merkle_leaf(record_hash: str, prev_hash: Optional[str]) -> bytes:
+    """Leaf of a record: binds the record to its predecessor, like the per-record HMAC"""
+    return hashlib.sha256(_LEAF_PREFIX + ((prev_hash or "") + record_hash).encode("utf-8")).digest()
+
+
+def _merkle_node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(_NODE_PREFIX + left + right).digest()
+
+
+def merkle_sign_batch(links: Sequence[Tuple[Optional[str], str]]) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Sign ``(prev_hash, record_hash)`` links with one HMAC over their Merkle root.
+
+    Returns the root signature and one proof per link:
+    ``{"i": index, "n": leaf count, "p": base64 of the sibling digests, leaf
+    to root}``. An unpaired node is promoted to the next level unchanged.
+    """
+    level = [merkle_leaf(record_hash, prev_hash) for prev_hash, record_hash in links]
+    size = len(level)
+    levels = []
+    while len(level) > 1:
+        levels.append(level)
+        level = [
+            _merkle_node(level[k], level[k + 1]) if k + 1 < len(level) else level[k]
+            for k in range(0, len(level), 2)
+        ]
+
+    proofs = []
+    for leaf in range(size):
+        path = []
+        position = leaf
+        for nodes in levels:
+            sibling = position ^ 1
+            if sibling < len(nodes):
+                path.append(nodes[sibling])
+            position >>= 1
+        proofs.append({"i": leaf, "n": size, "p": base64.b64encode(b"".join(path)).decode("ascii")})
+
+    return compute_audit_signature(level[0].hex()), proofs
+
+
+def merkle_root_from_proof(record_hash: str, prev_hash: Optional[str], proof: Dict[str, Any]) -> Optional[str]:
+    """Recompute the batch root from a record and its inclusion proof (``None`` if malformed)"""
+    try:
+        index, width = int(proof["i"]), int(proof["n"])
+        path = base64.b64decode(proof["p"], validate=True)
+    except (KeyError, TypeError, ValueError):
+        return None
+    node = merkle_leaf(record_hash, prev_hash)
+    offset = 0
+    while width > 1:
+        if index ^ 1 < width:
+            other = path[offset:offset + 32]
+            if len(other) != 32:
+                return None
+            offset += 32
+            node = _merkle_node(other, node) if index & 1 else _merkle_node(node, other)
+        index >>= 1
+        width = (width + 1) >> 1
+    return node.hex() if offset == len(path) else None
+
+
+def append_audit_records(
+    db: Session,
+    entries: Sequence[Dict[str, Any]],
+    batch_signing: Optional[bool] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Chain, sign and insert audit records (several per asset allowed, in order).
+
+    ``batch_signing`` forces Merkle batch signing on or off; by default it is
+    used when enabled in the settings and the batch is large enough.
+    Returns the inserted values, including ``prev_hash``, ``record_hash``,
+    ``signature`` and ``chain_seq``.
+    """
+    if not entries:
+        return []
+    if batch_signing is None:
+        batch_signing = settings.AUDIT_MERKLE_SIGNING and len(entries) >= settings.AUDIT_MERKLE_MIN_BATCH
+
+    heads = _lock_heads(db, {entry["asset_id"] for entry in entries})
+
+    records = []
+    for entry in entries:
+        record = dict(entry)
+        asset_id = record["asset_id"]
+        payload = dict(record.get("custom_metadata") or {})
+        payload.setdefault("action", record["action"])
+        payload.setdefault("asset_id", asset_id)
+
+        head = heads[asset_id]
+        record_hash = compute_audit_record_hash(payload)
+        record.update(
+            custom_metadata=payload,
+            prev_hash=head["last_hash"],
+            record_hash=record_hash,
+            chain_seq=head["seq"] + 1,
+        )
+        if not batch_signing:
+            record.update(
+                signature=compute_audit_signature(record_hash, head["last_hash"]),
+                signature_algorithm=SIGNATURE_ALGORITHM,
+                merkle_proof=None,
+            )
+        head["last_hash"] = record_hash
+        head["seq"] += 1
+        records.append(record)
+
+    if batch_signing:
+        signature, proofs = merkle_sign_batch([(record["prev_hash"], record["record_hash"]) for record in records])
+        for record, proof in zip(records, proofs):
+            record.update(signature=signature, signature_algorithm=MERKLE_SIGNATURE_ALGORITHM, merkle_proof=proof)
+
+    db.execute(insert(AssetAudit), records)
+    # Bulk UPDATE by primary key
+    db.execute(update(AssetAuditHead), [
+        {"asset_id": asset_id, "last_hash": head["last_hash"], "seq": head["seq"]}
+        for asset_id, head in heads.items()
+    ])
+    return records
+
+
+async def aappend_audit_records(db, entries: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """``append_audit_records`` for an ``AsyncSession``"""
+    return await db.run_sync(append_audit_records, entries)
+
+
+def _lock_heads(db: Session, asset_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Lock (creating when missing) the head rows of the given assets"""
+    asset_ids = sorted(asset_ids)
+    heads = _select_heads(db, asset_ids)
+
+    missing = [asset_id for asset_id in asset_ids if asset_id not in heads]
+    if missing:
+        # First append since the head table exists: seed from the chain's
+        # current last record (only ever done once per asset)
+        seeds = {asset_id: {"last_hash": None, "seq": 0} for asset_id in missing}
+        for start in range(0, len(missing), IN_CHUNK_SIZE):
+            latest = (
+                select(
+                    AssetAudit.asset_id,
+                    func.max(AssetAudit.id).label("last_id"),
+                    func.count(AssetAudit.id).label("total"),
+                )
+                .where(AssetAudit.asset_id.in_(missing[start:start + IN_CHUNK_SIZE]))
+                .group_by(AssetAudit.asset_id)
+                .subquery()
+            )
+            for asset_id, record_hash, total in db.execute(
+                select(latest.c.asset_id, AssetAudit.record_hash, latest.c.total)
+                .join(AssetAudit, AssetAudit.id == latest.c.last_id)
+            ):
+                seeds[asset_id] = {"last_hash": record_hash, "seq": total}
+
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        db.execute(
+            upsert(AssetAuditHead).on_conflict_do_nothing(index_elements=["asset_id"]),
+            [{"asset_id": asset_id, **seed} for asset_id, seed in seeds.items()],
+        )
+        # A concurrent writer may have created (and advanced) the head first
+        heads.update(_select_heads(db, missing))
+    return heads
+
+
+def _select_heads(db: Session, asset_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """``SELECT ... FOR UPDATE`` of head rows, in asset order (``asset_ids`` is sorted)"""
+    heads = {}
+    for start in range(0, len(asset_ids), IN_CHUNK_SIZE):
+        rows = db.execute(
+            select(AssetAuditHead.asset_id, AssetAuditHead.last_hash, AssetAuditHead.seq)
+            .where(AssetAuditHead.asset_id.in_(asset_ids[start:start + IN_CHUNK_SIZE]))
+            .order_by(AssetAuditHead.asset_id)
+            .with_for_update()
+        )
+        for asset_id, last_hash, seq in rows:
+            heads[asset_id] = {"last_hash": last_hash, "seq": seq}
+    return heads
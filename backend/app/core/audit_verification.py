@@ -0,0 +1,375 @@
+"""
+Hash-chain verification for asset audit trails
+
+Each ``asset_audits`` row links to the previous row of the same asset through
+``prev_hash`` and is authenticated by an HMAC ``signature``. Chains are read in
+insertion order (``asset_id, id``) from a server-side cursor and cut into
+fixed-size chunks; a chunk carries the hash its first record must link to, so
+chunks (even of the same chain) are verified independently on a process pool.
+
+Verified prefixes are stored in ``asset_audit_checkpoints``: by default only
+records written after the last checkpoint of each asset are read again.
+
+Checks, in order, for every record:
+
+* ``prev_hash`` equals the previous record's ``record_hash`` (``None`` for the
+  first record of a chain)
+* ``record_hash`` is present
+* ``signature`` is the HMAC of ``prev_hash + record_hash``; signatures over
+  ``record_hash`` alone, as written by older collection code, are accepted and
+  counted as legacy. Batch-signed records (``MERKLE-HMAC-SHA256``) carry the
+  HMAC of their batch's Merkle root, recomputed from ``merkle_proof``
+* when ``custom_metadata`` is the signed payload itself (it carries the row's
+  ``action`` and ``asset_id``), its hash matches ``record_hash``
+
+Command line::
+
+    python -m app.core.audit_verification [--full] [--asset ID ...] [--workers N]
+"""
+
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import structlog
+from sqlalchemy import func, null, select
+
+from app.core.audit_chain import MERKLE_SIGNATURE_ALGORITHM, merkle_root_from_proof
+from app.core.config import settings
+from app.core.security import compute_audit_record_hash, compute_audit_signature
+
+logger = structlog.get_logger()
+
+# Records per chunk handed to a worker process
+VERIFY_CHUNK_SIZE = 20000
+
+# Rows fetched per round trip from the server-side cursor
+VERIFY_FETCH_SIZE = 5000
+
+# Checkpoints written per statement
+CHECKPOINT_WRITE_BATCH = 1000
+
+# Broken links kept in the report (all of them are checkpointed)
+MAX_REPORTED_BREAKS = 100
+
+# (id, asset_id, action, prev_hash, record_hash, signature, custom_metadata,
+#  signature_algorithm, merkle_proof, checkpoint last_hash)
+AuditRow = Tuple[int, int, str, Optional[str], Optional[str], Optional[str], Any, Optional[str], Any, Optional[str]]
+
+# Chunk: ((asset_id, record_hash) of the row preceding the chunk when the chunk
+# starts in the middle of that asset's chain, rows)
+Chunk = Tuple[Optional[Tuple[int, Optional[str]]], List[AuditRow]]
+
+
+def verify_chunk(chunk: Chunk) -> List[Dict[str, Any]]:
+    """
+    Verify a chunk of records ordered by ``(asset_id, id)``.
+
+    Returns one segment per asset in the chunk with the last verified record
+    and the first broken link, if any. Top-level so it can run in a worker
+    process.
+    """
+    carry, rows = chunk
+    segments: List[Dict[str, Any]] = []
+    segment: Optional[Dict[str, Any]] = None
+    expected: Optional[str] = None
+
+    for (audit_id, asset_id, action, prev_hash, record_hash, signature, metadata,
+         algorithm, merkle_proof, checkpoint_hash) in rows:
+        if segment is None or segment["asset_id"] != asset_id:
+            if segment is None and carry is not None and carry[0] == asset_id:
+                expected = carry[1]
+            else:
+                expected = checkpoint_hash
+            segment = {
+                "asset_id": asset_id,
+                "first_audit_id": audit_id,
+                "last_audit_id": None,
+                "last_hash": expected,
+                "verified": 0,
+                "legacy_signatures": 0,
+                "break": None,
+            }
+            segments.append(segment)
+        if segment["break"] is not None:
+            continue
+
+        reason = None
+        if prev_hash != expected:
+            reason = "prev_hash_mismatch"
+        elif not record_hash:
+            reason = "missing_record_hash"
+        elif algorithm == MERKLE_SIGNATURE_ALGORITHM:
+            root = merkle_root_from_proof(record_hash, prev_hash, merkle_proof or {})
+            if root is None or signature != compute_audit_signature(root):
+                reason = "bad_signature"
+        elif signature != compute_audit_signature(record_hash, prev_hash):
+            if prev_hash and signature == compute_audit_signature(record_hash):
+                segment["legacy_signatures"] += 1
+            else:
+                reason = "bad_signature"
+        if (
+            reason is None
+            and isinstance(metadata, dict)
+            and metadata.get("action") == action
+            and metadata.get("asset_id") == asset_id
+            and compute_audit_record_hash(metadata) != record_hash
+        ):
+            reason = "record_hash_mismatch"
+
+        if reason is not None:
+            segment["break"] = {
+                "asset_id": asset_id,
+                "audit_id": audit_id,
+                "reason": reason,
+                "expected_prev_hash": expected,
+                "prev_hash": prev_hash,
+            }
+            continue
+
+        segment["last_audit_id"] = audit_id
+        segment["last_hash"] = record_hash
+        segment["verified"] += 1
+        expected = record_hash
+
+    return segments
+
+
+def _iter_chunks(rows: Iterable[Tuple], chunk_size: int) -> Iterator[Chunk]:
+    """Cut the ordered row stream into chunks, remembering the row before each one"""
+    chunk: List[AuditRow] = []
+    carry = None
+    previous: Optional[AuditRow] = None
+    for row in rows:
+        row = tuple(row)
+        if not chunk:
+            carry = (previous[1], previous[4]) if previous is not None else None
+        chunk.append(row)
+        previous = row
+        if len(chunk) >= chunk_size:
+            yield carry, chunk
+            chunk = []
+    if chunk:
+        yield carry, chunk
+
+
+def _chain_statement(asset_ids: Optional[Sequence[int]], full: bool):
+    from app.models.movement import AssetAudit, AssetAuditCheckpoint
+
+    statement = select(
+        AssetAudit.id,
+        AssetAudit.asset_id,
+        AssetAudit.action,
+        AssetAudit.prev_hash,
+        AssetAudit.record_hash,
+        AssetAudit.signature,
+        AssetAudit.custom_metadata,
+        AssetAudit.signature_algorithm,
+        AssetAudit.merkle_proof,
+        AssetAuditCheckpoint.last_hash if not full else null(),
+    )
+    if not full:
+        statement = statement.outerjoin(
+            AssetAuditCheckpoint, AssetAuditCheckpoint.asset_id == AssetAudit.asset_id
+        ).where(AssetAudit.id > func.coalesce(AssetAuditCheckpoint.last_audit_id, 0))
+    if asset_ids:
+        statement = statement.where(AssetAudit.asset_id.in_(list(asset_ids)))
+    return statement.order_by(AssetAudit.asset_id, AssetAudit.id)
+
+
+class _CheckpointWriter:
+    """Merge chunk segments per asset and upsert finished assets in batches"""
+
+    def __init__(self, db, full: bool):
+        self.db = db
+        self.full = full
+        # SQLite cannot commit while the reader's cursor holds its shared
+        # lock: checkpoints are written once the stream is exhausted
+        self.deferred = db.get_bind().dialect.name == "sqlite"
+        self.pending: Dict[int, Dict[str, Any]] = {}
+        self.current: Optional[Dict[str, Any]] = None
+        self.assets = 0
+        self.verified = 0
+        self.legacy_signatures = 0
+        self.broken: List[Dict[str, Any]] = []
+        self.broken_total = 0
+
+    def add(self, segment: Dict[str, Any]) -> None:
+        current = self.current
+        if current is not None and current["asset_id"] == segment["asset_id"]:
+            # Continuation of the chain in the next chunk; ignored after a break
+            if current["break"] is not None:
+                return
+            if segment["last_audit_id"] is not None:
+                current["last_audit_id"] = segment["last_audit_id"]
+                current["last_hash"] = segment["last_hash"]
+            current["verified"] += segment["verified"]
+            current["break"] = segment["break"]
+        else:
+            if current is not None:
+                self._finish(current)
+            self.current = dict(segment)
+            self.assets += 1
+        self.verified += segment["verified"]
+        self.legacy_signatures += segment["legacy_signatures"]
+
+    def _finish(self, state: Dict[str, Any]) -> None:
+        if state["break"] is not None:
+            self.broken_total += 1
+            if len(self.broken) < MAX_REPORTED_BREAKS:
+                self.broken.append(state["break"])
+        self.pending[state["asset_id"]] = state
+        if len(self.pending) >= CHECKPOINT_WRITE_BATCH and not self.deferred:
+            self.flush()
+
+    def close(self) -> None:
+        if self.current is not None:
+            self._finish(self.current)
+            self.current = None
+        self.flush()
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        states = list(self.pending.values())
+        self.pending = {}
+        for start in range(0, len(states), CHECKPOINT_WRITE_BATCH):
+            self._write(states[start:start + CHECKPOINT_WRITE_BATCH])
+
+    def _write(self, states: List[Dict[str, Any]]) -> None:
+        from app.models.movement import AssetAuditCheckpoint
+
+        existing = {
+            checkpoint.asset_id: checkpoint
+            for checkpoint in self.db.query(AssetAuditCheckpoint).filter(
+                AssetAuditCheckpoint.asset_id.in_([state["asset_id"] for state in states])
+            )
+        }
+        for state in states:
+            broken = state["break"]
+            checkpoint = existing.get(state["asset_id"])
+            if checkpoint is None:
+                if state["last_audit_id"] is None and broken is None:
+                    continue
+                checkpoint = AssetAuditCheckpoint(
+                    asset_id=state["asset_id"], last_audit_id=0, last_hash=None, verified_count=0
+                )
+                self.db.add(checkpoint)
+            elif self.full:
+                checkpoint.last_audit_id = 0
+                checkpoint.last_hash = None
+                checkpoint.verified_count = 0
+            if state["last_audit_id"] is not None:
+                checkpoint.last_audit_id = state["last_audit_id"]
+                checkpoint.last_hash = state["last_hash"]
+                checkpoint.verified_count += state["verified"]
+            checkpoint.broken_audit_id = broken["audit_id"] if broken else None
+            checkpoint.broken_reason = broken["reason"] if broken else None
+        self.db.commit()
+
+
+def verify_audit_chains(
+    asset_ids: Optional[Sequence[int]] = None,
+    full: bool = False,
+    workers: Optional[int] = None,
+    chunk_size: int = VERIFY_CHUNK_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Verify audit chains and advance their checkpoints.
+
+    ``full`` ignores existing checkpoints and re-verifies every chain from its
+    first record. ``workers`` defaults to ``AUDIT_VERIFY_WORKERS`` (0 = CPU
+    count); with one worker chunks are verified in the calling process.
+    ``progress`` is called with the number of records verified so far.
+    """
+    from app.core.database import SessionLocal
+
+    if workers is None:
+        workers = settings.AUDIT_VERIFY_WORKERS or os.cpu_count() or 1
+    started = time.perf_counter()
+
+    reader = SessionLocal()
+    writer = _CheckpointWriter(SessionLocal(), full)
+    # forkserver: the caller may be a threaded server or job runner
+    pool = (
+        ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+        if workers > 1 else None
+    )
+    try:
+        result = reader.execute(
+            _chain_statement(asset_ids, full).execution_options(yield_per=VERIFY_FETCH_SIZE)
+        )
+        chunks = _iter_chunks(result, chunk_size)
+
+        if pool is None:
+            for chunk in chunks:
+                for segment in verify_chunk(chunk):
+                    writer.add(segment)
+                if progress:
+                    progress(writer.verified)
+        else:
+            # Bounded window of in-flight chunks: the cursor is read only as
+            # fast as the pool verifies, and results are merged in order
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append(pool.submit(verify_chunk, chunk))
+                if len(in_flight) >= workers * 2:
+                    for segment in in_flight.popleft().result():
+                        writer.add(segment)
+                    if progress:
+                        progress(writer.verified)
+            while in_flight:
+                for segment in in_flight.popleft().result():
+                    writer.add(segment)
+                if progress:
+                    progress(writer.verified)
+        reader.close()
+        writer.close()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        reader.close()
+        writer.db.close()
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "full": full,
+        "assets_checked": writer.assets,
+        "records_verified": writer.verified,
+        "legacy_signatures": writer.legacy_signatures,
+        "broken_chains": writer.broken_total,
+        "breaks": writer.broken,
+        "elapsed_seconds": round(elapsed, 3),
+        "records_per_second": round(writer.verified / elapsed) if elapsed > 0 else None,
+    }
+    logger.info(
+        "Audit chains verified",
+        assets=report["assets_checked"],
+        records=report["records_verified"],
+        broken=report["broken_chains"],
+        elapsed=report["elapsed_seconds"],
+    )
+    return report
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Verify asset audit hash chains")
+    parser.add_argument("--full", action="store_true", help="ignore checkpoints and re-verify every chain")
+    parser.add_argument("--asset", type=int, action="append", dest="asset_ids", help="asset id (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    report = verify_audit_chains(asset_ids=args.asset_ids, full=args.full, workers=args.workers)
+    print(json.dumps(report, indent=2, default=str))
+    return 1 if report["broken_chains"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
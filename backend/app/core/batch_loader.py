@@ -0,0 +1,71 @@
+"""
+Per-request batched relation loader (DataLoader-style)
+
+Collects foreign keys while a list endpoint walks its rows and resolves each
+relation with a single ``IN (...)`` query, instead of one lookup per row.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Large IN lists are split to stay below driver parameter limits (SQLite: 999)
+IN_CHUNK_SIZE = 500
+
+
+class BatchLoader:
+    """
+    Batch lookups of related values by key.
+
+    Usage::
+
+        loader = BatchLoader()
+        loader.queue(Location.id, Location.code, [m.location_id for m in machines])
+        await loader.resolve(db)
+        code = loader.get(Location.id, Location.code, machine.location_id)
+
+    A relation is identified by ``(key_column, value_column)``. Resolved
+    values are cached for the lifetime of the loader, so one instance should
+    be created per request.
+    """
+
+    def __init__(self):
+        self._queued: Dict[Tuple[Any, Any], Set[Hashable]] = defaultdict(set)
+        self._cache: Dict[Tuple[Any, Any], Dict[Hashable, Any]] = defaultdict(dict)
+
+    def queue(self, key_column, value_column, keys: Iterable[Optional[Hashable]]) -> None:
+        """Register keys to be resolved on the next ``resolve`` call"""
+        cached = self._cache[(key_column, value_column)]
+        pending = self._queued[(key_column, value_column)]
+        for key in keys:
+            if key is not None and key not in cached:
+                pending.add(key)
+
+    async def resolve(self, db: AsyncSession) -> None:
+        """Resolve all queued keys, one ``IN`` query per relation and chunk"""
+        for (key_column, value_column), keys in list(self._queued.items()):
+            cache = self._cache[(key_column, value_column)]
+            ordered = list(keys)
+            for start in range(0, len(ordered), IN_CHUNK_SIZE):
+                chunk = ordered[start:start + IN_CHUNK_SIZE]
+                result = await db.execute(select(key_column, value_column).where(key_column.in_(chunk)))
+                for key, value in result.all():
+                    cache[key] = value
+                # Remember misses so they are not queried again
+                for key in chunk:
+                    cache.setdefault(key, None)
+        self._queued.clear()
+
+    def get(self, key_column, value_column, key: Optional[Hashable], default: Any = None) -> Any:
+        """Return a resolved value (or ``default`` when missing/not resolved)"""
+        if key is None:
+            return default
+        value = self._cache[(key_column, value_column)].get(key)
+        return default if value is None else value
+
+
+def get_batch_loader() -> BatchLoader:
+    """FastAPI dependency returning a fresh loader for the current request"""
+    return BatchLoader()
@@ -68,8 +68,52 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: Optional[str] = None
     
+    # Background jobs
+    JOB_MAX_CONCURRENCY: int = 4  # jobs executed at the same time
+    JOB_THREAD_WORKERS: int = 4  # threads for sync job handlers
+    JOB_BROKER_URL: Optional[str] = None  # redis://... to share the queue between processes
+    
+    # Audit trail verification
+    AUDIT_VERIFY_WORKERS: int = 0  # processes used to verify hash chains (0 = CPU count)
+    AUDIT_MERKLE_SIGNING: bool = False  # sign bulk appends once per batch (Merkle root)
+    AUDIT_MERKLE_MIN_BATCH: int = 64  # smallest append signed as a batch
+    
+    # Maintenance SLA
+    SLA_SCHEDULER_ENABLED: bool = True  # sets the persisted SLA flags (off: dashboards compare deadlines)
+    SLA_WARNING_RATIO: float = 0.8  # share of the SLA consumed before the warning event
+    SLA_SCHEDULER_RESYNC_SECONDS: int = 300  # reload upcoming events from the database
+    
+    # Maintenance analytics
+    MAINTENANCE_SUMMARY_REFRESH_SECONDS: int = 900  # daily rollup refresh interval (0 = manual only)
+    
+    # QR labels
+    LABEL_BATCH_TTL_HOURS: int = 24  # label batches generated in background are deleted after this (0 = keep)
+    
+    # Rate limiting
+    RATE_LIMIT_DEFAULT: str = "60/60"  # <requests>/<seconds> when no rule matches
+    RATE_LIMIT_RULES: str = "/api/v1/auth/=50/60,/api/v1/dashboard/=100/60,/api/=200/60"  # longest path prefix wins
+    RATE_LIMIT_LOGIN: str = "10/60"  # login and registration (rate_limit decorator), per client
+    RATE_LIMIT_BACKEND_URL: Optional[str] = None  # redis://... to share the counters between processes
+    
+    # System metrics
+    SYSTEM_METRICS_INTERVAL_SECONDS: float = 5.0  # CPU, memory, disk and network counters
+    SYSTEM_METRICS_SLOW_INTERVAL_SECONDS: float = 60.0  # socket table, partitions, interfaces, platform info
+    
+    # Query statistics
+    QUERY_STATS_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 500.0  # statements logged with their route
+    QUERY_STATS_MAX_FINGERPRINTS: int = 2000
+    
+    # Profiling
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: int = 0  # profile one request in N (0 = only admin requests with the header)
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_INTERVAL_MS: float = 5.0  # stack sampling interval
+    PROFILING_MAX_STACKS: int = 2000  # distinct stacks kept per route
+    
     # Monitoring
     SENTRY_DSN: Optional[str] = None
+    METRICS_BEARER_TOKEN: Optional[str] = None  # static token for Prometheus scrapes of /monitoring/prometheus
     LOG_FILE_PATH: str = "./logs/app.log"
     
     # Agent
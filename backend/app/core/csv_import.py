@@ -0,0 +1,44 @@
+"""
+Streaming CSV import helpers
+
+The upload is decoded incrementally and handed to the caller in fixed-size
+chunks of ``(line_number, row)`` pairs, so validation, duplicate detection and
+inserts can be done set-based per chunk instead of per row.
+"""
+
+import codecs
+import csv
+from typing import IO, Any, Dict, Iterator, List, Tuple
+
+# 3 unique columns are checked with IN per chunk: 3 * 300 stays below
+# SQLite's 999 bound parameters limit
+IMPORT_CHUNK_SIZE = 300
+
+# Uploads larger than this are processed as a background job
+IMPORT_BACKGROUND_THRESHOLD = 5 * 1024 * 1024
+
+
+def iter_csv_chunks(
+    binary_file: IO[bytes],
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    encoding: str = "utf-8-sig",
+) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    """
+    Yield lists of ``(line_number, row)`` read incrementally from a binary file.
+
+    Line numbers start at 2 (line 1 is the header). Header names are stripped
+    so ``" codigo"`` and ``"codigo"`` are treated alike.
+    """
+    text = codecs.getreader(encoding)(binary_file)
+    reader = csv.DictReader(text)
+    if reader.fieldnames:
+        reader.fieldnames = [name.strip() for name in reader.fieldnames]
+
+    chunk: List[Tuple[int, Dict[str, Any]]] = []
+    for row_num, row in enumerate(reader, start=2):
+        chunk.append((row_num, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -9,6 +9,8 @@ from sqlalchemy.pool import NullPool
 import structlog
 
 from app.core.config import settings
+from app.core.profiling import instrument_engine
+from app.core.query_stats import query_tracker
 
 logger = structlog.get_logger()
 
@@ -54,6 +56,11 @@ else:
 # Export sync engine for optimizations
 engine = sync_engine
 
+# DB spans for profiled requests, per-fingerprint query statistics
+for _engine in (async_engine.sync_engine, sync_engine):
+    instrument_engine(_engine)
+    query_tracker.instrument(_engine)
+
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
     async_engine,
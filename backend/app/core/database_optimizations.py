@@ -92,9 +92,11 @@ def optimize_database_settings():
         "SET random_page_cost = 1.1",
         "SET effective_io_concurrency = 200",
         
-        # Configurações de logging (apenas para desenvolvimento)
-        "SET log_min_duration_statement = 1000",  # Log queries > 1s
-        "SET log_statement = 'mod'",  # Log modificações
+        # Log de queries lentas: SET log_min_duration_statement só valia para
+        # esta conexão (e exige superusuário). As queries lentas da aplicação
+        # são registradas pelo query_tracker (app.core.query_stats, limite em
+        # SLOW_QUERY_THRESHOLD_MS); para o log do servidor, configurar
+        # log_min_duration_statement no postgresql.conf ou com ALTER DATABASE.
     ]
     
     try:
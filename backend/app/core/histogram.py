@@ -0,0 +1,118 @@
+"""
+Log-bucketed latency histograms
+
+Durations are counted in microsecond buckets laid out like an HDR histogram:
+16 linear sub-buckets per power of two, so any value is known within 1/16
+(6.25%) whatever its magnitude, from 1 µs up to ~2.4 hours, in a fixed
+array of ``NUM_BUCKETS`` counters. Recording is an index computation and a
+counter increment; percentiles are read from the cumulative counts.
+
+A histogram has a single writer. Concurrent recorders keep one histogram
+each and readers combine them with ``LatencyHistogram.merged``.
+"""
+
+from itertools import accumulate
+from operator import add
+from typing import Iterable, List, Sequence, Tuple
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_EXPONENT = 28  # values from 2**33 µs (~2.4 h) on share the last bucket
+NUM_BUCKETS = (MAX_EXPONENT + 2) * SUB_BUCKETS
+
+
+def bucket_index(micros: int) -> int:
+    """Bucket of a duration in microseconds"""
+    if micros < SUB_BUCKETS:
+        return micros if micros > 0 else 0
+    exponent = micros.bit_length() - SUB_BUCKET_BITS - 1
+    if exponent > MAX_EXPONENT:
+        return NUM_BUCKETS - 1
+    return ((exponent + 1) << SUB_BUCKET_BITS) + (micros >> exponent) - SUB_BUCKETS
+
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """``[lower, upper)`` microseconds covered by a bucket"""
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    exponent = (index >> SUB_BUCKET_BITS) - 1
+    mantissa = (index & (SUB_BUCKETS - 1)) + SUB_BUCKETS
+    return mantissa << exponent, (mantissa + 1) << exponent
+
+
+class LatencyHistogram:
+    """Counts, sum, min and max of durations recorded in seconds"""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        micros = int(seconds * 1_000_000)
+        if micros < SUB_BUCKETS:
+            index = micros if micros > 0 else 0
+        else:
+            exponent = micros.bit_length() - SUB_BUCKET_BITS - 1
+            if exponent > MAX_EXPONENT:
+                index = NUM_BUCKETS - 1
+            else:
+                index = ((exponent + 1) << SUB_BUCKET_BITS) + (micros >> exponent) - SUB_BUCKETS
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @classmethod
+    def merged(cls, histograms: Iterable['LatencyHistogram']) -> 'LatencyHistogram':
+        """Sum of several histograms (e.g. one per thread)"""
+        result = cls()
+        counts = result.counts
+        for histogram in histograms:
+            if not histogram.count:
+                continue
+            counts = list(map(add, counts, histogram.counts))
+            result.count += histogram.count
+            result.total += histogram.total
+            result.min = min(result.min, histogram.min)
+            result.max = max(result.max, histogram.max)
+        result.counts = counts
+        return result
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Duration in seconds below which ``percent`` % of the values fall"""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(self.count * percent / 100))
+        seen = 0
+        for index, value in enumerate(self.counts):
+            seen += value
+            if seen >= rank:
+                lower, upper = bucket_bounds(index)
+                estimate = (lower + upper) / 2 / 1_000_000
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds: Sequence[float]) -> List[int]:
+        """
+        Values below each bound in seconds (Prometheus ``le`` buckets); the
+        bucket holding a bound is left out, so counts are within the
+        histogram precision
+        """
+        cumulative = list(accumulate(self.counts))
+        result = []
+        for bound in bounds:
+            index = bucket_index(int(bound * 1_000_000))
+            result.append(cumulative[index - 1] if index else 0)
+        return result
@@ -0,0 +1,617 @@
+"""
+In-process background job runner
+
+Long-running operations (CSV import, audit item generation, label rendering...)
+are recorded in the ``background_jobs`` table and executed outside the HTTP
+request by a bounded pool of asyncio workers. Sync handlers run on a dedicated
+thread pool, async handlers on the event loop.
+
+Exports (``/ativos/exportar``, ``/movimentacoes/exportar``) and audit
+reconciliation stay in the request on purpose: exports stream server-side
+cursor batches with constant memory, and the reconciliation report is built
+from the per-location counters and paginated per group.
+
+Usage::
+
+    @job_runner.register("ativos.importar_csv", max_attempts=1)
+    def importar(ctx: JobContext, caminho: str) -> dict:
+        ...
+        ctx.set_progress(50, "metade")
+        ctx.check_cancelled()
+        return {"sucessos": 10}
+
+    job_id = job_runner.submit("ativos.importar_csv", {"caminho": path}, created_by=user.id)
+
+Handlers that can resume call ``ctx.save_checkpoint(state)`` after each unit
+of work; a job restarted after a shutdown or retried after a failure finds
+that state in ``ctx.checkpoint``. ``on_final(**params)`` runs once the job
+reaches a final status (cleanup of temporary files and the like).
+
+Periodic jobs are declared with ``job_runner.every(kind, seconds)``; while the
+runner is started a new job of that kind is submitted every ``seconds``
+unless one is still queued or running.
+
+Job ids are delivered to the workers through a broker. The default
+``LocalJobBroker`` is an ``asyncio.Queue``; setting ``JOB_BROKER_URL`` to a
+Redis URL shares the queue between processes (``RedisJobBroker``).
+"""
+
+import abc
+import asyncio
+import functools
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.models.job import BackgroundJob, JobStatus
+
+logger = structlog.get_logger()
+
+# Upper bound for the exponential retry backoff
+MAX_RETRY_DELAY_SECONDS = 300.0
+
+# Minimum interval between two progress writes for the same job
+PROGRESS_WRITE_INTERVAL_SECONDS = 0.5
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled"""
+
+
+class JobContext:
+    """Handle passed to job handlers to report progress and observe cancellation"""
+
+    def __init__(self, runner: "JobRunner", job_id: str, attempt: int, checkpoint: Any = None):
+        self.runner = runner
+        self.job_id = job_id
+        self.attempt = attempt
+        # Resume state saved by a previous attempt (None on the first run)
+        self.checkpoint = checkpoint
+        self._cancel_event = threading.Event()
+        self._last_write = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self) -> None:
+        self._cancel_event.set()
+
+    def check_cancelled(self) -> None:
+        """Raise ``JobCancelled`` if cancellation was requested"""
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.job_id)
+
+    def set_progress(self, progress: float, message: Optional[str] = None) -> None:
+        """
+        Persist progress (0-100). Writes are throttled; the job status is read
+        back on each write so a cancellation requested from another process is
+        also observed.
+        """
+        now = time.monotonic()
+        if progress < 100 and now - self._last_write < PROGRESS_WRITE_INTERVAL_SECONDS:
+            return
+        self._last_write = now
+        fields = {"progress": max(0.0, min(float(progress), 100.0))}
+        if message is not None:
+            fields["message"] = message[:500]
+        status = self.runner._update(self.job_id, **fields)
+        if status == JobStatus.CANCELLING:
+            self._cancel_event.set()
+
+    async def aset_progress(self, progress: float, message: Optional[str] = None) -> None:
+        """``set_progress`` for async handlers (DB write off the event loop)"""
+        await asyncio.to_thread(self.set_progress, progress, message)
+
+    def save_checkpoint(self, state: Any, db=None) -> None:
+        """
+        Persist the resume state (kept in ``result`` until the job succeeds).
+        With ``db`` the write joins the caller's transaction, so the checkpoint
+        is committed together with the work it describes.
+        """
+        self.checkpoint = state
+        statement = update(BackgroundJob).where(BackgroundJob.id == self.job_id).values(result=state)
+        if db is not None:
+            db.execute(statement)
+            return
+        session = self.runner._session()
+        try:
+            session.execute(statement)
+            session.commit()
+        finally:
+            session.close()
+
+
+class JobBroker(abc.ABC):
+    """Transport of job ids from ``submit`` to the workers"""
+
+    @abc.abstractmethod
+    async def publish(self, job_id: str) -> None:
+        """Hand a job id to the workers"""
+
+    @abc.abstractmethod
+    async def consume(self) -> str:
+        """Wait for the next job id"""
+
+    @abc.abstractmethod
+    async def depth(self) -> int:
+        """Number of job ids waiting for a worker"""
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalJobBroker(JobBroker):
+    """Single-process broker backed by an ``asyncio.Queue``"""
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    async def publish(self, job_id: str) -> None:
+        await self.queue.put(job_id)
+
+    async def consume(self) -> str:
+        return await self.queue.get()
+
+    async def depth(self) -> int:
+        return self.queue.qsize()
+
+
+class RedisJobBroker(JobBroker):
+    """Broker backed by a Redis list, shared by every API process"""
+
+    def __init__(self, url: str, queue_key: str = "jobs:queue"):
+        import redis.asyncio as aioredis
+
+        self._client = aioredis.from_url(url, decode_responses=True)
+        self.queue_key = queue_key
+
+    async def publish(self, job_id: str) -> None:
+        await self._client.lpush(self.queue_key, job_id)
+
+    async def consume(self) -> str:
+        while True:
+            item = await self._client.brpop(self.queue_key, timeout=1)
+            if item:
+                return item[1]
+
+    async def depth(self) -> int:
+        return await self._client.llen(self.queue_key)
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+def create_job_broker() -> JobBroker:
+    """Return the broker configured by ``JOB_BROKER_URL`` (local queue by default)"""
+    url = settings.JOB_BROKER_URL
+    if url and url.startswith(("redis://", "rediss://")):
+        try:
+            return RedisJobBroker(url)
+        except Exception as e:
+            logger.warning("Redis job broker unavailable, using local queue", error=str(e))
+    return LocalJobBroker()
+
+
+@dataclass
+class JobSpec:
+    """Registered handler, its retry policy and final-status hook"""
+    handler: Callable[..., Any]
+    max_attempts: int = 1
+    backoff_seconds: float = 2.0
+    on_final: Optional[Callable[..., Any]] = None
+
+
+class JobRunner:
+    """Bounded executor for persistent background jobs"""
+
+    def __init__(
+        self,
+        broker: Optional[JobBroker] = None,
+        max_concurrency: int = 4,
+        thread_workers: int = 4,
+    ):
+        self.broker = broker
+        self.max_concurrency = max_concurrency
+        self.thread_workers = thread_workers
+        self._handlers: Dict[str, JobSpec] = {}
+        self._running: Dict[str, JobContext] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._workers: List[asyncio.Task] = []
+        self._periodic: List[Tuple[str, float, Dict[str, Any]]] = []
+        self._timers: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+
+    # Registration -----------------------------------------------------------
+
+    def register(self, kind: str, max_attempts: int = 1, backoff_seconds: float = 2.0,
+                 on_final: Optional[Callable[..., Any]] = None):
+        """
+        Decorator registering ``handler(ctx, **params)`` for a job kind.
+        ``on_final(**params)`` is called when a job of this kind succeeds, fails
+        for the last time or is cancelled, never when it will run again.
+        """
+        def decorator(handler: Callable[..., Any]):
+            self._handlers[kind] = JobSpec(handler, max_attempts, backoff_seconds, on_final)
+            return handler
+        return decorator
+
+    def every(self, kind: str, interval_seconds: float, params: Optional[Dict[str, Any]] = None) -> None:
+        """Submit ``kind`` every ``interval_seconds`` while the runner is started"""
+        self._periodic.append((kind, interval_seconds, params or {}))
+
+    # Persistence ------------------------------------------------------------
+
+    @staticmethod
+    def _session():
+        from app.core.database import SessionLocal
+        return SessionLocal()
+
+    def _update(self, job_id: str, **fields: Any) -> Optional[str]:
+        """Update a job row and return its current status"""
+        db = self._session()
+        try:
+            job = db.get(BackgroundJob, job_id)
+            if job is None:
+                return None
+            for key, value in fields.items():
+                setattr(job, key, value)
+            db.commit()
+            return job.status
+        finally:
+            db.close()
+
+    def _claim(self, job_id: str) -> Optional[BackgroundJob]:
+        """Atomically move a queued job to RUNNING; None if it is not runnable"""
+        db = self._session()
+        try:
+            claimed = db.execute(
+                update(BackgroundJob)
+                .where(
+                    BackgroundJob.id == job_id,
+                    BackgroundJob.status.in_([JobStatus.PENDING, JobStatus.RETRYING]),
+                )
+                .values(
+                    status=JobStatus.RUNNING,
+                    attempts=BackgroundJob.attempts + 1,
+                    started_at=datetime.now(timezone.utc),
+                    next_attempt_at=None,
+                )
+            ).rowcount
+            db.commit()
+            if not claimed:
+                return None
+            job = db.get(BackgroundJob, job_id)
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _finalize(self, kind: str, params: Optional[Dict[str, Any]]) -> None:
+        """Run the ``on_final`` hook of a job that reached a final status"""
+        spec = self._handlers.get(kind)
+        if spec is None or spec.on_final is None:
+            return
+        try:
+            spec.on_final(**(params or {}))
+        except Exception as e:
+            logger.warning("Job final hook failed", kind=kind, error=str(e))
+
+    def get(self, job_id: str) -> Optional[BackgroundJob]:
+        """Return a detached snapshot of a job"""
+        db = self._session()
+        try:
+            job = db.get(BackgroundJob, job_id)
+            if job is not None:
+                db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    # Submission and cancellation -------------------------------------------
+
+    def _create(self, kind: str, params: Optional[Dict[str, Any]], created_by: Optional[int],
+                max_attempts: Optional[int]) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        db = self._session()
+        try:
+            db.add(BackgroundJob(
+                id=job_id,
+                kind=kind,
+                status=JobStatus.PENDING,
+                params=params or {},
+                max_attempts=max_attempts or self._handlers[kind].max_attempts,
+                created_by=created_by,
+            ))
+            db.commit()
+        finally:
+            db.close()
+        return job_id
+
+    def _publish_threadsafe(self, job_id: str) -> None:
+        """Publish from any thread; jobs submitted before start are picked up by recovery"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._loop.create_task(self.broker.publish(job_id))
+        else:
+            asyncio.run_coroutine_threadsafe(self.broker.publish(job_id), self._loop)
+
+    def submit(self, kind: str, params: Optional[Dict[str, Any]] = None,
+               created_by: Optional[int] = None, max_attempts: Optional[int] = None) -> str:
+        """Persist and enqueue a job (sync; safe to call from threadpool endpoints)"""
+        job_id = self._create(kind, params, created_by, max_attempts)
+        self._publish_threadsafe(job_id)
+        logger.info("Job submitted", job_id=job_id, kind=kind)
+        return job_id
+
+    async def asubmit(self, kind: str, params: Optional[Dict[str, Any]] = None,
+                      created_by: Optional[int] = None, max_attempts: Optional[int] = None) -> str:
+        """Async counterpart of ``submit``"""
+        job_id = await asyncio.to_thread(self._create, kind, params, created_by, max_attempts)
+        if self._loop is not None:
+            await self.broker.publish(job_id)
+        logger.info("Job submitted", job_id=job_id, kind=kind)
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Request cancellation. Queued jobs are cancelled immediately; running
+        jobs are flagged and stop at their next ``check_cancelled``.
+
+        Each transition is a conditional UPDATE, so a worker claiming the job
+        at the same time either sees it cancelled or runs it and gets flagged.
+        """
+        db = self._session()
+        try:
+            cancelled = db.execute(
+                update(BackgroundJob)
+                .where(
+                    BackgroundJob.id == job_id,
+                    BackgroundJob.status.in_([JobStatus.PENDING, JobStatus.RETRYING]),
+                )
+                .values(status=JobStatus.CANCELLED, finished_at=datetime.now(timezone.utc))
+            ).rowcount
+            flagged = 0
+            if not cancelled:
+                flagged = db.execute(
+                    update(BackgroundJob)
+                    .where(
+                        BackgroundJob.id == job_id,
+                        BackgroundJob.status.in_([JobStatus.RUNNING, JobStatus.CANCELLING]),
+                    )
+                    .values(status=JobStatus.CANCELLING)
+                ).rowcount
+            db.commit()
+            job = db.get(BackgroundJob, job_id) if cancelled else None
+            kind, params = (job.kind, job.params) if job is not None else (None, None)
+        finally:
+            db.close()
+
+        if cancelled:
+            self._finalize(kind, params)
+            return True
+        if not flagged:
+            return False
+
+        ctx = self._running.get(job_id)
+        if ctx is not None:
+            ctx.cancel()
+        task = self._tasks.get(job_id)
+        if task is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(task.cancel)
+        return True
+
+    async def queue_depth(self) -> int:
+        """Jobs waiting for a worker (0 while the runner is stopped)"""
+        if self.broker is None:
+            return 0
+        return await self.broker.depth()
+
+    @property
+    def running_count(self) -> int:
+        """Jobs executing in this process"""
+        return len(self._running)
+
+    # Lifecycle ---------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Start the workers and re-enqueue jobs left over by a previous run"""
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stopping = False
+        if self.broker is None:
+            self.broker = create_job_broker()
+        self._executor = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="job")
+
+        for job_id in await asyncio.to_thread(self._recover):
+            await self.broker.publish(job_id)
+
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}")
+            for i in range(self.max_concurrency)
+        ]
+        self._timers = [
+            asyncio.create_task(self._submit_periodically(kind, interval, params), name=f"job-timer-{kind}")
+            for kind, interval, params in self._periodic
+        ]
+        logger.info("Job runner started", workers=self.max_concurrency, broker=type(self.broker).__name__)
+
+    async def stop(self) -> None:
+        """Stop the workers; interrupted jobs go back to PENDING"""
+        self._stopping = True
+        for task in self._timers:
+            task.cancel()
+        await asyncio.gather(*self._timers, return_exceptions=True)
+        self._timers = []
+        for ctx in list(self._running.values()):
+            ctx.cancel()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self.broker is not None:
+            await self.broker.close()
+        self._loop = None
+        logger.info("Job runner stopped")
+
+    def _recover(self) -> List[str]:
+        """Return ids of jobs to enqueue on startup"""
+        db = self._session()
+        try:
+            if isinstance(self.broker, LocalJobBroker):
+                # Single process: anything RUNNING was interrupted by a restart
+                db.query(BackgroundJob).filter(BackgroundJob.status == JobStatus.RUNNING).update(
+                    {BackgroundJob.status: JobStatus.PENDING}, synchronize_session=False
+                )
+                interrupted = db.query(BackgroundJob.kind, BackgroundJob.params).filter(
+                    BackgroundJob.status == JobStatus.CANCELLING
+                ).all()
+                db.query(BackgroundJob).filter(BackgroundJob.status == JobStatus.CANCELLING).update(
+                    {BackgroundJob.status: JobStatus.CANCELLED, BackgroundJob.finished_at: datetime.now(timezone.utc)},
+                    synchronize_session=False,
+                )
+                db.commit()
+                for kind, params in interrupted:
+                    self._finalize(kind, params)
+            rows = db.query(BackgroundJob.id).filter(
+                BackgroundJob.status.in_([JobStatus.PENDING, JobStatus.RETRYING])
+            ).order_by(BackgroundJob.created_at).all()
+            return [row.id for row in rows]
+        finally:
+            db.close()
+
+    def _active(self, kind: str) -> bool:
+        """Whether a job of ``kind`` is queued or running (in any process)"""
+        db = self._session()
+        try:
+            return db.query(BackgroundJob.id).filter(
+                BackgroundJob.kind == kind,
+                BackgroundJob.status.in_([JobStatus.PENDING, JobStatus.RUNNING, JobStatus.RETRYING]),
+            ).first() is not None
+        finally:
+            db.close()
+
+    async def _submit_periodically(self, kind: str, interval: float, params: Dict[str, Any]) -> None:
+        while True:
+            try:
+                if not await asyncio.to_thread(self._active, kind):
+                    await self.asubmit(kind, params)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Periodic job submission failed", kind=kind, error=str(e))
+            await asyncio.sleep(interval)
+
+    # Execution -------------------------------------------------------------
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self.broker.consume()
+            try:
+                await self._execute(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Job worker error", job_id=job_id, error=str(e))
+
+    async def _execute(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self._claim, job_id)
+        if job is None:
+            return
+
+        spec = self._handlers.get(job.kind)
+        if spec is None:
+            await asyncio.to_thread(
+                self._update, job_id, status=JobStatus.FAILED,
+                error=f"Unknown job kind: {job.kind}", finished_at=datetime.now(timezone.utc),
+            )
+            return
+
+        ctx = JobContext(self, job_id, job.attempts, checkpoint=job.result)
+        self._running[job_id] = ctx
+        params = job.params or {}
+        logger.info("Job started", job_id=job_id, kind=job.kind, attempt=job.attempts)
+        try:
+            if asyncio.iscoroutinefunction(spec.handler):
+                task = asyncio.create_task(spec.handler(ctx, **params))
+                self._tasks[job_id] = task
+                result = await task
+            else:
+                result = await self._loop.run_in_executor(
+                    self._executor, functools.partial(spec.handler, ctx, **params)
+                )
+        except (JobCancelled, asyncio.CancelledError):
+            if self._stopping:
+                # Interrupted by shutdown: run again on next start
+                await asyncio.to_thread(self._update, job_id, status=JobStatus.PENDING)
+                raise asyncio.CancelledError()
+            await asyncio.to_thread(
+                self._update, job_id, status=JobStatus.CANCELLED, finished_at=datetime.now(timezone.utc)
+            )
+            await asyncio.to_thread(self._finalize, job.kind, params)
+            logger.info("Job cancelled", job_id=job_id)
+        except Exception as e:
+            await self._handle_failure(job, spec, e)
+        else:
+            await asyncio.to_thread(
+                self._update, job_id, status=JobStatus.SUCCEEDED, progress=100.0,
+                result=result, error=None, finished_at=datetime.now(timezone.utc),
+            )
+            await asyncio.to_thread(self._finalize, job.kind, params)
+            logger.info("Job succeeded", job_id=job_id, kind=job.kind)
+        finally:
+            self._running.pop(job_id, None)
+            self._tasks.pop(job_id, None)
+
+    async def _handle_failure(self, job: BackgroundJob, spec: JobSpec, error: Exception) -> None:
+        if job.attempts < job.max_attempts:
+            delay = min(spec.backoff_seconds * 2 ** (job.attempts - 1), MAX_RETRY_DELAY_SECONDS)
+            delay *= 0.5 + random.random() / 2  # jitter
+            await asyncio.to_thread(
+                self._update, job.id, status=JobStatus.RETRYING, error=str(error),
+                next_attempt_at=datetime.now(timezone.utc) + timedelta(seconds=delay),
+            )
+            self._loop.call_later(delay, lambda: self._loop.create_task(self.broker.publish(job.id)))
+            logger.warning("Job failed, retrying", job_id=job.id, attempt=job.attempts, delay=round(delay, 2), error=str(error))
+        else:
+            await asyncio.to_thread(
+                self._update, job.id, status=JobStatus.FAILED, error=str(error),
+                finished_at=datetime.now(timezone.utc),
+            )
+            await asyncio.to_thread(self._finalize, job.kind, job.params)
+            logger.error("Job failed", job_id=job.id, kind=job.kind, attempts=job.attempts, error=str(error))
+
+
+# Global job runner instance
+job_runner = JobRunner(
+    max_concurrency=settings.JOB_MAX_CONCURRENCY,
+    thread_workers=settings.JOB_THREAD_WORKERS,
+)
@@ -0,0 +1,177 @@
+"""
+QR label rendering with an on-disk cache
+
+Each QR image is stored once under ``UPLOAD_PATH/etiquetas`` and named by the
+SHA-256 of its payload, so re-printing a label never renders it again and the
+``ativos`` row only keeps a short reference (``etiquetas/<hash>.png``).
+Missing images of a batch are rendered in parallel on a process pool.
+Batches generated in background are written to ``etiquetas/lotes`` for
+download and removed by ``expire_label_batches``.
+Requires ``qrcode[pil]``.
+"""
+
+import io
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+LABEL_CACHE_DIR = Path(settings.UPLOAD_PATH) / "etiquetas"
+LABEL_BATCH_DIR = LABEL_CACHE_DIR / "lotes"
+
+# Below this number of missing images rendering happens inline (pool startup
+# costs more than the work itself)
+PROCESS_POOL_THRESHOLD = 16
+
+# Sheet layout (A4 at 150 dpi)
+PAGE_SIZE = (1240, 1754)
+PAGE_MARGIN = 60
+
+
+def qr_payload(ativo_id: int, codigo: str, patrimonio: Optional[str]) -> Dict[str, Any]:
+    """QR content for an asset"""
+    return {
+        "id": ativo_id,
+        "codigo": codigo,
+        "patrimonio": patrimonio,
+        "tipo": "ativo_levitiis",
+    }
+
+
+def payload_hash(payload: Dict[str, Any]) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def label_reference(digest: str) -> str:
+    """Short reference stored on the asset row"""
+    return f"etiquetas/{digest}.png"
+
+
+def label_path(digest: str, cache_dir: Path = LABEL_CACHE_DIR) -> Path:
+    return cache_dir / f"{digest}.png"
+
+
+def render_qr_png(data: str) -> bytes:
+    import qrcode
+
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _render_to_cache(item: Tuple[str, str, str]) -> str:
+    """Render one payload into the cache (top-level so it can run in a worker process)"""
+    digest, data, cache_dir = item
+    path = label_path(digest, Path(cache_dir))
+    if not path.exists():
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(render_qr_png(data))
+        os.replace(tmp, path)
+    return str(path)
+
+
+def render_labels(
+    payloads: Sequence[Dict[str, Any]],
+    max_workers: Optional[int] = None,
+    cache_dir: Path = LABEL_CACHE_DIR,
+) -> List[Tuple[Dict[str, Any], str, Path]]:
+    """
+    Ensure every payload has a cached PNG.
+
+    Returns ``(payload, digest, path)`` in input order.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    labels = []
+    missing = []
+    for payload in payloads:
+        digest = payload_hash(payload)
+        path = label_path(digest, cache_dir)
+        labels.append((payload, digest, path))
+        if not path.exists():
+            # The encoded text is the payload repr, as printed on existing labels
+            missing.append((digest, str(payload), str(cache_dir)))
+
+    if len(missing) >= PROCESS_POOL_THRESHOLD:
+        workers = max_workers or min(os.cpu_count() or 1, 8)
+        # forkserver: the caller may be a threaded server or job runner
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver")) as pool:
+            list(pool.map(_render_to_cache, missing, chunksize=max(1, len(missing) // (workers * 4))))
+    else:
+        for item in missing:
+            _render_to_cache(item)
+    return labels
+
+
+def expire_label_batches(max_age_seconds: float, batch_dir: Path = LABEL_BATCH_DIR) -> int:
+    """Delete batch files older than ``max_age_seconds``; return how many were removed"""
+    if not batch_dir.is_dir():
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for path in batch_dir.iterdir():
+        try:
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+def build_label_zip(labels: Sequence[Tuple[Dict[str, Any], str, Path]]) -> bytes:
+    """ZIP with one PNG per asset, named by asset code"""
+    buffer = io.BytesIO()
+    # PNGs are already compressed
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for payload, _digest, path in labels:
+            zf.write(path, arcname=f"{payload['codigo']}.png")
+    return buffer.getvalue()
+
+
+def build_label_pdf(
+    labels: Sequence[Tuple[Dict[str, Any], str, Path]],
+    columns: int = 3,
+    rows: int = 7,
+) -> bytes:
+    """
+    Printable PDF: a ``columns`` x ``rows`` grid of labels per page.
+
+    Pages are 1-bit images (QR codes are black and white), which keeps a
+    several-hundred-page sheet within a few dozen MB while it is assembled.
+    """
+    from PIL import Image, ImageDraw
+
+    width, height = PAGE_SIZE
+    cell_w = (width - 2 * PAGE_MARGIN) // columns
+    cell_h = (height - 2 * PAGE_MARGIN) // rows
+    text_h = 30
+    qr_side = max(1, min(cell_w, cell_h - text_h) - 10)
+    per_page = columns * rows
+
+    pages = []
+    for start in range(0, max(len(labels), 1), per_page):
+        page = Image.new("1", PAGE_SIZE, 1)
+        draw = ImageDraw.Draw(page)
+        for index, (payload, _digest, path) in enumerate(labels[start:start + per_page]):
+            x = PAGE_MARGIN + (index % columns) * cell_w
+            y = PAGE_MARGIN + (index // columns) * cell_h
+            with Image.open(path) as qr:
+                page.paste(qr.convert("1").resize((qr_side, qr_side)), (x + (cell_w - qr_side) // 2, y))
+            draw.text((x + 10, y + qr_side + 4), str(payload["codigo"]), fill=0)
+        pages.append(page)
+
+    buffer = io.BytesIO()
+    pages[0].save(buffer, format="PDF", save_all=True, append_images=pages[1:], resolution=150.0)
+    return buffer.getvalue()
@@ -0,0 +1,358 @@
+"""
+Maintenance analytics computed in the database
+
+MTTR, MTBF, SLA compliance and cost trends are SQL aggregates; no order is
+loaded into Python. Repair time is ``data_abertura -> data_resolucao`` (as in
+``Manutencao.tempo_resolucao_horas``); failures are corrective orders.
+
+Percentiles (p50/p90 of the repair time) use ``percentile_cont ... WITHIN
+GROUP`` and are only available on PostgreSQL; other dialects report ``None``.
+
+Daily figures per asset category and maintenance type are rolled up into
+``manutencao_resumos_diarios``. ``refresh_daily_summaries`` rebuilds only the
+distinct days (opening or resolution) of orders created or updated since the
+last refresh (with a ``REFRESH_OVERLAP`` safety margin), aggregated over runs
+of consecutive days; it is run periodically by the
+``manutencao.atualizar_resumos`` job.
+
+Usage::
+
+    resultado = refresh_daily_summaries(db)
+    db.commit()
+    serie = summary_series(db, date(2026, 1, 1), date(2026, 1, 31))
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Date, and_, case, delete, func, insert, null, or_, select, union
+from sqlalchemy.orm import Session
+from app.models.asset import Ativo
+from app.models.manutencao import Manutencao, ManutencaoResumoDiario, TipoManutencao
+
+# Category of orders whose asset has none
+UNCATEGORISED = "sem_categoria"
+
+# Changes recorded shortly before the last refresh are rolled up again
+# (application and database clocks may differ)
+REFRESH_OVERLAP = timedelta(days=1)
+
+# Runs of consecutive days aggregated per query (one OR branch each)
+RUNS_PER_QUERY = 100
+
+_CANCELLED_STATUSES = ("cancelado", "cancelada")
+
+
+def supports_percentiles(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def minutes_between(db: Session, start, end):
+    """SQL expression: minutes from ``start`` to ``end``"""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.extract("epoch", end - start) / 60.0
+    return (func.julianday(end) - func.julianday(start)) * 1440.0
+
+
+def repair_minutes(db: Session):
+    """SQL expression: repair time of an order, in minutes"""
+    return minutes_between(db, Manutencao.data_abertura, Manutencao.data_resolucao)
+
+
+def _percentile(db: Session, fraction: float, expression):
+    if supports_percentiles(db):
+        return func.percentile_cont(fraction).within_group(expression)
+    return null()
+
+
+def _day(column):
+    return func.date(column, type_=Date)
+
+
+def _day_range(first: date, last: date) -> Tuple[datetime, datetime]:
+    return datetime.combine(first, time.min), datetime.combine(last + timedelta(days=1), time.min)
+
+
+_resolved = and_(Manutencao.data_resolucao.isnot(None), Manutencao.status.notin_(_CANCELLED_STATUSES))
+
+# Resolved orders that met their SLA: no breach flagged and resolved by the
+# deadline (orders closed while the scheduler was not running are never flagged)
+sla_met = and_(
+    Manutencao.sla_violado_em.is_(None),
+    or_(Manutencao.sla_vence_em.is_(None), Manutencao.data_resolucao <= Manutencao.sla_vence_em),
+)
+
+
+# Rollup ---------------------------------------------------------------------
+
+def refresh_daily_summaries(db: Session, full: bool = False) -> Dict[str, Any]:
+    """
+    Rebuild the daily rollup of the days affected since the last refresh
+    (every day when ``full`` or on the first run). The caller commits.
+    """
+    calculated_at = db.scalar(select(func.now()))
+    watermark = None if full else db.scalar(select(func.max(ManutencaoResumoDiario.calculado_em)))
+
+    opened = select(_day(Manutencao.data_abertura).label("dia")).where(Manutencao.data_abertura.isnot(None))
+    resolved = select(_day(Manutencao.data_resolucao).label("dia")).where(Manutencao.data_resolucao.isnot(None))
+    if watermark is not None:
+        since = watermark - REFRESH_OVERLAP
+        changed = or_(Manutencao.criado_em >= since, Manutencao.atualizado_em >= since)
+        opened, resolved = opened.where(changed), resolved.where(changed)
+    days = sorted(db.scalars(select(union(opened, resolved).subquery().c.dia)))
+    if watermark is None:
+        # Every day is rebuilt: days whose orders were deleted go as well
+        db.execute(delete(ManutencaoResumoDiario))
+    if not days:
+        return {"inicio": None, "fim": None, "dias": 0, "linhas": 0}
+
+    runs = _day_runs(days)
+    total = 0
+    for start in range(0, len(runs), RUNS_PER_QUERY):
+        chunk = runs[start:start + RUNS_PER_QUERY]
+        rows = _daily_rows(db, chunk)
+        if watermark is not None:
+            db.execute(delete(ManutencaoResumoDiario).where(
+                or_(*[ManutencaoResumoDiario.dia.between(first, last) for first, last in chunk])
+            ))
+        if rows:
+            for row in rows:
+                row["calculado_em"] = calculated_at
+            db.execute(insert(ManutencaoResumoDiario), rows)
+        total += len(rows)
+    return {"inicio": days[0].isoformat(), "fim": days[-1].isoformat(), "dias": len(days), "linhas": total}
+
+
+def _day_runs(days: List[date]) -> List[Tuple[date, date]]:
+    """Sorted distinct days grouped into ``(first, last)`` runs of consecutive days"""
+    runs: List[List[date]] = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [(first, last) for first, last in runs]
+
+
+def _daily_rows(db: Session, runs: List[Tuple[date, date]]) -> list:
+    """Daily aggregates of the ``(first, last)`` day runs per category and type"""
+    ranges = [_day_range(first, last) for first, last in runs]
+
+    def in_runs(column):
+        return or_(*[and_(column >= start, column < end) for start, end in ranges])
+
+    categoria = func.coalesce(Ativo.categoria, UNCATEGORISED)
+    rows: Dict[Tuple[date, str, str], Dict[str, Any]] = {}
+
+    def row_for(dia, cat, tipo) -> Dict[str, Any]:
+        return rows.setdefault((dia, cat, tipo), {
+            "dia": dia, "categoria": cat, "tipo": tipo,
+            "abertas": 0, "resolvidas": 0, "minutos_reparo_total": 0.0,
+            "reparo_p50_minutos": None, "reparo_p90_minutos": None,
+            "sla_avaliadas": 0, "sla_cumpridas": 0, "custo_total": 0,
+        })
+
+    dia = _day(Manutencao.data_abertura)
+    for row in db.execute(
+        select(dia, categoria, Manutencao.tipo, func.count(Manutencao.id))
+        .join(Ativo, Ativo.id == Manutencao.ativo_id)
+        .where(in_runs(Manutencao.data_abertura))
+        .group_by(dia, categoria, Manutencao.tipo)
+    ):
+        row_for(row[0], row[1], row[2])["abertas"] = row[3]
+
+    dia = _day(Manutencao.data_resolucao)
+    minutos = repair_minutes(db)
+    for row in db.execute(
+        select(
+            dia, categoria, Manutencao.tipo,
+            func.count(Manutencao.id),
+            func.coalesce(func.sum(minutos), 0),
+            _percentile(db, 0.5, minutos),
+            _percentile(db, 0.9, minutos),
+            func.count(Manutencao.sla_horas),
+            func.coalesce(func.sum(case((and_(Manutencao.sla_horas.isnot(None), sla_met), 1), else_=0)), 0),
+            func.coalesce(func.sum(Manutencao.custo_real), 0),
+        )
+        .join(Ativo, Ativo.id == Manutencao.ativo_id)
+        .where(_resolved, in_runs(Manutencao.data_resolucao))
+        .group_by(dia, categoria, Manutencao.tipo)
+    ):
+        row_for(row[0], row[1], row[2]).update(
+            resolvidas=row[3], minutos_reparo_total=float(row[4]),
+            reparo_p50_minutos=row[5], reparo_p90_minutos=row[6],
+            sla_avaliadas=row[7], sla_cumpridas=row[8], custo_total=row[9],
+        )
+    return list(rows.values())
+
+
+# Reports --------------------------------------------------------------------
+
+def _summary_totals(row) -> Dict[str, Any]:
+    return {
+        "abertas": int(row.abertas or 0),
+        "resolvidas": int(row.resolvidas or 0),
+        "mttr_horas": round(row.minutos / row.resolvidas / 60, 2) if row.resolvidas else None,
+        "percentual_sla_cumprido": round(row.sla_cumpridas * 100 / row.sla_avaliadas, 2) if row.sla_avaliadas else None,
+        "custo_total": float(row.custo or 0),
+    }
+
+
+def summary_series(
+    db: Session,
+    first: date,
+    last: date,
+    categoria: Optional[str] = None,
+    tipo: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Daily series and totals of ``[first, last]`` read from the rollup"""
+    R = ManutencaoResumoDiario
+    filters = [R.dia.between(first, last)]
+    if categoria:
+        filters.append(R.categoria == categoria)
+    if tipo:
+        filters.append(R.tipo == tipo)
+    measures = (
+        func.sum(R.abertas).label("abertas"),
+        func.sum(R.resolvidas).label("resolvidas"),
+        func.sum(R.minutos_reparo_total).label("minutos"),
+        func.sum(R.sla_avaliadas).label("sla_avaliadas"),
+        func.sum(R.sla_cumpridas).label("sla_cumpridas"),
+        func.sum(R.custo_total).label("custo"),
+    )
+    # Stored daily percentiles only describe a single category and type
+    single_group = bool(categoria and tipo)
+
+    serie = []
+    for row in db.execute(
+        select(
+            R.dia, *measures,
+            (func.max(R.reparo_p50_minutos) if single_group else null()).label("p50"),
+            (func.max(R.reparo_p90_minutos) if single_group else null()).label("p90"),
+        )
+        .where(*filters)
+        .group_by(R.dia)
+        .order_by(R.dia)
+    ):
+        serie.append({
+            "dia": row.dia.isoformat(),
+            **_summary_totals(row),
+            "reparo_p50_horas": round(row.p50 / 60, 2) if row.p50 is not None else None,
+            "reparo_p90_horas": round(row.p90 / 60, 2) if row.p90 is not None else None,
+        })
+
+    totais = _summary_totals(db.execute(select(*measures).where(*filters)).one())
+    totais.update(repair_percentiles(db, first, last, categoria, tipo))
+    return {
+        "inicio": first.isoformat(),
+        "fim": last.isoformat(),
+        "calculado_em": db.scalar(select(func.max(R.calculado_em))),
+        "totais": totais,
+        "serie": serie,
+    }
+
+
+def repair_percentiles(
+    db: Session,
+    first: date,
+    last: date,
+    categoria: Optional[str] = None,
+    tipo: Optional[str] = None,
+) -> Dict[str, Optional[float]]:
+    """p50/p90 of the repair time of orders resolved in ``[first, last]``"""
+    if not supports_percentiles(db):
+        return {"reparo_p50_horas": None, "reparo_p90_horas": None}
+    start, end = _day_range(first, last)
+    minutos = repair_minutes(db)
+    query = (
+        select(_percentile(db, 0.5, minutos), _percentile(db, 0.9, minutos))
+        .where(_resolved, Manutencao.data_resolucao >= start, Manutencao.data_resolucao < end)
+    )
+    if categoria:
+        query = query.join(Ativo, Ativo.id == Manutencao.ativo_id).where(
+            func.coalesce(Ativo.categoria, UNCATEGORISED) == categoria
+        )
+    if tipo:
+        query = query.where(Manutencao.tipo == tipo)
+    p50, p90 = db.execute(query).one()
+    return {
+        "reparo_p50_horas": round(p50 / 60, 2) if p50 is not None else None,
+        "reparo_p90_horas": round(p90 / 60, 2) if p90 is not None else None,
+    }
+
+
+def mtbf(
+    db: Session,
+    group_by: str = "ativo",
+    first: Optional[date] = None,
+    last: Optional[date] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> Dict[str, Any]:
+    """
+    Mean time between failures per asset or per asset category.
+
+    An asset with ``n`` failures spread over ``t`` hours has an MTBF of
+    ``t / (n - 1)``; a category sums both terms over its assets. The MTTR
+    of a category is its total repair time over its resolved orders.
+    """
+    filters = [Manutencao.tipo == TipoManutencao.CORRETIVA.value]
+    if first:
+        filters.append(Manutencao.data_abertura >= _day_range(first, first)[0])
+    if last:
+        filters.append(Manutencao.data_abertura < _day_range(last, last)[1])
+
+    per_asset = (
+        select(
+            Manutencao.ativo_id,
+            func.count(Manutencao.id).label("falhas"),
+            minutes_between(db, func.min(Manutencao.data_abertura), func.max(Manutencao.data_abertura)).label("intervalo"),
+            func.avg(case((_resolved, repair_minutes(db)))).label("mttr"),
+            func.count(case((_resolved, 1))).label("reparadas"),
+            func.sum(case((_resolved, repair_minutes(db)))).label("minutos_reparo"),
+            func.min(Manutencao.data_abertura).label("primeira_falha"),
+            func.max(Manutencao.data_abertura).label("ultima_falha"),
+        )
+        .where(*filters)
+        .group_by(Manutencao.ativo_id)
+        .subquery()
+    )
+
+    if group_by == "categoria":
+        categoria = func.coalesce(Ativo.categoria, UNCATEGORISED)
+        intervalos = func.sum(case((per_asset.c.falhas > 1, per_asset.c.intervalo), else_=0))
+        query = (
+            select(
+                categoria.label("categoria"),
+                func.count().label("ativos"),
+                func.sum(per_asset.c.falhas).label("falhas"),
+                (intervalos / func.nullif(func.sum(per_asset.c.falhas - 1), 0)).label("mtbf"),
+                # Repair minutes over repaired orders, not each asset's mean weighted by its failures
+                (func.sum(per_asset.c.minutos_reparo) / func.nullif(func.sum(per_asset.c.reparadas), 0)).label("mttr"),
+            )
+            .join(Ativo, Ativo.id == per_asset.c.ativo_id)
+            .group_by(categoria)
+            .order_by(categoria)
+        )
+    else:
+        query = (
+            select(
+                per_asset.c.ativo_id, Ativo.codigo.label("ativo_codigo"), Ativo.categoria,
+                per_asset.c.falhas,
+                (per_asset.c.intervalo / func.nullif(per_asset.c.falhas - 1, 0)).label("mtbf"),
+                per_asset.c.mttr, per_asset.c.primeira_falha, per_asset.c.ultima_falha,
+            )
+            .join(Ativo, Ativo.id == per_asset.c.ativo_id)
+            .order_by(per_asset.c.falhas.desc(), per_asset.c.ativo_id)
+        )
+
+    total = db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+    itens = []
+    for row in db.execute(query.offset(skip).limit(limit)).mappings():
+        item = dict(row)
+        for key in ("mtbf", "mttr"):
+            minutos = item.pop(key)
+            item[f"{key}_horas"] = round(float(minutos) / 60, 2) if minutos is not None else None
+        item["falhas"] = int(item["falhas"])
+        itens.append(item)
+    return {"total": total, "skip": skip, "limit": limit, "itens": itens}
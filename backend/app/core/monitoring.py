@@ -1,18 +1,26 @@
 """
 Performance monitoring and metrics collection
+
+Request metrics are recorded without a lock into per-thread shards: one
+log-bucketed latency histogram per endpoint (percentiles) and a ring of
+per-minute totals (request rates over the last 24 hours). Readers merge
+the shards.
 """
 
 import time
-import psutil
 import threading
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from collections import defaultdict, deque
+from contextvars import ContextVar
 from functools import wraps
 import structlog
 from dataclasses import dataclass, asdict
 import json
 
+from app.core.histogram import LatencyHistogram
+from app.core.system_metrics import system_sampler
+
 logger = structlog.get_logger()
 
 
@@ -39,42 +47,166 @@ class SystemMetric:
     active_connections: int
 
 
+# Request counts are kept per minute for the last 24 hours
+WINDOW_SLOTS = 1440
+
+# Endpoint label of requests that did not reach a route (404, rejected by a middleware)
+UNMATCHED_ENDPOINT = "unmatched"
+
+# ASGI scope of the request being handled, set by the request pipeline, so
+# code running below an endpoint (SQLAlchemy events) can tell its route
+current_request: ContextVar[Optional[dict]] = ContextVar("current_request", default=None)
+
+
+def endpoint_label(scope) -> str:
+    """
+    Route template of the request ("/api/v1/ativos/{ativo_id}"), so metrics
+    are kept per route and not per raw path
+    """
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ENDPOINT)
+
+
+def current_route() -> Optional[str]:
+    """"METHOD /route/template" of the request being handled (None outside requests)"""
+    scope = current_request.get()
+    if scope is None:
+        return None
+    return f"{scope['method']} {endpoint_label(scope)}"
+
+
+class EndpointHistogram(LatencyHistogram):
+    """Latency histogram of one endpoint, with its error count"""
+
+    __slots__ = ('errors',)
+
+    def __init__(self):
+        super().__init__()
+        self.errors = 0
+
+
+class MetricsShard:
+    """
+    Request metrics recorded by one thread
+
+    Only the owning thread writes to a shard, so recording takes no lock;
+    readers merge every shard.
+    """
+
+    __slots__ = ('endpoints', 'status_counts', 'window', 'current')
+
+    def __init__(self):
+        self.endpoints: Dict[str, Dict[str, EndpointHistogram]] = {}  # method -> endpoint -> histogram
+        self.status_counts: Dict[int, int] = {}
+        # Ring of per-minute totals [minute, requests, response time, errors],
+        # slot = minute % WINDOW_SLOTS; ``current`` is the slot being filled
+        self.window = [[-1, 0, 0.0, 0] for _ in range(WINDOW_SLOTS)]
+        self.current = self.window[0]
+
+    def rotate(self, minute: int) -> list:
+        current = self.window[minute % WINDOW_SLOTS]
+        current[1:] = 0, 0.0, 0
+        current[0] = minute
+        self.current = current
+        return current
+
+
 class MetricsCollector:
     """Collect and store performance metrics"""
     
-    def __init__(self, max_metrics: int = 10000):
-        self.max_metrics = max_metrics
-        self.request_metrics: deque = deque(maxlen=max_metrics)
+    def __init__(self):
         self.system_metrics: deque = deque(maxlen=1000)  # Keep last 1000 system metrics
-        self.error_counts = defaultdict(int)
-        self.endpoint_stats = defaultdict(lambda: {
-            'count': 0,
-            'total_time': 0.0,
-            'min_time': float('inf'),
-            'max_time': 0.0,
-            'error_count': 0
-        })
+        self._last_system_sample: Optional[datetime] = None
         self.active_requests = 0
-        self.total_requests = 0
         self.start_time = datetime.utcnow()
         self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards: List[MetricsShard] = []
+        self.counters: Dict[str, int] = defaultdict(int)
+        # Cache name -> callable returning (hits, misses)
+        self._caches: Dict[str, Callable[[], Tuple[int, int]]] = {}
+    
+    def _create_shard(self) -> MetricsShard:
+        shard = self._local.shard = MetricsShard()
+        with self._lock:
+            self._shards.append(shard)
+        return shard
+    
+    def record(self, endpoint: str, method: str, status_code: int, response_time: float):
+        """Record one request (no lock, no per-request objects kept)"""
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._create_shard()
+        
+        by_method = shard.endpoints.get(method)
+        if by_method is None:
+            by_method = shard.endpoints[method] = {}
+        histogram = by_method.get(endpoint)
+        if histogram is None:
+            histogram = by_method[endpoint] = EndpointHistogram()
+        histogram.record(response_time)
+        
+        current = shard.current
+        minute = int(time.time() / 60)
+        if current[0] != minute:
+            current = shard.rotate(minute)
+        current[1] += 1
+        current[2] += response_time
+        
+        if status_code >= 400:
+            histogram.errors += 1
+            current[3] += 1
+            shard.status_counts[status_code] = shard.status_counts.get(status_code, 0) + 1
+    
+    def increment(self, name: str, amount: int = 1):
+        """Increment an event counter (e.g. "machine_heartbeats")"""
+        self.counters[name] += amount
+    
+    def register_cache(self, name: str, stats: Callable[[], Tuple[int, int]]):
+        """Report the hits and misses of a cache (e.g. ``lambda: func.cache_info()[:2]``)"""
+        self._caches[name] = stats
+    
+    def get_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hits, misses and hit ratio of the registered caches"""
+        stats = {}
+        for name, cache_stats in list(self._caches.items()):
+            hits, misses = cache_stats()
+            lookups = hits + misses
+            stats[name] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': round(hits / lookups, 4) if lookups else 0.0
+            }
+        return stats
     
     def add_request_metric(self, metric: RequestMetric):
         """Add a request metric"""
-        with self._lock:
-            self.request_metrics.append(metric)
-            self.total_requests += 1
-            
-            # Update endpoint statistics
-            stats = self.endpoint_stats[f"{metric.method} {metric.endpoint}"]
-            stats['count'] += 1
-            stats['total_time'] += metric.response_time
-            stats['min_time'] = min(stats['min_time'], metric.response_time)
-            stats['max_time'] = max(stats['max_time'], metric.response_time)
-            
-            if metric.status_code >= 400:
-                stats['error_count'] += 1
-                self.error_counts[metric.status_code] += 1
+        self.record(metric.endpoint, metric.method, metric.status_code, metric.response_time)
+    
+    @property
+    def total_requests(self) -> int:
+        return sum(
+            histogram.count
+            for shard in list(self._shards)
+            for by_method in list(shard.endpoints.values())
+            for histogram in list(by_method.values())
+        )
+    
+    def endpoint_histograms(self) -> Dict[str, EndpointHistogram]:
+        """Histogram of every endpoint ("METHOD path"), merged across shards"""
+        parts: Dict[str, List[EndpointHistogram]] = defaultdict(list)
+        for shard in list(self._shards):
+            for method, by_method in list(shard.endpoints.items()):
+                for endpoint, histogram in list(by_method.items()):
+                    parts[f"{method} {endpoint}"].append(histogram)
+        
+        merged = {}
+        for key, histograms in parts.items():
+            histogram = EndpointHistogram.merged(histograms)
+            histogram.errors = sum(h.errors for h in histograms)
+            merged[key] = histogram
+        return merged
     
     def add_system_metric(self, metric: SystemMetric):
         """Add a system metric"""
@@ -83,85 +215,80 @@ class MetricsCollector:
     
     def get_request_stats(self, minutes: int = 60) -> Dict[str, Any]:
         """Get request statistics for the last N minutes"""
-        cutoff_time = datetime.utcnow() - timedelta(minutes=minutes)
+        minutes = max(1, min(minutes, WINDOW_SLOTS))
+        first_minute = int(time.time() / 60) - minutes + 1
         
-        with self._lock:
-            recent_metrics = [
-                m for m in self.request_metrics 
-                if m.timestamp >= cutoff_time
-            ]
-            
-            if not recent_metrics:
-                return {
-                    'total_requests': 0,
-                    'avg_response_time': 0,
-                    'error_rate': 0,
-                    'requests_per_minute': 0
-                }
-            
-            total_requests = len(recent_metrics)
-            avg_response_time = sum(m.response_time for m in recent_metrics) / total_requests
-            error_count = sum(1 for m in recent_metrics if m.status_code >= 400)
-            error_rate = (error_count / total_requests) * 100
-            requests_per_minute = total_requests / minutes
-            
+        total_requests = 0
+        total_time = 0.0
+        error_count = 0
+        for shard in list(self._shards):
+            for minute, count, response_time, errors in list(shard.window):
+                if minute >= first_minute:
+                    total_requests += count
+                    total_time += response_time
+                    error_count += errors
+        
+        if not total_requests:
             return {
-                'total_requests': total_requests,
-                'avg_response_time': round(avg_response_time, 3),
-                'error_rate': round(error_rate, 2),
-                'requests_per_minute': round(requests_per_minute, 2),
-                'error_count': error_count
+                'total_requests': 0,
+                'avg_response_time': 0,
+                'error_rate': 0,
+                'requests_per_minute': 0
             }
+        
+        return {
+            'total_requests': total_requests,
+            'avg_response_time': round(total_time / total_requests, 3),
+            'error_rate': round((error_count / total_requests) * 100, 2),
+            'requests_per_minute': round(total_requests / minutes, 2),
+            'error_count': error_count
+        }
     
     def get_endpoint_stats(self) -> Dict[str, Any]:
         """Get statistics by endpoint"""
-        with self._lock:
-            stats = {}
-            for endpoint, data in self.endpoint_stats.items():
-                if data['count'] > 0:
-                    avg_time = data['total_time'] / data['count']
-                    error_rate = (data['error_count'] / data['count']) * 100
-                    
-                    stats[endpoint] = {
-                        'count': data['count'],
-                        'avg_response_time': round(avg_time, 3),
-                        'min_response_time': round(data['min_time'], 3),
-                        'max_response_time': round(data['max_time'], 3),
-                        'error_rate': round(error_rate, 2),
-                        'error_count': data['error_count']
-                    }
-            
-            return stats
+        stats = {}
+        for endpoint, histogram in self.endpoint_histograms().items():
+            if histogram.count > 0:
+                stats[endpoint] = {
+                    'count': histogram.count,
+                    'avg_response_time': round(histogram.mean, 3),
+                    'min_response_time': round(histogram.min, 3),
+                    'max_response_time': round(histogram.max, 3),
+                    'p50_response_time': round(histogram.percentile(50), 3),
+                    'p95_response_time': round(histogram.percentile(95), 3),
+                    'p99_response_time': round(histogram.percentile(99), 3),
+                    'error_rate': round((histogram.errors / histogram.count) * 100, 2),
+                    'error_count': histogram.errors
+                }
+        
+        return stats
     
     def get_system_stats(self) -> Dict[str, Any]:
-        """Get current system statistics"""
+        """Get current system statistics (latest sample of the system metrics sampler)"""
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
+            snapshot = system_sampler.snapshot
+            cpu, memory, disk, network = (snapshot['cpu'], snapshot['memory'], snapshot['disk'], snapshot['network'])
             
-            # Get network connections (approximate active connections)
-            connections = len(psutil.net_connections(kind='inet'))
-            
-            current_metric = SystemMetric(
-                timestamp=datetime.utcnow(),
-                cpu_percent=cpu_percent,
-                memory_percent=memory.percent,
-                memory_used_mb=memory.used / (1024 * 1024),
-                disk_usage_percent=disk.percent,
-                active_connections=connections
-            )
-            
-            self.add_system_metric(current_metric)
+            if snapshot['sampled_at'] != self._last_system_sample:
+                self._last_system_sample = snapshot['sampled_at']
+                self.add_system_metric(SystemMetric(
+                    timestamp=snapshot['sampled_at'],
+                    cpu_percent=cpu['usage_percent'],
+                    memory_percent=memory['usage_percent'],
+                    memory_used_mb=memory['used_mb'],
+                    disk_usage_percent=disk['usage_percent'],
+                    active_connections=network.get('inet_connections_count', 0)
+                ))
             
             return {
-                'cpu_percent': cpu_percent,
-                'memory_percent': memory.percent,
-                'memory_used_mb': round(memory.used / (1024 * 1024), 2),
-                'memory_available_mb': round(memory.available / (1024 * 1024), 2),
-                'disk_usage_percent': disk.percent,
-                'active_connections': connections,
-                'uptime_seconds': (datetime.utcnow() - self.start_time).total_seconds()
+                'cpu_percent': cpu['usage_percent'],
+                'memory_percent': memory['usage_percent'],
+                'memory_used_mb': memory['used_mb'],
+                'memory_available_mb': memory['available_mb'],
+                'disk_usage_percent': disk['usage_percent'],
+                'active_connections': network.get('inet_connections_count', 0),
+                'uptime_seconds': (datetime.utcnow() - self.start_time).total_seconds(),
+                'sampled_at': snapshot['sampled_at'].isoformat()
             }
             
         except Exception as e:
@@ -170,8 +297,11 @@ class MetricsCollector:
     
     def get_error_summary(self) -> Dict[str, int]:
         """Get error count summary"""
-        with self._lock:
-            return dict(self.error_counts)
+        summary: Dict[int, int] = defaultdict(int)
+        for shard in list(self._shards):
+            for status_code, count in list(shard.status_counts.items()):
+                summary[status_code] += count
+        return dict(summary)
     
     def get_health_status(self) -> Dict[str, Any]:
         """Get overall health status"""
@@ -338,11 +468,13 @@ class PerformanceLogger:
         self.interval = interval
         self.running = False
         self.thread = None
+        self._stop = threading.Event()
     
     def start(self):
         """Start performance logging"""
         if not self.running:
             self.running = True
+            self._stop.clear()
             self.thread = threading.Thread(target=self._log_loop, daemon=True)
             self.thread.start()
             logger.info("Performance logging started")
@@ -350,6 +482,7 @@ class PerformanceLogger:
     def stop(self):
         """Stop performance logging"""
         self.running = False
+        self._stop.set()
         if self.thread:
             self.thread.join()
         logger.info("Performance logging stopped")
@@ -387,7 +520,7 @@ class PerformanceLogger:
             except Exception as e:
                 logger.error(f"Performance logging error: {e}")
             
-            time.sleep(self.interval)
+            self._stop.wait(self.interval)
 
 
 # Global performance logger
@@ -396,12 +529,14 @@ performance_logger = PerformanceLogger()
 
 def start_monitoring():
     """Start performance monitoring"""
+    system_sampler.start()
     performance_logger.start()
 
 
 def stop_monitoring():
     """Stop performance monitoring"""
     performance_logger.stop()
+    system_sampler.stop()
 
 
 def get_metrics_summary() -> Dict[str, Any]:
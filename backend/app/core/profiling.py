@@ -0,0 +1,426 @@
+"""
+Opt-in per-request profiling
+
+A profiled request (one in ``PROFILING_SAMPLE_RATE``, or any request an admin
+sends with the ``PROFILING_HEADER`` header) gets two kinds of data:
+
+- stack samples: a daemon thread wakes every ``PROFILING_INTERVAL_MS`` and
+  records the stack of the request's task. When the task is running, that is
+  the event loop thread's stack from the task's coroutine down; when it is
+  suspended, the chain of awaiting coroutines with an ``[await]`` leaf. The
+  samples are wall-clock: time spent waiting on the database or Redis shows
+  up as ``[await]`` stacks under the awaiting function. Sync (``def``)
+  endpoints run in the threadpool: while one runs, the worker thread's stack
+  from the endpoint down is appended to the task's await chain instead.
+- spans: timings of DB statements, Redis commands, response rendering and
+  middleware stages, recorded by hooks that read the current profile from a
+  context variable.
+
+Both are aggregated per route template: collapsed stacks (the
+``frame;frame;frame count`` format of flamegraph.pl / speedscope) and span
+count/total/max per (kind, name).
+
+With profiling disabled, the pipeline does one attribute check per request
+and the span hooks one context variable lookup; the sampler thread only runs
+while a profiled request is in flight.
+"""
+
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.security import verify_token
+
+logger = structlog.get_logger()
+
+MAX_STACK_DEPTH = 64
+OTHER_STACKS = "[other]"
+AWAIT_FRAME = "[await]"
+
+_TABLE_PATTERN = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+"?(\w+)', re.IGNORECASE)
+
+_BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep
+_frame_labels: Dict[Any, str] = {}
+
+
+def _frame_label(code) -> str:
+    label = _frame_labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(_BACKEND_ROOT):
+            filename = filename[len(_BACKEND_ROOT):]
+        elif "site-packages" + os.sep in filename:
+            filename = filename.split("site-packages" + os.sep, 1)[1]
+        else:
+            filename = os.path.basename(filename)
+        label = f"{code.co_qualname} ({filename})"
+        _frame_labels[code] = label
+    return label
+
+
+class RequestProfile:
+    """Samples and spans of one profiled request"""
+
+    __slots__ = ('task', 'thread_id', 'worker', 'stacks', 'spans', 'started')
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.thread_id = threading.get_ident()
+        # (thread ident, endpoint code) while a sync endpoint runs in the threadpool
+        self.worker: Optional[Tuple[int, Any]] = None
+        self.stacks: Counter = Counter()
+        self.spans: List[Tuple[str, str, float]] = []
+        self.started = time.perf_counter()
+
+    def add_span(self, kind: str, name: str, duration: float) -> None:
+        self.spans.append((kind, name, duration))
+
+    def sample(self, frames: Dict[int, Any]) -> None:
+        """Record the task's current stack (called from the sampler thread)"""
+        coro = self.task.get_coro()
+        root = getattr(coro, "cr_frame", None)
+        if root is None:
+            return  # task finished
+
+        labels = []
+        # cr_running holds for the task's outer coroutine while any coroutine
+        # it awaits is executing, i.e. while the task is the loop's current task
+        if coro.cr_running:
+            frame = frames.get(self.thread_id)
+            while frame is not root:
+                if frame is None:
+                    return  # the task was switched out while we walked
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(_frame_label(root.f_code))
+            labels.reverse()
+        else:
+            awaitable = coro
+            while awaitable is not None:
+                frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+                if frame is None:
+                    break
+                labels.append(_frame_label(frame.f_code))
+                awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+            worker_labels = self._worker_stack(frames)
+            if worker_labels:
+                labels += worker_labels
+            else:
+                labels.append(AWAIT_FRAME)
+
+        if len(labels) > MAX_STACK_DEPTH:
+            labels = labels[:MAX_STACK_DEPTH // 2] + ["[...]"] + labels[-MAX_STACK_DEPTH // 2:]
+        self.stacks[";".join(labels)] += 1
+
+
+    def _worker_stack(self, frames: Dict[int, Any]) -> Optional[List[str]]:
+        """Labels of the threadpool worker's stack, from the sync endpoint down"""
+        worker = self.worker
+        if worker is None:
+            return None
+        thread_id, root_code = worker
+        frame = frames.get(thread_id)
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame.f_code))
+            if frame.f_code is root_code:
+                labels.reverse()
+                return labels
+            frame = frame.f_back
+        return None  # the endpoint returned while we walked
+
+
+class RouteProfile:
+    """Profiles of one route template, merged"""
+
+    def __init__(self):
+        self.requests = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.spans: Dict[Tuple[str, str], List[float]] = {}
+
+    def add(self, profile: RequestProfile, duration: float, max_stacks: int) -> None:
+        self.requests += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        for stack, count in profile.stacks.items():
+            self.samples += count
+            if stack not in self.stacks and len(self.stacks) >= max_stacks:
+                stack = OTHER_STACKS
+            self.stacks[stack] += count
+        for kind, name, span_time in profile.spans:
+            span = self.spans.get((kind, name))
+            if span is None:
+                self.spans[(kind, name)] = [1, span_time, span_time]
+            else:
+                span[0] += 1
+                span[1] += span_time
+                span[2] = max(span[2], span_time)
+
+    def summary(self) -> Dict[str, Any]:
+        spans = [
+            {
+                "kind": kind,
+                "name": name,
+                "count": count,
+                "total_time": round(total, 6),
+                "avg_time": round(total / count, 6),
+                "max_time": round(maximum, 6),
+                "per_request": round(count / self.requests, 2),
+            }
+            for (kind, name), (count, total, maximum) in self.spans.items()
+        ]
+        spans.sort(key=lambda span: span["total_time"], reverse=True)
+        return {
+            "requests": self.requests,
+            "avg_time": round(self.total_time / self.requests, 6) if self.requests else 0,
+            "max_time": round(self.max_time, 6),
+            "samples": self.samples,
+            "spans": spans,
+        }
+
+
+class Profiler:
+    """Per-request sampling profiler, aggregated per route template"""
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[int] = None,
+        interval_ms: Optional[float] = None,
+        max_stacks: Optional[int] = None,
+    ):
+        self.enabled = settings.PROFILING_ENABLED if enabled is None else enabled
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.interval = (interval_ms or settings.PROFILING_INTERVAL_MS) / 1000
+        self.max_stacks = max_stacks or settings.PROFILING_MAX_STACKS
+        self.header = settings.PROFILING_HEADER
+        self.routes: Dict[str, RouteProfile] = {}
+        self._active: Dict[int, RequestProfile] = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def should_sample(self) -> bool:
+        """One request in ``sample_rate`` (never when the rate is 0)"""
+        if self.sample_rate <= 0:
+            return False
+        self._counter += 1
+        return self._counter % self.sample_rate == 0
+
+    def requested(self, headers) -> bool:
+        """Whether an admin asked for this request to be profiled"""
+        if self.header.lower() not in headers:
+            return False
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        payload = verify_token(token, "access")
+        return bool(payload) and payload.get("role") == "admin"
+
+    def begin(self) -> RequestProfile:
+        """Start profiling the current task (call from the request's task)"""
+        profile = RequestProfile(asyncio.current_task())
+        _current_profile.set(profile)
+        with self._lock:
+            self._active[id(profile)] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def end(self, profile: RequestProfile, route: str, duration: float) -> None:
+        """Stop profiling a request and merge it into its route"""
+        _current_profile.set(None)
+        with self._lock:
+            self._active.pop(id(profile), None)
+            route_profile = self.routes.get(route)
+            if route_profile is None:
+                route_profile = self.routes[route] = RouteProfile()
+            route_profile.add(profile, duration, self.max_stacks)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for profile in self._active.values():
+                    try:
+                        profile.sample(frames)
+                    except Exception as e:
+                        logger.debug(f"Profiler sample failed: {e}")
+                del frames
+            time.sleep(self.interval)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {route: profile.summary() for route, profile in self.routes.items()}
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval * 1000,
+            "routes": routes,
+        }
+
+    def collapsed(self, route: Optional[str] = None, limit: Optional[int] = None) -> str:
+        """
+        Collapsed stacks (``frame;frame count`` per line), of one route or of
+        all routes under a root frame per route
+        """
+        with self._lock:
+            if route is not None:
+                stacks = Counter(self.routes[route].stacks) if route in self.routes else Counter()
+            else:
+                stacks = Counter()
+                for name, profile in self.routes.items():
+                    for stack, count in profile.stacks.items():
+                        stacks[f"{name};{stack}"] += count
+        lines = [f"{stack} {count}" for stack, count in stacks.most_common(limit)]
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def flame_graph(self, route: Optional[str] = None) -> Dict[str, Any]:
+        """Collapsed stacks as a ``{name, value, children}`` tree (d3-flame-graph)"""
+        root: Dict[str, Any] = {"name": route or "all", "value": 0, "children": {}}
+        for line in self.collapsed(route).splitlines():
+            stack, count = line.rsplit(" ", 1)
+            count = int(count)
+            root["value"] += count
+            node = root
+            for name in stack.split(";"):
+                child = node["children"].get(name)
+                if child is None:
+                    child = node["children"][name] = {"name": name, "value": 0, "children": {}}
+                child["value"] += count
+                node = child
+
+        def as_list(node: Dict[str, Any]) -> Dict[str, Any]:
+            children = sorted(node["children"].values(), key=lambda child: child["value"], reverse=True)
+            return {"name": node["name"], "value": node["value"], "children": [as_list(c) for c in children]}
+
+        return as_list(root)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.routes.clear()
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """Profile of the request being handled, if it is profiled"""
+    return _current_profile.get()
+
+
+def _profiled_endpoint(endpoint):
+    """Sync endpoint that publishes its worker thread on the request's profile"""
+    root_code = endpoint.__code__
+
+    @wraps(endpoint)
+    def run_endpoint(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        profile.worker = (threading.get_ident(), root_code)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profile.worker = None
+
+    return run_endpoint
+
+
+def profile_sync_endpoints(app) -> None:
+    """
+    Let the profiler sample the threadpool worker of sync (``def``) endpoints.
+    Call once the routers are included; the threadpool copies the request's
+    context, so the wrapper sees the current profile.
+    """
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        call = route.dependant.call
+        if asyncio.iscoroutinefunction(call) or not hasattr(call, "__code__") or hasattr(call, "__wrapped__"):
+            continue
+        route.dependant.call = _profiled_endpoint(call)
+
+
+class profile_span:
+    """Times a block as a span of the current profile (no-op otherwise)"""
+
+    __slots__ = ('kind', 'name', 'profile', 'start')
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+
+    def __enter__(self):
+        self.profile = _current_profile.get()
+        if self.profile is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profile is not None:
+            self.profile.add_span(self.kind, self.name, time.perf_counter() - self.start)
+        return False
+
+
+@lru_cache(maxsize=1024)
+def _statement_name(statement: str) -> str:
+    verb = statement.split(None, 1)[0].upper() if statement.strip() else "?"
+    match = _TABLE_PATTERN.search(statement)
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+def instrument_engine(engine) -> None:
+    """Record the cursor executions of a (sync) engine as ``db`` spans"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile.get() is not None:
+            conn.info["profile_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # A single slot, not a stack: a failed statement never reaches this
+        # hook and would leave a stale entry behind on the pooled connection
+        start = conn.info.pop("profile_start", None)
+        profile = _current_profile.get()
+        if profile is not None and start is not None:
+            profile.add_span("db", _statement_name(statement), time.perf_counter() - start)
+
+
+class ProfiledJSONResponse(JSONResponse):
+    """JSONResponse whose rendering is recorded as a ``serialize`` span"""
+
+    def render(self, content: Any) -> bytes:
+        profile = _current_profile.get()
+        if profile is None:
+            return super().render(content)
+        start = time.perf_counter()
+        try:
+            return super().render(content)
+        finally:
+            profile.add_span("serialize", "json", time.perf_counter() - start)
+
+
+# Global profiler
+profiler = Profiler()
@@ -0,0 +1,189 @@
+"""
+Prometheus / OpenMetrics text exposition of the API metrics
+
+``render_metrics`` reads the in-memory state only (request histograms,
+counters, pool and connection gauges) plus one Redis PING, so a scrape costs
+a few milliseconds and can run every few seconds. Request latencies are
+exported per route template, never per raw path.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import structlog
+
+from app.core.database import async_engine, sync_engine
+from app.core.jobs import job_runner
+from app.core.monitoring import metrics_collector
+from app.core.redis_config import redis_manager
+from app.core.websocket import connection_manager
+
+logger = structlog.get_logger()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Upper bounds (seconds) of the exported request latency buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsWriter:
+    """Builds the exposition text, one metric family at a time"""
+
+    def __init__(self, openmetrics: bool = False):
+        self.openmetrics = openmetrics
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, documentation: str) -> None:
+        # Prometheus text names a counter family with its _total suffix, OpenMetrics without
+        if kind == "counter" and not self.openmetrics:
+            name += "_total"
+        self.lines.append(f"# HELP {name} {documentation}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Labels = ()) -> None:
+        if labels:
+            label_text = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels)
+            self.lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+        else:
+            self.lines.append(f"{name} {_format_value(value)}")
+
+    def text(self) -> str:
+        if self.openmetrics:
+            self.lines.append("# EOF")
+        return "\n".join(self.lines) + "\n"
+
+
+def _write_requests(writer: MetricsWriter) -> None:
+    histograms = metrics_collector.endpoint_histograms()
+
+    writer.family("http_request_duration_seconds", "histogram", "HTTP request duration by route template")
+    for key, histogram in sorted(histograms.items()):
+        method, route = key.split(" ", 1)
+        labels = (("method", method), ("route", route))
+        for bound, count in zip(LATENCY_BUCKETS, histogram.cumulative_counts(LATENCY_BUCKETS)):
+            writer.sample("http_request_duration_seconds_bucket", count, labels + (("le", repr(bound)),))
+        writer.sample("http_request_duration_seconds_bucket", histogram.count, labels + (("le", "+Inf"),))
+        writer.sample("http_request_duration_seconds_count", histogram.count, labels)
+        writer.sample("http_request_duration_seconds_sum", histogram.total, labels)
+
+    writer.family("http_request_errors", "counter", "HTTP responses with status >= 400 by route template")
+    for key, histogram in sorted(histograms.items()):
+        method, route = key.split(" ", 1)
+        writer.sample("http_request_errors_total", histogram.errors, (("method", method), ("route", route)))
+
+    writer.family("http_error_responses", "counter", "HTTP responses with status >= 400 by status code")
+    for status_code, count in sorted(metrics_collector.get_error_summary().items()):
+        writer.sample("http_error_responses_total", count, (("status", str(status_code)),))
+
+    writer.family("http_requests_in_flight", "gauge", "HTTP requests being processed")
+    writer.sample("http_requests_in_flight", metrics_collector.active_requests)
+
+
+def _write_db_pools(writer: MetricsWriter) -> None:
+    writer.family("db_pool_connections", "gauge", "Database pool connections by state")
+    for engine_name, engine in (("async", async_engine.sync_engine), ("sync", sync_engine)):
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            continue  # NullPool (SQLite): no pooled connections
+        for state, value in (
+            ("checked_out", pool.checkedout()),
+            ("checked_in", pool.checkedin()),
+            ("overflow", max(pool.overflow(), 0)),
+        ):
+            writer.sample("db_pool_connections", value, (("engine", engine_name), ("state", state)))
+
+    writer.family("db_pool_size", "gauge", "Database pool size (without overflow)")
+    for engine_name, engine in (("async", async_engine.sync_engine), ("sync", sync_engine)):
+        if hasattr(engine.pool, "size"):
+            writer.sample("db_pool_size", engine.pool.size(), (("engine", engine_name),))
+
+
+async def _write_redis(writer: MetricsWriter) -> None:
+    latency: Optional[float] = None
+    if redis_manager.is_connected:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.to_thread(redis_manager.redis_client.ping), timeout=1)
+            latency = time.perf_counter() - start
+        except Exception as e:
+            logger.warning(f"Redis ping failed during metrics scrape: {e}")
+
+    writer.family("redis_up", "gauge", "Whether the Redis PING succeeded")
+    writer.sample("redis_up", 1 if latency is not None else 0)
+    if latency is not None:
+        writer.family("redis_ping_duration_seconds", "gauge", "Round trip of a Redis PING")
+        writer.sample("redis_ping_duration_seconds", latency)
+
+
+def _write_websockets(writer: MetricsWriter) -> None:
+    writer.family("websocket_connections", "gauge", "Open WebSocket connections")
+    writer.sample("websocket_connections", len(connection_manager.active_connections))
+    writer.family("websocket_users", "gauge", "Users with at least one open WebSocket connection")
+    writer.sample("websocket_users", len(connection_manager.user_connections))
+
+
+def _write_caches(writer: MetricsWriter) -> None:
+    caches = metrics_collector.get_cache_stats()
+
+    writer.family("cache_lookups", "counter", "Cache lookups by result")
+    for name, stats in sorted(caches.items()):
+        writer.sample("cache_lookups_total", stats["hits"], (("cache", name), ("result", "hit")))
+        writer.sample("cache_lookups_total", stats["misses"], (("cache", name), ("result", "miss")))
+
+    writer.family("cache_hit_ratio", "gauge", "Cache hits / lookups since startup")
+    for name, stats in sorted(caches.items()):
+        writer.sample("cache_hit_ratio", stats["hit_ratio"], (("cache", name),))
+
+
+async def _write_jobs(writer: MetricsWriter) -> None:
+    try:
+        depth = await job_runner.queue_depth()
+    except Exception as e:
+        logger.warning(f"Job queue depth unavailable during metrics scrape: {e}")
+        depth = None
+
+    if depth is not None:
+        writer.family("job_queue_depth", "gauge", "Background jobs waiting for a worker")
+        writer.sample("job_queue_depth", depth)
+    writer.family("jobs_running", "gauge", "Background jobs executing in this process")
+    writer.sample("jobs_running", job_runner.running_count)
+
+
+def _write_counters(writer: MetricsWriter) -> None:
+    counters = dict(metrics_collector.counters)
+
+    writer.family("machine_heartbeats", "counter", "Machine agent status updates received")
+    writer.sample("machine_heartbeats_total", counters.get("machine_heartbeats", 0))
+
+    writer.family("process_uptime_seconds", "gauge", "Seconds since the metrics collector started")
+    writer.sample("process_uptime_seconds", round((datetime.utcnow() - metrics_collector.start_time).total_seconds(), 3))
+
+
+async def render_metrics(openmetrics: bool = False) -> str:
+    """Exposition text of every API metric"""
+    writer = MetricsWriter(openmetrics)
+    _write_requests(writer)
+    _write_db_pools(writer)
+    await _write_redis(writer)
+    _write_websockets(writer)
+    _write_caches(writer)
+    await _write_jobs(writer)
+    _write_counters(writer)
+    return writer.text()
@@ -0,0 +1,205 @@
+"""
+Query fingerprint statistics and slow-query log
+
+Every statement executed through the application engines is timed by
+SQLAlchemy cursor events and normalised into a fingerprint: literals and
+bound parameters become ``?``, ``IN``/``VALUES`` lists collapse to one
+element, whitespace and comments are dropped. Per fingerprint we keep a
+latency histogram (count, total, mean, p99), the rows returned or affected
+and the routes that ran it, so N+1 patterns show up as a high number of
+executions per request and unindexed scans as a high p99.
+
+Statements slower than ``SLOW_QUERY_THRESHOLD_MS`` are logged with the
+route of the request that ran them (never with their parameters) and kept
+in a short list for the monitoring endpoint.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Deque, Dict, Optional
+
+import structlog
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.histogram import LatencyHistogram
+from app.core.monitoring import current_route, metrics_collector
+
+logger = structlog.get_logger()
+
+# Fingerprint of the statements beyond QUERY_STATS_MAX_FINGERPRINTS
+OTHER_FINGERPRINT = "other"
+# Route label of statements run outside a request (startup, jobs, scripts)
+NO_ROUTE = "background"
+MAX_STATEMENT_LENGTH = 2000
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.IGNORECASE)
+_PARAMETERS = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<![:\w]):\w+|\?")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def normalize_statement(statement: str) -> str:
+    """Statement with literals, parameters and lists replaced by ``?``"""
+    normalized = _COMMENTS.sub(" ", statement)
+    normalized = _STRINGS.sub("?", normalized)
+    normalized = _NUMBERS.sub("?", normalized)
+    normalized = _PARAMETERS.sub("?", normalized)
+    normalized = _LISTS.sub("(?)", normalized)
+    normalized = _ROWS.sub("(?), ...", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Short id of a statement's normalised form"""
+    return hashlib.md5(normalize_statement(statement).encode()).hexdigest()[:16]
+
+
+class QueryStats:
+    """Executions of one fingerprint"""
+
+    __slots__ = ('statement', 'histogram', 'rows', 'rows_count', 'routes')
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.histogram = LatencyHistogram()
+        self.rows = 0
+        self.rows_count = 0  # executions whose row count the driver reported
+        self.routes: Counter = Counter()
+
+    def summary(self, fingerprint_id: str, route_requests: Dict[str, int]) -> Dict[str, Any]:
+        histogram = self.histogram
+        routes = []
+        for route, count in self.routes.most_common(5):
+            requests = route_requests.get(route)
+            routes.append({
+                "route": route,
+                "count": count,
+                "per_request": round(count / requests, 2) if requests else None,
+            })
+        return {
+            "fingerprint": fingerprint_id,
+            "statement": self.statement,
+            "count": histogram.count,
+            "total_time": round(histogram.total, 6),
+            "mean_time": round(histogram.mean, 6),
+            "p99_time": round(histogram.percentile(99), 6),
+            "max_time": round(histogram.max, 6),
+            "rows": self.rows if self.rows_count else None,
+            "mean_rows": round(self.rows / self.rows_count, 2) if self.rows_count else None,
+            "routes": routes,
+        }
+
+
+class QueryTracker:
+    """Per-fingerprint statistics of the executed statements"""
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        slow_threshold_ms: Optional[float] = None,
+        max_fingerprints: Optional[int] = None,
+    ):
+        self.enabled = settings.QUERY_STATS_ENABLED if enabled is None else enabled
+        self.slow_threshold = (
+            settings.SLOW_QUERY_THRESHOLD_MS if slow_threshold_ms is None else slow_threshold_ms
+        ) / 1000
+        self.max_fingerprints = max_fingerprints or settings.QUERY_STATS_MAX_FINGERPRINTS
+        self.queries: Dict[str, QueryStats] = {}
+        self.slow_queries: Deque[Dict[str, Any]] = deque(maxlen=100)
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration: float, rows: int = -1) -> None:
+        """Add one execution (``rows`` < 0 when the driver does not know)"""
+        fingerprint_id = fingerprint(statement)
+        route = current_route() or NO_ROUTE
+
+        with self._lock:
+            stats = self.queries.get(fingerprint_id)
+            if stats is None:
+                if len(self.queries) >= self.max_fingerprints:
+                    fingerprint_id = OTHER_FINGERPRINT
+                    stats = self.queries.get(fingerprint_id)
+                if stats is None:
+                    if fingerprint_id == OTHER_FINGERPRINT:
+                        statement_text = "(other statements)"
+                    else:
+                        statement_text = normalize_statement(statement)[:MAX_STATEMENT_LENGTH]
+                    stats = self.queries[fingerprint_id] = QueryStats(statement_text)
+            stats.histogram.record(duration)
+            if rows >= 0:
+                stats.rows += rows
+                stats.rows_count += 1
+            stats.routes[route] += 1
+
+        if duration >= self.slow_threshold:
+            self._log_slow(statement, fingerprint_id, route, duration, rows)
+
+    def _log_slow(self, statement: str, fingerprint_id: str, route: str, duration: float, rows: int) -> None:
+        slow_query = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "duration_ms": round(duration * 1000, 2),
+            "route": route,
+            "fingerprint": fingerprint_id,
+            "rows": rows if rows >= 0 else None,
+            "statement": normalize_statement(statement)[:MAX_STATEMENT_LENGTH],
+        }
+        self.slow_queries.append(slow_query)
+        logger.warning("Slow query", **{key: value for key, value in slow_query.items() if key != "timestamp"})
+
+    def instrument(self, engine) -> None:
+        """Time the cursor executions of a (sync) engine"""
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if self.enabled:
+                conn.info["query_start"] = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            start = conn.info.pop("query_start", None)
+            if start is None:
+                return
+            try:
+                self.record(statement, time.perf_counter() - start, cursor.rowcount)
+            except Exception as e:
+                logger.warning(f"Query statistics error: {e}")
+
+    def summary(self, sort: str = "total_time", limit: int = 50) -> Dict[str, Any]:
+        """Top fingerprints by ``sort`` plus the latest slow queries"""
+        route_requests = {
+            key: histogram.count for key, histogram in metrics_collector.endpoint_histograms().items()
+        }
+        with self._lock:
+            queries = [
+                stats.summary(fingerprint_id, route_requests)
+                for fingerprint_id, stats in self.queries.items()
+            ]
+            slow_queries = list(self.slow_queries)
+        queries.sort(key=lambda query: query[sort] or 0, reverse=True)
+        return {
+            "enabled": self.enabled,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "fingerprints": len(queries),
+            "queries": queries[:limit],
+            "slow_queries": slow_queries[::-1],
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.queries.clear()
+            self.slow_queries.clear()
+
+
+# Global query tracker
+query_tracker = QueryTracker()
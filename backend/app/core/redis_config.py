@@ -10,12 +10,29 @@ import structlog
 from functools import wraps
 import pickle
 import hashlib
+import time
 
 from app.core.config import settings
+from app.core.monitoring import metrics_collector
+from app.core.profiling import current_profile
 
 logger = structlog.get_logger()
 
 
+class ProfiledRedis(redis.Redis):
+    """Redis client recording its commands as spans of profiled requests"""
+
+    def execute_command(self, *args, **options):
+        profile = current_profile()
+        if profile is None:
+            return super().execute_command(*args, **options)
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            profile.add_span("redis", str(args[0]), time.perf_counter() - start)
+
+
 class RedisManager:
     """Redis connection and operations manager"""
     
@@ -27,7 +44,7 @@ class RedisManager:
         """Initialize Redis connection"""
         try:
             # Try to connect to Redis
-            self.redis_client = redis.Redis(
+            self.redis_client = ProfiledRedis(
                 host=getattr(settings, 'REDIS_HOST', 'localhost'),
                 port=getattr(settings, 'REDIS_PORT', 6379),
                 db=getattr(settings, 'REDIS_DB', 0),
@@ -198,6 +215,11 @@ def cache_key(*args, **kwargs) -> str:
     return ":".join(key_parts)
 
 
+# Lookups of the redis_cache decorator (exported as the "redis" cache metrics)
+redis_cache_stats = {"hits": 0, "misses": 0}
+metrics_collector.register_cache("redis", lambda: (redis_cache_stats["hits"], redis_cache_stats["misses"]))
+
+
 def redis_cache(expire: int = 300, key_prefix: str = "cache"):
     """
     Redis cache decorator
@@ -217,8 +239,10 @@ def redis_cache(expire: int = 300, key_prefix: str = "cache"):
             cached_result = redis_manager.get(cache_key_str)
             if cached_result is not None:
                 logger.debug(f"Cache HIT for {func_name}")
+                redis_cache_stats["hits"] += 1
                 return cached_result
             
+            redis_cache_stats["misses"] += 1
             # Execute function and cache result
             result = func(*args, **kwargs)
             redis_manager.set(cache_key_str, result, expire)
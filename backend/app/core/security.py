@@ -17,6 +17,7 @@ import time
 import secrets
 import hashlib
 import hmac
+import json
 from functools import lru_cache
 
 from app.core.config import settings
@@ -461,14 +462,30 @@ def validate_email(email: str) -> bool:
 
 
 # Audit trail helpers
+
+# Canonical JSON for audit payloads (sorted keys, compact separators). A
+# single encoder instance is reused: ``json.dumps`` with non-default options
+# builds a new encoder on every call.
+_AUDIT_JSON_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"))
+
+
+def canonical_audit_json(data: Dict[str, Any]) -> str:
+    """Canonical serialisation of an audit payload (same output as ``json.dumps(sort_keys=True)``)"""
+    return _AUDIT_JSON_ENCODER.encode(data)
+
+
+@lru_cache(maxsize=4)
+def _audit_hmac(key: str) -> "hmac.HMAC":
+    """Keyed HMAC-SHA256 state, copied for each signature"""
+    return hmac.new(key=key.encode("utf-8"), digestmod=hashlib.sha256)
+
+
 def compute_audit_record_hash(data: Dict[str, Any]) -> str:
     """Compute a deterministic SHA-256 hash for an audit record payload.
     Uses JSON serialization with sorted keys for stability.
     """
     try:
-        import json
-        serialized = json.dumps(data, sort_keys=True, separators=(",", ":"))
-        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+        return hashlib.sha256(canonical_audit_json(data).encode("utf-8")).hexdigest()
     except Exception as e:
         logger.error("Failed to compute audit record hash", error=str(e))
         raise
@@ -480,12 +497,9 @@ def compute_audit_signature(record_hash: str, prev_hash: Optional[str] = None) -
     """
     try:
         message = (prev_hash or "") + record_hash
-        signature = hmac.new(
-            key=settings.SECRET_KEY.encode("utf-8"),
-            msg=message.encode("utf-8"),
-            digestmod=hashlib.sha256
-        ).hexdigest()
-        return signature
+        signature = _audit_hmac(settings.SECRET_KEY).copy()
+        signature.update(message.encode("utf-8"))
+        return signature.hexdigest()
     except Exception as e:
         logger.error("Failed to compute audit signature", error=str(e))
         raise
@@ -0,0 +1,313 @@
+"""
+SLA timer for maintenance orders
+
+Each order carries a precomputed SLA state:
+
+- ``sla_vence_em``: the effective deadline, i.e. ``data_vencimento_sla``
+  shifted by ``tempo_pausado_minutos``;
+- ``sla_proximo_evento_em``: the next warning (``SLA_WARNING_RATIO`` of the
+  SLA consumed) or breach. It is NULL when nothing is pending: the order is
+  closed, paused or already breached.
+
+``refresh_sla_state`` recomputes both whenever an order is created, updated,
+paused or resumed.
+
+``SlaScheduler`` keeps upcoming events in a min-heap and sleeps until the
+earliest one. Every ``resync_seconds`` it reloads the events of the next
+``horizon_seconds`` from the indexed ``sla_proximo_evento_em`` column.
+Due orders are flagged (``sla_alerta_em`` / ``sla_violado_em``) by guarded
+``UPDATE ... RETURNING`` statements. Several processes may therefore run a
+scheduler, and each event is still emitted once. Events are pushed over
+WebSocket to the assignee and the requester. SLA dashboards read the
+persisted flags through ``sla_breached_clause`` instead of comparing
+deadlines at query time. With ``SLA_SCHEDULER_ENABLED`` off nothing sets
+the flags, so that clause falls back to comparing ``sla_vence_em``.
+
+Usage::
+
+    refresh_sla_state(manutencao)
+    db.commit()
+    sla_scheduler.schedule(manutencao.id, manutencao.sla_proximo_evento_em)
+"""
+
+import asyncio
+import heapq
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import structlog
+from sqlalchemy import and_, or_, select, update
+
+from app.core.batch_loader import IN_CHUNK_SIZE
+from app.core.config import settings
+from app.core.websocket import connection_manager
+from app.models.manutencao import Manutencao
+
+logger = structlog.get_logger()
+
+# Statuses that stop the SLA clock (model and endpoint vocabularies)
+SLA_CLOSED_STATUSES = ("resolvido", "fechado", "cancelado", "finalizada", "cancelada")
+
+
+def local_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Local naive datetime (timestamptz columns come back aware on PostgreSQL)"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def sla_breached_clause(now: Optional[datetime] = None):
+    """
+    SQL condition for open orders past their SLA: the persisted breach flag,
+    or the effective deadline when the scheduler is disabled
+    """
+    breached = Manutencao.sla_violado_em.isnot(None)
+    if not settings.SLA_SCHEDULER_ENABLED:
+        breached = or_(breached, and_(
+            Manutencao.sla_vence_em.isnot(None),
+            Manutencao.sla_vence_em < (now or datetime.now()),
+            or_(Manutencao.sla_pausado.is_(None), Manutencao.sla_pausado == 0),
+        ))
+    return and_(breached, Manutencao.status.notin_(SLA_CLOSED_STATUSES))
+
+
+def next_sla_event(
+    vence_em: Optional[datetime],
+    sla_horas: Optional[int],
+    status: Optional[str],
+    pausado: bool,
+    alerta_em: Optional[datetime],
+    violado_em: Optional[datetime],
+) -> Optional[datetime]:
+    """Time of the next warning or breach (``None`` when no event is pending)"""
+    if vence_em is None or pausado or violado_em is not None or status in SLA_CLOSED_STATUSES:
+        return None
+    if alerta_em is None and sla_horas:
+        return vence_em - timedelta(hours=sla_horas * (1 - settings.SLA_WARNING_RATIO))
+    return vence_em
+
+
+def refresh_sla_state(manutencao: Manutencao, now: Optional[datetime] = None) -> None:
+    """Recompute pause accounting, effective deadline and next SLA event of an order"""
+    now = now or datetime.now()
+    if manutencao.sla_pausado and manutencao.sla_pausado_em is None:
+        manutencao.sla_pausado_em = now
+    elif not manutencao.sla_pausado and manutencao.sla_pausado_em is not None:
+        # Resumed: the pause is added to the deadline
+        pausa = now - local_naive(manutencao.sla_pausado_em)
+        manutencao.tempo_pausado_minutos = (manutencao.tempo_pausado_minutos or 0) + int(pausa.total_seconds() // 60)
+        manutencao.sla_pausado_em = None
+
+    if manutencao.data_vencimento_sla is None:
+        manutencao.sla_vence_em = None
+    else:
+        manutencao.sla_vence_em = local_naive(manutencao.data_vencimento_sla) + timedelta(
+            minutes=manutencao.tempo_pausado_minutos or 0
+        )
+    manutencao.sla_proximo_evento_em = next_sla_event(
+        manutencao.sla_vence_em, manutencao.sla_horas, manutencao.status,
+        bool(manutencao.sla_pausado), manutencao.sla_alerta_em, manutencao.sla_violado_em,
+    )
+
+
+class SlaScheduler:
+    """Min-heap of upcoming SLA events, fired by a single asyncio task"""
+
+    def __init__(self, resync_seconds: float = 300.0, horizon_seconds: Optional[float] = None):
+        self.resync_seconds = resync_seconds
+        # Events further away are left to a later resync
+        self.horizon_seconds = horizon_seconds or 2 * resync_seconds
+        self._heap: List[Tuple[datetime, int]] = []
+        # Current event time per order; heap entries that differ are stale
+        self._armed: Dict[int, datetime] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # Scheduling -------------------------------------------------------------
+
+    def schedule(self, manutencao_id: int, when: Optional[datetime]) -> None:
+        """(Re)arm the timer of an order; ``None`` disarms it. Safe from any thread."""
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._arm(manutencao_id, when)
+        else:
+            self._loop.call_soon_threadsafe(self._arm, manutencao_id, when)
+
+    def _arm(self, manutencao_id: int, when: Optional[datetime]) -> None:
+        when = local_naive(when)
+        if when is None or when > datetime.now() + timedelta(seconds=self.horizon_seconds):
+            self._armed.pop(manutencao_id, None)
+            return
+        if self._armed.get(manutencao_id) == when:
+            return
+        self._armed[manutencao_id] = when
+        heapq.heappush(self._heap, (when, manutencao_id))
+        self._wakeup.set()
+
+    def _pop_due(self, now: datetime) -> List[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, manutencao_id = heapq.heappop(self._heap)
+            if self._armed.get(manutencao_id) == when:
+                del self._armed[manutencao_id]
+                due.append(manutencao_id)
+        return due
+
+    # Lifecycle ---------------------------------------------------------------
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="sla-scheduler")
+        logger.info("SLA scheduler started", resync_seconds=self.resync_seconds)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._loop = None
+        self._heap.clear()
+        self._armed.clear()
+        logger.info("SLA scheduler stopped")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_resync = loop.time()
+        while True:
+            try:
+                self._wakeup.clear()
+                if loop.time() >= next_resync:
+                    for manutencao_id, when in await asyncio.to_thread(self._load_upcoming):
+                        self._arm(manutencao_id, when)
+                    next_resync = loop.time() + self.resync_seconds
+
+                due = self._pop_due(datetime.now())
+                if due:
+                    for manutencao_id, when in await asyncio.to_thread(self._fire, due):
+                        self._arm(manutencao_id, when)
+                    continue
+
+                timeout = next_resync - loop.time()
+                if self._heap:
+                    timeout = min(timeout, (self._heap[0][0] - datetime.now()).total_seconds())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0.0))
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("SLA scheduler error", error=str(e))
+                await asyncio.sleep(5)
+
+    # Database ---------------------------------------------------------------
+
+    @staticmethod
+    def _session():
+        from app.core.database import SessionLocal
+        return SessionLocal()
+
+    def _load_upcoming(self) -> List[Tuple[int, datetime]]:
+        """Events due within the horizon, including overdue ones"""
+        limit = datetime.now() + timedelta(seconds=self.horizon_seconds)
+        db = self._session()
+        try:
+            return db.execute(
+                select(Manutencao.id, Manutencao.sla_proximo_evento_em)
+                .where(Manutencao.sla_proximo_evento_em.isnot(None), Manutencao.sla_proximo_evento_em <= limit)
+            ).all()
+        finally:
+            db.close()
+
+    def _fire(self, manutencao_ids: Sequence[int]) -> List[Tuple[int, datetime]]:
+        """Flag due orders, push the events and return the timers to re-arm"""
+        now = datetime.now()
+        breached, warned, rearm = [], [], []
+        db = self._session()
+        try:
+            for start in range(0, len(manutencao_ids), IN_CHUNK_SIZE):
+                chunk = manutencao_ids[start:start + IN_CHUNK_SIZE]
+                running = and_(
+                    Manutencao.id.in_(chunk),
+                    Manutencao.status.notin_(SLA_CLOSED_STATUSES),
+                    or_(Manutencao.sla_pausado.is_(None), Manutencao.sla_pausado == 0),
+                    Manutencao.sla_violado_em.is_(None),
+                )
+                breached += db.scalars(
+                    update(Manutencao)
+                    .where(running, Manutencao.sla_vence_em <= now)
+                    .values(sla_violado_em=now, sla_proximo_evento_em=None)
+                    .returning(Manutencao.id)
+                    .execution_options(synchronize_session=False)
+                ).all()
+                warned += db.scalars(
+                    update(Manutencao)
+                    .where(running, Manutencao.sla_alerta_em.is_(None), Manutencao.sla_proximo_evento_em <= now)
+                    .values(sla_alerta_em=now, sla_proximo_evento_em=Manutencao.sla_vence_em)
+                    .returning(Manutencao.id)
+                    .execution_options(synchronize_session=False)
+                ).all()
+                # Orders whose event moved (or the breach after a warning)
+                rearm += db.execute(
+                    select(Manutencao.id, Manutencao.sla_proximo_evento_em)
+                    .where(Manutencao.id.in_(chunk), Manutencao.sla_proximo_evento_em.isnot(None))
+                ).all()
+            db.commit()
+
+            if breached or warned:
+                logger.info("SLA events emitted", breached=len(breached), warned=len(warned))
+                self._notify(db, breached, warned)
+        finally:
+            db.close()
+        return rearm
+
+    @staticmethod
+    def _notify(db, breached: List[int], warned: List[int]) -> None:
+        """Push the events to the assignee and the requester of each order"""
+        from app.models.asset import Ativo
+
+        kinds = {**{manutencao_id: "alerta" for manutencao_id in warned},
+                 **{manutencao_id: "violado" for manutencao_id in breached}}
+        ids = list(kinds)
+        per_user: Dict[str, List[Dict[str, Any]]] = {}
+        for start in range(0, len(ids), IN_CHUNK_SIZE):
+            for row in db.execute(
+                select(
+                    Manutencao.id, Manutencao.numero_chamado, Manutencao.titulo, Manutencao.prioridade,
+                    Manutencao.sla_vence_em, Manutencao.atribuido_para, Manutencao.aberto_por,
+                    Ativo.codigo.label("ativo_codigo"),
+                )
+                .join(Ativo, Ativo.id == Manutencao.ativo_id)
+                .where(Manutencao.id.in_(ids[start:start + IN_CHUNK_SIZE]))
+            ):
+                event = {
+                    "evento": kinds[row.id],
+                    "manutencao_id": row.id,
+                    "numero_chamado": row.numero_chamado,
+                    "titulo": row.titulo,
+                    "prioridade": row.prioridade,
+                    "ativo_codigo": row.ativo_codigo,
+                    "sla_vence_em": row.sla_vence_em.isoformat() if row.sla_vence_em else None,
+                }
+                for user_id in {row.atribuido_para, row.aberto_por} - {None}:
+                    per_user.setdefault(str(user_id), []).append(event)
+
+        timestamp = datetime.utcnow().isoformat()
+        connection_manager.send_to_users_threadsafe({
+            user_id: {"type": "sla_eventos", "data": {"eventos": events}, "timestamp": timestamp}
+            for user_id, events in per_user.items()
+        })
+
+
+# Global SLA scheduler instance
+sla_scheduler = SlaScheduler(resync_seconds=settings.SLA_SCHEDULER_RESYNC_SECONDS)
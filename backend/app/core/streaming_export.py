@@ -0,0 +1,321 @@
+"""
+Streaming export helpers (CSV, NDJSON and XLSX)
+
+Rows are encoded batch by batch and handed to a ``StreamingResponse`` so that
+large datasets are exported with constant memory. Optional gzip compression is
+applied incrementally on the encoded chunks.
+"""
+
+import abc
+import csv
+import io
+import json
+import zipfile
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+EXPORT_FORMATS = ("csv", "ndjson", "xlsx")
+EXPORT_FORMAT_REGEX = "^(csv|ndjson|xlsx)$"
+EXPORT_BATCH_SIZE = 1000
+
+_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _to_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default, ensure_ascii=False)
+    return str(value)
+
+
+class ExportEncoder(abc.ABC):
+    """Incremental encoder: ``begin()``, ``encode(rows)`` per batch, ``end()``"""
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns = list(columns)
+
+    def begin(self) -> bytes:
+        return b""
+
+    @abc.abstractmethod
+    def encode(self, rows: Iterable[Sequence[Any]]) -> bytes:
+        """Encoded bytes of one batch of rows"""
+
+    def end(self) -> bytes:
+        return b""
+
+
+class CsvEncoder(ExportEncoder):
+    """CSV with header row; UTF-8 BOM so spreadsheets detect the encoding"""
+
+    def __init__(self, columns: Sequence[str]):
+        super().__init__(columns)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate(0)
+        return data
+
+    def begin(self) -> bytes:
+        self._writer.writerow(self.columns)
+        return b"\xef\xbb\xbf" + self._drain()
+
+    def encode(self, rows: Iterable[Sequence[Any]]) -> bytes:
+        self._writer.writerows([_to_text(v) for v in row] for row in rows)
+        return self._drain()
+
+
+class NdjsonEncoder(ExportEncoder):
+    """One JSON object per line"""
+
+    def encode(self, rows: Iterable[Sequence[Any]]) -> bytes:
+        lines = [
+            json.dumps(dict(zip(self.columns, row)), default=_json_default, ensure_ascii=False)
+            for row in rows
+        ]
+        if not lines:
+            return b""
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _DrainBuffer(io.RawIOBase):
+    """Non-seekable sink for ``zipfile``; written bytes are collected by ``drain``"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class XlsxEncoder(ExportEncoder):
+    """
+    Minimal single-sheet XLSX writer.
+
+    The worksheet XML is written into a zip entry opened in streaming mode
+    (data descriptors), so no part of the workbook is kept in memory beyond
+    the deflate window. Strings use inline cells to avoid a shared strings table.
+    """
+
+    _CONTENT_TYPES = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    )
+    _ROOT_RELS = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    )
+    _WORKBOOK = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{sheet}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+    _WORKBOOK_RELS = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    )
+
+    def __init__(self, columns: Sequence[str], sheet_name: str = "export"):
+        super().__init__(columns)
+        self.sheet_name = sheet_name[:31]
+        self._sink = _DrainBuffer()
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._sheet = None
+
+    @staticmethod
+    def _cell(value: Any) -> str:
+        if value is None:
+            return "<c/>"
+        if isinstance(value, bool):
+            return f'<c t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, (int, float, Decimal)):
+            return f"<c><v>{value}</v></c>"
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_to_text(value))}</t></is></c>'
+
+    def _row(self, values: Iterable[Any]) -> str:
+        return "<row>" + "".join(self._cell(v) for v in values) + "</row>"
+
+    def begin(self) -> bytes:
+        self._zip = zipfile.ZipFile(self._sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+        self._zip.writestr("[Content_Types].xml", self._CONTENT_TYPES)
+        self._zip.writestr("_rels/.rels", self._ROOT_RELS)
+        self._zip.writestr("xl/workbook.xml", self._WORKBOOK.format(sheet=escape(self.sheet_name)))
+        self._zip.writestr("xl/_rels/workbook.xml.rels", self._WORKBOOK_RELS)
+        self._sheet = self._zip.open("xl/worksheets/sheet1.xml", mode="w", force_zip64=True)
+        self._sheet.write(
+            (
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                "<sheetData>" + self._row(self.columns)
+            ).encode("utf-8")
+        )
+        return self._sink.drain()
+
+    def encode(self, rows: Iterable[Sequence[Any]]) -> bytes:
+        self._sheet.write("".join(self._row(row) for row in rows).encode("utf-8"))
+        return self._sink.drain()
+
+    def end(self) -> bytes:
+        self._sheet.write(b"</sheetData></worksheet>")
+        self._sheet.close()
+        self._zip.close()
+        return self._sink.drain()
+
+
+def get_encoder(formato: str, columns: Sequence[str], sheet_name: str = "export") -> ExportEncoder:
+    """Return the encoder for an export format"""
+    if formato == "csv":
+        return CsvEncoder(columns)
+    if formato == "ndjson":
+        return NdjsonEncoder(columns)
+    if formato == "xlsx":
+        return XlsxEncoder(columns, sheet_name=sheet_name)
+    raise ValueError(f"Formato de exportação não suportado: {formato}")
+
+
+class _Gzip:
+    """Incremental gzip compressor (pass-through when disabled)"""
+
+    def __init__(self, enabled: bool):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if enabled else None
+
+    def feed(self, data: bytes) -> bytes:
+        if self._compressor is None or not data:
+            return data
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush() if self._compressor is not None else b""
+
+
+def iter_export(
+    encoder: ExportEncoder,
+    batches: Iterable[Sequence[Sequence[Any]]],
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """Encode row batches from a sync iterator"""
+    gz = _Gzip(compress)
+    chunk = gz.feed(encoder.begin())
+    if chunk:
+        yield chunk
+    for batch in batches:
+        chunk = gz.feed(encoder.encode(batch))
+        if chunk:
+            yield chunk
+    tail = gz.feed(encoder.end()) + gz.finish()
+    if tail:
+        yield tail
+
+
+async def aiter_export(
+    encoder: ExportEncoder,
+    batches: AsyncIterator[Sequence[Sequence[Any]]],
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """Encode row batches from an async iterator"""
+    gz = _Gzip(compress)
+    chunk = gz.feed(encoder.begin())
+    if chunk:
+        yield chunk
+    async for batch in batches:
+        chunk = gz.feed(encoder.encode(batch))
+        if chunk:
+            yield chunk
+    tail = gz.feed(encoder.end()) + gz.finish()
+    if tail:
+        yield tail
+
+
+def iter_query_batches(
+    build_statement: Callable[[Any], Select],
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[List[tuple]]:
+    """
+    Yield row batches from a server-side cursor (``yield_per``/``stream_results``).
+
+    A dedicated session is opened because the generator is consumed by the
+    response after the endpoint (and its request-scoped session) has returned.
+    ``build_statement`` receives that session and returns the select to stream.
+    """
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        result = db.execute(build_statement(db).execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+    finally:
+        db.close()
+
+
+async def aiter_query_batches(
+    statement: Select,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[List[tuple]]:
+    """Async counterpart of ``iter_query_batches`` using ``AsyncSession.stream``"""
+    from app.core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(statement.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
+
+def export_response(content, formato: str, filename: str, compress: bool = False) -> StreamingResponse:
+    """Wrap an export stream in a ``StreamingResponse`` with download headers"""
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{formato}"'}
+    if compress:
+        # Already encoded: GZipMiddleware skips responses with Content-Encoding set
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(content, media_type=_MEDIA_TYPES[formato], headers=headers)
@@ -0,0 +1,245 @@
+"""
+Background sampler of host metrics
+
+psutil calls are kept off the request path: a daemon thread refreshes the
+host metrics every ``SYSTEM_METRICS_INTERVAL_SECONDS`` and publishes them as
+a new snapshot dict (a single reference swap, so readers never see a
+half-written sample). Health and monitoring endpoints read the latest
+snapshot instead of sampling.
+
+CPU usage comes from ``psutil.cpu_percent(interval=None)``, i.e. the average
+since the previous sample, instead of sleeping for one second. Expensive
+collectors (socket table, partitions, network interfaces, platform info)
+run every ``SYSTEM_METRICS_SLOW_INTERVAL_SECONDS`` and their last result is
+carried over in between.
+
+Snapshots are shared: treat them as read-only.
+"""
+
+import platform
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import psutil
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+GB = 1024 ** 3
+
+
+def _collect(name: str, collector) -> Dict[str, Any]:
+    try:
+        return collector()
+    except Exception as e:
+        logger.error(f"Error collecting {name} metrics: {e}")
+        return {"error": str(e)}
+
+
+def _cpu_metrics() -> Dict[str, Any]:
+    cpu_freq = psutil.cpu_freq()
+    return {
+        "usage_percent": round(psutil.cpu_percent(interval=None), 2),
+        "cores_physical": psutil.cpu_count(logical=False),
+        "cores_logical": psutil.cpu_count(logical=True),
+        "frequency_mhz": round(cpu_freq.current, 2) if cpu_freq else None,
+        "frequency_max_mhz": round(cpu_freq.max, 2) if cpu_freq else None,
+    }
+
+
+def _memory_metrics() -> Dict[str, Any]:
+    memory = psutil.virtual_memory()
+    swap = psutil.swap_memory()
+    return {
+        "total_gb": round(memory.total / GB, 2),
+        "available_gb": round(memory.available / GB, 2),
+        "used_gb": round(memory.used / GB, 2),
+        "usage_percent": round(memory.percent, 2),
+        "used_mb": round(memory.used / (1024 * 1024), 2),
+        "available_mb": round(memory.available / (1024 * 1024), 2),
+        "swap_total_gb": round(swap.total / GB, 2),
+        "swap_used_gb": round(swap.used / GB, 2),
+        "swap_usage_percent": round(swap.percent, 2),
+    }
+
+
+def _disk_metrics() -> Dict[str, Any]:
+    disk_usage = psutil.disk_usage('/')
+    disk_io = psutil.disk_io_counters()
+    return {
+        "total_gb": round(disk_usage.total / GB, 2),
+        "used_gb": round(disk_usage.used / GB, 2),
+        "free_gb": round(disk_usage.free / GB, 2),
+        "usage_percent": round((disk_usage.used / disk_usage.total) * 100, 2),
+        "read_bytes": disk_io.read_bytes if disk_io else 0,
+        "write_bytes": disk_io.write_bytes if disk_io else 0,
+    }
+
+
+def _disk_partitions() -> Dict[str, Any]:
+    partitions = []
+    for partition in psutil.disk_partitions():
+        try:
+            partition_usage = psutil.disk_usage(partition.mountpoint)
+        except PermissionError:
+            continue
+        partitions.append({
+            "device": partition.device,
+            "mountpoint": partition.mountpoint,
+            "fstype": partition.fstype,
+            "total_gb": round(partition_usage.total / GB, 2),
+            "used_gb": round(partition_usage.used / GB, 2),
+            "free_gb": round(partition_usage.free / GB, 2),
+            "usage_percent": round((partition_usage.used / partition_usage.total) * 100, 2)
+        })
+    return {"partitions": partitions}
+
+
+def _network_metrics() -> Dict[str, Any]:
+    net_io = psutil.net_io_counters()
+    return {
+        "bytes_sent": net_io.bytes_sent,
+        "bytes_recv": net_io.bytes_recv,
+        "packets_sent": net_io.packets_sent,
+        "packets_recv": net_io.packets_recv,
+        "errors_in": net_io.errin,
+        "errors_out": net_io.errout,
+        "drops_in": net_io.dropin,
+        "drops_out": net_io.dropout,
+    }
+
+
+def _network_details() -> Dict[str, Any]:
+    interface_stats = psutil.net_if_stats()
+    interfaces = []
+    for interface, addrs in psutil.net_if_addrs().items():
+        stats = interface_stats.get(interface)
+        interfaces.append({
+            "name": interface,
+            "is_up": stats.isup if stats else False,
+            "speed_mbps": stats.speed if stats else 0,
+            "addresses": [
+                {
+                    "family": str(addr.family),
+                    "address": addr.address,
+                    "netmask": addr.netmask,
+                    "broadcast": addr.broadcast
+                }
+                for addr in addrs
+            ]
+        })
+    return {
+        "connections_count": len(psutil.net_connections()),
+        "inet_connections_count": len(psutil.net_connections(kind='inet')),
+        "interfaces": interfaces,
+    }
+
+
+def _system_info() -> Dict[str, Any]:
+    boot_time = datetime.fromtimestamp(psutil.boot_time())
+    return {
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "system": platform.system(),
+        "release": platform.release(),
+        "version": platform.version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "boot_time": boot_time.isoformat(),
+    }
+
+
+class SystemMetricsSampler:
+    """Refreshes host metrics on a background thread"""
+
+    def __init__(self, interval: Optional[float] = None, slow_interval: Optional[float] = None):
+        self.interval = interval or settings.SYSTEM_METRICS_INTERVAL_SECONDS
+        self.slow_interval = slow_interval or settings.SYSTEM_METRICS_SLOW_INTERVAL_SECONDS
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._slow: Dict[str, Dict[str, Any]] = {}
+        self._slow_sampled_at = 0.0
+        self._sample_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        psutil.cpu_percent(interval=None)  # first call only sets the CPU baseline
+
+    @property
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Latest sample: ``cpu``, ``memory``, ``disk``, ``network`` and
+        ``system`` sections plus ``sampled_at``. Sampled once on the caller's
+        thread if the sampler has not run yet.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.sample()
+        return snapshot
+
+    def sample(self) -> Dict[str, Any]:
+        """Collect the host metrics and publish a new snapshot"""
+        with self._sample_lock:
+            now = time.monotonic()
+            if not self._slow or now - self._slow_sampled_at >= self.slow_interval:
+                self._slow = {
+                    "disk": _collect("disk partition", _disk_partitions),
+                    "network": _collect("network interface", _network_details),
+                    "system": _collect("system", _system_info),
+                }
+                self._slow_sampled_at = now
+
+            sampled_at = datetime.utcnow()
+            timestamp = sampled_at.isoformat()
+            system = dict(self._slow["system"])
+            if "error" not in system:
+                boot_time = datetime.fromisoformat(system["boot_time"])
+                system["uptime_seconds"] = int((datetime.now() - boot_time).total_seconds())
+
+            snapshot = {
+                "cpu": _collect("CPU", _cpu_metrics),
+                "memory": _collect("memory", _memory_metrics),
+                "disk": {**_collect("disk", _disk_metrics), **self._slow["disk"]},
+                "network": {**_collect("network", _network_metrics), **self._slow["network"]},
+                "system": system,
+            }
+            for section in snapshot.values():
+                section["timestamp"] = timestamp
+            snapshot["sampled_at"] = sampled_at
+
+            self._snapshot = snapshot
+            return snapshot
+
+    def start(self) -> None:
+        """Start the sampling thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="system-metrics", daemon=True)
+        self._thread.start()
+        logger.info("System metrics sampler started", interval=self.interval, slow_interval=self.slow_interval)
+
+    def stop(self) -> None:
+        """Stop the sampling thread (the last snapshot stays readable)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        logger.info("System metrics sampler stopped")
+
+    def _run(self) -> None:
+        # Let the CPU baseline cover some time before the first sample
+        wait = min(self.interval, 1.0)
+        while not self._stop.wait(wait):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"System metrics sampling error: {e}")
+            wait = self.interval
+
+
+# Global system metrics sampler
+system_sampler = SystemMetricsSampler()
@@ -28,12 +28,16 @@ class ConnectionManager:
         # Heartbeat tracking
         self.heartbeat_tasks: Dict[str, asyncio.Task] = {}
         
+        # Event loop serving the connections (for pushes from worker threads)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        
         logger.info("WebSocket ConnectionManager initialized")
 
     async def connect(self, websocket: WebSocket, connection_id: str, user_id: str = None):
         """Accept a new WebSocket connection"""
         try:
             await websocket.accept()
+            self._loop = asyncio.get_running_loop()
             
             # Store connection
             self.active_connections[connection_id] = websocket
@@ -137,6 +141,30 @@ class ConnectionManager:
             for connection_id in connection_ids:
                 await self.send_personal_message(connection_id, message)
 
+    async def send_to_users(self, messages: Dict[str, dict]):
+        """Send one message per user (user ID -> message) concurrently"""
+        tasks = [
+            self.send_to_user(user_id, message)
+            for user_id, message in messages.items()
+            if user_id in self.user_connections
+        ]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def send_to_users_threadsafe(self, messages: Dict[str, dict]) -> None:
+        """Queue per-user messages from any thread (threadpool endpoints, jobs)"""
+        messages = {user_id: message for user_id, message in messages.items() if user_id in self.user_connections}
+        if not messages or self._loop is None or self._loop.is_closed():
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._loop.create_task(self.send_to_users(messages))
+        else:
+            asyncio.run_coroutine_threadsafe(self.send_to_users(messages), self._loop)
+
     async def broadcast(self, message: dict, exclude_connections: Set[str] = None):
         """Broadcast a message to all active connections"""
         exclude_connections = exclude_connections or set()
@@ -6,6 +6,7 @@ from .rate_limiting import rate_limit_middleware, RateLimitMiddleware
 from .validation import validation_middleware, ValidationMiddleware, InputValidator
 from .security import security_middleware, SecurityMiddleware, setup_cors_middleware
 from .performance import performance_middleware, PerformanceMiddleware
+from .pipeline import RequestPipelineMiddleware
 
 __all__ = [
     'rate_limit_middleware',
@@ -17,5 +18,6 @@ __all__ = [
     'SecurityMiddleware',
     'setup_cors_middleware',
     'performance_middleware',
-    'PerformanceMiddleware'
+    'PerformanceMiddleware',
+    'RequestPipelineMiddleware'
 ]
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Single pure-ASGI middleware for the per-request concerns
+
+Request ID, timing and metrics, rate limiting, size limit, JSON validation
+and response headers run in one ASGI layer instead of four
+``BaseHTTPMiddleware`` wrappers (one task and one response relay each).
+The response is never buffered: headers are added to the
+``http.response.start`` message and body chunks are passed through, so
+streaming responses stay streaming.
+
+``X-Process-Time`` is the time until the response headers; the request
+metric records the full duration, body included, under the route template.
+Sampled requests are profiled for the whole pass (see ``app.core.profiling``).
+"""
+import logging
+import time
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.monitoring import current_request, endpoint_label, metrics_collector
+from app.core.profiling import Profiler, profiler as default_profiler
+from .performance import PerformanceMiddleware, performance_middleware
+from .rate_limiting import RateLimitMiddleware, rate_limit_middleware
+from .security import SecurityMiddleware, security_middleware
+from .validation import ValidationMiddleware, replay_receive, validation_middleware
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPipelineMiddleware:
+    """
+    Request ID, timing, rate limiting, validation and security headers in one pass
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        security: Optional[SecurityMiddleware] = None,
+        rate_limit: Optional[RateLimitMiddleware] = None,
+        validation: Optional[ValidationMiddleware] = None,
+        performance: Optional[PerformanceMiddleware] = None,
+        profiler: Optional[Profiler] = None,
+    ):
+        self.app = app
+        self.security = security or security_middleware
+        self.rate_limit = rate_limit or rate_limit_middleware
+        self.validation = validation or validation_middleware
+        self.performance = performance or performance_middleware
+        self.profiler = profiler or default_profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        request_id = self.security.generate_request_id()
+        scope.setdefault("state", {})["request_id"] = request_id
+        request = Request(scope, receive)
+        path, method = scope["path"], scope["method"]
+        logger.info(f"Request {request_id}: {method} {path}")
+
+        response_headers = self.security.security_headers(request_id)
+        status_code = 500
+
+        async def send_with_headers(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                for name, value in response_headers.items():
+                    headers[name] = value
+                headers["X-Process-Time"] = str(round(time.perf_counter() - start_time, 3))
+            await send(message)
+
+        profile = None
+        if self.profiler.enabled and (self.profiler.should_sample() or self.profiler.requested(request.headers)):
+            profile = self.profiler.begin()
+
+        request_token = current_request.set(scope)
+        metrics_collector.active_requests += 1
+        try:
+            stage_start = time.perf_counter()
+            rate_limit_headers, rejection = await self.rate_limit.check(request)
+            if profile is not None:
+                profile.add_span("middleware", "rate_limit", time.perf_counter() - stage_start)
+            if rejection is None:
+                response_headers.update(rate_limit_headers)
+                stage_start = time.perf_counter()
+                body, rejection = await self.validation.check_request(request)
+                if profile is not None:
+                    profile.add_span("middleware", "validation", time.perf_counter() - stage_start)
+                if body is not None:
+                    receive = replay_receive(body, receive)
+
+            if rejection is not None:
+                await rejection(scope, receive, send_with_headers)
+            else:
+                await self.app(scope, receive, send_with_headers)
+
+        except Exception as e:
+            process_time = time.perf_counter() - start_time
+            logger.error(f"Error in request {request_id}: {str(e)} after {process_time:.3f}s")
+            self.performance.record(endpoint_label(scope), method, 500, process_time, str(e))
+            raise
+
+        else:
+            process_time = time.perf_counter() - start_time
+            if process_time > self.security.max_request_time:
+                logger.warning(f"Slow request {request_id}: {process_time:.2f}s")
+            logger.info(f"Response {request_id}: {status_code} in {process_time:.3f}s")
+            self.performance.record(endpoint_label(scope), method, status_code, process_time)
+
+        finally:
+            metrics_collector.active_requests -= 1
+            current_request.reset(request_token)
+            if profile is not None:
+                self.profiler.end(profile, f"{method} {endpoint_label(scope)}", time.perf_counter() - start_time)
@@ -1,71 +1,292 @@
 """
 Rate limiting middleware for API protection
+
+Limits use a sliding-window counter: per client and rule only the counts of
+the current and previous windows are kept, and the previous one is weighted
+by how much of it still overlaps the sliding window. Memory is O(1) per
+client, whatever the request rate.
+
+Rules are configured per path prefix (``RATE_LIMIT_RULES``, longest prefix
+wins, ``RATE_LIMIT_DEFAULT`` otherwise) or per route with the ``rate_limit``
+decorator.
+
+State lives in a backend:
+
+- ``LocalRateLimitBackend`` (default): sharded in-process dicts; idle
+  clients are evicted once their windows have expired;
+- ``RedisRateLimitBackend`` (``RATE_LIMIT_BACKEND_URL=redis://...``): one
+  atomic Lua script per request, so limits hold across workers. When Redis
+  is unreachable the local backend is used.
 """
+import abc
+import math
+import threading
 import time
-from typing import Dict, Optional
-from fastapi import Request, HTTPException, status
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+from fastapi import Request, status
 from fastapi.responses import JSONResponse
-import asyncio
-from collections import defaultdict, deque
-from datetime import datetime, timedelta
 import logging
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
-class RateLimiter:
+
+def rate_limit(max_requests: int, window_seconds: int = 60) -> Callable:
     """
-    Token bucket rate limiter implementation
+    Route decorator: limit of the route, instead of the path prefix rules
     """
-    
-    def __init__(self, max_requests: int = 100, window_seconds: int = 60):
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        self.clients: Dict[str, deque] = defaultdict(deque)
-        self.lock = asyncio.Lock()
-    
-    async def is_allowed(self, client_id: str) -> bool:
-        """
-        Check if client is allowed to make request
-        """
-        async with self.lock:
-            now = datetime.now()
-            client_requests = self.clients[client_id]
-            
-            # Remove old requests outside the window
-            while client_requests and client_requests[0] < now - timedelta(seconds=self.window_seconds):
-                client_requests.popleft()
-            
-            # Check if under limit
-            if len(client_requests) < self.max_requests:
-                client_requests.append(now)
-                return True
-            
-            return False
-    
-    async def get_reset_time(self, client_id: str) -> Optional[datetime]:
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.__rate_limit__ = (max_requests, window_seconds)
+        return endpoint
+    return decorator
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """
+    ``max_requests`` per sliding ``window_seconds``; ``name`` identifies the counter
+    """
+    name: str
+    max_requests: int
+    window_seconds: int
+
+
+@dataclass
+class RateLimitDecision:
+    """
+    Outcome of one request against a rule
+    """
+    allowed: bool
+    remaining: int
+    retry_after: float  # seconds until a request would be allowed (0 when allowed)
+
+
+def parse_rate_limit(value: str) -> Tuple[int, int]:
+    """
+    '<requests>/<seconds>' -> (requests, seconds)
+    """
+    max_requests, window_seconds = value.strip().split('/')
+    return int(max_requests), int(window_seconds)
+
+
+def parse_rate_limit_rules(value: str) -> List[RateLimitRule]:
+    """
+    '<path prefix>=<requests>/<seconds>,...' -> rules, longest prefix first
+    """
+    rules = []
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        prefix, limit = item.rsplit('=', 1)
+        max_requests, window_seconds = parse_rate_limit(limit)
+        rules.append(RateLimitRule(prefix.strip(), max_requests, window_seconds))
+    return sorted(rules, key=lambda rule: len(rule.name), reverse=True)
+
+
+def sliding_window_decision(
+    rule: RateLimitRule,
+    current: int,
+    previous: int,
+    elapsed: float,
+    allowed: bool,
+) -> RateLimitDecision:
+    """
+    Remaining requests and retry delay from the window counts after a request
+    (``elapsed`` is the time spent in the current window)
+    """
+    window = rule.window_seconds
+    weight = 1 - elapsed / window
+    remaining = max(0, math.floor(rule.max_requests - (previous * weight + current)))
+    if allowed:
+        return RateLimitDecision(True, remaining, 0.0)
+
+    # Wait until the previous window has decayed enough for one more request
+    free = rule.max_requests - current - 1
+    if free >= 0 and previous > 0:
+        retry_after = window * (1 - free / previous) - elapsed
+    else:
+        # Not within this window: the current count becomes the previous one
+        retry_after = window - elapsed
+        if current > 0:
+            retry_after += window * max(0.0, 1 - (rule.max_requests - 1) / current)
+    return RateLimitDecision(False, 0, max(retry_after, 0.0))
+
+
+class RateLimitBackend(abc.ABC):
+    """
+    Storage of the sliding-window counters
+    """
+
+    @abc.abstractmethod
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        """Count a request against ``rule`` under ``key``"""
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """
+    In-process counters, sharded by key (one lock per shard)
+    """
+
+    # Expired entries of one shard are dropped every SWEEP_INTERVAL hits
+    SWEEP_INTERVAL = 1024
+
+    def __init__(self, shards: int = 16):
+        # key -> [window index, current count, previous count, expires at]
+        self._shards: List[Dict[str, list]] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._hits = 0
+        self._next_sweep = 0
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        return self.hit_sync(key, rule)
+
+    def hit_sync(self, key: str, rule: RateLimitRule, now: Optional[float] = None) -> RateLimitDecision:
+        now = time.monotonic() if now is None else now
+        window = rule.window_seconds
+        index = int(now // window)
+        elapsed = now - index * window
+
+        slot = hash(key) % len(self._shards)
+        with self._locks[slot]:
+            shard = self._shards[slot]
+            entry = shard.get(key)
+            if entry is None or entry[0] < index - 1:
+                current, previous = 0, 0
+            elif entry[0] == index - 1:
+                current, previous = 0, entry[1]
+            else:
+                current, previous = entry[1], entry[2]
+
+            allowed = previous * (1 - elapsed / window) + current + 1 <= rule.max_requests
+            if allowed:
+                current += 1
+            # Both windows are over after two window lengths: the entry is empty
+            shard[key] = [index, current, previous, (index + 2) * window]
+
+        self._hits += 1
+        if self._hits % self.SWEEP_INTERVAL == 0:
+            self._sweep(now)
+        return sliding_window_decision(rule, current, previous, elapsed, allowed)
+
+    def _sweep(self, now: float) -> None:
         """
-        Get when the rate limit will reset for client
+        Evict the idle clients of the next shard
         """
-        async with self.lock:
-            client_requests = self.clients[client_id]
-            if client_requests:
-                return client_requests[0] + timedelta(seconds=self.window_seconds)
-            return None
+        slot = self._next_sweep
+        self._next_sweep = (slot + 1) % len(self._shards)
+        with self._locks[slot]:
+            shard = self._shards[slot]
+            for key in [key for key, entry in shard.items() if entry[3] <= now]:
+                del shard[key]
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Counters in Redis hashes, updated by an atomic Lua script (shared by every process)
+    """
+
+    # Seconds on local counters before Redis is tried again after an error
+    RETRY_SECONDS = 30
+
+    # KEYS[1] = counter key; ARGV = max requests, window (ms)
+    # Returns {allowed, current, previous, elapsed ms}
+    SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local index = math.floor(now / window)
+local elapsed = now - index * window
+local state = redis.call('HMGET', KEYS[1], 'i', 'c', 'p')
+local i = tonumber(state[1])
+local current = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+if i == nil or i < index - 1 then
+    current, previous = 0, 0
+elseif i == index - 1 then
+    current, previous = 0, current
+end
+local allowed = 0
+if previous * (window - elapsed) / window + current + 1 <= limit then
+    allowed = 1
+    current = current + 1
+end
+redis.call('HSET', KEYS[1], 'i', index, 'c', current, 'p', previous)
+redis.call('PEXPIRE', KEYS[1], (index + 2) * window - now)
+return {allowed, current, previous, elapsed}
+"""
+
+    def __init__(self, url: str, key_prefix: str = "ratelimit:", fallback: Optional[RateLimitBackend] = None):
+        import redis.asyncio as aioredis
+
+        self._client = aioredis.from_url(url, socket_connect_timeout=1, socket_timeout=1)
+        self._script = self._client.register_script(self.SCRIPT)
+        self.key_prefix = key_prefix
+        self.fallback = fallback or LocalRateLimitBackend()
+        self._degraded = False
+        self._retry_at = 0.0
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        if self._degraded and time.monotonic() < self._retry_at:
+            return await self.fallback.hit(key, rule)
+        try:
+            allowed, current, previous, elapsed = await self._script(
+                keys=[self.key_prefix + key], args=[rule.max_requests, rule.window_seconds * 1000]
+            )
+        except Exception as e:
+            if not self._degraded:
+                logger.warning(f"Redis rate limiter unavailable, using local counters: {e}")
+                self._degraded = True
+            self._retry_at = time.monotonic() + self.RETRY_SECONDS
+            return await self.fallback.hit(key, rule)
+
+        if self._degraded:
+            logger.info("Redis rate limiter available again")
+            self._degraded = False
+        return sliding_window_decision(rule, int(current), int(previous), int(elapsed) / 1000, bool(allowed))
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+def create_rate_limit_backend() -> RateLimitBackend:
+    """
+    Return the backend configured by ``RATE_LIMIT_BACKEND_URL`` (in-process by default)
+    """
+    url = settings.RATE_LIMIT_BACKEND_URL
+    if url and url.startswith(("redis://", "rediss://")):
+        try:
+            return RedisRateLimitBackend(url)
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable, using local counters: {e}")
+    return LocalRateLimitBackend()
+
 
 class RateLimitMiddleware:
     """
     Rate limiting middleware for FastAPI
     """
-    
-    def __init__(self):
-        # Different limits for different endpoint types
-        self.limiters = {
-            'auth': RateLimiter(max_requests=50, window_seconds=60),      # 50 auth requests per minute
-            'api': RateLimiter(max_requests=200, window_seconds=60),     # 200 API requests per minute
-            'dashboard': RateLimiter(max_requests=100, window_seconds=60), # 100 dashboard requests per minute
-            'default': RateLimiter(max_requests=60, window_seconds=60)   # 60 requests per minute default
-        }
-    
+
+    def __init__(
+        self,
+        rules: Optional[str] = None,
+        default: Optional[str] = None,
+        backend: Optional[RateLimitBackend] = None,
+    ):
+        self.rules = parse_rate_limit_rules(settings.RATE_LIMIT_RULES if rules is None else rules)
+        self.default_rule = RateLimitRule('default', *parse_rate_limit(default or settings.RATE_LIMIT_DEFAULT))
+        self.backend = backend
+        # (path regex, rule) of routes marked with rate_limit (built lazily)
+        self._route_rules: Optional[List[Tuple[Pattern, RateLimitRule]]] = None
+
     def get_client_id(self, request: Request) -> str:
         """
         Get client identifier from request
@@ -73,76 +294,75 @@ class RateLimitMiddleware:
         # Try to get user ID from auth if available
         if hasattr(request.state, 'user_id'):
             return f"user:{request.state.user_id}"
-        
+
         # Fallback to IP address
         forwarded_for = request.headers.get('X-Forwarded-For')
         if forwarded_for:
             return f"ip:{forwarded_for.split(',')[0].strip()}"
-        
+
         client_host = request.client.host if request.client else 'unknown'
         return f"ip:{client_host}"
-    
-    def get_limiter_type(self, request: Request) -> str:
+
+    def get_rule(self, request: Request) -> RateLimitRule:
         """
-        Determine which rate limiter to use based on request path
+        Rule of the request: route decorator, then longest matching path prefix
         """
-        path = request.url.path
-        
-        if '/auth/' in path:
-            return 'auth'
-        elif '/dashboard/' in path:
-            return 'dashboard'
-        elif '/api/' in path:
-            return 'api'
-        else:
-            return 'default'
-    
-    async def __call__(self, request: Request, call_next):
+        path = request.scope['path']
+
+        if self._route_rules is None:
+            app = request.scope.get('app')
+            self._route_rules = [
+                (route.path_regex, RateLimitRule(route.path, *route.endpoint.__rate_limit__))
+                for route in getattr(app, 'routes', [])
+                if hasattr(getattr(route, 'endpoint', None), '__rate_limit__')
+            ]
+        for regex, rule in self._route_rules:
+            if regex.match(path):
+                return rule
+
+        for rule in self.rules:
+            if path.startswith(rule.name):
+                return rule
+        return self.default_rule
+
+    async def check(self, request: Request) -> Tuple[Dict[str, str], Optional[JSONResponse]]:
         """
-        Process request with rate limiting
+        Count the request; returns the rate limit headers and a 429 response when over the limit
         """
+        if self.backend is None:
+            self.backend = create_rate_limit_backend()
+
         client_id = self.get_client_id(request)
-        limiter_type = self.get_limiter_type(request)
-        limiter = self.limiters[limiter_type]
-        
-        # Check rate limit
-        if not await limiter.is_allowed(client_id):
-            reset_time = await limiter.get_reset_time(client_id)
-            
-            logger.warning(f"Rate limit exceeded for client {client_id} on {request.url.path}")
-            
-            headers = {
-                "X-RateLimit-Limit": str(limiter.max_requests),
-                "X-RateLimit-Window": str(limiter.window_seconds),
-                "X-RateLimit-Remaining": "0"
-            }
-            
-            if reset_time:
-                headers["X-RateLimit-Reset"] = str(int(reset_time.timestamp()))
-            
-            return JSONResponse(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content={
-                    "detail": "Rate limit exceeded. Too many requests.",
-                    "error_code": "RATE_LIMIT_EXCEEDED",
-                    "retry_after": limiter.window_seconds
-                },
-                headers=headers
-            )
-        
-        # Add rate limit headers to response
-        response = await call_next(request)
-        
-        # Get current usage
-        async with limiter.lock:
-            current_requests = len(limiter.clients[client_id])
-            remaining = max(0, limiter.max_requests - current_requests)
-        
-        response.headers["X-RateLimit-Limit"] = str(limiter.max_requests)
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
-        response.headers["X-RateLimit-Window"] = str(limiter.window_seconds)
-        
-        return response
+        rule = self.get_rule(request)
+        decision = await self.backend.hit(f"{rule.name}:{client_id}", rule)
+
+        headers = {
+            "X-RateLimit-Limit": str(rule.max_requests),
+            "X-RateLimit-Remaining": str(decision.remaining),
+            "X-RateLimit-Window": str(rule.window_seconds)
+        }
+        if decision.allowed:
+            return headers, None
+
+        logger.warning(f"Rate limit exceeded for client {client_id} on {request.url.path}")
+
+        retry_after = max(1, math.ceil(decision.retry_after))
+        headers["Retry-After"] = str(retry_after)
+        headers["X-RateLimit-Reset"] = str(int(time.time()) + retry_after)
+
+        return headers, JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={
+                "detail": "Rate limit exceeded. Too many requests.",
+                "error_code": "RATE_LIMIT_EXCEEDED",
+                "retry_after": retry_after
+            },
+            headers=headers
+        )
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
 
 # Global rate limiter instance
-rate_limit_middleware = RateLimitMiddleware()
\ No newline at end of file
+rate_limit_middleware = RateLimitMiddleware()
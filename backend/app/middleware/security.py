@@ -2,11 +2,9 @@
 Security middleware for CORS, headers, and general security
 """
 import logging
-from typing import List, Optional
-from fastapi import Request, Response
+from typing import Dict, List, Optional
+from fastapi import Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import time
 import secrets
 from app.core.config import settings
 
@@ -23,6 +21,7 @@ class SecurityMiddleware:
         self.allowed_hosts = allowed_hosts or ['localhost', '127.0.0.1']
         self.max_request_time = max_request_time
         self.request_id_header = "X-Request-ID"
+        self._static_headers: Optional[Dict[str, str]] = None
     
     def generate_request_id(self) -> str:
         """
@@ -37,68 +36,28 @@ class SecurityMiddleware:
         host = request.headers.get('host', '').split(':')[0]
         return host in self.allowed_hosts or host.startswith('localhost') or host.startswith('127.0.0.1')
     
-    async def __call__(self, request: Request, call_next):
+    def security_headers(self, request_id: str) -> Dict[str, str]:
         """
-        Process request with security checks
+        Security headers of a response (computed once, except the request ID)
         """
-        start_time = time.time()
-        
-        # Generate request ID
-        request_id = self.generate_request_id()
-        request.state.request_id = request_id
-        
-        # Validate host (in production)
-        # if not self.validate_host(request):
-        #     logger.warning(f"Invalid host: {request.headers.get('host')}")
-        #     return JSONResponse(
-        #         status_code=403,
-        #         content={"detail": "Forbidden", "error_code": "INVALID_HOST"}
-        #     )
-        
-        # Add request logging
-        logger.info(f"Request {request_id}: {request.method} {request.url.path}")
-        
-        try:
-            response = await call_next(request)
-            
-            # Check request processing time
-            process_time = time.time() - start_time
-            if process_time > self.max_request_time:
-                logger.warning(f"Slow request {request_id}: {process_time:.2f}s")
-            
-            # Add security headers
-            self.add_security_headers(response, request_id)
-            
-            # Add timing header
-            response.headers["X-Process-Time"] = str(round(process_time, 3))
-            
-            logger.info(f"Response {request_id}: {response.status_code} in {process_time:.3f}s")
-            
-            return response
-            
-        except Exception as e:
-            process_time = time.time() - start_time
-            logger.error(f"Error in request {request_id}: {str(e)} after {process_time:.3f}s")
-            raise
+        if self._static_headers is None:
+            self._static_headers = self._build_static_headers()
+        return {self.request_id_header: request_id, **self._static_headers}
     
-    def add_security_headers(self, response: Response, request_id: str):
-        """
-        Add security headers to response
-        """
-        # Request ID
-        response.headers[self.request_id_header] = request_id
-        
+    def _build_static_headers(self) -> Dict[str, str]:
         # Security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
+        headers = {
+            "X-Content-Type-Options": "nosniff",
+            "X-Frame-Options": "DENY",
+            "X-XSS-Protection": "1; mode=block",
+            "Referrer-Policy": "strict-origin-when-cross-origin",
+            "Permissions-Policy": "geolocation=(), microphone=(), camera=()",
+        }
         
         # Content Security Policy (adjusted for environment)
         script_inline = " 'unsafe-inline'" if settings.DEBUG else ""
         style_inline = " 'unsafe-inline'" if settings.DEBUG else ""
-        csp = (
+        headers["Content-Security-Policy"] = (
             "default-src 'self'; "
             f"script-src 'self'{script_inline}; "
             f"style-src 'self'{style_inline}; "
@@ -107,15 +66,15 @@ class SecurityMiddleware:
             "connect-src 'self'; "
             "frame-ancestors 'none';"
         )
-        response.headers["Content-Security-Policy"] = csp
         
         # HSTS (HTTP Strict Transport Security) - only in production with HTTPS enabled
         try:
             if (not settings.DEBUG) and (settings.ENABLE_HTTPS_REDIRECT or (settings.SSL_CERT_PATH and settings.SSL_KEY_PATH)):
-                response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
+                headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
         except Exception:
             # Safeguard in case settings are not available
             pass
+        return headers
 
 def setup_cors_middleware(app, 
                          allowed_origins: List[str] = None,
@@ -4,14 +4,38 @@ Input validation and sanitization middleware
 import re
 import json
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
+from starlette.types import Message, Receive
 import html
 import urllib.parse
 
 logger = logging.getLogger(__name__)
 
+
+def skip_sanitization(endpoint: Callable) -> Callable:
+    """
+    Route decorator: the JSON body is left to the route's schema validation
+    instead of being sanitized by ``ValidationMiddleware``
+    """
+    endpoint.__skip_sanitization__ = True
+    return endpoint
+
+
+class UnsafeInputError(ValueError):
+    """A string matched one of the blocked patterns"""
+
+    def __init__(self, kind: str, value: str):
+        super().__init__(kind)
+        self.kind = kind
+        self.value = value
+
+
+class _JSONTooDeep(ValueError):
+    pass
+
+
 class InputValidator:
     """
     Input validation and sanitization utilities
@@ -49,6 +73,47 @@ class InputValidator:
         re.compile(r'/\*.*?\*/', re.IGNORECASE | re.DOTALL)
     ]
     
+    # Lowercase literals that every match of the corresponding pattern
+    # (DANGEROUS_PATTERNS + SQL_INJECTION_PATTERNS, in order) contains
+    BLOCKED_LITERALS = [
+        ('<script',), ('javascript:',), ('=',), ('<iframe',), ('<object',),
+        ('<embed',), ('eval',), ('expression',), ('vbscript:',), ('data:text/html',),
+        ('union', 'select', 'insert', 'update', 'delete', 'drop', 'create', 'alter', 'exec'),
+        ("'", '"', ';'), ('--',), ('/*',),
+    ]
+    
+    _BLOCKED_RULES = list(zip(
+        DANGEROUS_PATTERNS + SQL_INJECTION_PATTERNS,
+        BLOCKED_LITERALS,
+        ['dangerous'] * len(DANGEROUS_PATTERNS) + ['sql'] * len(SQL_INJECTION_PATTERNS)
+    ))
+    
+    # Non-ASCII characters that IGNORECASE matches to ASCII letters
+    # (ı, İ, ſ, Kelvin sign): their presence disables the literal prefilter
+    CASE_ALIASES = ('\u0130', '\u0131', '\u017f', '\u212a')
+    
+    # Characters rewritten by sanitize_string (HTML escaping, URL decoding)
+    REWRITE_CHARS = ('&', '<', '>', '"', "'", '%')
+    
+    @classmethod
+    def find_blocked(cls, value: str) -> Optional[str]:
+        """
+        Kind of blocked pattern found in the string ('dangerous' or 'sql'), if any.
+        
+        Patterns whose literals are absent from the lowercased input are
+        skipped, so clean input costs a few substring searches instead of
+        one regex scan per pattern.
+        """
+        folded = None
+        if value.isascii() or not any(alias in value for alias in cls.CASE_ALIASES):
+            folded = value.lower()
+        for pattern, literals, kind in cls._BLOCKED_RULES:
+            if folded is not None and not any(literal in folded for literal in literals):
+                continue
+            if pattern.search(value):
+                return kind
+        return None
+    
     @classmethod
     def sanitize_string(cls, value: str, max_length: int = 1000) -> str:
         """
@@ -151,6 +216,11 @@ class ValidationMiddleware:
         self.validator = InputValidator()
         self.max_request_size = 10 * 1024 * 1024  # 10MB
         self.max_json_depth = 10
+        self.max_string_length = 1000
+        self.max_key_length = 100
+        self.max_array_length = 1000
+        # Path regexes of routes marked with skip_sanitization (built lazily)
+        self._exempt_routes: Optional[List[Pattern]] = None
     
     async def validate_request_size(self, request: Request) -> bool:
         """
@@ -179,43 +249,106 @@ class ValidationMiddleware:
         """
         Recursively sanitize JSON data
         """
+        try:
+            sanitized, _ = self.sanitize_body(data)
+        except UnsafeInputError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid input detected"
+            )
+        return sanitized
+    
+    def sanitize_body(self, data: Any) -> Tuple[Any, bool]:
+        """
+        Check and sanitize a parsed JSON body; returns (data, changed).
+        
+        The strings of the body are joined with NUL separators and checked
+        in one pass for blocked patterns and for characters that
+        ``sanitize_string`` would rewrite. When nothing has to change,
+        ``data`` is returned as is and the raw body can be forwarded.
+        """
+        strings: List[str] = []
+        changed = self._collect_strings(data, strings, 0)
+        text = '\x00'.join(strings)
+        
+        if self.validator.find_blocked(text):
+            # Locate the offending string (a match may also span two strings)
+            for value in strings:
+                kind = self.validator.find_blocked(value)
+                if kind:
+                    raise UnsafeInputError(kind, value)
+        
+        if changed or any(char in text for char in self.validator.REWRITE_CHARS):
+            return self._rewrite(data), True
+        return data, False
+    
+    def _collect_strings(self, data: Any, strings: List[str], depth: int) -> bool:
+        """
+        Gather the strings that are kept; True when truncation or stripping
+        changes the body
+        """
+        if depth > self.max_json_depth:
+            raise _JSONTooDeep()
+        
+        if isinstance(data, str):
+            strings.append(data)
+            return len(data) > self.max_string_length or (
+                data != '' and (data[0].isspace() or data[-1].isspace())
+            )
+        if isinstance(data, dict):
+            changed = False
+            for key, value in data.items():
+                if len(key) > self.max_key_length:
+                    changed = True
+                elif self._collect_strings(value, strings, depth + 1):
+                    changed = True
+            return changed
+        if isinstance(data, list):
+            changed = len(data) > self.max_array_length
+            for item in data[:self.max_array_length]:
+                if self._collect_strings(item, strings, depth + 1):
+                    changed = True
+            return changed
+        return False
+    
+    def _rewrite(self, data: Any) -> Any:
         if isinstance(data, dict):
             return {
-                key: self.sanitize_json_data(value)
+                key: self._rewrite(value)
                 for key, value in data.items()
-                if isinstance(key, str) and len(key) <= 100  # Limit key length
+                if len(key) <= self.max_key_length  # Limit key length
             }
         elif isinstance(data, list):
-            return [self.sanitize_json_data(item) for item in data[:1000]]  # Limit array size
+            return [self._rewrite(item) for item in data[:self.max_array_length]]  # Limit array size
         elif isinstance(data, str):
-            # Check for dangerous patterns
-            if self.validator.check_dangerous_patterns(data):
-                logger.warning(f"Dangerous pattern detected in input: {data[:100]}...")
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid input detected"
-                )
-            
-            # Check for SQL injection
-            if self.validator.check_sql_injection(data):
-                logger.warning(f"SQL injection attempt detected: {data[:100]}...")
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid input detected"
-                )
-            
-            return self.validator.sanitize_string(data)
-        else:
-            return data
+            return self.validator.sanitize_string(data, self.max_string_length)
+        return data
     
-    async def __call__(self, request: Request, call_next):
+    def _is_exempt(self, request: Request) -> bool:
         """
-        Process request with validation
+        Whether the request targets a route marked with ``skip_sanitization``
+        """
+        if self._exempt_routes is None:
+            app = request.scope.get('app')
+            self._exempt_routes = [
+                route.path_regex
+                for route in getattr(app, 'routes', [])
+                if getattr(getattr(route, 'endpoint', None), '__skip_sanitization__', False)
+            ]
+        path = request.scope['path']
+        return any(regex.match(path) for regex in self._exempt_routes)
+    
+    async def check_request(self, request: Request) -> Tuple[Optional[bytes], Optional[JSONResponse]]:
+        """
+        Size limit and JSON body sanitization.
+        
+        Returns the body to forward downstream (``None`` when the body was not
+        read) and the error response when the request is rejected.
         """
         # Validate request size
         if not await self.validate_request_size(request):
             logger.warning(f"Request too large from {request.client.host if request.client else 'unknown'}")
-            return JSONResponse(
+            return None, JSONResponse(
                 status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 content={
                     "detail": "Request entity too large",
@@ -224,84 +357,76 @@ class ValidationMiddleware:
             )
         
         # Validate and sanitize JSON body for POST/PUT requests
-        if request.method in ['POST', 'PUT', 'PATCH']:
-            content_type = request.headers.get('content-type', '')
-            
-            if 'application/json' in content_type:
-                try:
-                    # Prefer FastAPI/Starlette built-in JSON parser
-                    try:
-                        json_data = await request.json()
-                    except Exception:
-                        body = await request.body()
-                        if body:
-                            json_data = json.loads(body)
-                        else:
-                            json_data = None
-                    
-                    if json_data is not None:
-                        # Validate JSON depth
-                        if not self.validate_json_depth(json_data):
-                            logger.warning("JSON nesting too deep")
-                            return JSONResponse(
-                                status_code=status.HTTP_400_BAD_REQUEST,
-                                content={
-                                    "detail": "JSON nesting too deep",
-                                    "error_code": "INVALID_JSON_STRUCTURE"
-                                }
-                            )
-                        
-                        # Sanitize JSON data
-                        try:
-                            sanitized_data = self.sanitize_json_data(json_data)
-                            
-                            # Replace request body with sanitized data
-                            sanitized_body = json.dumps(sanitized_data).encode()
-                            
-                            # Store the sanitized body for the request (FIXED: don't modify _receive)
-                            request._body = sanitized_body
-                        except HTTPException:
-                            raise
-                        except Exception as e:
-                            logger.error(f"Error sanitizing JSON data: {e}")
-                            return JSONResponse(
-                                status_code=status.HTTP_400_BAD_REQUEST,
-                                content={
-                                    "detail": "Invalid request data",
-                                    "error_code": "INVALID_REQUEST_DATA"
-                                }
-                            )
-                    # If body is empty, that's OK for some endpoints
-                
-                except json.JSONDecodeError:
-                    logger.warning("Invalid JSON in request body")
-                    return JSONResponse(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        content={
-                            "detail": "Invalid JSON format",
-                            "error_code": "INVALID_JSON"
-                        }
-                    )
-                except Exception as e:
-                    logger.error(f"Error processing request body: {e}")
-                    return JSONResponse(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        content={
-                            "detail": "Error processing request",
-                            "error_code": "REQUEST_PROCESSING_ERROR"
-                        }
-                    )
-        
-        # Continue with request
-        response = await call_next(request)
+        if (
+            request.method not in ['POST', 'PUT', 'PATCH']
+            or 'application/json' not in request.headers.get('content-type', '')
+            or self._is_exempt(request)
+        ):
+            return None, None
         
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        try:
+            body = await request.body()
+            if body:
+                json_data = json.loads(body)
+                sanitized_data, changed = self.sanitize_body(json_data)
+                if changed:
+                    body = json.dumps(sanitized_data).encode()
+                request.state.json_body = sanitized_data
+            # If body is empty, that's OK for some endpoints
+            return body, None
         
-        return response
+        except _JSONTooDeep:
+            logger.warning("JSON nesting too deep")
+            return None, JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "detail": "JSON nesting too deep",
+                    "error_code": "INVALID_JSON_STRUCTURE"
+                }
+            )
+        except UnsafeInputError as e:
+            if e.kind == 'sql':
+                logger.warning(f"SQL injection attempt detected: {e.value[:100]}...")
+            else:
+                logger.warning(f"Dangerous pattern detected in input: {e.value[:100]}...")
+            return None, JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "detail": "Invalid input detected",
+                    "error_code": "INVALID_INPUT"
+                }
+            )
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            logger.warning("Invalid JSON in request body")
+            return None, JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "detail": "Invalid JSON format",
+                    "error_code": "INVALID_JSON"
+                }
+            )
+        except Exception as e:
+            logger.error(f"Error processing request body: {e}")
+            return None, JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "detail": "Error processing request",
+                    "error_code": "REQUEST_PROCESSING_ERROR"
+                }
+            )
+    
+def replay_receive(body: bytes, receive: Receive) -> Receive:
+    """
+    ASGI receive channel that delivers an already read ``body`` first
+    """
+    pending = [body]
+    
+    async def replay() -> Message:
+        if pending:
+            return {"type": "http.request", "body": pending.pop(), "more_body": False}
+        return await receive()
+    
+    return replay
 
 # Global validation middleware instance
 validation_middleware = ValidationMiddleware()
\ No newline at end of file
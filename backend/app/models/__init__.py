@@ -8,9 +8,12 @@ from .location import Local, Location
 from .responsavel import Responsavel
 from .fornecedor import Fornecedor
 from .asset import Ativo, EstadoAtivo, StatusAtivo, CategoriaAtivo
-from .movimentacao import Movimentacao, TipoMovimentacao, StatusMovimentacao
-from .auditoria import Auditoria, AuditoriaItem, TipoAuditoria, StatusAuditoria, ResultadoItem
-from .manutencao import Manutencao, TipoManutencao, StatusManutencao, PrioridadeManutencao
+from .movimentacao import Movimentacao, TipoMovimentacao, StatusMovimentacao, CustodiaIntervalo
+from .auditoria import (
+    Auditoria, AuditoriaItem, AuditoriaContadorLocal, AuditoriaItemVersao, AuditoriaLeituraRecebida,
+    TipoAuditoria, StatusAuditoria, ResultadoItem
+)
+from .manutencao import Manutencao, ManutencaoResumoDiario, TipoManutencao, StatusManutencao, PrioridadeManutencao
 
 # Legacy models (keeping for backward compatibility)
 from .machine import Machine, MachineStatus, MachineType
@@ -18,6 +21,9 @@ from .movement import Movement, MovementType, MovementStatus
 from .alert import Alert, AlertType, AlertStatus
 from .ticket import Ticket, TicketStatus, TicketPriority, TicketCategory
 
+# Infrastructure
+from .job import BackgroundJob, JobStatus
+
 __all__ = [
     # Core user management
     "User", "UserRole", "UserStatus",
@@ -29,13 +35,17 @@ __all__ = [
     "Responsavel",
     "Fornecedor",
     "Ativo", "EstadoAtivo", "StatusAtivo", "CategoriaAtivo",
-    "Movimentacao", "TipoMovimentacao", "StatusMovimentacao",
-    "Auditoria", "AuditoriaItem", "TipoAuditoria", "StatusAuditoria", "ResultadoItem",
-    "Manutencao", "TipoManutencao", "StatusManutencao", "PrioridadeManutencao",
+    "Movimentacao", "TipoMovimentacao", "StatusMovimentacao", "CustodiaIntervalo",
+    "Auditoria", "AuditoriaItem", "AuditoriaContadorLocal", "AuditoriaItemVersao",
+    "AuditoriaLeituraRecebida", "TipoAuditoria", "StatusAuditoria", "ResultadoItem",
+    "Manutencao", "ManutencaoResumoDiario", "TipoManutencao", "StatusManutencao", "PrioridadeManutencao",
     
     # Legacy models (backward compatibility)
     "Machine", "MachineStatus", "MachineType",
     "Movement", "MovementType", "MovementStatus",
     "Alert", "AlertType", "AlertStatus",
-    "Ticket", "TicketStatus", "TicketPriority", "TicketCategory"
+    "Ticket", "TicketStatus", "TicketPriority", "TicketCategory",
+    
+    # Infrastructure
+    "BackgroundJob", "JobStatus"
 ]
\ No newline at end of file
@@ -3,7 +3,7 @@ Auditoria models for Levitiis inventory system
 Physical inventory audit and reconciliation
 """
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, JSON, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum
@@ -135,6 +135,7 @@ class AuditoriaItem(Base):
     local_esperado_id = Column(Integer, ForeignKey("locais.id"), nullable=True)
     local_encontrado_id = Column(Integer, ForeignKey("locais.id"), nullable=True)
     responsavel_esperado_id = Column(Integer, ForeignKey("responsaveis.id"), nullable=True)
+    estado_esperado = Column(String(30), nullable=True)
     
     # Evidence and observations
     observacao = Column(Text, nullable=True)
@@ -147,7 +148,7 @@ class AuditoriaItem(Base):
     data_coleta = Column(DateTime(timezone=True), nullable=True)
     
     # Audit trail
-    verificado_por = Column(Integer, ForeignKey("users.id"), nullable=False)
+    verificado_por = Column(Integer, ForeignKey("users.id"), nullable=True)  # Preenchido na coleta
     timestamp_verificacao = Column(DateTime(timezone=True), server_default=func.now())
     coordenadas_gps = Column(String(50), nullable=True)  # lat,lng
     coletado_por = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -170,6 +171,77 @@ class AuditoriaItem(Base):
     aprovador = relationship("User", foreign_keys=[aprovado_por])
     coletor = relationship("User", foreign_keys=[coletado_por])
     responsavel_esperado = relationship("Responsavel", foreign_keys=[responsavel_esperado_id])
+    
+    __table_args__ = (
+        Index("ix_auditoria_itens_auditoria_resultado", "auditoria_id", "resultado"),
+    )
+
+    def __repr__(self):
+        return f"<AuditoriaItem(id={self.id}, auditoria_id={self.auditoria_id}, resultado='{self.resultado}')>"
+
 
+class AuditoriaContadorLocal(Base):
+    """
+    Contadores de progresso da auditoria por local, mantidos incrementalmente
+    a cada coleta. Os totais gerais são a soma das linhas; Auditoria.total_*
+    só é preenchido ao iniciar a reconciliação.
+    """
+    
+    __tablename__ = "auditoria_contadores_local"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    auditoria_id = Column(Integer, ForeignKey("auditorias.id"), nullable=False, index=True)
+    local_id = Column(Integer, nullable=False, default=0)  # 0 = sem local
+    
+    esperados = Column(Integer, nullable=False, default=0)
+    verificados = Column(Integer, nullable=False, default=0)
+    conformes = Column(Integer, nullable=False, default=0)
+    divergentes = Column(Integer, nullable=False, default=0)
+    nao_encontrados = Column(Integer, nullable=False, default=0)
+    extras = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint("auditoria_id", "local_id", name="uq_auditoria_contador_local"),
+    )
+    
     def __repr__(self):
-        return f"<AuditoriaItem(id={self.id}, auditoria_id={self.auditoria_id}, resultado='{self.resultado}')>"
\ No newline at end of file
+        return f"<AuditoriaContadorLocal(auditoria_id={self.auditoria_id}, local_id={self.local_id}, verificados={self.verificados})>"
+
+
+class AuditoriaItemVersao(Base):
+    """
+    Registro de alteração de itens para sincronização offline.
+    
+    Cada coleta insere uma linha; o ``id`` (autoincremento) é a versão usada
+    pelos dispositivos para baixar apenas o que mudou. Só há inserts, então
+    dispositivos concorrentes não disputam a mesma linha.
+    """
+    
+    __tablename__ = "auditoria_item_versoes"
+    
+    id = Column(Integer, primary_key=True)
+    auditoria_id = Column(Integer, ForeignKey("auditorias.id"), nullable=False)
+    item_id = Column(Integer, ForeignKey("auditoria_itens.id"), nullable=False)
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_auditoria_item_versoes_auditoria_id_id", "auditoria_id", "id"),
+    )
+
+
+class AuditoriaLeituraRecebida(Base):
+    """
+    Recibo de leitura sincronizada, chaveado pela auditoria e pelo ID gerado
+    no dispositivo (idempotência; o mesmo client_id pode voltar em outra auditoria)
+    """
+    
+    __tablename__ = "auditoria_leituras_recebidas"
+    
+    auditoria_id = Column(Integer, ForeignKey("auditorias.id"), primary_key=True)
+    client_id = Column(String(64), primary_key=True)
+    item_id = Column(Integer, nullable=True)
+    dispositivo_id = Column(String(100), nullable=True)
+    status = Column(String(20), nullable=False)  # sucesso, erro
+    resultado = Column(String(30), nullable=True)
+    erro = Column(Text, nullable=True)
+    recebido_em = Column(DateTime(timezone=True), server_default=func.now())
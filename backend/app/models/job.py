@@ -0,0 +1,62 @@
+"""
+Background job model
+"""
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON, ForeignKey, Index
+from sqlalchemy.sql import func
+import enum
+
+from app.core.database import Base
+
+
+class JobStatus(str, enum.Enum):
+    """Background job status enumeration"""
+    PENDING = "pending"
+    RUNNING = "running"
+    RETRYING = "retrying"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLING = "cancelling"
+    CANCELLED = "cancelled"
+
+
+# Statuses from which a job will not run again
+JOB_FINAL_STATUSES = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class BackgroundJob(Base):
+    """Persistent record of a long-running operation executed by the job runner"""
+
+    __tablename__ = "background_jobs"
+
+    id = Column(String(32), primary_key=True)
+    kind = Column(String(100), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default=JobStatus.PENDING, index=True)
+
+    # Input and output
+    params = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    # Progress (0-100) and last progress message
+    progress = Column(Float, nullable=False, default=0.0)
+    message = Column(String(500), nullable=True)
+
+    # Retries
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=1)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Ownership and timestamps
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_background_jobs_created_by_status", "created_by", "status"),
+    )
+
+    def __repr__(self):
+        return f"<BackgroundJob(id={self.id}, kind='{self.kind}', status='{self.status}')>"
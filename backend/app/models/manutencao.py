@@ -3,7 +3,7 @@ Manutencao model for Levitiis inventory system
 Asset maintenance and support ticket management
 """
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Numeric
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Float, Text, Numeric, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum
@@ -44,6 +44,19 @@ class Manutencao(Base):
     Manages asset maintenance requests and service tickets
     """
     __tablename__ = "manutencoes"
+    __table_args__ = (
+        # Upcoming SLA events, read by the SLA scheduler
+        Index(
+            "ix_manutencoes_sla_proximo_evento_em", "sla_proximo_evento_em",
+            postgresql_where=text("sla_proximo_evento_em IS NOT NULL"),
+            sqlite_where=text("sla_proximo_evento_em IS NOT NULL"),
+        ),
+        Index("ix_manutencoes_sla_vence_em", "sla_vence_em"),
+        # Date ranges scanned by the analytics rollup
+        Index("ix_manutencoes_data_abertura", "data_abertura"),
+        Index("ix_manutencoes_data_resolucao", "data_resolucao"),
+        Index("ix_manutencoes_atualizado_em", "atualizado_em"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -71,6 +84,13 @@ class Manutencao(Base):
     sla_pausado = Column(Integer, default=0)  # 0=não, 1=sim
     tempo_pausado_minutos = Column(Integer, default=0)
     
+    # Precomputed SLA state (maintained by app.core.sla_scheduler)
+    sla_vence_em = Column(DateTime(timezone=True), nullable=True)  # deadline shifted by the pauses
+    sla_proximo_evento_em = Column(DateTime(timezone=True), nullable=True)  # next warning/breach
+    sla_pausado_em = Column(DateTime(timezone=True), nullable=True)
+    sla_alerta_em = Column(DateTime(timezone=True), nullable=True)
+    sla_violado_em = Column(DateTime(timezone=True), nullable=True)
+    
     # Assignment and responsibility
     aberto_por = Column(Integer, ForeignKey("users.id"), nullable=False)
     atribuido_para = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -112,6 +132,8 @@ class Manutencao(Base):
     @property
     def sla_vencido(self):
         """Verifica se o SLA foi vencido"""
+        if self.sla_violado_em is not None:
+            return True
         if not self.data_vencimento_sla:
             return False
         return datetime.now() > self.data_vencimento_sla and self.status not in [StatusManutencao.RESOLVIDO, StatusManutencao.FECHADO]
@@ -136,4 +158,33 @@ class Manutencao(Base):
         return min(100, round((tempo_decorrido.total_seconds() / tempo_total_sla.total_seconds()) * 100, 1))
 
     def __repr__(self):
-        return f"<Manutencao(id={self.id}, numero='{self.numero_chamado}', tipo='{self.tipo}', status='{self.status}')>"
\ No newline at end of file
+        return f"<Manutencao(id={self.id}, numero='{self.numero_chamado}', tipo='{self.tipo}', status='{self.status}')>"
+
+
+class ManutencaoResumoDiario(Base):
+    """
+    Daily maintenance rollup per asset category and maintenance type
+    Refreshed incrementally by app.core.maintenance_analytics
+    """
+    __tablename__ = "manutencao_resumos_diarios"
+
+    dia = Column(Date, primary_key=True)
+    categoria = Column(String(50), primary_key=True)  # categoria do ativo
+    tipo = Column(String(20), primary_key=True)
+
+    # Orders opened on the day
+    abertas = Column(Integer, nullable=False, default=0)
+
+    # Orders resolved on the day (repair time = abertura -> resolução)
+    resolvidas = Column(Integer, nullable=False, default=0)
+    minutos_reparo_total = Column(Float, nullable=False, default=0)
+    reparo_p50_minutos = Column(Float, nullable=True)  # only where percentile_cont exists
+    reparo_p90_minutos = Column(Float, nullable=True)
+    sla_avaliadas = Column(Integer, nullable=False, default=0)
+    sla_cumpridas = Column(Integer, nullable=False, default=0)
+    custo_total = Column(Numeric(14, 2), nullable=False, default=0)
+
+    calculado_em = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<ManutencaoResumoDiario(dia={self.dia}, categoria='{self.categoria}', tipo='{self.tipo}')>"
@@ -2,7 +2,7 @@
 Movement model for asset tracking
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum
@@ -147,6 +147,8 @@ class AssetAudit(Base):
     record_hash = Column(String(64), nullable=True)
     signature = Column(String(128), nullable=True)
     signature_algorithm = Column(String(50), default="HMAC-SHA256", nullable=True)
+    chain_seq = Column(Integer, nullable=True)  # position in the asset's chain (see AssetAuditHead)
+    merkle_proof = Column(JSON, nullable=True)  # inclusion proof when signed as part of a batch
 
     # Audit fields
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -156,5 +158,56 @@ class AssetAudit(Base):
     asset = relationship("Asset", back_populates="audit_logs")
     user = relationship("User")
     
+    __table_args__ = (
+        # Chains are read per asset in insertion order
+        Index("ix_asset_audits_asset_id_id", "asset_id", "id"),
+        # A forked chain (two records with the same predecessor) cannot be stored
+        Index("uq_asset_audits_asset_id_chain_seq", "asset_id", "chain_seq", unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<AssetAudit(id={self.id}, asset_id={self.asset_id}, action='{self.action}')>"
+
+
+class AssetAuditHead(Base):
+    """
+    Last record of an asset's audit chain.
+    
+    Locked by ``app.core.audit_chain.append_audit_records`` while appending, so
+    appends to one asset are serialised without reading its history.
+    """
+    
+    __tablename__ = "asset_audit_heads"
+    
+    asset_id = Column(Integer, primary_key=True)
+    last_hash = Column(String(64), nullable=True)
+    seq = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<AssetAuditHead(asset_id={self.asset_id}, seq={self.seq})>"
+
+
+class AssetAuditCheckpoint(Base):
+    """
+    Verified prefix of an asset's audit chain.
+    
+    Verification resumes after ``last_audit_id`` using ``last_hash`` as the
+    expected ``prev_hash`` of the next record.
+    """
+    
+    __tablename__ = "asset_audit_checkpoints"
+    
+    asset_id = Column(Integer, primary_key=True)
+    last_audit_id = Column(Integer, nullable=False)
+    last_hash = Column(String(64), nullable=True)
+    verified_count = Column(Integer, default=0, nullable=False)
+    
+    # First broken link found after the verified prefix, if any
+    broken_audit_id = Column(Integer, nullable=True)
+    broken_reason = Column(String(50), nullable=True)
+    
+    verified_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
     def __repr__(self):
-        return f"<AssetAudit(id={self.id}, asset_id={self.asset_id}, action='{self.action}')>"
\ No newline at end of file
+        return f"<AssetAuditCheckpoint(asset_id={self.asset_id}, last_audit_id={self.last_audit_id})>"
\ No newline at end of file
@@ -3,9 +3,9 @@ Movimentacao model for Levitiis inventory system
 Asset movement and custody chain tracking
 """
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from enum import Enum
 from app.core.database import Base
 
@@ -33,6 +33,24 @@ class Movimentacao(Base):
     Tracks asset movements and maintains custody chain
     """
     __tablename__ = "movimentacoes"
+    __table_args__ = (
+        # Fila de aprovação: índices parciais só com as movimentações pendentes
+        Index(
+            "ix_movimentacoes_pendentes", "id",
+            postgresql_where=text("status = 'pendente_aprovacao'"),
+            sqlite_where=text("status = 'pendente_aprovacao'"),
+        ),
+        Index(
+            "ix_movimentacoes_pendentes_setor", "setor_id", "id",
+            postgresql_where=text("status = 'pendente_aprovacao'"),
+            sqlite_where=text("status = 'pendente_aprovacao'"),
+        ),
+        Index(
+            "ix_movimentacoes_pendentes_centro_custo", "centro_custo_id", "id",
+            postgresql_where=text("status = 'pendente_aprovacao'"),
+            sqlite_where=text("status = 'pendente_aprovacao'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -49,6 +67,10 @@ class Movimentacao(Base):
     de_responsavel_id = Column(Integer, ForeignKey("responsaveis.id"), nullable=True)
     para_responsavel_id = Column(Integer, ForeignKey("responsaveis.id"), nullable=True)
     
+    # Roteamento da aprovação (setor e centro de custo do ativo na solicitação)
+    setor_id = Column(Integer, ForeignKey("setores.id"), nullable=True)
+    centro_custo_id = Column(Integer, ForeignKey("centros_custo.id"), nullable=True)
+    
     # Movement control
     status = Column(String(20), nullable=False, default=StatusMovimentacao.PENDENTE)
     data_solicitacao = Column(DateTime(timezone=True), server_default=func.now())
@@ -83,5 +105,42 @@ class Movimentacao(Base):
     aprovador = relationship("User", foreign_keys=[aprovado_por])
     executor = relationship("User", foreign_keys=[executado_por])
 
+    @property
+    def requer_aprovacao(self):
+        """Movimentação passou (ou está) na fila de aprovação"""
+        return self.status == "pendente_aprovacao" or self.aprovado_por is not None
+
+    def __repr__(self):
+        return f"<Movimentacao(id={self.id}, ativo_id={self.ativo_id}, tipo='{self.tipo}', status='{self.status}')>"
+
+
+class CustodiaIntervalo(Base):
+    """
+    Intervalo de custódia de um ativo: local e responsável vigentes entre
+    ``inicio`` e ``fim`` (``fim`` nulo = custódia atual).
+    Mantido por ``_executar_movimentacoes``; permite consultas por data e por
+    período sem reprocessar o histórico de movimentações.
+    """
+    __tablename__ = "custodia_intervalos"
+    __table_args__ = (
+        Index("ix_custodia_intervalos_ativo_inicio", "ativo_id", "inicio"),
+        Index("ix_custodia_intervalos_local_inicio_fim", "local_id", "inicio", "fim"),
+        Index("ix_custodia_intervalos_responsavel_inicio_fim", "responsavel_id", "inicio", "fim"),
+        # No máximo um intervalo aberto por ativo
+        Index(
+            "uq_custodia_intervalos_ativo_aberto", "ativo_id", unique=True,
+            postgresql_where=text("fim IS NULL"), sqlite_where=text("fim IS NULL"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    ativo_id = Column(Integer, ForeignKey("ativos.id"), nullable=False)
+    local_id = Column(Integer, ForeignKey("locais.id"), nullable=True)
+    responsavel_id = Column(Integer, ForeignKey("responsaveis.id"), nullable=True)
+    # Movimentação que abriu o intervalo (nula para a custódia inicial)
+    movimentacao_id = Column(Integer, ForeignKey("movimentacoes.id"), nullable=True)
+    inicio = Column(DateTime(timezone=True), nullable=False)
+    fim = Column(DateTime(timezone=True), nullable=True)
+
     def __repr__(self):
-        return f"<Movimentacao(id={self.id}, ativo_id={self.ativo_id}, tipo='{self.tipo}', status='{self.status}')>"
\ No newline at end of file
+        return f"<CustodiaIntervalo(ativo_id={self.ativo_id}, local_id={self.local_id}, responsavel_id={self.responsavel_id}, inicio={self.inicio}, fim={self.fim})>"
@@ -72,7 +72,7 @@ class AtivoResponse(AtivoBase):
     valor_contabil_atual: Optional[Decimal] = None
     valor_depreciado_acumulado: Optional[Decimal] = None
     percentual_depreciacao: Optional[float] = None
-    etiqueta_gerada: bool = False
+    etiqueta_impressa: Optional[bool] = False
     codigo_qr: Optional[str] = None
     codigo_nfc: Optional[str] = None
     url_foto: Optional[str] = None
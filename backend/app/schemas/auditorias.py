@@ -128,6 +128,13 @@ class ColetaLeitura(BaseModel):
     estado_encontrado: Optional[str] = Field(None, description="Estado físico encontrado")
     observacoes: Optional[str] = Field(None, max_length=500, description="Observações da coleta")
     foto_url: Optional[str] = Field(None, description="URL da foto de evidência")
+    client_id: Optional[str] = Field(None, max_length=64, description="ID único gerado no dispositivo (reenvio idempotente)")
+
+
+class SincronizacaoColetas(BaseModel):
+    """Schema for a chunk of readings pushed by an offline device"""
+    dispositivo_id: str = Field(..., max_length=100)
+    coletas: List[ColetaLeitura] = Field(..., max_length=1000)
 
 
 class RelatorioReconciliacao(BaseModel):
@@ -6,7 +6,7 @@ Data validation and serialization models
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from decimal import Decimal
-from pydantic import BaseModel, Field, validator
+from pydantic import AliasChoices, BaseModel, Field, validator
 
 
 class ManutencaoBase(BaseModel):
@@ -49,12 +49,13 @@ class ManutencaoUpdate(BaseModel):
     pecas_utilizadas: Optional[str] = Field(None, max_length=1000)
     servicos_realizados: Optional[str] = Field(None, max_length=2000)
     observacoes_resolucao: Optional[str] = Field(None, max_length=2000)
+    sla_pausado: Optional[bool] = Field(None, description="Pausar/retomar a contagem do SLA")
 
 
 class ManutencaoResponse(ManutencaoBase):
     """Schema for Manutencao response"""
     id: int
-    numero_ticket: str
+    numero_ticket: str = Field(..., validation_alias=AliasChoices("numero_chamado", "numero_ticket"))
     status: str
     classificacao: Optional[str] = None
     sla_horas: Optional[int] = None
@@ -5,7 +5,7 @@ Data validation and serialization models
 
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
 
 
 class MovimentacaoBase(BaseModel):
@@ -26,6 +26,16 @@ class MovimentacaoCreate(MovimentacaoBase):
     pass
 
 
+class MovimentacaoLote(BaseModel):
+    """Schema for bulk movement creation (mass relocations and allocations)"""
+    movimentacoes: List[MovimentacaoCreate] = Field(..., min_length=1, max_length=10000)
+
+
+class AprovacaoLote(BaseModel):
+    """Schema for approving a batch of pending movements"""
+    movimentacao_ids: List[int] = Field(..., min_length=1, max_length=5000)
+
+
 class MovimentacaoUpdate(BaseModel):
     """Schema for updating Movimentacao"""
     local_destino_id: Optional[int] = Field(None)
@@ -37,14 +47,24 @@ class MovimentacaoUpdate(BaseModel):
 
 class MovimentacaoResponse(MovimentacaoBase):
     """Schema for Movimentacao response"""
+    # Colunas do modelo: de_/para_local_id, de_/para_responsavel_id e data_conclusao
+    local_origem_id: Optional[int] = Field(None, validation_alias=AliasChoices("de_local_id", "local_origem_id"))
+    local_destino_id: Optional[int] = Field(None, validation_alias=AliasChoices("para_local_id", "local_destino_id"))
+    responsavel_origem_id: Optional[int] = Field(
+        None, validation_alias=AliasChoices("de_responsavel_id", "responsavel_origem_id")
+    )
+    responsavel_destino_id: Optional[int] = Field(
+        None, validation_alias=AliasChoices("para_responsavel_id", "responsavel_destino_id")
+    )
     id: int
     status: str
     requer_aprovacao: bool = False
     solicitado_por: Optional[int] = None
     aprovado_por: Optional[int] = None
+    executado_por: Optional[int] = None
     data_solicitacao: datetime
     data_aprovacao: Optional[datetime] = None
-    data_execucao: Optional[datetime] = None
+    data_execucao: Optional[datetime] = Field(None, validation_alias=AliasChoices("data_conclusao", "data_execucao"))
     observacoes_aprovacao: Optional[str] = None
     termo_responsabilidade_url: Optional[str] = None
     hash_integridade: Optional[str] = None
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the request metric recording (MetricsCollector)
+
+Compares the previous recording (``RequestMetric`` with a ``datetime``
+appended to a deque under a global lock, plus count/sum/min/max per endpoint)
+with ``MetricsCollector.record``, on one thread and on several threads.
+
+    cd backend && python benchmark_metrics.py [requisicoes]
+"""
+
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+from app.core.monitoring import MetricsCollector, RequestMetric
+
+ENDPOINTS = [f"/api/v1/rota{i}/{{item_id}}" for i in range(20)]
+
+
+class ColetorLegado:
+    """Previous implementation of add_request_metric"""
+
+    def __init__(self):
+        self.request_metrics = deque(maxlen=10000)
+        self.error_counts = defaultdict(int)
+        self.endpoint_stats = defaultdict(lambda: {
+            'count': 0, 'total_time': 0.0, 'min_time': float('inf'), 'max_time': 0.0, 'error_count': 0
+        })
+        self.total_requests = 0
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, method, status_code, response_time):
+        metric = RequestMetric(endpoint, method, status_code, response_time, datetime.utcnow())
+        with self._lock:
+            self.request_metrics.append(metric)
+            self.total_requests += 1
+            stats = self.endpoint_stats[f"{metric.method} {metric.endpoint}"]
+            stats['count'] += 1
+            stats['total_time'] += metric.response_time
+            stats['min_time'] = min(stats['min_time'], metric.response_time)
+            stats['max_time'] = max(stats['max_time'], metric.response_time)
+            if metric.status_code >= 400:
+                stats['error_count'] += 1
+                self.error_counts[metric.status_code] += 1
+
+
+def gravar(coletor, requisicoes: int) -> None:
+    record = coletor.record
+    for i in range(requisicoes):
+        record(ENDPOINTS[i % 20], "GET", 200 if i % 50 else 500, 0.0005 + (i % 997) / 10000)
+
+
+def medir(coletor, requisicoes: int, threads: int) -> float:
+    """ns por requisição gravada (tempo total / requisições de todas as threads)"""
+    trabalhadores = [threading.Thread(target=gravar, args=(coletor, requisicoes)) for _ in range(threads)]
+    inicio = time.perf_counter()
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+    return (time.perf_counter() - inicio) / (requisicoes * threads) * 1e9
+
+
+def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for threads in (1, 4):
+        legado = medir(ColetorLegado(), requisicoes, threads)
+        coletor = MetricsCollector()
+        atual = medir(coletor, requisicoes, threads)
+        print(f"{threads} thread(s), {requisicoes} requisições cada")
+        print(f"  legado: {legado:7.0f} ns/requisição")
+        print(f"  atual:  {atual:7.0f} ns/requisição  ({legado / atual:.1f}x)")
+
+    inicio = time.perf_counter()
+    estatisticas = coletor.get_endpoint_stats()
+    leitura = (time.perf_counter() - inicio) * 1000
+    exemplo = estatisticas[f"GET {ENDPOINTS[0]}"]
+    print(f"get_endpoint_stats ({len(estatisticas)} endpoints): {leitura:.1f} ms")
+    print(f"  p50/p95/p99 de {ENDPOINTS[0]}: "
+          f"{exemplo['p50_response_time']}/{exemplo['p95_response_time']}/{exemplo['p99_response_time']} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the per-request middleware overhead on ``/health``
+
+Compares the previous chain (four ``@app.middleware("http")`` callables on
+``BaseHTTPMiddleware``, rebuilt here from the same checks) with
+``RequestPipelineMiddleware``. Both apps keep
+GZip, TrustedHost and CORS; requests are sent straight to the ASGI app, so
+the numbers exclude the server and the network.
+
+    cd backend && python benchmark_middleware.py [requisicoes]
+"""
+
+import asyncio
+import logging
+import statistics
+import sys
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.middleware.trustedhost import TrustedHostMiddleware
+
+from app.core.monitoring import endpoint_label, metrics_collector
+from app.middleware import RequestPipelineMiddleware
+from app.middleware.performance import PerformanceMiddleware
+from app.middleware.rate_limiting import RateLimitMiddleware
+from app.middleware.security import SecurityMiddleware
+from app.middleware.validation import ValidationMiddleware, replay_receive
+
+
+def rate_limit_sem_bloqueio() -> RateLimitMiddleware:
+    return RateLimitMiddleware(rules="", default=f"{10 ** 9}/60")
+
+
+def cadeia_anterior(app: FastAPI) -> None:
+    """Os quatro middlewares http anteriores (mais interno primeiro)"""
+    desempenho, limite = PerformanceMiddleware(), rate_limit_sem_bloqueio()
+    validacao, seguranca = ValidationMiddleware(), SecurityMiddleware()
+
+    @app.middleware("http")
+    async def medir_desempenho(request: Request, call_next):
+        inicio = time.time()
+        metrics_collector.active_requests += 1
+        try:
+            response = await call_next(request)
+            desempenho.record(endpoint_label(request.scope), request.method, response.status_code, time.time() - inicio)
+            return response
+        finally:
+            metrics_collector.active_requests -= 1
+
+    @app.middleware("http")
+    async def limitar(request: Request, call_next):
+        cabecalhos, rejeicao = await limite.check(request)
+        if rejeicao is not None:
+            return rejeicao
+        response = await call_next(request)
+        response.headers.update(cabecalhos)
+        return response
+
+    @app.middleware("http")
+    async def validar(request: Request, call_next):
+        corpo, rejeicao = await validacao.check_request(request)
+        if rejeicao is not None:
+            return rejeicao
+        if corpo is not None:
+            request = Request(request.scope, replay_receive(corpo, request.receive))
+        return await call_next(request)
+
+    @app.middleware("http")
+    async def proteger(request: Request, call_next):
+        inicio = time.time()
+        request_id = seguranca.generate_request_id()
+        request.state.request_id = request_id
+        logging.getLogger(__name__).info(f"Request {request_id}: {request.method} {request.url.path}")
+        response = await call_next(request)
+        response.headers.update(seguranca.security_headers(request_id))
+        response.headers["X-Process-Time"] = str(round(time.time() - inicio, 3))
+        return response
+
+
+def criar_app(pipeline: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy"}
+
+    app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=6)
+    if pipeline:
+        app.add_middleware(RequestPipelineMiddleware, rate_limit=rate_limit_sem_bloqueio())
+    else:
+        cadeia_anterior(app)
+    app.add_middleware(TrustedHostMiddleware, allowed_hosts=["localhost"])
+    app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:3000"], allow_methods=["*"], allow_headers=["*"])
+    return app
+
+
+async def requisitar(app: FastAPI) -> None:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/health", "raw_path": b"/health",
+        "query_string": b"", "root_path": "", "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8000), "headers": [(b"host", b"localhost")],
+    }
+    status = []
+    recebido = False
+    concluida = asyncio.Event()
+
+    async def receive():
+        # Like a server: the body once, then nothing until the client leaves
+        nonlocal recebido
+        if not recebido:
+            recebido = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await concluida.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        elif not message.get("more_body", False):
+            concluida.set()
+
+    await app(scope, receive, send)
+    assert status == [200], status
+
+
+async def medir(app: FastAPI, requisicoes: int) -> float:
+    for _ in range(200):
+        await requisitar(app)
+    rodadas = []
+    for _ in range(5):
+        inicio = time.perf_counter()
+        for _ in range(requisicoes):
+            await requisitar(app)
+        rodadas.append((time.perf_counter() - inicio) / requisicoes * 1e6)
+    return statistics.median(rodadas)
+
+
+async def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    logging.disable(logging.INFO)
+    base = await medir(criar_app(pipeline=False), requisicoes)
+    atual = await medir(criar_app(pipeline=True), requisicoes)
+    print(f"GET /health, {requisicoes} requisições por rodada (mediana de 5)")
+    print(f"  BaseHTTPMiddleware x4: {base:8.1f} µs/requisição")
+    print(f"  pipeline ASGI:         {atual:8.1f} µs/requisição  ({base / atual:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark of audit record hashing and signing
+
+Compares, on payloads shaped like the audit collection records:
+
+- the previous per-record path (``json.dumps(sort_keys=True)`` and a new
+  ``hmac.new`` for every signature)
+- the per-record path with ``canonical_audit_json`` and the cached keyed HMAC
+- Merkle batch signing (one HMAC over the root plus one proof per record)
+
+Only hashing and signing are measured; the database insert is the same for
+the three paths.
+
+    cd backend && python benchmark_trilha_auditoria.py [registros] [tamanho_lote]
+"""
+
+import hashlib
+import hmac
+import json
+import sys
+import time
+
+from app.core.audit_chain import merkle_sign_batch
+from app.core.config import settings
+from app.core.security import compute_audit_record_hash, compute_audit_signature
+
+
+def payloads(quantidade: int):
+    return [
+        {
+            "asset_id": i % 5000,
+            "auditoria_id": 42,
+            "auditoria_status": "em_andamento",
+            "action": "AUDIT_READ",
+            "table_name": "auditoria_itens",
+            "record_id": i,
+            "collector_user_id": 7,
+            "codigo_lido": f"AT{i:06d}",
+            "local_encontrado_id": i % 120,
+            "estado_encontrado": "bom",
+            "resultado": "encontrado_conforme",
+            "divergencias": [],
+        }
+        for i in range(quantidade)
+    ]
+
+
+def legado(registros):
+    """Previous compute_audit_record_hash/compute_audit_signature"""
+    chave = settings.SECRET_KEY.encode("utf-8")
+    anterior = None
+    for payload in registros:
+        record_hash = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        ).hexdigest()
+        hmac.new(chave, ((anterior or "") + record_hash).encode("utf-8"), hashlib.sha256).hexdigest()
+        anterior = record_hash
+
+
+def por_registro(registros):
+    anterior = None
+    for payload in registros:
+        record_hash = compute_audit_record_hash(payload)
+        compute_audit_signature(record_hash, anterior)
+        anterior = record_hash
+
+
+def merkle(registros, tamanho_lote: int):
+    anterior = None
+    for inicio in range(0, len(registros), tamanho_lote):
+        elos = []
+        for payload in registros[inicio:inicio + tamanho_lote]:
+            record_hash = compute_audit_record_hash(payload)
+            elos.append((anterior, record_hash))
+            anterior = record_hash
+        merkle_sign_batch(elos)
+
+
+def medir(funcao, *args) -> float:
+    """Melhor de 3 execuções, em segundos"""
+    tempos = []
+    for _ in range(3):
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    tamanho_lote = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    registros = payloads(quantidade)
+
+    resultados = [
+        ("legado (json.dumps + hmac.new)", medir(legado, registros)),
+        ("por registro (encoder + HMAC em cache)", medir(por_registro, registros)),
+        (f"Merkle, lotes de {tamanho_lote}", medir(merkle, registros, tamanho_lote)),
+    ]
+    base = resultados[0][1]
+    print(f"{quantidade} registros")
+    for nome, segundos in resultados:
+        print(f"  {nome:40s} {quantidade / segundos:9.0f} registros/s  ({base / segundos:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
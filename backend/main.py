@@ -14,14 +14,12 @@ from starlette.middleware.httpsredirect import HTTPSRedirectMiddleware
 
 from app.core.config import settings
 from app.core.database import init_db, close_db
+from app.core.jobs import job_runner
+from app.core.sla_scheduler import sla_scheduler
 from app.core.exceptions import AppException
-from app.middleware import (
-    rate_limit_middleware,
-    validation_middleware,
-    security_middleware,
-    performance_middleware
-)
+from app.middleware import RequestPipelineMiddleware, rate_limit_middleware
 from app.core.monitoring import monitor_performance, start_monitoring, stop_monitoring
+from app.core.profiling import ProfiledJSONResponse, profile_sync_endpoints
 from app.core.redis_config import init_redis, close_redis
 from app.api.v1.api import api_router
 
@@ -65,11 +63,27 @@ async def lifespan(app: FastAPI):
     start_monitoring()
     logger.info("Performance monitoring started")
     
+    # Start background job runner
+    await job_runner.start()
+    
+    # Start maintenance SLA timers
+    if settings.SLA_SCHEDULER_ENABLED:
+        await sla_scheduler.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Levitiis AMS API")
     
+    # Stop maintenance SLA timers
+    await sla_scheduler.stop()
+    
+    # Stop background job runner
+    await job_runner.stop()
+    
+    # Close rate limit counters
+    await rate_limit_middleware.close()
+    
     # Stop monitoring
     stop_monitoring()
     logger.info("Performance monitoring stopped")
@@ -91,6 +105,7 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url=f"{settings.API_V1_STR}/docs",
     redoc_url=f"{settings.API_V1_STR}/redoc",
+    default_response_class=ProfiledJSONResponse,  # JSONResponse + serialisation span when profiled
     lifespan=lifespan
 )
 
@@ -106,26 +121,17 @@ app.add_middleware(
 if settings.ENABLE_HTTPS_REDIRECT:
     app.add_middleware(HTTPSRedirectMiddleware)
 
-# Security middlewares (order matters - applied in reverse order)
-# 1. Performance monitoring (first to track all requests)
-app.middleware("http")(performance_middleware)
-
-# 2. Rate limiting
-app.middleware("http")(rate_limit_middleware)
-
-# 4. Input validation and sanitization
-app.middleware("http")(validation_middleware)
-
-# 5. General security middleware
-app.middleware("http")(security_middleware)
+# Request pipeline (single pure-ASGI layer): request ID, performance
+# monitoring, rate limiting, input validation and security headers
+app.add_middleware(RequestPipelineMiddleware)
 
-# 6. Trusted host middleware
+# Trusted host middleware
 app.add_middleware(
     TrustedHostMiddleware,
     allowed_hosts=settings.get_allowed_hosts()
 )
 
-# 7. CORS middleware (setup with secure defaults)
+# CORS middleware (setup with secure defaults)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.get_cors_origins(),
@@ -179,6 +185,7 @@ async def health_check():
 
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
+profile_sync_endpoints(app)
 
 
 if __name__ == "__main__":
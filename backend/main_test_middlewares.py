@@ -1,163 +0,0 @@
-#!/usr/bin/env python3
-"""
-Versão de teste para identificar middleware problemático
-"""
-
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
-from contextlib import asynccontextmanager
-from starlette.middleware.httpsredirect import HTTPSRedirectMiddleware
-import structlog
-import time
-
-from app.core.config import settings
-from app.core.database import init_db
-from app.api.v1.api import api_router
-
-# Import middlewares to test
-from app.middleware import (
-    rate_limit_middleware,
-    security_middleware,
-    performance_middleware
-)
-from app.middleware.validation_fixed import validation_middleware_fixed
-
-# Configure structured logging
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    wrapper_class=structlog.stdlib.BoundLogger,
-    cache_logger_on_first_use=True,
-)
-
-logger = structlog.get_logger()
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Application lifespan events"""
-    # Startup
-    logger.info("Starting application...")
-    
-    try:
-        # Initialize database
-        await init_db()
-        logger.info("Database initialized")
-    except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
-        raise
-    
-    yield
-    
-    # Shutdown
-    logger.info("Shutting down application...")
-
-# Create FastAPI app
-app = FastAPI(
-    title=settings.APP_NAME,
-    version=settings.APP_VERSION,
-    description="Sistema de Inventário de Ativos - Middleware Test Version",
-    openapi_url=f"{settings.API_V1_STR}/openapi.json" if settings.DEBUG else None,
-    docs_url="/docs" if settings.DEBUG else None,
-    redoc_url="/redoc" if settings.DEBUG else None,
-    lifespan=lifespan
-)
-
-# Exception handlers
-@app.exception_handler(Exception)
-async def global_exception_handler(request: Request, exc: Exception):
-    """Global exception handler"""
-    logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
-        status_code=500,
-        content={"detail": "Internal server error", "error_code": "INTERNAL_ERROR"}
-    )
-
-# Health check endpoint
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "version": settings.APP_VERSION}
-
-# Performance middlewares (safe ones)
-if not settings.DEBUG:
-    app.add_middleware(
-        GZipMiddleware,
-        minimum_size=1000
-    )
-
-# HTTPS redirect (only in production)
-if not settings.DEBUG and settings.ENABLE_HTTPS_REDIRECT:
-    app.add_middleware(HTTPSRedirectMiddleware)
-
-# Trusted host middleware
-app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=settings.get_allowed_hosts()
-)
-
-# CORS middleware (setup with secure defaults)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-        "http://localhost:8080",
-        "http://127.0.0.1:8080"
-    ],
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-    allow_headers=[
-        "Accept",
-        "Accept-Language",
-        "Content-Language",
-        "Content-Type",
-        "Authorization",
-        "X-Requested-With",
-        "X-Request-ID"
-    ],
-    expose_headers=["X-Request-ID", "X-Process-Time", "X-RateLimit-Remaining"]
-)
-
-# TEST: Add rate_limit_middleware and validation_middleware
-from app.middleware.security import security_middleware
-from app.middleware.performance import performance_middleware
-print("[TEST] Adding rate_limit_middleware...")
-app.middleware("http")(rate_limit_middleware)
-
-print("[TEST] Adding validation_middleware_fixed...")
-app.middleware("http")(validation_middleware_fixed)
-
-print("[TEST] Adding security_middleware...")
-app.middleware("http")(security_middleware)
-
-print("[TEST] Adding performance_middleware...")
-app.middleware("http")(performance_middleware)
-
-# Include API router
-app.include_router(api_router, prefix=settings.API_V1_STR)
-
-logger.info(f"Application configured - Debug mode: {settings.DEBUG}")
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "main_test_middlewares:app",
-        host="0.0.0.0",
-        port=8003,
-        reload=True,
-        log_level="debug"
-    )
\ No newline at end of file
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Testes das auditorias de inventário (geração de itens, coletas, progresso e sincronização)
+"""
+
+import ambiente_teste as ambiente
+
+from app.api.v1.endpoints.auditorias import _gerar_itens_auditoria
+from app.models import (
+    Auditoria, AuditoriaContadorLocal, AuditoriaItem, ResultadoItem, StatusAuditoria, TipoAuditoria
+)
+from app.models.movement import AssetAudit
+
+
+def _criar_auditoria(db, usuario, **campos):
+    n = next(ambiente._sequencia)
+    campos.setdefault("tipo", TipoAuditoria.TOTAL)
+    return ambiente.criar(db, Auditoria, codigo=f"AUD{n}", nome=f"Auditoria {n}", criado_por=usuario.id, **campos)
+
+
+def test_gerar_itens_com_insert_select():
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        local_a, local_b = ambiente.criar_local(db), ambiente.criar_local(db)
+        ativos = [ambiente.criar_ativo(db, local_id=local_a.id, estado="bom") for _ in range(3)]
+        ativos.append(ambiente.criar_ativo(db, local_id=local_b.id, estado="regular"))
+        ambiente.criar_ativo(db, local_id=local_a.id, status="baixado")
+        ambiente.criar_ativo(db)  # fora do escopo
+        auditoria = _criar_auditoria(db, usuario, escopo_locais=f"{local_a.id},{local_b.id}")
+
+        with ambiente.contar_queries() as instrucoes:
+            total = _gerar_itens_auditoria(auditoria, db)
+        assert total == 4
+        # Um INSERT ... SELECT para os itens e outro para os contadores, qualquer que seja o escopo
+        assert sum(1 for s in instrucoes if s.lstrip().upper().startswith("INSERT")) == 2
+
+        itens = db.query(AuditoriaItem).filter(AuditoriaItem.auditoria_id == auditoria.id).all()
+        esperado = {a.id: (a.local_id, a.estado) for a in ativos}
+        assert {i.ativo_id: (i.local_esperado_id, i.estado_esperado) for i in itens} == esperado
+
+        contadores = {
+            c.local_id: c.esperados
+            for c in db.query(AuditoriaContadorLocal).filter(AuditoriaContadorLocal.auditoria_id == auditoria.id)
+        }
+        assert contadores == {local_a.id: 3, local_b.id: 1}
+        assert auditoria.total_itens_esperados == 4
+
+
+def _auditoria_em_andamento(quantidade: int):
+    """Auditoria iniciada com ``quantidade`` ativos em um local; devolve ids e cabeçalhos"""
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        local = ambiente.criar_local(db)
+        ativos = [ambiente.criar_ativo(db, local_id=local.id, estado="bom") for _ in range(quantidade)]
+        auditoria = _criar_auditoria(
+            db, usuario, escopo_locais=str(local.id), status=StatusAuditoria.EM_ANDAMENTO
+        )
+        _gerar_itens_auditoria(auditoria, db)
+        itens = {
+            item.ativo_id: item.id
+            for item in db.query(AuditoriaItem).filter(AuditoriaItem.auditoria_id == auditoria.id)
+        }
+        return {
+            "auditoria_id": auditoria.id,
+            "local_id": local.id,
+            "itens": [(itens[a.id], a.codigo) for a in ativos],
+            "cabecalhos": ambiente.cabecalhos(usuario),
+        }
+
+
+def _coletar(cenario, leituras, caminho="coletas", **corpo):
+    url = f"/api/v1/auditorias/{cenario['auditoria_id']}/{caminho}"
+    json = {**corpo, "coletas": leituras} if corpo else leituras
+    resposta = ambiente.cliente().post(url, json=json, headers=cenario["cabecalhos"])
+    assert resposta.status_code == 200, resposta.text
+    return resposta.json()
+
+
+def test_coletas_em_lote():
+    cenario = _auditoria_em_andamento(3)
+    (item_ok, codigo_ok), (item_div, codigo_div), (item_falta, _) = cenario["itens"]
+    local_id = cenario["local_id"]
+    with ambiente.sessao() as db:
+        extra = ambiente.criar_ativo(db)
+        extra_id, extra_codigo = extra.id, extra.codigo
+
+    resultado = _coletar(cenario, [
+        {"item_id": item_ok, "codigo_lido": codigo_ok, "local_encontrado_id": local_id, "estado_encontrado": "bom"},
+        {"item_id": item_div, "codigo_lido": codigo_div, "local_encontrado_id": None, "estado_encontrado": "bom"},
+        {"item_id": item_falta},
+        {"item_id": 0, "codigo_lido": extra_codigo},
+        {"item_id": 0, "codigo_lido": "NAO-EXISTE"},
+    ])
+    assert resultado["sucessos"] == 4 and resultado["erros"] == 1
+    por_item = {d["item_id"]: d["resultado"] for d in resultado["detalhes"] if d["status"] == "sucesso"}
+    assert por_item[item_ok] == ResultadoItem.CONFORME
+    assert por_item[item_div] == ResultadoItem.DIVERGENTE
+    assert por_item[item_falta] == ResultadoItem.NAO_ENCONTRADO
+
+    with ambiente.sessao() as db:
+        extra_item = db.query(AuditoriaItem).filter(
+            AuditoriaItem.auditoria_id == cenario["auditoria_id"], AuditoriaItem.ativo_id == extra_id
+        ).one()
+        assert extra_item.resultado == ResultadoItem.EXTRA
+        assert db.get(AuditoriaItem, item_div).divergencias == "local"
+        assert db.get(AuditoriaItem, item_ok).verificado_por is not None
+        trilha = db.query(AssetAudit).filter(AssetAudit.action == "AUDIT_READ", AssetAudit.asset_id == extra_id).all()
+        assert len(trilha) == 1
+
+
+def test_coletas_queries_nao_crescem_com_o_lote():
+    contagens = []
+    for quantidade in (2, 20):
+        cenario = _auditoria_em_andamento(quantidade)
+        leituras = [
+            {"item_id": item_id, "codigo_lido": codigo, "local_encontrado_id": cenario["local_id"], "estado_encontrado": "bom"}
+            for item_id, codigo in cenario["itens"]
+        ]
+        with ambiente.contar_queries() as instrucoes:
+            assert _coletar(cenario, leituras)["sucessos"] == quantidade
+        contagens.append(len(instrucoes))
+    assert contagens[0] == contagens[1], contagens
+
+
+def test_progresso_por_contadores_e_releitura():
+    cenario = _auditoria_em_andamento(3)
+    (item_a, codigo_a), (item_b, codigo_b), _ = cenario["itens"]
+    local_id = cenario["local_id"]
+    url = f"/api/v1/auditorias/{cenario['auditoria_id']}/progresso"
+
+    _coletar(cenario, [
+        {"item_id": item_a, "codigo_lido": codigo_a, "local_encontrado_id": local_id, "estado_encontrado": "bom"},
+        {"item_id": item_b, "codigo_lido": codigo_b, "local_encontrado_id": None, "estado_encontrado": "bom"},
+    ])
+    # Releitura do item divergente, agora conforme: muda de grupo sem contar duas vezes
+    _coletar(cenario, [
+        {"item_id": item_b, "codigo_lido": codigo_b, "local_encontrado_id": local_id, "estado_encontrado": "bom"},
+    ])
+
+    progresso = ambiente.cliente().get(url, headers=cenario["cabecalhos"]).json()
+    assert progresso["esperados"] == 3
+    assert progresso["verificados"] == 2
+    assert progresso["pendentes"] == 1
+    assert progresso["resultados"] == {"conformes": 2, "divergentes": 0, "nao_encontrados": 0, "extras": 0}
+    assert progresso["locais"] == [{
+        "local_id": local_id, "esperados": 3, "verificados": 2, "conformes": 2,
+        "divergentes": 0, "nao_encontrados": 0, "extras": 0,
+    }]
+    with ambiente.sessao() as db:
+        assert db.get(AuditoriaItem, item_b).divergencias is None
+        # Durante a coleta a linha da auditoria não é atualizada
+        assert db.get(Auditoria, cenario["auditoria_id"]).total_itens_verificados == 0
+
+
+def test_sincronizacao_offline_idempotente_por_auditoria():
+    cenario = _auditoria_em_andamento(2)
+    outra = _auditoria_em_andamento(1)
+    (item_a, codigo_a), (item_b, codigo_b) = cenario["itens"]
+    cliente = ambiente.cliente()
+    base = f"/api/v1/auditorias/{cenario['auditoria_id']}/sync"
+
+    snapshot = cliente.get(f"{base}/snapshot", headers=cenario["cabecalhos"])
+    assert snapshot.status_code == 200
+    versao = snapshot.json()["versao"]
+    assert [linha[0] for linha in snapshot.json()["itens"]] == sorted([item_a, item_b])
+    nao_mudou = cliente.get(
+        f"{base}/snapshot", headers={**cenario["cabecalhos"], "If-None-Match": snapshot.headers["ETag"]}
+    )
+    assert nao_mudou.status_code == 304
+
+    leituras = [
+        {"item_id": item_a, "codigo_lido": codigo_a, "local_encontrado_id": cenario["local_id"],
+         "estado_encontrado": "bom", "client_id": "leitura-1"},
+    ]
+    primeiro = _coletar(cenario, leituras, "sync/coletas", dispositivo_id="coletor-1")
+    assert primeiro["sucessos"] == 1
+    reenvio = _coletar(cenario, leituras, "sync/coletas", dispositivo_id="coletor-1")
+    assert reenvio["sucessos"] == 0 and reenvio["duplicadas"] == 1
+    assert reenvio["detalhes"][0]["resultado"] == ResultadoItem.CONFORME
+
+    # O mesmo client_id em outra auditoria é uma leitura nova
+    (item_outra, codigo_outra), = outra["itens"]
+    em_outra = _coletar(outra, [
+        {"item_id": item_outra, "codigo_lido": codigo_outra, "client_id": "leitura-1"},
+    ], "sync/coletas", dispositivo_id="coletor-1")
+    assert em_outra["sucessos"] == 1 and em_outra["duplicadas"] == 0
+
+    delta = cliente.get(f"{base}/delta", params={"desde": versao}, headers=cenario["cabecalhos"]).json()
+    assert [linha[0] for linha in delta["itens"]] == [item_a]
+    assert delta["versao"] == primeiro["versao"]
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_gerar_itens_com_insert_select,
+        test_coletas_em_lote,
+        test_coletas_queries_nao_crescem_com_o_lote,
+        test_progresso_por_contadores_e_releitura,
+        test_sincronizacao_offline_idempotente_por_auditoria,
+    )
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Teste do carregamento em lote das relações nas listagens (BatchLoader)
+
+O número de queries de GET /tickets e GET /machines não pode crescer com o
+número de linhas listadas (sem N+1).
+"""
+
+import asyncio
+
+import ambiente_teste as ambiente  # antes de qualquer módulo app
+
+from app.core.batch_loader import BatchLoader
+from app.core.database import AsyncSessionLocal
+from app.models.location import Location
+from app.models.machine import Machine
+from app.models.ticket import Ticket
+
+
+def _queries_da_listagem(cliente, url, usuario) -> int:
+    with ambiente.contar_queries() as instrucoes:
+        resposta = cliente.get(url, headers=ambiente.cabecalhos(usuario))
+    assert resposta.status_code == 200, resposta.text
+    return len(instrucoes)
+
+
+def _criar_tickets(db, usuario, quantidade):
+    for _ in range(quantidade):
+        n = next(ambiente._sequencia)
+        local = ambiente.criar(db, Location, name=f"Local {n}", code=f"LOC{n}")
+        ambiente.criar(
+            db, Ticket, ticket_number=f"T{n}", title="Teste", description="Teste",
+            assigned_to=usuario.id, created_by=usuario.id, location_id=local.id,
+        )
+
+
+def _criar_maquinas(db, quantidade):
+    for _ in range(quantidade):
+        n = next(ambiente._sequencia)
+        local = ambiente.criar(db, Location, name=f"Local {n}", code=f"LOC{n}")
+        ambiente.criar(
+            db, Machine, hostname=f"host{n}", machine_id=f"maquina-{n}", location_id=local.id,
+            ip_address=f"10.0.0.{n % 250}", mac_address=f"00:00:00:00:{n // 250:02x}:{n % 250:02x}",
+        )
+
+
+def test_listagem_de_tickets_sem_n_mais_1():
+    db = ambiente.sessao()
+    usuario = ambiente.criar_usuario(db)
+    cliente = ambiente.cliente()
+
+    _criar_tickets(db, usuario, 3)
+    poucas = _queries_da_listagem(cliente, "/api/v1/tickets/", usuario)
+    _criar_tickets(db, usuario, 30)
+    muitas = _queries_da_listagem(cliente, "/api/v1/tickets/", usuario)
+    db.close()
+
+    assert muitas == poucas, (poucas, muitas)
+
+
+def test_listagem_de_maquinas_sem_n_mais_1():
+    db = ambiente.sessao()
+    usuario = ambiente.criar_usuario(db)
+    cliente = ambiente.cliente()
+
+    _criar_maquinas(db, 3)
+    poucas = _queries_da_listagem(cliente, "/api/v1/machines/", usuario)
+    _criar_maquinas(db, 30)
+    muitas = _queries_da_listagem(cliente, "/api/v1/machines/", usuario)
+    db.close()
+
+    assert muitas == poucas, (poucas, muitas)
+
+
+def test_batch_loader_uma_query_por_relacao():
+    db = ambiente.sessao()
+    locais = [ambiente.criar(db, Location, name="Local", code=f"BL{i}").id for i in range(5)]
+    db.close()
+
+    async def carregar():
+        loader = BatchLoader()
+        async with AsyncSessionLocal() as sessao:
+            loader.queue(Location.id, Location.code, locais + [None, 999999])
+            with ambiente.contar_queries() as instrucoes:
+                await loader.resolve(sessao)
+                # Chaves já resolvidas (inclusive inexistentes) não são consultadas de novo
+                loader.queue(Location.id, Location.code, [locais[0], 999999])
+                await loader.resolve(sessao)
+        return loader, instrucoes
+
+    loader, instrucoes = asyncio.run(carregar())
+    assert len(instrucoes) == 1, instrucoes
+    assert loader.get(Location.id, Location.code, locais[2]) == "BL2"
+    assert loader.get(Location.id, Location.code, 999999, "-") == "-"
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_listagem_de_tickets_sem_n_mais_1,
+        test_listagem_de_maquinas_sem_n_mais_1,
+        test_batch_loader_uma_query_por_relacao,
+    )
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Testes das estatísticas por fingerprint de consulta e do log de consultas lentas
+"""
+
+import ambiente_teste as ambiente
+
+from app.core.monitoring import current_request
+from app.core.query_stats import NO_ROUTE, OTHER_FINGERPRINT, QueryTracker, fingerprint, normalize_statement, query_tracker
+from app.models import UserRole
+
+
+def test_literais_parametros_e_listas_viram_o_mesmo_fingerprint():
+    variantes = [
+        "SELECT * FROM ativos WHERE id IN (1, 2, 3) AND codigo = 'AT001'",
+        "SELECT *   FROM ativos /* painel */ WHERE id IN ($1, $2) AND codigo = $3",
+        "SELECT * FROM ativos WHERE id IN (%(id_1)s) AND codigo = %s -- lista",
+        "SELECT * FROM ativos WHERE id IN (?, ?, ?, ?) AND codigo = :codigo",
+    ]
+    assert normalize_statement(variantes[0]) == "SELECT * FROM ativos WHERE id IN (?) AND codigo = ?"
+    assert len({fingerprint(v) for v in variantes}) == 1
+    assert normalize_statement("INSERT INTO logs (a, b) VALUES (1, 'x'), (2, 'y'), (3, 'z')") == (
+        "INSERT INTO logs (a, b) VALUES (?), ..."
+    )
+    # Nomes com dígitos não são literais
+    assert normalize_statement("SELECT t1.col2 FROM tabela_2 t1") == "SELECT t1.col2 FROM tabela_2 t1"
+
+
+def test_consultas_lentas_registradas_sem_parametros():
+    rastreador = QueryTracker(enabled=True, slow_threshold_ms=100, max_fingerprints=2)
+    token = current_request.set({"method": "GET", "route": None})
+    try:
+        rastreador.record("SELECT * FROM users WHERE email = 'ana@exemplo.com'", 0.25, rows=1)
+    finally:
+        current_request.reset(token)
+    rastreador.record("SELECT * FROM users WHERE email = 'bia@exemplo.com'", 0.01, rows=3)
+    rastreador.record("UPDATE ativos SET status = 'baixado'", 0.02)
+    rastreador.record("DELETE FROM sessoes WHERE id = 9", 0.03)
+
+    lenta, = rastreador.slow_queries
+    assert lenta["duration_ms"] == 250.0 and lenta["route"] == "GET unmatched"
+    assert lenta["statement"] == "SELECT * FROM users WHERE email = ?"
+
+    resumo = rastreador.summary(sort="count")
+    consultas = {c["fingerprint"]: c for c in resumo["queries"]}
+    assert resumo["fingerprints"] == 3
+    usuarios = consultas[fingerprint("SELECT * FROM users WHERE email = 'x'")]
+    assert (usuarios["count"], usuarios["rows"], usuarios["mean_rows"]) == (2, 4, 2.0)
+    assert {r["route"] for r in usuarios["routes"]} == {"GET unmatched", NO_ROUTE}
+    # Além do limite de fingerprints as consultas são somadas em "other"
+    assert consultas[OTHER_FINGERPRINT]["count"] == 1 and consultas[OTHER_FINGERPRINT]["rows"] is None
+
+
+def test_consultas_atribuidas_a_rota_e_por_requisicao():
+    with ambiente.sessao() as db:
+        admin = ambiente.cabecalhos(ambiente.criar_usuario(db))
+        usuario = ambiente.cabecalhos(ambiente.criar_usuario(db, role=UserRole.USER))
+        ambiente.criar_ativo(db, categoria="SEGREDO123")
+    cliente = ambiente.cliente()
+
+    query_tracker.reset()
+    for _ in range(2):
+        assert cliente.get("/api/v1/ativos/", params={"categoria": "SEGREDO123"}, headers=admin).status_code == 200
+
+    assert cliente.get("/api/v1/monitoring/queries", headers=usuario).status_code == 403
+    resumo = cliente.get("/api/v1/monitoring/queries", params={"sort": "count"}, headers=admin).json()
+    da_rota = [
+        (consulta, rota) for consulta in resumo["queries"] for rota in consulta["routes"]
+        if rota["route"] == "GET /api/v1/ativos/"
+    ]
+    assert da_rota, resumo
+    for consulta, rota in da_rota:
+        assert rota["count"] % 2 == 0 and rota["per_request"] is not None
+        assert "SEGREDO123" not in consulta["statement"]
+    assert any("FROM ativos" in consulta["statement"] for consulta, _ in da_rota)
+
+    assert cliente.delete("/api/v1/monitoring/queries", headers=admin).status_code == 200
+    assert query_tracker.queries == {}
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_literais_parametros_e_listas_viram_o_mesmo_fingerprint,
+        test_consultas_lentas_registradas_sem_parametros,
+        test_consultas_atribuidas_a_rota_e_por_requisicao,
+    )
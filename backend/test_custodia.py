@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Testes da custódia por data e período (intervalos de custódia e migração)
+"""
+
+import importlib.util
+import os
+from datetime import datetime, timedelta
+
+import ambiente_teste as ambiente
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+from app.models import CustodiaIntervalo, Local, Movimentacao, Responsavel
+
+MIGRACAO = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "alembic", "versions", "b3d8e1f47a20_custodia_intervalos.py"
+)
+
+
+def _migracao():
+    spec = importlib.util.spec_from_file_location("migracao_custodia", MIGRACAO)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def _movimentar(db, ativo, usuario, quando, status="executada", **campos):
+    return ambiente.criar(
+        db, Movimentacao, ativo_id=ativo.id, tipo=campos.pop("tipo", "transferencia"), motivo="Histórico",
+        status=status, solicitado_por=usuario.id, data_conclusao=quando if status == "executada" else None,
+        **campos
+    )
+
+
+def test_migracao_reconstroi_o_historico_das_movimentacoes():
+    engine = create_engine(f"sqlite:///{os.path.join(ambiente.DIRETORIO, 'migracao_custodia.db')}")
+    tabelas = [tabela for nome, tabela in Base.metadata.tables.items() if nome != "custodia_intervalos"]
+    Base.metadata.create_all(engine, tables=tabelas)
+    t0 = datetime(2025, 1, 1, 8)
+    t1, t2, t3 = t0 + timedelta(days=10), t0 + timedelta(days=20), t0 + timedelta(days=30)
+
+    with Session(engine) as db:
+        usuario = ambiente.criar_usuario(db)
+        setor = ambiente.criar_setor(db)
+        l1, l2, l3 = ambiente.criar_local(db), ambiente.criar_local(db), ambiente.criar_local(db)
+        r1, r2 = ambiente.criar_responsavel(db, setor), ambiente.criar_responsavel(db, setor)
+        movido = ambiente.criar_ativo(db, local_id=l3.id, responsavel_id=r2.id, criado_em=t0)
+        parado = ambiente.criar_ativo(db, local_id=l1.id, responsavel_id=r1.id, criado_em=t0)
+        baixado = ambiente.criar_ativo(db, local_id=l2.id, status="baixado", criado_em=t0)
+        # Fora de ordem de inserção: a reconstrução segue data_conclusao
+        m2 = _movimentar(db, movido, usuario, t2, de_local_id=l2.id, para_local_id=l3.id, para_responsavel_id=r2.id)
+        m1 = _movimentar(db, movido, usuario, t1, de_local_id=l1.id, de_responsavel_id=r1.id, para_local_id=l2.id)
+        _movimentar(db, movido, usuario, None, status="pendente_aprovacao", para_local_id=l1.id)
+        mb1 = _movimentar(db, baixado, usuario, t1, de_local_id=l1.id, para_local_id=l2.id)
+        _movimentar(db, baixado, usuario, t3, tipo="baixa")
+        ids = {
+            "movido": movido.id, "parado": parado.id, "baixado": baixado.id, "l1": l1.id, "l2": l2.id,
+            "l3": l3.id, "r1": r1.id, "r2": r2.id, "m1": m1.id, "m2": m2.id, "mb1": mb1.id,
+        }
+
+    modulo = _migracao()
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            modulo.upgrade()
+
+    with Session(engine) as db:
+        def historico(ativo_id):
+            return [
+                (i.local_id, i.responsavel_id, i.movimentacao_id, i.inicio, i.fim)
+                for i in db.scalars(
+                    select(CustodiaIntervalo).where(CustodiaIntervalo.ativo_id == ativo_id)
+                    .order_by(CustodiaIntervalo.inicio)
+                )
+            ]
+
+        assert historico(ids["movido"]) == [
+            (ids["l1"], ids["r1"], None, t0, t1),
+            (ids["l2"], ids["r1"], ids["m1"], t1, t2),
+            (ids["l3"], ids["r2"], ids["m2"], t2, None),
+        ]
+        assert historico(ids["parado"]) == [(ids["l1"], ids["r1"], None, t0, None)]
+        # Após a baixa não há custódia aberta
+        assert historico(ids["baixado"]) == [
+            (ids["l1"], None, None, t0, t1),
+            (ids["l2"], None, ids["mb1"], t1, t3),
+        ]
+    engine.dispose()
+
+
+def _cenario_movimentado():
+    """Ativo cadastrado há 10 dias na origem e transferido agora para o destino pela API"""
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        setor = ambiente.criar_setor(db)
+        origem, destino = ambiente.criar_local(db), ambiente.criar_local(db)
+        resp_origem, resp_destino = ambiente.criar_responsavel(db, setor), ambiente.criar_responsavel(db, setor)
+        ativo = ambiente.criar_ativo(
+            db, local_id=origem.id, responsavel_id=resp_origem.id, criado_em=datetime.now() - timedelta(days=10)
+        )
+        cenario = {
+            "cabecalhos": ambiente.cabecalhos(usuario), "ativo_id": ativo.id,
+            "origem": origem.id, "destino": destino.id, "resp_origem": resp_origem.id, "resp_destino": resp_destino.id,
+        }
+    resposta = ambiente.cliente().post("/api/v1/movimentacoes/", json={
+        "ativo_id": cenario["ativo_id"], "tipo": "transferencia", "local_destino_id": cenario["destino"],
+        "responsavel_destino_id": cenario["resp_destino"], "motivo": "Mudança de sala",
+    }, headers=cenario["cabecalhos"])
+    assert resposta.status_code == 200, resposta.text
+    cenario["movimentacao_id"] = resposta.json()["id"]
+    with ambiente.sessao() as db:
+        cenario["conclusao"] = db.get(Movimentacao, cenario["movimentacao_id"]).data_conclusao
+    return cenario
+
+
+def _intervalos(resposta):
+    assert resposta.status_code == 200, resposta.text
+    return [(i["local_id"], i["responsavel_id"], i["movimentacao_id"]) for i in resposta.json()["intervalos"]]
+
+
+def test_custodia_em_uma_data_ao_redor_da_movimentacao():
+    cenario = _cenario_movimentado()
+    cliente, conclusao = ambiente.cliente(), cenario["conclusao"]
+
+    def em(data):
+        return _intervalos(cliente.get("/api/v1/movimentacoes/custodia/em", params={
+            "data": data.isoformat(), "ativo_id": cenario["ativo_id"],
+        }, headers=cenario["cabecalhos"]))
+
+    anterior = [(cenario["origem"], cenario["resp_origem"], None)]
+    posterior = [(cenario["destino"], cenario["resp_destino"], cenario["movimentacao_id"])]
+    assert em(conclusao - timedelta(days=5)) == anterior
+    assert em(conclusao - timedelta(microseconds=1)) == anterior
+    # O fim do intervalo é exclusivo: no instante da conclusão vale o destino
+    assert em(conclusao) == posterior
+    assert em(conclusao + timedelta(days=1)) == posterior
+    # Antes do cadastro o ativo não tinha custódia
+    assert em(conclusao - timedelta(days=11)) == []
+
+    por_local = cliente.get("/api/v1/movimentacoes/custodia/em", params={
+        "data": (conclusao - timedelta(days=1)).isoformat(), "local_id": cenario["destino"],
+    }, headers=cenario["cabecalhos"])
+    assert _intervalos(por_local) == []
+
+
+def test_custodia_em_um_periodo():
+    cenario = _cenario_movimentado()
+    cliente, conclusao = ambiente.cliente(), cenario["conclusao"]
+
+    def periodo(inicio, fim, **filtros):
+        return cliente.get("/api/v1/movimentacoes/custodia/periodo", params={
+            "inicio": inicio.isoformat(), "fim": fim.isoformat(), **filtros,
+        }, headers=cenario["cabecalhos"])
+
+    ambos = periodo(conclusao - timedelta(days=2), conclusao + timedelta(hours=1), ativo_id=cenario["ativo_id"])
+    assert _intervalos(ambos) == [
+        (cenario["origem"], cenario["resp_origem"], None),
+        (cenario["destino"], cenario["resp_destino"], cenario["movimentacao_id"]),
+    ]
+    anterior, posterior = ambos.json()["intervalos"]
+    assert anterior["fim"] == posterior["inicio"] and posterior["fim"] is None
+
+    # Período terminando exatamente na conclusão: o destino já começa nesse instante
+    assert len(_intervalos(periodo(conclusao - timedelta(days=2), conclusao, ativo_id=cenario["ativo_id"]))) == 2
+    assert _intervalos(periodo(
+        conclusao - timedelta(days=2), conclusao - timedelta(days=1), ativo_id=cenario["ativo_id"]
+    )) == [(cenario["origem"], cenario["resp_origem"], None)]
+    assert _intervalos(periodo(
+        conclusao - timedelta(days=2), conclusao + timedelta(hours=1), responsavel_id=cenario["resp_destino"]
+    )) == [(cenario["destino"], cenario["resp_destino"], cenario["movimentacao_id"])]
+    assert periodo(conclusao, conclusao - timedelta(days=1)).status_code == 400
+
+
+def test_relatorio_cadeia_custodia():
+    cenario = _cenario_movimentado()
+    cliente = ambiente.cliente()
+    url = f"/api/v1/movimentacoes/relatorios/cadeia-custodia/{cenario['ativo_id']}"
+
+    resposta = cliente.get(url, headers=cenario["cabecalhos"])
+    assert resposta.status_code == 200, resposta.text
+    relatorio = resposta.json()
+    assert relatorio["ativo"]["id"] == cenario["ativo_id"] and relatorio["total"] == 1
+    etapa, = relatorio["cadeia_custodia"]
+    assert etapa["status"] == "executada"
+    with ambiente.sessao() as db:
+        assert etapa["local_origem"] == db.get(Local, cenario["origem"]).codigo
+        assert etapa["local_destino"] == db.get(Local, cenario["destino"]).codigo
+        assert etapa["responsavel_destino"] == db.get(Responsavel, cenario["resp_destino"]).nome
+
+    assert cliente.get(url, params={"skip": 1}, headers=cenario["cabecalhos"]).json()["cadeia_custodia"] == []
+    assert cliente.get(
+        "/api/v1/movimentacoes/relatorios/cadeia-custodia/0", headers=cenario["cabecalhos"]
+    ).status_code == 404
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_migracao_reconstroi_o_historico_das_movimentacoes,
+        test_custodia_em_uma_data_ao_redor_da_movimentacao,
+        test_custodia_em_um_periodo,
+        test_relatorio_cadeia_custodia,
+    )
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Testes das etiquetas QR (individual, lote síncrono e lotes em segundo plano)
+"""
+
+import io
+import os
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+import ambiente_teste as ambiente
+
+from app.core.jobs import job_runner
+from app.core.labels import LABEL_BATCH_DIR, PROCESS_POOL_THRESHOLD, expire_label_batches, render_labels
+from app.models import Ativo, JobStatus
+
+
+def test_etiqueta_individual_marca_impressa():
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        cabecalhos = ambiente.cabecalhos(usuario)
+        ativo_id = ambiente.criar_ativo(db, categoria="informatica").id
+    cliente = ambiente.cliente()
+
+    resposta = cliente.post(f"/api/v1/ativos/{ativo_id}/etiqueta", headers=cabecalhos)
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.json()["codigo_qr"].startswith("data:image/png;base64,")
+
+    with ambiente.sessao() as db:
+        ativo = db.get(Ativo, ativo_id)
+        assert ativo.etiqueta_impressa == 1
+        assert ativo.qr_code.startswith("etiquetas/")
+    assert cliente.get(f"/api/v1/ativos/{ativo_id}", headers=cabecalhos).json()["etiqueta_impressa"] is True
+
+
+def test_lote_sincrono_zip():
+    with ambiente.sessao() as db:
+        cabecalhos = ambiente.cabecalhos(ambiente.criar_usuario(db))
+        ativos = [ambiente.criar_ativo(db, categoria="informatica") for _ in range(3)]
+        ids, codigos = [a.id for a in ativos], sorted(a.codigo for a in ativos)
+
+    resposta = ambiente.cliente().get(
+        "/api/v1/ativos/etiquetas", params={"ids": ids, "formato": "zip"}, headers=cabecalhos
+    )
+    assert resposta.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(resposta.content)) as arquivo:
+        assert arquivo.namelist() == [f"{codigo}.png" for codigo in codigos]
+
+
+def test_lote_grande_renderizado_em_processos_a_partir_de_thread():
+    cache = Path(ambiente.DIRETORIO) / "etiquetas_processos"
+    payloads = [{"codigo": f"PROC{i:04d}"} for i in range(PROCESS_POOL_THRESHOLD + 4)]
+    resultado = []
+
+    # Como no job runner: chamado de uma thread que não é a principal
+    thread = threading.Thread(target=lambda: resultado.extend(render_labels(payloads, max_workers=2, cache_dir=cache)))
+    thread.start()
+    thread.join(timeout=120)
+    assert not thread.is_alive()
+
+    assert [payload for payload, _, _ in resultado] == payloads
+    for _, digest, caminho in resultado:
+        assert caminho.read_bytes()[:8] == b"\x89PNG\r\n\x1a\n", digest
+    assert not list(cache.rglob("*.tmp"))
+
+
+def test_lotes_em_segundo_plano_expiram():
+    LABEL_BATCH_DIR.mkdir(parents=True, exist_ok=True)
+    antigo, recente = LABEL_BATCH_DIR / "antigo.pdf", LABEL_BATCH_DIR / "recente.pdf"
+    antigo.write_bytes(b"%PDF")
+    recente.write_bytes(b"%PDF")
+    duas_horas = time.time() - 7200
+    os.utime(antigo, (duas_horas, duas_horas))
+
+    assert expire_label_batches(3600) == 1
+    assert not antigo.exists() and recente.exists()
+
+    # Download de um lote já expirado
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        cabecalhos = ambiente.cabecalhos(usuario)
+        usuario_id = usuario.id
+    job_id = job_runner.submit("ativos.gerar_etiquetas", {"ids": [], "formato": "pdf"}, created_by=usuario_id)
+    job_runner._update(job_id, status=JobStatus.SUCCEEDED, result={"total": 0, "formato": "pdf"})
+    resposta = ambiente.cliente().get(f"/api/v1/ativos/etiquetas/lotes/{job_id}", headers=cabecalhos)
+    assert resposta.status_code == 410
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_etiqueta_individual_marca_impressa,
+        test_lote_sincrono_zip,
+        test_lote_grande_renderizado_em_processos_a_partir_de_thread,
+        test_lotes_em_segundo_plano_expiram,
+    )
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Testes da exportação em streaming (/ativos/exportar e /movimentacoes/exportar)
+"""
+
+import csv
+import gzip
+import io
+import json
+import zipfile
+
+import ambiente_teste as ambiente
+
+from app.core.streaming_export import ExportEncoder, get_encoder, iter_export
+from app.models import Movimentacao
+
+
+def _cenario():
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        setor = ambiente.criar_setor(db)
+        origem, destino = ambiente.criar_local(db), ambiente.criar_local(db)
+        responsavel = ambiente.criar_responsavel(db, setor)
+        ativo = ambiente.criar_ativo(db, local_id=origem.id)
+        ids = []
+        for para_local_id, para_responsavel_id in ((destino.id, responsavel.id), (origem.id, None), (destino.id, None)):
+            movimentacao = ambiente.criar(
+                db, Movimentacao, ativo_id=ativo.id, tipo="transferencia", motivo="Teste",
+                de_local_id=origem.id, para_local_id=para_local_id,
+                para_responsavel_id=para_responsavel_id, solicitado_por=usuario.id,
+            )
+            ids.append(movimentacao.id)
+        return ambiente.cabecalhos(usuario), destino.id, responsavel.id, ids
+
+
+def test_exportar_movimentacoes_filtra_por_destino():
+    cabecalhos, destino_id, responsavel_id, ids = _cenario()
+    cliente = ambiente.cliente()
+
+    resposta = cliente.get(
+        "/api/v1/movimentacoes/exportar", params={"local_destino_id": destino_id}, headers=cabecalhos
+    )
+    assert resposta.status_code == 200
+    linhas = list(csv.DictReader(io.StringIO(resposta.content.decode("utf-8-sig"))))
+    assert [int(linha["id"]) for linha in linhas] == [ids[0], ids[2]]
+    assert all(int(linha["para_local_id"]) == destino_id for linha in linhas)
+
+    resposta = cliente.get(
+        "/api/v1/movimentacoes/exportar",
+        params={"formato": "ndjson", "compactar": True, "responsavel_destino_id": responsavel_id},
+        headers=cabecalhos,
+    )
+    assert resposta.status_code == 200
+    corpo = resposta.content
+    if corpo[:2] == b"\x1f\x8b":  # o TestClient não descompacta quando não há Content-Encoding
+        corpo = gzip.decompress(corpo)
+    linhas = [json.loads(linha) for linha in corpo.decode().splitlines()]
+    assert [linha["id"] for linha in linhas] == [ids[0]]
+
+
+def test_exportar_ativos_xlsx():
+    cabecalhos, _, _, _ = _cenario()
+    resposta = ambiente.cliente().get(
+        "/api/v1/ativos/exportar", params={"formato": "xlsx"}, headers=cabecalhos
+    )
+    assert resposta.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(resposta.content)) as arquivo:
+        planilha = arquivo.read("xl/worksheets/sheet1.xml").decode()
+    assert planilha.count("<row>") >= 2
+
+
+def test_exportar_ativos_com_busca_textual():
+    with ambiente.sessao() as db:
+        cabecalhos = ambiente.cabecalhos(ambiente.criar_usuario(db))
+        por_serie = ambiente.criar_ativo(db, ns_serie="SN-EXPORT-77").id
+        por_descricao = ambiente.criar_ativo(db, descricao="Monitor sn-export-77 reserva").id
+        ambiente.criar_ativo(db, ns_serie="SN-OUTRO-1")
+    cliente = ambiente.cliente()
+
+    resposta = cliente.get("/api/v1/ativos/exportar", params={"query": "SN-EXPORT"}, headers=cabecalhos)
+    assert resposta.status_code == 200, resposta.text
+    linhas = list(csv.DictReader(io.StringIO(resposta.content.decode("utf-8-sig"))))
+    assert [int(linha["id"]) for linha in linhas] == [por_serie, por_descricao]
+    assert linhas[0]["ns_serie"] == "SN-EXPORT-77"
+
+    # A listagem usa os mesmos filtros
+    listagem = cliente.get("/api/v1/ativos/", params={"query": "SN-EXPORT"}, headers=cabecalhos)
+    assert listagem.status_code == 200, listagem.text
+    assert sorted(item["id"] for item in listagem.json()["items"]) == [por_serie, por_descricao]
+
+
+def test_encoder_em_lotes():
+    encoder = get_encoder("csv", ["id", "nome"])
+    lotes = [[(1, "a"), (2, "b")], [], [(3, None)]]
+    conteudo = b"".join(iter_export(encoder, lotes, compress=True))
+    texto = gzip.decompress(conteudo).decode("utf-8-sig")
+    assert texto.splitlines() == ["id,nome", "1,a", "2,b", "3,"]
+
+    try:
+        ExportEncoder(["id"])
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("ExportEncoder deveria ser abstrato")
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_exportar_movimentacoes_filtra_por_destino,
+        test_exportar_ativos_xlsx,
+        test_exportar_ativos_com_busca_textual,
+        test_encoder_em_lotes,
+    )
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Testes da importação de ativos por CSV (POST /ativos/importar)
+"""
+
+import ambiente_teste as ambiente
+
+from app.models import Ativo
+
+CABECALHO = "codigo,descricao,categoria,patrimonio,ns_serie,valor_aquisicao,data_compra\n"
+
+
+def _csv(linhas):
+    return (CABECALHO + "".join(linhas)).encode("utf-8")
+
+
+def _importar(cliente, cabecalhos, conteudo):
+    return cliente.post(
+        "/api/v1/ativos/importar",
+        files={"file": ("ativos.csv", conteudo, "text/csv")},
+        headers=cabecalhos,
+    )
+
+
+def test_importar_relata_erros_por_linha():
+    with ambiente.sessao() as db:
+        cabecalhos = ambiente.cabecalhos(ambiente.criar_usuario(db))
+        existente = ambiente.criar_ativo(db, patrimonio="PAT-EXISTENTE").patrimonio
+
+    conteudo = _csv([
+        "IMP001,Notebook,informatica,PAT-IMP001,NS001,\"3500,50\",2024-01-15\n",
+        "IMP002,Monitor,informatica,,,,15/02/2024\n",
+        "IMP001,Repetido,informatica,,,,\n",
+        "IMP003,,informatica,,,,\n",
+        f"IMP004,Cadeira,mobiliario,{existente},,,\n",
+        "IMP005,Mesa,mobiliario,,,,31/31/2024\n",
+    ])
+    resposta = _importar(ambiente.cliente(), cabecalhos, conteudo)
+    assert resposta.status_code == 200
+    resultado = resposta.json()
+    assert resultado["sucessos"] == 2
+    assert resultado["erros"] == 4
+    erros = {d["linha"]: d["erro"] for d in resultado["detalhes"] if d["status"] == "erro"}
+    assert "duplicado no arquivo" in erros[4]
+    assert "Descrição" in erros[5]
+    assert "já existe" in erros[6]
+    assert "Data de compra" in erros[7]
+
+    with ambiente.sessao() as db:
+        ativo = db.query(Ativo).filter(Ativo.codigo == "IMP001").one()
+        assert float(ativo.valor_aquisicao) == 3500.5
+        assert ativo.data_compra.day == 15
+
+
+def test_importar_usa_queries_por_lote_e_nao_por_linha():
+    with ambiente.sessao() as db:
+        cabecalhos = ambiente.cabecalhos(ambiente.criar_usuario(db))
+    cliente = ambiente.cliente()
+
+    contagens = []
+    for prefixo, quantidade in (("Q", 5), ("R", 250)):
+        conteudo = _csv(f"{prefixo}{i:05d},Item {i},informatica,,,,\n" for i in range(quantidade))
+        with ambiente.contar_queries() as instrucoes:
+            resposta = _importar(cliente, cabecalhos, conteudo)
+        assert resposta.json()["sucessos"] == quantidade
+        contagens.append(len(instrucoes))
+
+    assert contagens[0] == contagens[1], contagens
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_importar_relata_erros_por_linha,
+        test_importar_usa_queries_por_lote_e_nao_por_linha,
+    )
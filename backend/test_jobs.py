@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Testes do job runner e da importação de CSV em segundo plano
+"""
+
+import asyncio
+import os
+import tempfile
+
+import ambiente_teste as ambiente
+
+import main  # noqa: F401  (registra os handlers dos endpoints)
+from app.core.jobs import JobBroker, JobCancelled, JobContext, LocalJobBroker, job_runner
+from app.models import Ativo, JobStatus
+
+from app.api.v1.endpoints.ativos import _job_importar_ativos
+
+
+def _arquivo_csv(prefixo: str, quantidade: int) -> str:
+    arquivo = tempfile.NamedTemporaryFile(
+        prefix="importacao_", suffix=".csv", delete=False, dir=ambiente.DIRETORIO
+    )
+    with arquivo:
+        arquivo.write(b"codigo,descricao,categoria\n")
+        for i in range(quantidade):
+            arquivo.write(f"{prefixo}{i:05d},Item {i},informatica\n".encode())
+    return arquivo.name
+
+
+def _rodar_ate_terminar(*job_ids: str):
+    """Iniciar o runner, esperar os jobs chegarem a um status final e pará-lo"""
+    async def rodar():
+        job_runner.broker = LocalJobBroker()
+        await job_runner.start()
+        try:
+            for _ in range(200):
+                status = [job_runner.get(job_id).status for job_id in job_ids]
+                if all(s in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED) for s in status):
+                    return
+                await asyncio.sleep(0.05)
+            raise AssertionError(f"Jobs não terminaram: {status}")
+        finally:
+            await job_runner.stop()
+            job_runner.broker = None
+
+    asyncio.run(rodar())
+
+
+def test_cancelar_job_na_fila_e_condicional():
+    caminho = _arquivo_csv("CAN", 3)
+    job_id = job_runner.submit("ativos.importar_csv", {"caminho": caminho, "usuario_id": None})
+
+    assert job_runner.cancel(job_id) is True
+    assert job_runner.get(job_id).status == JobStatus.CANCELLED
+    # Cancelado na fila: o arquivo temporário já pode ser apagado
+    assert not os.path.exists(caminho)
+    # Um worker que tente reivindicar o job depois do cancelamento não o executa
+    assert job_runner._claim(job_id) is None
+    assert job_runner.cancel(job_id) is False
+    assert job_runner.cancel("inexistente") is False
+
+
+def test_cancelar_job_em_execucao_sinaliza():
+    job_id = job_runner.submit("ativos.importar_csv", {"caminho": _arquivo_csv("RUN", 1), "usuario_id": None})
+    assert job_runner._claim(job_id) is not None
+    assert job_runner.cancel(job_id) is True
+    assert job_runner.get(job_id).status == JobStatus.CANCELLING
+
+
+def test_importacao_interrompida_mantem_arquivo_e_retoma():
+    caminho = _arquivo_csv("RET", 650)
+    job_id = job_runner.submit("ativos.importar_csv", {"caminho": caminho, "usuario_id": None})
+    assert job_runner._claim(job_id) is not None
+
+    # Primeira tentativa interrompida (desligamento) logo após o primeiro lote
+    ctx = JobContext(job_runner, job_id, attempt=1)
+    ctx.cancel()
+    try:
+        _job_importar_ativos(ctx, caminho=caminho, usuario_id=None)
+    except JobCancelled:
+        pass
+    else:
+        raise AssertionError("a importação deveria ter sido interrompida")
+    assert os.path.exists(caminho)
+    checkpoint = job_runner.get(job_id).result
+    assert checkpoint["linha"] == 301 and checkpoint["sucessos"] == 300
+
+    # O runner devolve o job à fila; a nova tentativa retoma após a linha 301
+    job_runner._update(job_id, status=JobStatus.PENDING)
+    _rodar_ate_terminar(job_id)
+
+    job = job_runner.get(job_id)
+    assert job.status == JobStatus.SUCCEEDED, job.error
+    assert job.result["sucessos"] == 650
+    assert job.result["erros"] == 0
+    assert job.result["retomado_apos_linha"] == 301
+    assert not os.path.exists(caminho)
+    with ambiente.sessao() as db:
+        assert db.query(Ativo).filter(Ativo.codigo.like("RET%")).count() == 650
+
+
+def test_broker_abstrato():
+    try:
+        JobBroker()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("JobBroker deveria ser abstrato")
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_cancelar_job_na_fila_e_condicional,
+        test_cancelar_job_em_execucao_sinaliza,
+        test_importacao_interrompida_mantem_arquivo_e_retoma,
+        test_broker_abstrato,
+    )
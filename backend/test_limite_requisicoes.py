@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Testes do limite de requisições (janela deslizante, expiração e limites por rota)
+"""
+
+import ambiente_teste as ambiente
+
+from app.core.config import settings
+from app.middleware.rate_limiting import (
+    LocalRateLimitBackend, RateLimitBackend, RateLimitRule, parse_rate_limit, parse_rate_limit_rules
+)
+
+
+def test_janela_deslizante():
+    backend = LocalRateLimitBackend()
+    regra = RateLimitRule("teste", 10, 60)
+
+    decisoes = [backend.hit_sync("ip:1", regra, now=6000.0 + i) for i in range(11)]
+    assert [d.allowed for d in decisoes] == [True] * 10 + [False]
+    assert decisoes[9].remaining == 0 and decisoes[10].retry_after > 0
+
+    # Metade da janela seguinte: a anterior ainda pesa 50% (10 * 0.5 = 5 requisições)
+    meio = [backend.hit_sync("ip:1", regra, now=6090.0) for _ in range(6)]
+    assert [d.allowed for d in meio] == [True] * 5 + [False]
+    # Outro cliente tem contadores próprios
+    assert backend.hit_sync("ip:2", regra, now=6090.0).remaining == 9
+
+
+def test_clientes_ociosos_sao_removidos():
+    backend = LocalRateLimitBackend(shards=1)
+    regra = RateLimitRule("teste", 5, 1)
+    for i in range(100):
+        backend.hit_sync(f"ip:{i}", regra, now=100.0)
+    assert len(backend) == 100
+    # Depois de duas janelas as entradas expiraram; a varredura periódica as descarta
+    for _ in range(LocalRateLimitBackend.SWEEP_INTERVAL):
+        backend.hit_sync("ip:ativo", regra, now=110.0)
+    assert len(backend) == 1
+
+
+def test_regras_por_prefixo_e_backend_abstrato():
+    regras = parse_rate_limit_rules("/api/=200/60, /api/v1/auth/=50/60")
+    assert [r.name for r in regras] == ["/api/v1/auth/", "/api/"]
+    assert parse_rate_limit(" 10/30 ") == (10, 30)
+    try:
+        RateLimitBackend()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("RateLimitBackend deveria ser abstrato")
+
+
+def test_limite_da_rota_de_login():
+    limite, _ = parse_rate_limit(settings.RATE_LIMIT_LOGIN)
+    cliente = ambiente.cliente()
+    cabecalhos = {"X-Forwarded-For": "203.0.113.45"}
+    status = [
+        cliente.post("/api/v1/auth/login", json={"username": "ninguem", "password": "x"}, headers=cabecalhos).status_code
+        for _ in range(limite + 1)
+    ]
+    assert 429 not in status[:limite], status
+    assert status[-1] == 429
+    # O limite do decorator vale só para a rota: outra rota do mesmo cliente segue liberada
+    assert cliente.get("/health", headers=cabecalhos).status_code != 429
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_janela_deslizante,
+        test_clientes_ociosos_sao_removidos,
+        test_regras_por_prefixo_e_backend_abstrato,
+        test_limite_da_rota_de_login,
+    )
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Testes das manutenções (estado de SLA e métricas)
+"""
+
+import asyncio
+import importlib.util
+import os
+from datetime import date, datetime, timedelta, timezone
+
+import ambiente_teste as ambiente
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import Base
+from app.core.maintenance_analytics import _day_runs, refresh_daily_summaries
+from app.core.sla_scheduler import SlaScheduler, local_naive
+from app.core.websocket import connection_manager
+from app.models import Manutencao, ManutencaoResumoDiario
+
+MIGRACAO_SLA = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "alembic", "versions", "0c8e5b2d9f63_manutencoes_sla_estado.py"
+)
+
+
+def _manutencao(db, usuario, ativo, **campos):
+    n = next(ambiente._sequencia)
+    return ambiente.criar(
+        db, Manutencao, numero_chamado=f"MAN{n}", titulo=f"Chamado {n}", descricao="Equipamento parado",
+        ativo_id=ativo.id, aberto_por=usuario.id, sla_horas=4, **campos
+    )
+
+
+def test_sla_vencido_usa_marcacao_do_agendador():
+    agora = datetime.now()
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        ativo = ambiente.criar_ativo(db)
+        marcada = _manutencao(db, usuario, ativo, sla_vence_em=agora - timedelta(hours=2), sla_violado_em=agora).id
+        # Prazo vencido, ainda não marcado pelo agendador
+        atrasada = _manutencao(db, usuario, ativo, sla_vence_em=agora - timedelta(hours=1)).id
+        _manutencao(db, usuario, ativo, sla_vence_em=agora + timedelta(hours=1))
+        _manutencao(db, usuario, ativo, sla_vence_em=agora - timedelta(hours=1), sla_pausado=1)
+        cabecalhos, ativo_id = ambiente.cabecalhos(usuario), ativo.id
+    cliente = ambiente.cliente()
+
+    def vencidas():
+        resposta = cliente.get(
+            "/api/v1/manutencao/", params={"ativo_id": ativo_id, "sla_vencido": True}, headers=cabecalhos
+        )
+        assert resposta.status_code == 200, resposta.text
+        no_prazo = cliente.get(
+            "/api/v1/manutencao/", params={"ativo_id": ativo_id, "sla_vencido": False}, headers=cabecalhos
+        ).json()["total"]
+        painel = cliente.get("/api/v1/manutencao/metricas/dashboard", headers=cabecalhos)
+        assert painel.status_code == 200, painel.text
+        return sorted(m["id"] for m in resposta.json()["items"]), no_prazo, painel.json()["total_vencidas"]
+
+    com_agendador, no_prazo, total = vencidas()
+    assert com_agendador == [marcada] and no_prazo == 3
+
+    # Sem o agendador nada marca sla_violado_em: o prazo efetivo é comparado
+    settings.SLA_SCHEDULER_ENABLED = False
+    try:
+        sem_agendador, no_prazo, total_sem_agendador = vencidas()
+    finally:
+        settings.SLA_SCHEDULER_ENABLED = True
+    assert sem_agendador == sorted([marcada, atrasada]) and no_prazo == 2
+    assert total_sem_agendador == total + 1
+
+
+def test_percentual_de_sla_compara_resolucao_com_o_prazo():
+    agora = datetime.now()
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        ativo = ambiente.criar_ativo(db)
+        # Resolvida 26 h após o prazo sem o agendador rodando: nenhuma violação marcada
+        _manutencao(
+            db, usuario, ativo, status="resolvido", data_abertura=agora - timedelta(hours=40),
+            sla_vence_em=agora - timedelta(hours=36), data_resolucao=agora - timedelta(hours=10),
+        )
+        _manutencao(
+            db, usuario, ativo, status="resolvido", data_abertura=agora - timedelta(hours=5),
+            sla_vence_em=agora - timedelta(hours=1), data_resolucao=agora - timedelta(hours=2),
+        )
+        cabecalhos = ambiente.cabecalhos(usuario)
+
+        # Regra esperada aplicada em Python sobre todas as ordens resolvidas com SLA
+        avaliadas = cumpridas = 0
+        for m in db.query(Manutencao).filter(Manutencao.data_resolucao.isnot(None), Manutencao.sla_horas.isnot(None)):
+            if m.status in ("cancelado", "cancelada"):
+                continue
+            avaliadas += 1
+            cumpridas += m.sla_violado_em is None and (m.sla_vence_em is None or m.data_resolucao <= m.sla_vence_em)
+
+    painel = ambiente.cliente().get("/api/v1/manutencao/metricas/dashboard", headers=cabecalhos)
+    assert painel.status_code == 200, painel.text
+    assert cumpridas < avaliadas
+    assert abs(painel.json()["percentual_sla_cumprido"] - cumpridas * 100 / avaliadas) < 1e-6
+
+
+def _migrar_sla(engine):
+    """Banco sem as colunas de estado de SLA, migrado pela revisão 0c8e5b2d9f63"""
+    spec = importlib.util.spec_from_file_location("migracao_sla", MIGRACAO_SLA)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_manutencoes_sla_proximo_evento_em"))
+        conn.execute(text("DROP INDEX ix_manutencoes_sla_vence_em"))
+        for coluna in ("sla_vence_em", "sla_proximo_evento_em", "sla_pausado_em", "sla_alerta_em", "sla_violado_em"):
+            conn.execute(text(f"ALTER TABLE manutencoes DROP COLUMN {coluna}"))
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            modulo.upgrade()
+
+
+def test_migracao_preenche_prazo_das_ordens_encerradas():
+    engine = create_engine(f"sqlite:///{os.path.join(ambiente.DIRETORIO, 'migracao_sla.db')}")
+    Base.metadata.create_all(engine)
+    prazo = datetime(2025, 5, 1, 12)
+    with Session(engine) as db:
+        usuario = ambiente.criar_usuario(db)
+        ativo = ambiente.criar_ativo(db)
+        campos = dict(data_vencimento_sla=prazo, tempo_pausado_minutos=60)
+        atrasada = _manutencao(db, usuario, ativo, status="resolvido", data_resolucao=prazo + timedelta(hours=26), **campos).id
+        no_prazo = _manutencao(db, usuario, ativo, status="fechado", data_resolucao=prazo + timedelta(minutes=30), **campos).id
+        aberta = _manutencao(db, usuario, ativo, status="aberto", **campos).id
+    _migrar_sla(engine)
+
+    with Session(engine) as db:
+        prazo_efetivo = prazo + timedelta(hours=1)
+        estado = {
+            m.id: (m.sla_vence_em, m.sla_violado_em, m.sla_proximo_evento_em)
+            for m in db.query(Manutencao).filter(Manutencao.id.in_([atrasada, no_prazo, aberta]))
+        }
+    assert estado[atrasada] == (prazo_efetivo, prazo_efetivo, None)
+    assert estado[no_prazo] == (prazo_efetivo, None, None)
+    # Em aberto: próximo evento (alerta com 80% das 4 h consumidas) para o agendador
+    assert estado[aberta] == (prazo_efetivo, None, prazo_efetivo - timedelta(hours=4 * 0.2))
+    engine.dispose()
+
+
+def test_agendador_alerta_viola_e_rearma():
+    agora = datetime.now()
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        ativo = ambiente.criar_ativo(db)
+        # 4 h de SLA, prazo em 30 min: o alerta (80% consumidos) já passou
+        manutencao = _manutencao(
+            db, usuario, ativo, status="aberto", atribuido_para=usuario.id,
+            sla_vence_em=agora + timedelta(minutes=30), sla_proximo_evento_em=agora - timedelta(minutes=18),
+        )
+        manutencao_id, usuario_id, vence_em = manutencao.id, usuario.id, manutencao.sla_vence_em
+
+    enviados = []
+    connection_manager.send_to_users_threadsafe = enviados.append
+    agendador = SlaScheduler(resync_seconds=60)
+    try:
+        # Alerta: marca sla_alerta_em e devolve o prazo para rearmar o timer
+        assert agendador._fire([manutencao_id]) == [(manutencao_id, vence_em)]
+        with ambiente.sessao() as db:
+            manutencao = db.get(Manutencao, manutencao_id)
+            assert manutencao.sla_alerta_em is not None and manutencao.sla_violado_em is None
+            assert manutencao.sla_proximo_evento_em == vence_em
+            # O prazo chega
+            manutencao.sla_vence_em = manutencao.sla_proximo_evento_em = agora - timedelta(seconds=1)
+            db.commit()
+
+        # Violação: nada mais a rearmar; um segundo disparo não repete o evento
+        assert agendador._fire([manutencao_id]) == []
+        assert agendador._fire([manutencao_id]) == []
+    finally:
+        del connection_manager.send_to_users_threadsafe
+
+    with ambiente.sessao() as db:
+        manutencao = db.get(Manutencao, manutencao_id)
+        assert manutencao.sla_violado_em is not None and manutencao.sla_proximo_evento_em is None
+    assert [m[str(usuario_id)]["data"]["eventos"][0]["evento"] for m in enviados] == ["alerta", "violado"]
+
+
+def test_timers_substituidos_disparam_uma_vez():
+    agendador = SlaScheduler(resync_seconds=600)  # horizonte de 20 min
+    agendador._wakeup = asyncio.Event()
+    agora = datetime.now()
+    agendador._arm(1, agora - timedelta(minutes=5))
+    agendador._arm(1, agora - timedelta(minutes=1))  # rearmado: a entrada anterior fica obsoleta
+    agendador._arm(2, agora + timedelta(minutes=5))
+    agendador._arm(3, agora + timedelta(days=1))  # além do horizonte: fica para a próxima ressincronização
+    assert agendador._pop_due(agora) == [1]
+    assert agendador._pop_due(agora + timedelta(minutes=10)) == [2]
+    assert agendador._heap == [] and agendador._armed == {}
+
+
+def test_hora_local_sem_fuso():
+    local = datetime(2026, 3, 1, 12, 30)
+    assert local_naive(local) is local
+    assert local_naive(None) is None
+    com_fuso = local.astimezone(timezone.utc)
+    assert local_naive(com_fuso) == local
+
+
+def test_resumos_recalculam_apenas_os_dias_alterados():
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        ativo = ambiente.criar_ativo(db, categoria="resumos")
+        _manutencao(
+            db, usuario, ativo, data_abertura=datetime(2025, 1, 10, 9), data_resolucao=datetime(2025, 1, 11, 15),
+            status="resolvido", sla_vence_em=datetime(2025, 1, 11, 13),
+        )
+        refresh_daily_summaries(db, full=True)
+        db.commit()
+
+        # Resumo antigo de um dia sem alterações, entre os dias alterados
+        ambiente.criar(
+            db, ManutencaoResumoDiario, dia=date(2025, 2, 1), categoria="resumos", tipo="corretiva",
+            abertas=7, calculado_em=datetime(2025, 2, 2),
+        )
+        _manutencao(db, usuario, ativo, data_abertura=datetime(2025, 3, 5, 10))
+        resultado = refresh_daily_summaries(db)
+        db.commit()
+
+        # Apenas dias distintos (abertura/resolução), não o intervalo entre eles
+        assert resultado["dias"] < (date.fromisoformat(resultado["fim"]) - date(2025, 1, 10)).days
+        resumos = {
+            r.dia: r for r in db.query(ManutencaoResumoDiario).filter(ManutencaoResumoDiario.categoria == "resumos")
+        }
+        assert resumos[date(2025, 2, 1)].abertas == 7
+        assert resumos[date(2025, 1, 10)].abertas == 1
+        assert (resumos[date(2025, 1, 11)].resolvidas, resumos[date(2025, 1, 11)].sla_cumpridas) == (1, 0)
+        assert resumos[date(2025, 3, 5)].abertas == 1
+
+        # O recálculo completo reconstrói tudo a partir das ordens
+        refresh_daily_summaries(db, full=True)
+        db.commit()
+        assert db.get(ManutencaoResumoDiario, (date(2025, 2, 1), "resumos", "corretiva")) is None
+
+
+def test_mtbf_e_mttr_por_ativo_e_categoria():
+    inicio = datetime(2024, 3, 1, 8)
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        cabecalhos = ambiente.cabecalhos(usuario)
+        frequente = ambiente.criar_ativo(db, categoria="mtbf-teste")
+        raro = ambiente.criar_ativo(db, categoria="mtbf-teste")
+        # 10 falhas, uma por dia; só a primeira resolvida (100 h)
+        for dia in range(10):
+            abertura = inicio + timedelta(days=dia)
+            resolucao = {"status": "resolvido", "data_resolucao": abertura + timedelta(hours=100)} if dia == 0 else {}
+            _manutencao(db, usuario, frequente, tipo="corretiva", data_abertura=abertura, **resolucao)
+        _manutencao(
+            db, usuario, raro, tipo="corretiva", data_abertura=inicio, status="resolvido",
+            data_resolucao=inicio + timedelta(hours=1),
+        )
+        # Preventivas não são falhas
+        _manutencao(db, usuario, raro, tipo="preventiva", data_abertura=inicio + timedelta(days=2))
+        frequente_id, raro_id = frequente.id, raro.id
+    cliente = ambiente.cliente()
+    periodo = {"data_inicio": "2024-03-01", "data_fim": "2024-03-31"}
+
+    resposta = cliente.get("/api/v1/manutencao/metricas/mtbf", params=periodo, headers=cabecalhos)
+    assert resposta.status_code == 200, resposta.text
+    por_ativo = {item["ativo_id"]: item for item in resposta.json()["itens"]}
+    assert (por_ativo[frequente_id]["falhas"], por_ativo[frequente_id]["mtbf_horas"]) == (10, 24.0)
+    assert por_ativo[frequente_id]["mttr_horas"] == 100.0
+    assert (por_ativo[raro_id]["falhas"], por_ativo[raro_id]["mtbf_horas"], por_ativo[raro_id]["mttr_horas"]) == (1, None, 1.0)
+
+    resposta = cliente.get(
+        "/api/v1/manutencao/metricas/mtbf", params={**periodo, "agrupar": "categoria"}, headers=cabecalhos
+    )
+    assert resposta.status_code == 200, resposta.text
+    categoria, = [item for item in resposta.json()["itens"] if item["categoria"] == "mtbf-teste"]
+    assert (categoria["ativos"], categoria["falhas"], categoria["mtbf_horas"]) == (2, 11, 24.0)
+    # (100 h + 1 h) / 2 ordens resolvidas, não ponderado pelas 10 falhas do primeiro ativo
+    assert categoria["mttr_horas"] == 50.5
+
+
+def test_metricas_analiticas_a_partir_dos_resumos():
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        cabecalhos = ambiente.cabecalhos(usuario)
+        ativo = ambiente.criar_ativo(db, categoria="analitico-teste")
+        abertura = datetime(2024, 4, 2, 9)
+        _manutencao(
+            db, usuario, ativo, tipo="corretiva", status="resolvido", data_abertura=abertura,
+            data_resolucao=abertura + timedelta(hours=2), sla_vence_em=abertura + timedelta(hours=4), custo_real=100,
+        )
+        abertura = datetime(2024, 4, 3, 9)
+        _manutencao(
+            db, usuario, ativo, tipo="corretiva", status="resolvido", data_abertura=abertura,
+            data_resolucao=abertura + timedelta(hours=30), sla_vence_em=abertura + timedelta(hours=4), custo_real=50,
+        )
+        refresh_daily_summaries(db, full=True)
+        db.commit()
+    cliente = ambiente.cliente()
+
+    resposta = cliente.get("/api/v1/manutencao/metricas/analitico", params={
+        "data_inicio": "2024-04-01", "data_fim": "2024-04-30", "categoria": "analitico-teste",
+    }, headers=cabecalhos)
+    assert resposta.status_code == 200, resposta.text
+    corpo = resposta.json()
+    assert corpo["totais"]["abertas"] == 2 and corpo["totais"]["resolvidas"] == 2
+    assert corpo["totais"]["mttr_horas"] == 16.0
+    assert corpo["totais"]["percentual_sla_cumprido"] == 50.0
+    assert corpo["totais"]["custo_total"] == 150.0
+    assert [(d["dia"], d["abertas"], d["resolvidas"]) for d in corpo["serie"]] == [
+        ("2024-04-02", 1, 1), ("2024-04-03", 1, 0), ("2024-04-04", 0, 1),
+    ]
+
+    invertido = cliente.get("/api/v1/manutencao/metricas/analitico", params={
+        "data_inicio": "2024-04-30", "data_fim": "2024-04-01",
+    }, headers=cabecalhos)
+    assert invertido.status_code == 400
+
+
+def test_dias_agrupados_em_sequencias():
+    dias = [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3), date(2025, 1, 7), date(2025, 2, 1), date(2025, 2, 2)]
+    assert _day_runs(dias) == [
+        (date(2025, 1, 1), date(2025, 1, 3)), (date(2025, 1, 7), date(2025, 1, 7)), (date(2025, 2, 1), date(2025, 2, 2)),
+    ]
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_sla_vencido_usa_marcacao_do_agendador,
+        test_percentual_de_sla_compara_resolucao_com_o_prazo,
+        test_migracao_preenche_prazo_das_ordens_encerradas,
+        test_agendador_alerta_viola_e_rearma,
+        test_timers_substituidos_disparam_uma_vez,
+        test_hora_local_sem_fuso,
+        test_resumos_recalculam_apenas_os_dias_alterados,
+        test_mtbf_e_mttr_por_ativo_e_categoria,
+        test_metricas_analiticas_a_partir_dos_resumos,
+        test_dias_agrupados_em_sequencias,
+    )
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Testes do coletor de métricas de requisições (shards por thread e histogramas)
+"""
+
+import threading
+import time
+
+import ambiente_teste as ambiente
+
+from app.core.histogram import LatencyHistogram, bucket_bounds, bucket_index
+from app.core.monitoring import MetricsCollector
+
+
+def test_histograma_percentis_com_precisao_do_bucket():
+    histograma = LatencyHistogram()
+    for ms in range(1, 1001):
+        histograma.record(ms / 1000)
+    assert histograma.count == 1000
+    assert (histograma.min, histograma.max) == (0.001, 1.0)
+    assert abs(histograma.mean - 0.5005) < 1e-9
+    for percentil, esperado in ((50, 0.5), (95, 0.95), (99, 0.99)):
+        assert abs(histograma.percentile(percentil) - esperado) <= esperado / 16, percentil
+    # Cada bucket cobre no máximo 1/16 do seu limite inferior
+    for micros in (0, 15, 16, 1000, 123456, 10 ** 9):
+        inferior, superior = bucket_bounds(bucket_index(micros))
+        assert inferior <= micros < superior
+        assert superior - inferior <= max(1, inferior // 16)
+
+
+def test_registros_de_varias_threads_sao_combinados():
+    coletor = MetricsCollector()
+
+    def registrar(tempo):
+        for _ in range(100):
+            coletor.record("/api/v1/ativos/{ativo_id}", "GET", 200, tempo)
+        coletor.record("/api/v1/ativos/{ativo_id}", "GET", 404, tempo)
+
+    threads = [threading.Thread(target=registrar, args=(t,)) for t in (0.01, 0.02, 0.04)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(coletor._shards) == 3
+    assert coletor.total_requests == 303
+    histograma = coletor.endpoint_histograms()["GET /api/v1/ativos/{ativo_id}"]
+    assert (histograma.count, histograma.errors) == (303, 3)
+    assert (histograma.min, histograma.max) == (0.01, 0.04)
+
+    estatisticas = coletor.get_endpoint_stats()["GET /api/v1/ativos/{ativo_id}"]
+    assert estatisticas["error_count"] == 3 and estatisticas["error_rate"] == 0.99
+    assert estatisticas["p50_response_time"] == 0.02
+    assert estatisticas["p99_response_time"] == 0.04
+    assert coletor.get_error_summary() == {404: 3}
+
+
+def test_janela_por_minuto():
+    coletor = MetricsCollector()
+    assert coletor.get_request_stats()["total_requests"] == 0
+    for status in (200, 201, 500, 200):
+        coletor.record("/health", "GET", status, 0.1)
+    # Fixa o minuto da fatia para o teste não depender da virada do relógio
+    shard = coletor._shards[0]
+    shard.current[0] = int(time.time() / 60)
+    estatisticas = coletor.get_request_stats(minutes=1)
+    assert estatisticas["total_requests"] == 4
+    assert estatisticas["error_count"] == 1 and estatisticas["error_rate"] == 25.0
+    assert estatisticas["avg_response_time"] == 0.1
+
+    # Minutos fora da janela pedida não entram na conta
+    shard.current[0] = int(time.time() / 60) - 5
+    assert coletor.get_request_stats(minutes=5)["total_requests"] == 0
+    assert coletor.get_request_stats(minutes=6)["total_requests"] == 4
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_histograma_percentis_com_precisao_do_bucket,
+        test_registros_de_varias_threads_sao_combinados,
+        test_janela_por_minuto,
+    )
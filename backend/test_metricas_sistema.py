@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Testes do amostrador de métricas do host (thread em segundo plano)
+"""
+
+import time
+
+import ambiente_teste as ambiente
+
+from app.core import system_metrics
+from app.core.monitoring import metrics_collector
+from app.core.system_metrics import SystemMetricsSampler, system_sampler
+
+
+def _aguardar(condicao, limite: float = 5.0) -> bool:
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if condicao():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_thread_publica_novas_amostras():
+    amostrador = SystemMetricsSampler(interval=0.05, slow_interval=3600)
+    primeira = amostrador.snapshot  # sem a thread: amostrada na chamada
+    assert amostrador.snapshot is primeira
+    for secao in ("cpu", "memory", "disk", "network", "system"):
+        assert primeira[secao]["timestamp"] == primeira["sampled_at"].isoformat(), secao
+
+    amostrador.start()
+    try:
+        assert _aguardar(lambda: amostrador.snapshot is not primeira)
+        assert _aguardar(lambda: amostrador.snapshot["sampled_at"] > primeira["sampled_at"])
+    finally:
+        amostrador.stop()
+    assert amostrador._thread is None
+    ultima = amostrador.snapshot
+    time.sleep(0.15)
+    assert amostrador.snapshot is ultima
+
+    # Coletores lentos são reaproveitados até vencer o slow_interval
+    assert ultima["network"]["interfaces"] is primeira["network"]["interfaces"]
+    assert ultima["system"]["hostname"] == primeira["system"]["hostname"]
+
+
+def test_falha_de_um_coletor_nao_derruba_a_amostra():
+    original = system_metrics._memory_metrics
+
+    def falhar():
+        raise OSError("sem /proc")
+
+    system_metrics._memory_metrics = falhar
+    try:
+        amostra = SystemMetricsSampler(interval=60, slow_interval=3600).sample()
+    finally:
+        system_metrics._memory_metrics = original
+    assert amostra["memory"]["error"] == "sem /proc"
+    assert "usage_percent" in amostra["cpu"] and "usage_percent" in amostra["disk"]
+
+
+def test_endpoints_leem_a_ultima_amostra():
+    amostra = system_sampler.sample()
+    original = system_metrics.psutil.cpu_percent
+
+    def proibido(*args, **kwargs):
+        raise AssertionError("psutil chamado durante a requisição")
+
+    with ambiente.sessao() as db:
+        cabecalhos = ambiente.cabecalhos(ambiente.criar_usuario(db))
+    system_metrics.psutil.cpu_percent = proibido
+    try:
+        resposta = ambiente.cliente().get("/api/v1/machines/metrics/current", headers=cabecalhos)
+        sistema = metrics_collector.get_system_stats()
+    finally:
+        system_metrics.psutil.cpu_percent = original
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.json()["cpu"]["usage_percent"] == amostra["cpu"]["usage_percent"]
+    assert sistema["sampled_at"] == amostra["sampled_at"].isoformat()
+    assert sistema["memory_percent"] == amostra["memory"]["usage_percent"]
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_thread_publica_novas_amostras,
+        test_falha_de_um_coletor_nao_derruba_a_amostra,
+        test_endpoints_leem_a_ultima_amostra,
+    )
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Testes das movimentações (criação, execução, termo de responsabilidade e lotes)
+"""
+
+import ambiente_teste as ambiente
+
+from app.api.v1.endpoints.movimentacoes import MOVIMENTACOES_LOTE_LIMITE_SINCRONO, VALOR_LIMITE_APROVACAO
+from app.core.jobs import job_runner
+from app.core.websocket import connection_manager
+from app.models import Ativo, CustodiaIntervalo, JobStatus, Movimentacao, UserRole
+
+
+def _cenario():
+    """Usuário, dois locais, dois responsáveis e um ativo no primeiro local/responsável"""
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        setor = ambiente.criar_setor(db)
+        origem, destino = ambiente.criar_local(db), ambiente.criar_local(db)
+        resp_origem, resp_destino = ambiente.criar_responsavel(db, setor), ambiente.criar_responsavel(db, setor)
+        ativo = ambiente.criar_ativo(
+            db, local_id=origem.id, responsavel_id=resp_origem.id, setor_id=setor.id, valor_aquisicao=100
+        )
+        return {
+            "usuario_id": usuario.id,
+            "cabecalhos": ambiente.cabecalhos(usuario),
+            "origem": origem.id,
+            "destino": destino.id,
+            "resp_origem": resp_origem.id,
+            "resp_destino": resp_destino.id,
+            "ativo_id": ativo.id,
+        }
+
+
+def test_criar_movimentacao_executa_e_registra_custodia():
+    cenario = _cenario()
+    cliente = ambiente.cliente()
+
+    resposta = cliente.post("/api/v1/movimentacoes/", json={
+        "ativo_id": cenario["ativo_id"],
+        "tipo": "alocacao",
+        "local_destino_id": cenario["destino"],
+        "responsavel_destino_id": cenario["resp_destino"],
+        "motivo": "Alocação para o novo setor",
+    }, headers=cenario["cabecalhos"])
+    assert resposta.status_code == 200, resposta.text
+    corpo = resposta.json()
+    assert corpo["status"] == "executada"
+    assert corpo["requer_aprovacao"] is False
+    # A origem vem do ativo quando não é informada
+    assert (corpo["local_origem_id"], corpo["local_destino_id"]) == (cenario["origem"], cenario["destino"])
+    assert corpo["responsavel_origem_id"] == cenario["resp_origem"]
+    assert corpo["executado_por"] == cenario["usuario_id"]
+    assert corpo["data_execucao"] is not None
+
+    with ambiente.sessao() as db:
+        movimentacao = db.get(Movimentacao, corpo["id"])
+        assert movimentacao.data_conclusao is not None
+        ativo = db.get(Ativo, cenario["ativo_id"])
+        assert (ativo.local_id, ativo.responsavel_id, ativo.status) == (
+            cenario["destino"], cenario["resp_destino"], "alocado"
+        )
+        aberto = db.query(CustodiaIntervalo).filter(
+            CustodiaIntervalo.ativo_id == cenario["ativo_id"], CustodiaIntervalo.fim.is_(None)
+        ).one()
+        assert (aberto.local_id, aberto.movimentacao_id) == (cenario["destino"], corpo["id"])
+
+    assert cliente.get(f"/api/v1/movimentacoes/{corpo['id']}", headers=cenario["cabecalhos"]).status_code == 200
+
+    termo = cliente.post(
+        f"/api/v1/movimentacoes/{corpo['id']}/termo-responsabilidade", headers=cenario["cabecalhos"]
+    )
+    assert termo.status_code == 200, termo.text
+    termo = termo.json()
+    assert termo["data_movimentacao"] is not None
+    assert termo["responsavel_origem"]["email"] and termo["responsavel_destino"]["email"]
+
+
+def test_lote_usa_a_mesma_execucao():
+    cenario = _cenario()
+    resposta = ambiente.cliente().post("/api/v1/movimentacoes/lote", json={"movimentacoes": [{
+        "ativo_id": cenario["ativo_id"],
+        "tipo": "transferencia",
+        "local_destino_id": cenario["destino"],
+        "motivo": "Realocação em massa",
+    }]}, headers=cenario["cabecalhos"])
+    assert resposta.status_code == 200, resposta.text
+    detalhe, = resposta.json()["detalhes"]
+    assert detalhe["status"] == "executada"
+
+    with ambiente.sessao() as db:
+        movimentacao = db.get(Movimentacao, detalhe["movimentacao_id"])
+        assert movimentacao.status == "executada"
+        assert movimentacao.executado_por == cenario["usuario_id"]
+        assert movimentacao.data_conclusao is not None
+        assert db.get(Ativo, cenario["ativo_id"]).local_id == cenario["destino"]
+
+
+def _lote(cabecalhos, itens):
+    resposta = ambiente.cliente().post("/api/v1/movimentacoes/lote", json={"movimentacoes": itens}, headers=cabecalhos)
+    assert resposta.status_code in (200, 202), resposta.text
+    return resposta
+
+
+def test_lote_com_erros_e_pendencias():
+    cenario = _cenario()
+    with ambiente.sessao() as db:
+        caro = ambiente.criar_ativo(db, local_id=cenario["origem"], valor_aquisicao=VALOR_LIMITE_APROVACAO + 1).id
+    base = {"tipo": "transferencia", "local_destino_id": cenario["destino"], "motivo": "Mudança de andar"}
+
+    resultado = _lote(cenario["cabecalhos"], [
+        {**base, "ativo_id": cenario["ativo_id"]},
+        {**base, "ativo_id": cenario["ativo_id"]},
+        {**base, "ativo_id": caro},
+        {**base, "ativo_id": 0},
+        {**base, "ativo_id": caro, "local_destino_id": 0},
+    ]).json()
+    assert (resultado["executadas"], resultado["pendentes"], resultado["erros"]) == (1, 1, 3)
+    assert [d.get("erro") for d in resultado["detalhes"]] == [
+        None, "Ativo repetido no lote", None, "Ativo não encontrado", "Ativo repetido no lote"
+    ]
+
+    with ambiente.sessao() as db:
+        pendente = db.get(Movimentacao, resultado["detalhes"][2]["movimentacao_id"])
+        assert pendente.status == "pendente_aprovacao" and pendente.executado_por is None
+        assert db.get(Ativo, caro).local_id == cenario["origem"]
+
+
+def test_lote_queries_nao_crescem_com_o_tamanho():
+    contagens = []
+    for quantidade in (3, 30):
+        cenario = _cenario()
+        with ambiente.sessao() as db:
+            ids = [ambiente.criar_ativo(db, local_id=cenario["origem"]).id for _ in range(quantidade)]
+        itens = [
+            {"ativo_id": ativo_id, "tipo": "transferencia", "local_destino_id": cenario["destino"], "motivo": "Lote"}
+            for ativo_id in ids
+        ]
+        with ambiente.contar_queries() as instrucoes:
+            assert _lote(cenario["cabecalhos"], itens).json()["executadas"] == quantidade
+        contagens.append(len(instrucoes))
+    assert contagens[0] == contagens[1], contagens
+
+
+def test_lote_grande_vira_job():
+    cenario = _cenario()
+    itens = [
+        {"ativo_id": cenario["ativo_id"], "tipo": "transferencia", "motivo": "Lote grande"}
+    ] * (MOVIMENTACOES_LOTE_LIMITE_SINCRONO + 1)
+    resposta = _lote(cenario["cabecalhos"], itens)
+    assert resposta.status_code == 202
+    job = job_runner.get(resposta.json()["job_id"])
+    assert (job.kind, job.status) == ("movimentacoes.criar_lote", JobStatus.PENDING)
+
+
+def test_aprovacao_notifica_gestor_e_respeita_escopo():
+    cenario = _cenario()
+    with ambiente.sessao() as db:
+        gestor = ambiente.criar_usuario(db, role=UserRole.MANAGER)
+        outro = ambiente.criar_usuario(db, role=UserRole.MANAGER)
+        setor = ambiente.criar_setor(db, gestor=gestor)
+        ativo_id = ambiente.criar_ativo(
+            db, local_id=cenario["origem"], setor_id=setor.id, valor_aquisicao=VALOR_LIMITE_APROVACAO + 1
+        ).id
+        gestor_id = gestor.id
+        cabecalhos_gestor, cabecalhos_outro = ambiente.cabecalhos(gestor), ambiente.cabecalhos(outro)
+    cliente = ambiente.cliente()
+
+    enviadas = []
+    conexoes = connection_manager.user_connections
+    connection_manager.user_connections = {str(gestor_id): {"conexao-1"}}
+    connection_manager.send_to_users_threadsafe = enviadas.append
+    try:
+        resposta = cliente.post("/api/v1/movimentacoes/", json={
+            "ativo_id": ativo_id, "tipo": "transferencia",
+            "local_destino_id": cenario["destino"], "motivo": "Ativo de alto valor",
+        }, headers=cenario["cabecalhos"])
+    finally:
+        connection_manager.user_connections = conexoes
+        del connection_manager.send_to_users_threadsafe
+    assert resposta.status_code == 200, resposta.text
+    movimentacao_id = resposta.json()["id"]
+    assert resposta.json()["status"] == "pendente_aprovacao"
+    assert resposta.json()["requer_aprovacao"] is True
+    mensagem, = enviadas
+    assert mensagem[str(gestor_id)]["type"] == "aprovacao_pendente"
+    assert mensagem[str(gestor_id)]["data"]["movimentacoes"] == [movimentacao_id]
+
+    url = f"/api/v1/movimentacoes/{movimentacao_id}/aprovar"
+    assert cliente.put(url, headers=cabecalhos_outro).status_code == 403
+    resposta = cliente.put(url, params={"observacoes_aprovacao": "Liberado"}, headers=cabecalhos_gestor)
+    assert resposta.status_code == 200, resposta.text
+
+    with ambiente.sessao() as db:
+        movimentacao = db.get(Movimentacao, movimentacao_id)
+        assert movimentacao.status == "executada"
+        assert movimentacao.aprovado_por == movimentacao.executado_por == gestor_id
+        assert movimentacao.observacoes == "Aprovação: Liberado"
+        assert db.get(Ativo, ativo_id).local_id == cenario["destino"]
+
+
+
+def _pendente(db, ativo_id, solicitante_id, para_local_id, setor_id=None, centro_custo_id=None):
+    return ambiente.criar(
+        db, Movimentacao, ativo_id=ativo_id, tipo="transferencia", motivo="Aguardando aprovação",
+        status="pendente_aprovacao", solicitado_por=solicitante_id, para_local_id=para_local_id,
+        setor_id=setor_id, centro_custo_id=centro_custo_id,
+    ).id
+
+
+def _fila_do_gestor():
+    """Gestor de um setor com centro de custo e pendências dentro e fora da sua fila"""
+    cenario = _cenario()
+    with ambiente.sessao() as db:
+        gestor = ambiente.criar_usuario(db, role=UserRole.MANAGER)
+        centro = ambiente.criar_centro_custo(db)
+        gerido = ambiente.criar_setor(db, gestor=gestor, centro_custo=centro)
+        vizinho, alheio = ambiente.criar_setor(db), ambiente.criar_setor(db)
+
+        def pendente(setor, centro_custo_id=None):
+            ativo_id = ambiente.criar_ativo(db, local_id=cenario["origem"], setor_id=setor.id).id
+            return _pendente(
+                db, ativo_id, cenario["usuario_id"], cenario["destino"], setor.id, centro_custo_id
+            )
+
+        cenario.update(
+            gestor_id=gestor.id, cabecalhos_gestor=ambiente.cabecalhos(gestor),
+            setor_gerido=gerido.id, setor_alheio=alheio.id,
+            do_setor=pendente(gerido),
+            do_centro=pendente(vizinho, centro.id),
+            fora=pendente(alheio),
+        )
+    return cenario
+
+
+def _fila(cabecalhos, **params):
+    resposta = ambiente.cliente().get("/api/v1/movimentacoes/pendentes/aprovacao", params=params, headers=cabecalhos)
+    assert resposta.status_code == 200, resposta.text
+    return resposta.json()
+
+
+def test_fila_de_pendentes_paginada_por_cursor():
+    cenario = _cenario()
+    with ambiente.sessao() as db:
+        setor_id = ambiente.criar_setor(db).id
+        ids = [
+            _pendente(db, ambiente.criar_ativo(db).id, cenario["usuario_id"], cenario["destino"], setor_id)
+            for _ in range(5)
+        ]
+        # Movimentações já decididas ficam fora da fila
+        ambiente.criar(
+            db, Movimentacao, ativo_id=cenario["ativo_id"], tipo="transferencia", motivo="Decidida",
+            status="rejeitada", solicitado_por=cenario["usuario_id"], setor_id=setor_id,
+        )
+
+    paginas, cursor = [], None
+    while True:
+        params = {"setor_id": setor_id, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        pagina = _fila(cenario["cabecalhos"], **params)
+        assert pagina["total"] == 5 and pagina["limit"] == 2
+        paginas.append([m["id"] for m in pagina["movimentacoes"]])
+        cursor = pagina["proximo_cursor"]
+        if cursor is None:
+            break
+        assert cursor == paginas[-1][-1]
+    # Mais antigas primeiro, sem repetir nem pular itens entre as páginas
+    assert paginas == [ids[0:2], ids[2:4], ids[4:]]
+
+    primeira = _fila(cenario["cabecalhos"], setor_id=setor_id, limit=1)["movimentacoes"][0]
+    assert primeira["ativo_id"] and primeira["ativo_codigo"] and primeira["setor_id"] == setor_id
+
+
+def test_minha_fila_segue_setor_e_centro_de_custo_do_gestor():
+    cenario = _fila_do_gestor()
+
+    minha = _fila(cenario["cabecalhos_gestor"], minha_fila=True)
+    assert [m["id"] for m in minha["movimentacoes"]] == [cenario["do_setor"], cenario["do_centro"]]
+    assert minha["total"] == 2
+
+    # Sem minha_fila o gestor vê todas as pendências, inclusive as de outros setores
+    alheias = _fila(cenario["cabecalhos_gestor"], setor_id=cenario["setor_alheio"])
+    assert [m["id"] for m in alheias["movimentacoes"]] == [cenario["fora"]]
+
+    # Quem não gere nenhum setor tem a fila vazia
+    vazia = _fila(cenario["cabecalhos"], minha_fila=True)
+    assert (vazia["total"], vazia["movimentacoes"], vazia["proximo_cursor"]) == (0, [], None)
+
+
+def test_aprovar_lote_com_ids_validos_ausentes_e_fora_do_escopo():
+    cenario = _fila_do_gestor()
+    with ambiente.sessao() as db:
+        # Segunda pendência do mesmo ativo que a do setor gerido
+        mesmo_ativo = _pendente(
+            db, db.get(Movimentacao, cenario["do_setor"]).ativo_id, cenario["usuario_id"],
+            cenario["origem"], cenario["setor_gerido"],
+        )
+
+    ids = [cenario["do_setor"], 0, cenario["fora"], cenario["do_centro"], cenario["do_setor"], mesmo_ativo]
+    resposta = ambiente.cliente().put(
+        "/api/v1/movimentacoes/aprovar-lote", json={"movimentacao_ids": ids}, headers=cenario["cabecalhos_gestor"]
+    )
+    assert resposta.status_code == 200, resposta.text
+    resultado = resposta.json()
+    assert (resultado["aprovadas"], resultado["erros"]) == (2, 3)
+    # IDs repetidos contam uma vez, na ordem em que apareceram
+    assert [(d["movimentacao_id"], d["status"], d.get("erro")) for d in resultado["detalhes"]] == [
+        (cenario["do_setor"], "executada", None),
+        (0, "erro", "Movimentação não encontrada"),
+        (cenario["fora"], "erro", "Movimentação fora da fila de aprovação do usuário"),
+        (cenario["do_centro"], "executada", None),
+        (mesmo_ativo, "erro", "Outra movimentação do mesmo ativo no lote"),
+    ]
+
+    with ambiente.sessao() as db:
+        for movimentacao_id in (cenario["do_setor"], cenario["do_centro"]):
+            movimentacao = db.get(Movimentacao, movimentacao_id)
+            assert movimentacao.status == "executada"
+            assert movimentacao.aprovado_por == movimentacao.executado_por == cenario["gestor_id"]
+            assert db.get(Ativo, movimentacao.ativo_id).local_id == cenario["destino"]
+        for movimentacao_id in (cenario["fora"], mesmo_ativo):
+            movimentacao = db.get(Movimentacao, movimentacao_id)
+            assert movimentacao.status == "pendente_aprovacao" and movimentacao.aprovado_por is None
+        assert db.get(Ativo, db.get(Movimentacao, cenario["fora"]).ativo_id).local_id == cenario["origem"]
+
+    # Reenviar o lote: o que já foi executado não é aprovado de novo
+    repetido = ambiente.cliente().put(
+        "/api/v1/movimentacoes/aprovar-lote", json={"movimentacao_ids": [cenario["do_setor"]]},
+        headers=cenario["cabecalhos_gestor"],
+    ).json()
+    assert repetido["aprovadas"] == 0
+    assert repetido["detalhes"][0]["erro"] == "Movimentação não pode ser aprovada. Status atual: executada"
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_criar_movimentacao_executa_e_registra_custodia,
+        test_lote_usa_a_mesma_execucao,
+        test_lote_com_erros_e_pendencias,
+        test_lote_queries_nao_crescem_com_o_tamanho,
+        test_lote_grande_vira_job,
+        test_aprovacao_notifica_gestor_e_respeita_escopo,
+        test_fila_de_pendentes_paginada_por_cursor,
+        test_minha_fila_segue_setor_e_centro_de_custo_do_gestor,
+        test_aprovar_lote_com_ids_validos_ausentes_e_fora_do_escopo,
+    )
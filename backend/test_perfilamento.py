@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Testes do perfilamento por requisição (amostras de pilha e spans)
+"""
+
+import asyncio
+import time
+
+import ambiente_teste as ambiente
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.profiling import AWAIT_FRAME, Profiler, profile_sync_endpoints, profiler
+
+
+def _ocupado(segundos: float) -> None:
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        pass
+
+
+async def _requisicao():
+    _ocupado(0.15)
+    await asyncio.sleep(0.15)
+
+
+def test_amostras_distinguem_tarefa_executando_e_suspensa():
+    perfilador = Profiler(enabled=True, interval_ms=5)
+
+    async def perfilada():
+        perfil = perfilador.begin()
+        inicio = time.perf_counter()
+        await _requisicao()
+        perfilador.end(perfil, "GET /teste", time.perf_counter() - inicio)
+
+    asyncio.run(perfilada())
+    pilhas = perfilador.routes["GET /teste"].stacks
+    executando = [p for p in pilhas if not p.endswith(AWAIT_FRAME)]
+    suspensas = [p for p in pilhas if p.endswith(AWAIT_FRAME)]
+    assert executando and suspensas, pilhas
+    # Executando: da corrotina da tarefa até o código em execução
+    assert all(p.startswith("test_amostras") for p in executando), executando
+    assert any(p.split(";")[-1].startswith("_ocupado") for p in executando), executando
+    # Suspensa: cadeia de awaits até o sleep
+    assert any("_requisicao" in p and "sleep" in p for p in suspensas), suspensas
+    assert not perfilador._active
+
+
+def test_endpoint_sincrono_amostrado_na_thread_do_threadpool():
+    perfilador = Profiler(enabled=True, interval_ms=5)
+    app = FastAPI()
+
+    @app.get("/sincrono")
+    def endpoint_sincrono():
+        _ocupado(0.3)
+        return {"ok": True}
+
+    profile_sync_endpoints(app)
+
+    async def perfilado(scope, receive, send):
+        if scope["type"] != "http":
+            return await app(scope, receive, send)
+        perfil = perfilador.begin()
+        inicio = time.perf_counter()
+        try:
+            await app(scope, receive, send)
+        finally:
+            perfilador.end(perfil, "GET /sincrono", time.perf_counter() - inicio)
+
+    with TestClient(perfilado) as cliente:
+        assert cliente.get("/sincrono").json() == {"ok": True}
+        # A rota passa a chamar o endpoint por meio do wrapper
+        assert app.router.routes[-1].dependant.call.__wrapped__.__name__ == "endpoint_sincrono"
+
+    pilhas = perfilador.routes["GET /sincrono"].stacks
+    na_thread = [p for p in pilhas if ".endpoint_sincrono (" in p]
+    assert na_thread, pilhas
+    # A pilha da thread vem depois da cadeia de awaits, do endpoint até o código em execução
+    assert any(p.split(";")[-1].startswith("_ocupado") for p in na_thread), na_thread
+    assert all(p.index("run_in_threadpool") < p.index(".endpoint_sincrono (") for p in na_thread), na_thread
+    assert not any(p.endswith(AWAIT_FRAME) for p in na_thread)
+
+
+def test_requisicao_pedida_por_admin_e_agregada_por_rota():
+    with ambiente.sessao() as db:
+        cabecalhos = ambiente.cabecalhos(ambiente.criar_usuario(db))
+        ambiente.criar_ativo(db)
+    cliente = ambiente.cliente()
+
+    profiler.enabled = True
+    profiler.reset()
+    try:
+        assert cliente.get("/api/v1/ativos/", headers=cabecalhos).status_code == 200
+        assert profiler.routes == {}
+        resposta = cliente.get("/api/v1/ativos/", headers={**cabecalhos, profiler.header: "1"})
+        assert resposta.status_code == 200, resposta.text
+    finally:
+        profiler.enabled = False
+
+    resumo = cliente.get("/api/v1/monitoring/profiles", headers=cabecalhos).json()
+    rota = resumo["routes"]["GET /api/v1/ativos/"]
+    assert rota["requests"] == 1
+    tipos = {span["kind"] for span in rota["spans"]}
+    assert {"db", "serialize", "middleware"} <= tipos, tipos
+    assert any(span["name"].startswith("SELECT ativos") for span in rota["spans"])
+    profiler.reset()
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_amostras_distinguem_tarefa_executando_e_suspensa,
+        test_endpoint_sincrono_amostrado_na_thread_do_threadpool,
+        test_requisicao_pedida_por_admin_e_agregada_por_rota,
+    )
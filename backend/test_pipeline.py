@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Testes do pipeline ASGI de middlewares (cabeçalhos, limite de requisições, validação e métricas)
+"""
+
+import ambiente_teste as ambiente
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.monitoring import metrics_collector
+from app.middleware import RequestPipelineMiddleware
+from app.middleware.rate_limiting import RateLimitMiddleware
+
+
+def _cliente(regras: str = "", padrao: str = "1000/60") -> TestClient:
+    app = FastAPI()
+
+    @app.get("/itens/{item_id}")
+    async def obter_item(item_id: int):
+        return {"id": item_id}
+
+    @app.post("/eco")
+    async def eco(request: Request):
+        return await request.json()
+
+    app.add_middleware(RequestPipelineMiddleware, rate_limit=RateLimitMiddleware(rules=regras, default=padrao))
+    return TestClient(app, base_url="http://localhost")
+
+
+def _contagem(chave: str) -> int:
+    histograma = metrics_collector.endpoint_histograms().get(chave)
+    return histograma.count if histograma else 0
+
+
+def test_cabecalhos_e_metrica_pelo_template_da_rota():
+    antes = _contagem("GET /itens/{item_id}")
+    resposta = _cliente().get("/itens/7")
+    assert resposta.status_code == 200 and resposta.json() == {"id": 7}
+    for cabecalho in ("X-Request-ID", "X-Process-Time", "X-Content-Type-Options", "X-RateLimit-Remaining"):
+        assert cabecalho in resposta.headers, cabecalho
+    assert _contagem("GET /itens/{item_id}") == antes + 1
+
+
+def test_rejeicoes_recebem_cabecalhos_e_sao_medidas():
+    cliente = _cliente(padrao="2/60")
+    assert [cliente.get("/itens/1").status_code for _ in range(2)] == [200, 200]
+    # Rejeitada antes do roteamento: entra nas métricas sem template de rota
+    antes = metrics_collector.total_requests
+    bloqueada = cliente.get("/itens/1")
+    assert bloqueada.status_code == 429
+    assert bloqueada.json()["error_code"] == "RATE_LIMIT_EXCEEDED"
+    assert "Retry-After" in bloqueada.headers and "X-Request-ID" in bloqueada.headers
+    assert bloqueada.headers["X-Frame-Options"] == "DENY"
+    assert metrics_collector.total_requests == antes + 1
+
+    grande = _cliente().post("/eco", content=b"{}", headers={
+        "Content-Type": "application/json", "Content-Length": str(11 * 1024 * 1024),
+    })
+    assert grande.status_code == 413 and "X-Request-ID" in grande.headers
+
+
+def test_corpo_validado_chega_ao_endpoint():
+    cliente = _cliente()
+    assert cliente.post("/eco", json={"nome": "Sala 3", "n": [1, 2]}).json() == {"nome": "Sala 3", "n": [1, 2]}
+    assert cliente.post("/eco", json={"nome": "A & B"}).json() == {"nome": "A &amp; B"}
+    bloqueada = cliente.post("/eco", json={"nome": "javascript:alert(1)"})
+    assert bloqueada.status_code == 400 and bloqueada.json()["error_code"] == "INVALID_INPUT"
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_cabecalhos_e_metrica_pelo_template_da_rota,
+        test_rejeicoes_recebem_cabecalhos_e_sao_medidas,
+        test_corpo_validado_chega_ao_endpoint,
+    )
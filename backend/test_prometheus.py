@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Testes da exposição de métricas em formato Prometheus/OpenMetrics
+"""
+
+import asyncio
+
+import ambiente_teste as ambiente
+
+from app.core.config import settings
+from app.core.monitoring import metrics_collector
+from app.core.prometheus import LATENCY_BUCKETS, MetricsWriter, render_metrics
+from app.models import UserRole
+
+URL = "/api/v1/monitoring/prometheus"
+
+
+def _amostras(texto: str) -> dict:
+    """Linha de amostra -> valor (sem comentários)"""
+    amostras = {}
+    for linha in texto.splitlines():
+        if linha and not linha.startswith("#"):
+            nome, valor = linha.rsplit(" ", 1)
+            amostras[nome] = float(valor)
+    return amostras
+
+
+def test_histograma_por_template_da_rota():
+    rota = '/teste/prometheus/{item_id}'
+    for tempo, status in ((0.003, 200), (0.02, 200), (0.2, 200), (3.0, 500)):
+        metrics_collector.record(rota, "GET", status, tempo)
+
+    amostras = _amostras(asyncio.run(render_metrics()))
+    rotulos = f'method="GET",route="{rota}"'
+    baldes = [amostras[f'http_request_duration_seconds_bucket{{{rotulos},le="{limite!r}"}}'] for limite in LATENCY_BUCKETS]
+    # Cumulativos: 0.003 <= 5 ms, 0.02 <= 25 ms, 0.2 <= 250 ms, 3.0 <= 5 s
+    assert baldes == [1, 1, 2, 2, 2, 3, 3, 3, 3, 4, 4]
+    assert amostras[f'http_request_duration_seconds_bucket{{{rotulos},le="+Inf"}}'] == 4
+    assert amostras[f'http_request_duration_seconds_count{{{rotulos}}}'] == 4
+    assert abs(amostras[f'http_request_duration_seconds_sum{{{rotulos}}}'] - 3.223) < 1e-9
+    assert amostras[f'http_request_errors_total{{{rotulos}}}'] == 1
+    assert amostras['http_error_responses_total{status="500"}'] >= 1
+    assert "redis_up" in amostras and "jobs_running" in amostras
+
+
+def test_formato_prometheus_e_openmetrics():
+    for openmetrics, familia in ((False, "eventos_total"), (True, "eventos")):
+        escritor = MetricsWriter(openmetrics)
+        escritor.family("eventos", "counter", "Eventos recebidos")
+        escritor.sample("eventos_total", 3, (("origem", 'agente "A"\n'),))
+        linhas = escritor.text().splitlines()
+        assert linhas[:2] == [f"# HELP {familia} Eventos recebidos", f"# TYPE {familia} counter"]
+        assert linhas[2] == 'eventos_total{origem="agente \\"A\\"\\n"} 3'
+        assert (linhas[-1] == "# EOF") is openmetrics
+
+
+def test_autenticacao_e_negociacao_do_formato():
+    with ambiente.sessao() as db:
+        admin = ambiente.cabecalhos(ambiente.criar_usuario(db))
+        usuario = ambiente.cabecalhos(ambiente.criar_usuario(db, role=UserRole.USER))
+    cliente = ambiente.cliente()
+
+    assert cliente.get(URL).status_code == 403
+    assert cliente.get(URL, headers=usuario).status_code == 403
+
+    resposta = cliente.get(URL, headers=admin)
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE http_request_duration_seconds histogram" in resposta.text
+
+    # Token estático do scraper, com o formato OpenMetrics pedido no Accept
+    settings.METRICS_BEARER_TOKEN = "token-do-scraper"
+    try:
+        resposta = cliente.get(URL, headers={
+            "Authorization": "Bearer token-do-scraper",
+            "Accept": "application/openmetrics-text; version=1.0.0",
+        })
+        recusada = cliente.get(URL, headers={"Authorization": "Bearer outro-token"})
+    finally:
+        settings.METRICS_BEARER_TOKEN = None
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.headers["content-type"].startswith("application/openmetrics-text")
+    assert resposta.text.endswith("# EOF\n")
+    assert "# TYPE machine_heartbeats counter" in resposta.text
+    assert recusada.status_code == 401
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_histograma_por_template_da_rota,
+        test_formato_prometheus_e_openmetrics,
+        test_autenticacao_e_negociacao_do_formato,
+    )
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Testes da trilha de auditoria encadeada (gravação e verificação das cadeias)
+"""
+
+import hashlib
+import hmac
+import json
+
+import ambiente_teste as ambiente
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.audit_chain import MERKLE_SIGNATURE_ALGORITHM, append_audit_records
+from app.core.config import settings
+from app.core.security import canonical_audit_json, compute_audit_signature
+from app.core.audit_verification import verify_audit_chains
+from app.models.movement import AssetAudit, AssetAuditHead
+
+
+def _registros(ativo_id: int, quantidade: int, inicio: int = 0):
+    return [
+        {
+            "asset_id": ativo_id,
+            "action": "UPDATE",
+            "table_name": "ativos",
+            "record_id": ativo_id,
+            "custom_metadata": {"campo": "estado", "valor": f"v{inicio + i}"},
+        }
+        for i in range(quantidade)
+    ]
+
+
+def _ativos(quantidade: int):
+    with ambiente.sessao() as db:
+        return [ambiente.criar_ativo(db).id for _ in range(quantidade)]
+
+
+def test_verificacao_detecta_adulteracao_e_retoma_do_checkpoint():
+    ativo_a, ativo_b = _ativos(2)
+    with ambiente.sessao() as db:
+        append_audit_records(db, _registros(ativo_a, 3) + _registros(ativo_b, 2))
+        db.commit()
+
+    relatorio = verify_audit_chains([ativo_a, ativo_b], workers=1, chunk_size=2)
+    assert relatorio["records_verified"] == 5
+    assert relatorio["broken_chains"] == 0
+
+    # Execução incremental: só os registros novos são lidos
+    with ambiente.sessao() as db:
+        append_audit_records(db, _registros(ativo_a, 1, inicio=3))
+        db.commit()
+    assert verify_audit_chains([ativo_a, ativo_b], workers=1)["records_verified"] == 1
+
+    # Adulterar o payload assinado de um registro do ativo B
+    with ambiente.sessao() as db:
+        registro = db.query(AssetAudit).filter(AssetAudit.asset_id == ativo_b).order_by(AssetAudit.id).first()
+        registro.custom_metadata = {**registro.custom_metadata, "valor": "adulterado"}
+        adulterado_id = registro.id
+        db.commit()
+
+    relatorio = verify_audit_chains([ativo_a, ativo_b], full=True, workers=1)
+    assert relatorio["broken_chains"] == 1
+    quebra, = relatorio["breaks"]
+    assert (quebra["asset_id"], quebra["audit_id"], quebra["reason"]) == (ativo_b, adulterado_id, "record_hash_mismatch")
+
+
+def test_gravacao_encadeia_pela_cabeca_sem_ler_historico():
+    ativo, = _ativos(1)
+    with ambiente.sessao() as db:
+        append_audit_records(db, _registros(ativo, 2))
+        db.commit()
+
+    # Com a cabeça criada, gravar não consulta asset_audits
+    with ambiente.sessao() as db:
+        with ambiente.contar_queries() as instrucoes:
+            append_audit_records(db, _registros(ativo, 2, inicio=2))
+            db.commit()
+    selects = [s for s in instrucoes if s.lstrip().upper().startswith("SELECT")]
+    assert selects and all("asset_audits" not in s for s in selects), selects
+
+    with ambiente.sessao() as db:
+        cadeia = db.query(AssetAudit).filter(AssetAudit.asset_id == ativo).order_by(AssetAudit.id).all()
+        assert [r.chain_seq for r in cadeia] == [1, 2, 3, 4]
+        assert cadeia[0].prev_hash is None
+        assert all(atual.prev_hash == anterior.record_hash for anterior, atual in zip(cadeia, cadeia[1:]))
+        cabeca = db.get(AssetAuditHead, ativo)
+        assert (cabeca.seq, cabeca.last_hash) == (4, cadeia[-1].record_hash)
+
+        # Uma bifurcação (mesma posição na cadeia) é rejeitada pelo índice único
+        db.add(AssetAudit(asset_id=ativo, action="UPDATE", table_name="ativos", chain_seq=4, record_hash="x"))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+        else:
+            raise AssertionError("chain_seq duplicado deveria ser rejeitado")
+
+
+def test_serializacao_e_assinatura_iguais_as_anteriores():
+    payload = {"b": [1, 2.5, None], "a": {"z": "ção", "y": True}, "asset_id": 3}
+    assert canonical_audit_json(payload) == json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    esperado = hmac.new(settings.SECRET_KEY.encode(), b"anterior" + b"atual", hashlib.sha256).hexdigest()
+    assert compute_audit_signature("atual", "anterior") == esperado
+    assert compute_audit_signature("atual", "anterior") == esperado  # estado HMAC em cache não é alterado
+
+
+def test_assinatura_em_lote_merkle_verificavel():
+    ativo_a, ativo_b = _ativos(2)
+    with ambiente.sessao() as db:
+        registros = append_audit_records(
+            db, _registros(ativo_a, 5) + _registros(ativo_b, 4), batch_signing=True
+        )
+        db.commit()
+    assert len({r["signature"] for r in registros}) == 1
+    assert all(r["signature_algorithm"] == MERKLE_SIGNATURE_ALGORITHM for r in registros)
+
+    relatorio = verify_audit_chains([ativo_a, ativo_b], full=True, workers=1)
+    assert relatorio["records_verified"] == 9 and relatorio["broken_chains"] == 0
+
+    # Prova de inclusão adulterada: a raiz recalculada não confere com a assinatura
+    with ambiente.sessao() as db:
+        registro = db.query(AssetAudit).filter(AssetAudit.asset_id == ativo_a).order_by(AssetAudit.id).first()
+        registro.merkle_proof = {**registro.merkle_proof, "i": registro.merkle_proof["i"] + 1}
+        db.commit()
+    relatorio = verify_audit_chains([ativo_a, ativo_b], full=True, workers=1)
+    assert [quebra["reason"] for quebra in relatorio["breaks"]] == ["bad_signature"]
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_verificacao_detecta_adulteracao_e_retoma_do_checkpoint,
+        test_gravacao_encadeia_pela_cabeca_sem_ler_historico,
+        test_serializacao_e_assinatura_iguais_as_anteriores,
+        test_assinatura_em_lote_merkle_verificavel,
+    )
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Testes da sanitização de corpos JSON (ValidationMiddleware)
+"""
+
+import ambiente_teste as ambiente
+
+from app.middleware.validation import InputValidator, UnsafeInputError, _JSONTooDeep, validation_middleware
+from app.models import Movimentacao
+
+
+def _bloqueado_por_padrao(valor):
+    """Verificação anterior: cada padrão aplicado à string inteira"""
+    for padrao in InputValidator.DANGEROUS_PATTERNS:
+        if padrao.search(valor):
+            return "dangerous"
+    for padrao in InputValidator.SQL_INJECTION_PATTERNS:
+        if padrao.search(valor):
+            return "sql"
+    return None
+
+
+def test_filtro_por_literais_equivale_aos_padroes():
+    amostras = [
+        "Notebook Dell", "<SCRIPT>alert(1)</script>", "onClick = x", "JavaScript:void(0)",
+        "Sala 3 -- bloco B", "drop table", "O'Brien", "/* nota */", "EVAL (x)",
+        "İnsert", "ſcript", "data:text/html,oi", "Transferência para o almoxarifado",
+    ]
+    for valor in amostras:
+        assert InputValidator.find_blocked(valor) == _bloqueado_por_padrao(valor), valor
+
+
+def test_corpo_limpo_e_encaminhado_sem_reescrita():
+    corpo = {"motivo": "Troca de sala", "itens": [{"codigo": "AT000001", "quantidade": 2}]}
+    dados, alterado = validation_middleware.sanitize_body(corpo)
+    assert dados is corpo and alterado is False
+
+    dados, alterado = validation_middleware.sanitize_body({"motivo": " A & B ", "longo": "x" * 1500})
+    assert alterado is True
+    assert dados == {"motivo": "A &amp; B", "longo": "x" * 1000}
+
+    try:
+        validation_middleware.sanitize_body({"itens": ["ok", {"nota": "<script>x</script>"}]})
+    except UnsafeInputError as erro:
+        assert erro.kind == "dangerous"
+    else:
+        raise AssertionError("entrada perigosa deveria ser bloqueada")
+
+    profundo = "fim"
+    for _ in range(validation_middleware.max_json_depth + 2):
+        profundo = {"x": profundo}
+    try:
+        validation_middleware.sanitize_body(profundo)
+    except _JSONTooDeep:
+        pass
+    else:
+        raise AssertionError("JSON profundo demais deveria ser rejeitado")
+
+
+def test_requisicoes_bloqueadas_reescritas_e_isentas():
+    with ambiente.sessao() as db:
+        usuario = ambiente.criar_usuario(db)
+        cabecalhos = ambiente.cabecalhos(usuario)
+        ativo_id = ambiente.criar_ativo(db).id
+        outro_id = ambiente.criar_ativo(db).id
+    cliente = ambiente.cliente()
+
+    bloqueada = cliente.post("/api/v1/movimentacoes/", json={
+        "ativo_id": ativo_id, "tipo": "transferencia", "motivo": "<script>alert(1)</script>",
+    }, headers=cabecalhos)
+    assert bloqueada.status_code == 400
+    assert bloqueada.json()["error_code"] == "INVALID_INPUT"
+
+    # O corpo reescrito chega ao endpoint
+    resposta = cliente.post("/api/v1/movimentacoes/", json={
+        "ativo_id": ativo_id, "tipo": "transferencia", "motivo": "Sala A & B",
+    }, headers=cabecalhos)
+    assert resposta.status_code == 200, resposta.text
+    with ambiente.sessao() as db:
+        assert db.get(Movimentacao, resposta.json()["id"]).motivo == "Sala A &amp; B"
+
+    # Rotas com @skip_sanitization ficam com a validação do schema
+    lote = cliente.post("/api/v1/movimentacoes/lote", json={"movimentacoes": [
+        {"ativo_id": outro_id, "tipo": "transferencia", "motivo": "Sala A & B"},
+    ]}, headers=cabecalhos)
+    assert lote.status_code == 200, lote.text
+    with ambiente.sessao() as db:
+        assert db.get(Movimentacao, lote.json()["detalhes"][0]["movimentacao_id"]).motivo == "Sala A & B"
+
+
+if __name__ == "__main__":
+    ambiente.executar(
+        test_filtro_por_literais_equivale_aos_padroes,
+        test_corpo_limpo_e_encaminhado_sem_reescrita,
+        test_requisicoes_bloqueadas_reescritas_e_isentas,
+    )